@@ -22,3 +22,7 @@ class AdvancedSearchPort(abc.ABC):
 
     @abc.abstractmethod
     async def get_index_mapping(self) -> dict[str, Any]: ...
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        """Hit and miss counts of a result cache; empty if not cached."""
+        return {}
@@ -8,4 +8,6 @@ from mhd_ws.application.services.interfaces.async_task.async_task_result import
 
 class AsyncTaskExecutor(abc.ABC):
     @abc.abstractmethod
-    async def start(self, expires: Union[None, int] = None) -> AsyncTaskResult: ...
+    async def start(
+        self, expires: Union[None, int] = None, countdown: Union[None, int] = None
+    ) -> AsyncTaskResult: ...
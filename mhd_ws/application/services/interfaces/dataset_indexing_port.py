@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+import abc
+
+
+class DatasetIndexingPort(abc.ABC):
+    @abc.abstractmethod
+    async def schedule_indexing(self, accession: str) -> str:
+        """Queue indexing of the latest public revision of ``accession``;
+        returns the schedule token."""
@@ -12,6 +12,7 @@ from mhd_ws.domain.entities.search.index_search_spec import (
     CharacteristicPairClauseSpec,
     ComparatorClauseSpec,
     DescriptorClauseSpec,
+    FacetSelection,
     FieldClauseSpec,
     FieldRef,
     ParameterPairClauseSpec,
@@ -42,8 +43,25 @@ class SearchSpecResolver:
             query_text=dto.query_text,
             inter_field_combiner=dto.inter_field_combiner,
             clauses=clauses,
+            facets=self._resolve_facets(dto),
         )
 
+    def _resolve_facets(self, dto: SearchRequestDTO) -> FacetSelection:
+        if dto.facets == "all":
+            keys = None
+        elif dto.facets == "none":
+            keys = []
+        else:
+            keys = sorted(set(dto.facets))
+        facet_keys = {f.facet_key for f in self._registry.fields if f.facet_key}
+        unknown = sorted({*(keys or []), *dto.facet_sizes} - facet_keys)
+        if unknown:
+            raise ValueError(
+                f"Unknown facet key(s) {', '.join(map(repr, unknown))}; "
+                f"allowed: {', '.join(sorted(facet_keys))}"
+            )
+        return FacetSelection(keys=keys, sizes=dict(sorted(dto.facet_sizes.items())))
+
     def _resolve_term_clause(self, clause: TermClauseDTO) -> TermClauseSpec:
         field_def = self._lookup(clause.field_id)
         self._validate_term_ops(field_def, clause)
@@ -84,3 +84,11 @@ class SearchRequestDTO(BaseModel):
     clauses: list[FieldClauseDTO] = Field(default_factory=list)
     page: Optional[PageDTO] = None
     sort: list[SortDTO] = Field(default_factory=list)
+    # "*" starts cursor paging; later pages send the returned next_cursor.
+    cursor: Optional[str] = None
+    # "all", "none" or a list of facet keys (see /search/fields).
+    facets: Union[Literal["all", "none"], list[str]] = "all"
+    # Number of buckets per value facet, overriding the default of 25.
+    facet_sizes: dict[str, Annotated[int, Field(ge=1, le=1000)]] = Field(
+        default_factory=dict
+    )
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from mhd_ws.domain.entities.search.legacy.facet_configuration import FacetConfig
+
+FILE_FACET_CONFIG: dict[str, FacetConfig] = {
+    "file_type": FacetConfig(field="file_type"),
+    "extension": FacetConfig(field="extension"),
+    "format": FacetConfig(field="format.name"),
+    "repository": FacetConfig(field="repository.name"),
+}
+
+# Filter names accepted by the file search endpoints -> file index fields.
+FILE_FILTER_FIELDS: dict[str, str] = {
+    "dataset_id": "dataset_id",
+    "accession": "repository.identifier",
+    "repository": "repository.name",
+    "file_type": "file_type",
+    "extension": "extension",
+    "format": "format.name",
+}
+
+# Sortable fields; ``id`` breaks ties so pages never overlap.
+FILE_SORT_FIELDS: tuple[str, ...] = (
+    "dataset_id",
+    "file_type",
+    "name",
+    "extension",
+    "id",
+)
@@ -10,6 +10,9 @@ from mhd_ws.domain.shared.model import MhdBaseModel
 class PageModel(MhdBaseModel):
     current: int = Field(default=1, ge=1)
     size: int = Field(default=20, ge=1, le=200)
+    # Opaque cursor from ``next_cursor`` of the previous page, or "*" to
+    # start cursor paging; replaces ``current``.
+    cursor: str | None = None
 
 
 class SortModel(MhdBaseModel):
@@ -38,3 +41,5 @@ class IndexSearchResult(MhdBaseModel):
     total_results: int = 0
     facets: dict[str, FacetResponse] = Field(default_factory=dict)
     request_id: str = ""
+    # Set on cursor-paged searches while more hits may follow.
+    next_cursor: str | None = None
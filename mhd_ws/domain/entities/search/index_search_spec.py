@@ -88,7 +88,16 @@ FieldClauseSpec = Annotated[
 ]
 
 
+class FacetSelection(BaseModel):
+    keys: Optional[list[str]] = None  # None = every facet, [] = none
+    sizes: dict[str, int] = Field(default_factory=dict)
+
+    def includes(self, facet_key: str) -> bool:
+        return self.keys is None or facet_key in self.keys
+
+
 class SearchSpec(BaseModel):
     query_text: Optional[str] = None
     inter_field_combiner: InterFieldCombiner = "AND"
     clauses: list[FieldClauseSpec] = Field(default_factory=list)
+    facets: FacetSelection = Field(default_factory=FacetSelection)
@@ -4,6 +4,7 @@ from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator, Union
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import Pool
 
 from mhd_ws.infrastructure.persistence.db.db_client import DatabaseClient
 from mhd_ws.infrastructure.persistence.db.sqlite.config import (
@@ -17,6 +18,7 @@ class SQLiteDatabaseClientImpl(DatabaseClient):
     def __init__(
         self,
         db_connection: Union[SQLiteDatabaseConnection, dict[str, any]],
+        poolclass: Union[None, type[Pool]] = None,
     ) -> None:
         self.db_connection = db_connection
         if isinstance(db_connection, dict):
@@ -26,7 +28,10 @@ class SQLiteDatabaseClientImpl(DatabaseClient):
         self.db_url = f"{cn.url_scheme}:///{real_path}"
         self.db_url_repr = self.db_url
         logger.warning("Database is SQLite and it is only for development.")
-        self.engine = create_async_engine(self.db_url, echo=True)
+        engine_args: dict[str, Any] = {"echo": True}
+        if poolclass is not None:
+            engine_args["poolclass"] = poolclass
+        self.engine = create_async_engine(self.db_url, **engine_args)
 
         self._async_session_factory = async_sessionmaker(
             self.engine, expire_on_commit=False
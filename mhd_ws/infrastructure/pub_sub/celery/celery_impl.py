@@ -95,7 +95,9 @@ class CeleryAsyncTaskExecutor(AsyncTaskExecutor):
         self.on_success_task = on_success_task
         self.on_failure_task = on_failure_task
 
-    async def start(self, expires: Union[None, int] = None) -> AsyncTaskResult:
+    async def start(
+        self, expires: Union[None, int] = None, countdown: Union[None, int] = None
+    ) -> AsyncTaskResult:
         request_tracker = get_request_tracker().get_request_tracker_model().model_dump()
         self.kwargs["request_tracker"] = request_tracker
         success_method = self.on_success_task.s() if self.on_success_task else None
@@ -104,6 +106,7 @@ class CeleryAsyncTaskExecutor(AsyncTaskExecutor):
             task_id = self.id_generator.generate_unique_id()
             task = self.task_method.apply_async(
                 expires=expires,
+                countdown=countdown,
                 task_id=task_id,
                 link=success_method,
                 link_error=failure_method,
@@ -112,6 +115,7 @@ class CeleryAsyncTaskExecutor(AsyncTaskExecutor):
         else:
             task = self.task_method.apply_async(
                 expires=expires,
+                countdown=countdown,
                 link=self.on_success_task if self.on_success_task else None,
                 link_error=self.on_failure_task if self.on_failure_task else None,
                 kwargs=self.kwargs,
@@ -111,13 +111,17 @@ class ThreadingAsyncTaskExecutor(AsyncTaskExecutor):
         self.on_success_task = on_success_task
         self.on_failure_task = on_failure_task
 
-    async def start(self, expires: Union[None, int] = None) -> AsyncTaskResult:
+    async def start(
+        self, expires: Union[None, int] = None, countdown: Union[None, int] = None
+    ) -> AsyncTaskResult:
         task_id = self.id_generator.generate_unique_id()
         async_task = ThreadingAsyncTaskResult(self.async_task_results_dict, task_id)
         request_tracker = get_request_tracker().get_request_tracker_model().model_dump()
         self.kwargs["request_tracker"] = request_tracker
 
         async def run_task():
+            if countdown:
+                await asyncio.sleep(countdown)
             try:
                 logger.info("Task %s with id %s started.", self.task_name, task_id)
                 async_task.status = "RUNNING"
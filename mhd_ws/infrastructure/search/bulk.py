@@ -0,0 +1,257 @@
+"""Byte-aware chunking, adaptive sizing, retries and reporting for bulk uploads."""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, AsyncIterable, AsyncIterator, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Item statuses worth retrying: queue rejections and transient node trouble.
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class BulkUploadOptions:
+    concurrency: int = 1
+    max_chunk_bytes: int = 10 * 1024 * 1024
+    adaptive: bool = False
+    target_took_ms: int = 1000
+    min_batch_size: int = 10
+    max_batch_size: int = 5000
+    max_retries: int = 3
+    initial_backoff_s: float = 1.0
+    max_backoff_s: float = 60.0
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry ``attempt`` (1-based), with jitter."""
+        delay = min(self.max_backoff_s, self.initial_backoff_s * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)  # noqa: S311
+
+
+@dataclass
+class BulkAction:
+    doc_id: str | None
+    lines: tuple[bytes, ...]
+    source: dict[str, Any] | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(line) + 1 for line in self.lines)
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_bulk_action(
+    doc: dict[str, Any], index_name: str, op_type: str = "index"
+) -> BulkAction:
+    """Serialize one document into its bulk metadata and source lines."""
+    meta: dict[str, Any] = {"_index": index_name}
+    doc_id = doc.get("id")
+    if doc_id:
+        meta["_id"] = doc_id
+    lines = (_dumps({op_type: meta}), _dumps(doc))
+    return BulkAction(doc_id=doc_id, lines=lines, source=doc)
+
+
+@dataclass
+class BulkBatchResult:
+    number: int
+    docs: int
+    nbytes: int
+    latency_s: float
+    took_ms: int | None = None
+    succeeded: int = 0
+    rejected: int = 0
+    failed: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.docs / self.latency_s if self.latency_s > 0 else 0.0
+
+
+@dataclass
+class BulkReport:
+    """Per-batch results of one bulk upload, with throughput summaries."""
+
+    index_name: str
+    batches: list[BulkBatchResult] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    def add(self, batch: BulkBatchResult) -> None:
+        self.batches.append(batch)
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def docs(self) -> int:
+        return sum(b.succeeded for b in self.batches)
+
+    @property
+    def rejected(self) -> int:
+        return sum(b.rejected for b in self.batches)
+
+    @property
+    def retried(self) -> int:
+        return sum(b.retried for b in self.batches)
+
+    @property
+    def dead_lettered(self) -> int:
+        return sum(b.dead_lettered for b in self.batches)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.docs / self.elapsed if self.elapsed > 0 else 0.0
+
+    def latency_percentile(self, pct: float) -> float:
+        latencies = sorted(b.latency_s for b in self.batches)
+        if not latencies:
+            return 0.0
+        return latencies[
+            min(len(latencies) - 1, math.ceil(pct / 100 * len(latencies)) - 1)
+        ]
+
+    def summary(self) -> str:
+        return (
+            f"{self.index_name}: {self.docs} docs in {len(self.batches)} batches, "
+            f"{self.elapsed:.2f}s ({self.docs_per_second:.1f} docs/s), "
+            f"batch latency p50={self.latency_percentile(50):.3f}s "
+            f"p95={self.latency_percentile(95):.3f}s "
+            f"max={self.latency_percentile(100):.3f}s, "
+            f"rejected={self.rejected} retried={self.retried} "
+            f"dead-lettered={self.dead_lettered}"
+        )
+
+
+class AdaptiveBatchSizer:
+    """Grow or shrink the batch size from ES ``took`` times and rejections.
+
+    Additive-increase / multiplicative-decrease: any rejected item halves
+    the size, a batch slower than the target shrinks it by a quarter, and a
+    full batch well under the target grows it by a quarter.
+    """
+
+    def __init__(self, initial: int, options: BulkUploadOptions) -> None:
+        self._options = options
+        self.size = max(1, initial)
+
+    def observe(self, batch: BulkBatchResult) -> None:
+        if not self._options.adaptive:
+            return
+        opts = self._options
+        if batch.rejected:
+            self.size = max(opts.min_batch_size, self.size // 2)
+        elif batch.took_ms is None:
+            return
+        elif batch.took_ms > opts.target_took_ms:
+            self.size = max(opts.min_batch_size, self.size * 3 // 4)
+        elif batch.took_ms < opts.target_took_ms / 2 and batch.docs >= self.size:
+            self.size = min(opts.max_batch_size, self.size * 5 // 4 + 1)
+
+
+async def iter_bulk_chunks(
+    actions: AsyncIterable[BulkAction],
+    sizer: AdaptiveBatchSizer,
+    max_chunk_bytes: int,
+) -> AsyncIterator[list[BulkAction]]:
+    """Group actions into chunks bounded by ``sizer.size`` docs and bytes.
+
+    An action larger than ``max_chunk_bytes`` on its own is sent alone.
+    """
+    chunk: list[BulkAction] = []
+    chunk_bytes = 0
+    async for action in actions:
+        size = action.nbytes
+        if chunk and (len(chunk) >= sizer.size or chunk_bytes + size > max_chunk_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(action)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+class DeadLetterWriter:
+    """Write permanently failed bulk items, with their source, to NDJSON.
+
+    The file is only created once the first item fails, so a clean run
+    leaves nothing behind. Records are appended to an existing file, so
+    failures of earlier runs that were never replayed are kept; pass
+    ``overwrite`` only once the file has been read back (a replay into the
+    same file). Records can be re-sent with ``iter_dead_letter``.
+    """
+
+    def __init__(self, path: Path, overwrite: bool = False) -> None:
+        self.path = path
+        self.overwrite = overwrite
+        self.count = 0
+        self.doc_ids: set[str] = set()
+        self._fh: IO[str] | None = None
+
+    def write(
+        self,
+        action: BulkAction,
+        index_name: str,
+        op_type: str,
+        status: int | None,
+        error: Any,
+        attempts: int,
+    ) -> None:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.overwrite and self.path.is_file() and self.path.stat().st_size:
+                logger.warning(
+                    "Appending to dead-letter file %s, which still holds "
+                    "failures of an earlier run",
+                    self.path,
+                )
+            self._fh = self.path.open("w" if self.overwrite else "a", encoding="utf-8")
+        record = {
+            "index": index_name,
+            "op_type": op_type,
+            "id": action.doc_id,
+            "status": status,
+            "error": error,
+            "attempts": attempts,
+            "failed_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "doc": action.source,
+        }
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        self.count += 1
+        if action.doc_id:
+            self.doc_ids.add(action.doc_id)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> DeadLetterWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def iter_dead_letter(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the records of a dead-letter file written by ``DeadLetterWriter``."""
+    with path.open(encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record.get("doc"), dict) or not record.get("index"):
+                raise ValueError(f"{path}:{line_no}: not a dead-letter record")
+            yield record
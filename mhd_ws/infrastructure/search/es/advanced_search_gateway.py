@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 import uuid
+from dataclasses import replace
 from typing import Any
 
 from mhd_ws.application.services.interfaces.advanced_search_port import (
@@ -22,6 +25,7 @@ from mhd_ws.domain.entities.search.index_search_spec import (
 )
 from mhd_ws.domain.entities.search.registries.models import (
     FieldRegistry,
+    IndexCapabilities,
     IndexCapabilitiesRegistry,
 )
 from mhd_ws.domain.entities.search.stages import (
@@ -33,6 +37,17 @@ from mhd_ws.infrastructure.search.es.es_configuration import (
     AdvancedSearchConfiguration,
 )
 from mhd_ws.infrastructure.search.es.es_dsl_compiler import EsDslCompiler
+from mhd_ws.infrastructure.search.es.id_set_cache import (
+    MetaboliteIdSetCache,
+    id_set_cache_key,
+)
+from mhd_ws.infrastructure.search.es.search_cursor import (
+    START_CURSOR,
+    SearchCursor,
+    decode_cursor,
+    encode_cursor,
+    search_fingerprint,
+)
 from mhd_ws.infrastructure.search.es_client import ElasticsearchClient
 
 logger = logging.getLogger(__name__)
@@ -47,9 +62,19 @@ class AdvancedSearchGateway(AdvancedSearchPort):
         index_registry: IndexCapabilitiesRegistry,
         field_registry: FieldRegistry,
         facet_size: int = 25,
+        id_set_cache: MetaboliteIdSetCache | None = None,
     ) -> None:
         self._client = client
+        self._id_set_cache = id_set_cache
         self._config = config
+        self._cursor_key = (
+            config.cursor_secret.encode() if config.cursor_secret else None
+        )
+        if self._cursor_key is None:
+            logger.warning(
+                "Search cursor paging is disabled; set "
+                "advanced_search.cursor_secret to enable it"
+            )
         self._planner = planner
         self._index_registry = index_registry
         self._facet_size = facet_size
@@ -95,10 +120,54 @@ class AdvancedSearchGateway(AdvancedSearchPort):
 
         join_field = index_caps.get_field_strict(index_caps.join.dataset_id_field_key)
         dataset_id_es_path = join_field.es_path
+        max_ids = stage.output.max_ids
 
+        cache_key = None
+        if self._id_set_cache is not None:
+            cache_key = id_set_cache_key(
+                index_caps.concrete_index_or_alias, dataset_id_es_path, query, max_ids
+            )
+            cached = self._id_set_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Metabolite stage reused %d dataset IDs", len(cached))
+                return set(cached)
+
+        started = time.perf_counter()
+        partitions = self._config.metabolite_partitions
+        if partitions > 1:
+            collected_ids, requests = await self._collect_partitioned_ids(
+                index_caps, compiler, query, dataset_id_es_path, max_ids
+            )
+            mode = f"{partitions} partitions"
+        else:
+            collected_ids, requests = await self._collect_composite_ids(
+                index_caps, compiler, query, dataset_id_es_path, max_ids
+            )
+            mode = "serial"
+        logger.info(
+            "Metabolite stage (%s, %d requests) collected %d dataset IDs in %.1f ms",
+            mode,
+            requests,
+            len(collected_ids),
+            (time.perf_counter() - started) * 1000,
+        )
+        if cache_key is not None:
+            self._id_set_cache.put(cache_key, collected_ids)
+        return collected_ids
+
+    async def _collect_composite_ids(
+        self,
+        index_caps: IndexCapabilities,
+        compiler: EsDslCompiler,
+        query: dict[str, Any],
+        dataset_id_es_path: str,
+        max_ids: int,
+    ) -> tuple[set[str], int]:
+        """Walk composite agg pages in order; returns the IDs and the
+        number of requests."""
         collected_ids: set[str] = set()
         after_key: dict[str, Any] | None = None
-        max_ids = stage.output.max_ids
+        requests = 0
 
         while True:
             aggs = compiler.compile_metabolite_composite_agg(
@@ -113,6 +182,7 @@ class AdvancedSearchGateway(AdvancedSearchPort):
                 body=body,
                 api_key_name=index_caps.api_key_name,
             )
+            requests += 1
 
             composite_agg = raw.get("aggregations", {}).get("dataset_ids", {})
             buckets = composite_agg.get("buckets", [])
@@ -129,8 +199,44 @@ class AdvancedSearchGateway(AdvancedSearchPort):
             if after_key is None:
                 break
 
-        logger.debug("Metabolite stage collected %d dataset IDs", len(collected_ids))
-        return collected_ids
+        return collected_ids, requests
+
+    async def _collect_partitioned_ids(
+        self,
+        index_caps: IndexCapabilities,
+        compiler: EsDslCompiler,
+        query: dict[str, Any],
+        dataset_id_es_path: str,
+        max_ids: int,
+    ) -> tuple[set[str], int]:
+        """Fetch every partition of the dataset-ID keyspace, at most
+        ``metabolite_concurrency`` at a time; returns the IDs and the
+        number of requests."""
+        partitions = self._config.metabolite_partitions
+        semaphore = asyncio.Semaphore(max(1, self._config.metabolite_concurrency))
+
+        async def fetch(partition: int) -> list[str]:
+            aggs = compiler.compile_metabolite_partition_agg(
+                dataset_id_es_path, partition, partitions, size=max_ids
+            )
+            body: dict[str, Any] = {"size": 0, "query": query, "aggs": aggs}
+            async with semaphore:
+                raw = await self._client.search(
+                    index=index_caps.concrete_index_or_alias,
+                    body=body,
+                    api_key_name=index_caps.api_key_name,
+                )
+            buckets = raw.get("aggregations", {}).get("dataset_ids", {}).get("buckets")
+            return [str(bucket["key"]) for bucket in buckets or []]
+
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(fetch(p)) for p in range(partitions)]
+        collected_ids = {id_ for task in tasks for id_ in task.result()}
+        if len(collected_ids) > max_ids:
+            # Each partition returns its lowest keys, so the lowest
+            # ``max_ids`` of the union are what the composite walk returns.
+            collected_ids = set(sorted(collected_ids)[:max_ids])
+        return collected_ids, partitions
 
     async def _execute_dataset_stage(
         self,
@@ -157,21 +263,47 @@ class AdvancedSearchGateway(AdvancedSearchPort):
                 query_dsl = {"bool": {"must": [query_dsl], "filter": [id_filter]}}
 
         body: dict[str, Any] = {"query": query_dsl}
-        body.update(compiler.compile_pagination(page.current, page.size))
+        if self._config.source_excludes:
+            body["_source"] = {"excludes": list(self._config.source_excludes)}
+        cursor: SearchCursor | None = None
+        if page.cursor is not None:
+            cursor = await self._open_cursor(index_caps, page.cursor, spec, sort)
+            body.update(
+                compiler.compile_search_after(
+                    page.size,
+                    cursor.pit_id,
+                    self._config.cursor_keep_alive,
+                    cursor.search_after,
+                )
+            )
+        else:
+            body.update(compiler.compile_pagination(page.current, page.size))
+        if self._config.track_total_hits is not None:
+            body["track_total_hits"] = self._config.track_total_hits
 
         if sort:
             body["sort"] = compiler.compile_sort(sort.field, sort.direction)
         else:
             body["sort"] = [{"_score": {"order": "desc"}}]
-
-        body["aggs"] = compiler.compile_facet_aggs(self._facet_fields, self._facet_size)
+        if cursor is not None:
+            # Hits with equal sort values are ordered by shard and doc
+            # within the point in time.
+            body["sort"].append({"_shard_doc": "asc"})
+
+        agg_groups = [
+            compiler.compile_facet_aggs(
+                [f for f in self._facet_fields if spec.facets.includes(f.facet_key)],
+                self._facet_size,
+                spec.facets.sizes,
+            )
+        ]
         parameter_facet_types = [
             c.type_name
             for c in spec.clauses
             if isinstance(c, ParameterPairClauseSpec) and c.include_facet
         ]
         if parameter_facet_types:
-            body["aggs"].update(
+            agg_groups.append(
                 compiler.compile_parameter_group_aggs(
                     parameter_facet_types, self._facet_size
                 )
@@ -182,35 +314,174 @@ class AdvancedSearchGateway(AdvancedSearchPort):
             if isinstance(c, CharacteristicPairClauseSpec) and c.include_facet
         ]
         if characteristic_facet_types:
-            body["aggs"].update(
+            agg_groups.append(
                 compiler.compile_characteristic_group_aggs(
                     characteristic_facet_types, self._facet_size
                 )
             )
-
-        logger.debug(
-            "Advanced search payload for index=%s: %s",
-            index_caps.concrete_index_or_alias,
-            body,
-        )
-
-        raw = await self._client.search(
-            index=index_caps.concrete_index_or_alias,
-            body=body,
-            api_key_name=index_caps.api_key_name,
-        )
+        agg_groups = [aggs for aggs in agg_groups if aggs]
+
+        mode = self._config.dataset_stage_mode
+        # A point-in-time search names no index, so cursor pages always
+        # send hits and aggregations together.
+        if mode == "combined" or not agg_groups or cursor is not None:
+            if agg_groups:
+                body["aggs"] = {
+                    name: agg for aggs in agg_groups for name, agg in aggs.items()
+                }
+            logger.debug(
+                "Advanced search payload for index=%s: %s",
+                index_caps.concrete_index_or_alias,
+                body,
+            )
+            try:
+                raw = await self._client.search(
+                    index=None if cursor else index_caps.concrete_index_or_alias,
+                    body=body,
+                    api_key_name=index_caps.api_key_name,
+                )
+            except Exception as ex:
+                if cursor is not None and getattr(ex, "status_code", None) == 404:
+                    raise ValueError(
+                        "Search cursor expired; start again with cursor "
+                        f'"{START_CURSOR}"'
+                    ) from ex
+                raise
+        else:
+            raw = await self._search_split(index_caps, body, agg_groups, mode)
 
         results = [self._map_hit(hit) for hit in raw.get("hits", {}).get("hits", [])]
         total = self._extract_total(raw)
         facets = self._map_aggs(raw.get("aggregations", {}))
+        next_cursor = None
+        if cursor is not None:
+            next_cursor = await self._next_cursor(index_caps, cursor, raw, page.size)
 
         return IndexSearchResult(
             results=results,
             total_results=total,
             facets=facets,
             request_id=str(uuid.uuid4()),
+            next_cursor=next_cursor,
+        )
+
+    async def _open_cursor(
+        self,
+        index_caps: IndexCapabilities,
+        token: str,
+        spec: SearchSpec,
+        sort: SortModel | None,
+    ) -> SearchCursor:
+        """Decode the cursor of a request, opening a point in time for a
+        new one. Cursors with a bad signature, of another search or past
+        their lifetime are rejected."""
+        if self._cursor_key is None:
+            raise ValueError(
+                "Search cursor paging is not enabled on this server; "
+                "page with page.current instead"
+            )
+        fingerprint = search_fingerprint(spec, sort)
+        if token == START_CURSOR:
+            pit_id = await self._client.open_point_in_time(
+                index=index_caps.concrete_index_or_alias,
+                keep_alive=self._config.cursor_keep_alive,
+                api_key_name=index_caps.api_key_name,
+            )
+            return SearchCursor(pit_id, None, fingerprint, time.time())
+
+        cursor = decode_cursor(token, self._cursor_key)
+        if cursor.fingerprint != fingerprint:
+            raise ValueError(
+                "Search cursor was issued for a different query or sort; "
+                f'start again with cursor "{START_CURSOR}"'
+            )
+        if time.time() - cursor.opened_at > self._config.cursor_max_lifetime_s:
+            await self._client.close_point_in_time(
+                cursor.pit_id, api_key_name=index_caps.api_key_name
+            )
+            raise ValueError(
+                f"Search cursor is older than {self._config.cursor_max_lifetime_s} s; "
+                f'start again with cursor "{START_CURSOR}"'
+            )
+        return cursor
+
+    async def _next_cursor(
+        self,
+        index_caps: IndexCapabilities,
+        cursor: SearchCursor,
+        raw: dict[str, Any],
+        page_size: int,
+    ) -> str | None:
+        """Cursor for the page after ``raw``; None, with the point in time
+        closed, once a page comes back short."""
+        hits = raw.get("hits", {}).get("hits", [])
+        # ES may return a new PIT ID with every search.
+        pit_id = raw.get("pit_id") or cursor.pit_id
+        if len(hits) < page_size or "sort" not in hits[-1]:
+            await self._client.close_point_in_time(
+                pit_id, api_key_name=index_caps.api_key_name
+            )
+            return None
+        return encode_cursor(
+            replace(cursor, pit_id=pit_id, search_after=hits[-1]["sort"]),
+            self._cursor_key,
         )
 
+    async def _search_split(
+        self,
+        index_caps: IndexCapabilities,
+        hits_body: dict[str, Any],
+        agg_groups: list[dict[str, Any]],
+        mode: str,
+    ) -> dict[str, Any]:
+        """Send the hits and each aggregation group as separate searches,
+        in one ``msearch`` or concurrently, and merge the responses into
+        the shape of a combined search response."""
+        agg_bodies = [
+            {
+                "size": 0,
+                "track_total_hits": False,
+                "query": hits_body["query"],
+                "aggs": aggs,
+            }
+            for aggs in agg_groups
+        ]
+        index = index_caps.concrete_index_or_alias
+        api_key_name = index_caps.api_key_name
+        if mode == "msearch":
+            searches: list[dict[str, Any]] = []
+            for body in (hits_body, *agg_bodies):
+                searches.extend(({"index": index}, body))
+            raw = await self._client.msearch(
+                index=index, body=searches, api_key_name=api_key_name
+            )
+            responses = raw.get("responses", [])
+            for response in responses:
+                if "error" in response:
+                    raise RuntimeError(
+                        f"Elasticsearch multi-search failed for index {index!r}: "
+                        f"{response['error']}"
+                    )
+        else:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(
+                        self._client.search(
+                            index=index, body=body, api_key_name=api_key_name
+                        )
+                    )
+                    for body in (hits_body, *agg_bodies)
+                ]
+            responses = [task.result() for task in tasks]
+
+        merged = dict(responses[0])
+        merged["aggregations"] = {
+            name: agg
+            for response in responses
+            for name, agg in (response.get("aggregations") or {}).items()
+        }
+        return merged
+
     # ------------------------------------------------------------------
     # Mapping helpers
     # ------------------------------------------------------------------
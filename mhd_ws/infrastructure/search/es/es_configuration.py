@@ -2,6 +2,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 
+# How the dataset stage sends hits and aggregations: in one search, or
+# hits and each aggregation group as separate searches in one msearch or
+# concurrently, so heavy nested aggs do not hold up the hit list.
+DATASET_STAGE_MODES = ("combined", "msearch", "concurrent")
+
 
 @dataclass(frozen=True)
 class ElasticsearchConfiguration:
@@ -70,3 +75,41 @@ class LegacyElasticSearchConfiguration(ElasticsearchConfiguration):
 class AdvancedSearchConfiguration(ElasticsearchConfiguration):
     api_key_name: str = "dataset_ms"
     facet_size: int = 25
+    # Searched but never shown; kept out of every hit.
+    source_excludes: tuple[str, ...] = ("search_text", "debug")
+    # The metabolite stage fetches dataset IDs as this many terms-agg
+    # partitions, at most ``metabolite_concurrency`` at a time; 1 walks
+    # one composite agg page after another instead.
+    metabolite_partitions: int = 8
+    metabolite_concurrency: int = 4
+    # One of DATASET_STAGE_MODES.
+    dataset_stage_mode: str = "combined"
+    # ``track_total_hits`` of the hits search (None = the ES default, an
+    # exact count up to 10,000).
+    track_total_hits: bool | int | None = None
+    # Cursor paging: each page extends the point in time by
+    # ``cursor_keep_alive``; a cursor older than ``cursor_max_lifetime_s``
+    # is rejected and its point in time closed.
+    cursor_keep_alive: str = "2m"
+    cursor_max_lifetime_s: int = 3600
+    # Key that cursors are signed with, shared by every API worker. Cursor
+    # paging is off without one.
+    cursor_secret: str | None = None
+
+    def __post_init__(self) -> None:
+        if self.dataset_stage_mode not in DATASET_STAGE_MODES:
+            raise ValueError(
+                f"Unknown dataset stage mode {self.dataset_stage_mode!r}; "
+                f"allowed: {', '.join(DATASET_STAGE_MODES)}"
+            )
+
+
+@dataclass(frozen=True)
+class FileSearchConfiguration(ElasticsearchConfiguration):
+    index_name: str = ""
+    api_key_name: str = "file"
+    facet_size: int = 25
+    # ``index.max_result_window`` of the file mapping: deep enough to page
+    # through a dataset with 100k+ files.
+    max_result_window: int = 200_000
+    search_fields: tuple[str, ...] = ("name.text", "dataset_id", "format.name")
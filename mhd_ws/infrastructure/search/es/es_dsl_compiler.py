@@ -36,12 +36,32 @@ class EsDslCompiler:
             "size": page_size,
         }
 
+    def compile_search_after(
+        self,
+        page_size: int,
+        pit_id: str,
+        keep_alive: str,
+        search_after: list[Any] | None,
+    ) -> dict[str, Any]:
+        body: dict[str, Any] = {
+            "size": page_size,
+            "pit": {"id": pit_id, "keep_alive": keep_alive},
+        }
+        if search_after is not None:
+            body["search_after"] = search_after
+        return body
+
     def compile_sort(self, field: str, direction: str) -> list[dict[str, Any]]:
         return [{field: {"order": direction}}]
 
     def compile_facet_aggs(
-        self, facet_fields: list[FieldDef], facet_size: int = 25
+        self,
+        facet_fields: list[FieldDef],
+        facet_size: int = 25,
+        facet_sizes: dict[str, int] | None = None,
     ) -> dict[str, Any]:
+        """Aggs for ``facet_fields``; ``facet_sizes`` overrides
+        ``facet_size`` per value facet key."""
         aggs: dict[str, Any] = {}
         for field in facet_fields:
             if not field.facet_key or not field.facet_type:
@@ -67,7 +87,8 @@ class EsDslCompiler:
                     }
                 }
             elif field.facet_type == "value":
-                terms_agg = {"terms": {"field": cap.es_path, "size": facet_size}}
+                size = (facet_sizes or {}).get(field.facet_key, facet_size)
+                terms_agg = {"terms": {"field": cap.es_path, "size": size}}
                 if cap.nested:
                     if cap.nested.facet_filter:
                         aggs[field.facet_key] = {
@@ -119,6 +140,29 @@ class EsDslCompiler:
             }
         }
 
+    def compile_metabolite_partition_agg(
+        self,
+        dataset_id_es_path: str,
+        partition: int,
+        num_partitions: int,
+        size: int,
+    ) -> dict[str, Any]:
+        """Terms agg over one hash partition of the dataset-ID keyspace,
+        lowest keys first (the order of the composite agg)."""
+        return {
+            "dataset_ids": {
+                "terms": {
+                    "field": dataset_id_es_path,
+                    "include": {
+                        "partition": partition,
+                        "num_partitions": num_partitions,
+                    },
+                    "size": size,
+                    "order": {"_key": "asc"},
+                }
+            }
+        }
+
     # ------------------------------------------------------------------
     # Recursive compilation
     # ------------------------------------------------------------------
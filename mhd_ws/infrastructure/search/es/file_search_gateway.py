@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from mhd_ws.domain.entities.search.files.facet_configuration import (
+    FILE_FACET_CONFIG,
+    FILE_FILTER_FIELDS,
+    FILE_SORT_FIELDS,
+)
+from mhd_ws.domain.entities.search.index_search import (
+    FilterModel,
+    IndexSearchResult,
+    PageModel,
+    SortModel,
+)
+from mhd_ws.infrastructure.search.es.base_es_gateway import BaseElasticSearchGateway
+from mhd_ws.infrastructure.search.es.es_configuration import FileSearchConfiguration
+from mhd_ws.infrastructure.search.es_client import ElasticsearchClient
+
+logger = logging.getLogger(__name__)
+
+
+class ElasticsearchFileSearchGateway(BaseElasticSearchGateway):
+    """Search the file index: one doc per file node of every dataset."""
+
+    def __init__(
+        self,
+        client: ElasticsearchClient,
+        config: FileSearchConfiguration | None = None,
+    ):
+        self._file_config = config or FileSearchConfiguration()
+        super().__init__(client=client, config=self._file_config)
+
+    async def search(
+        self,
+        *,
+        search_text: str | None = None,
+        filters: list[FilterModel] | None = None,
+        page: PageModel | None = None,
+        sort: SortModel | None = None,
+    ) -> IndexSearchResult:
+        page = page or PageModel()
+        if page.current * page.size > self._file_config.max_result_window:
+            raise ValueError(
+                f"Only the first {self._file_config.max_result_window} files "
+                "can be paged through; add filters to narrow the search."
+            )
+        return await super().search(
+            search_text=search_text, filters=filters, page=page, sort=sort
+        )
+
+    # -- query ----------------------------------------------------------------
+
+    def _build_query(
+        self,
+        *,
+        search_text: str | None,
+        filters: list[FilterModel] | None,
+    ) -> dict[str, Any] | None:
+        must: list[dict[str, Any]] = []
+        filter_clauses = [self._filter_clause(f) for f in filters or []]
+        if search_text:
+            must.append(
+                {
+                    "multi_match": {
+                        "query": search_text,
+                        "fields": list(self._file_config.search_fields),
+                    }
+                }
+            )
+        if not must and not filter_clauses:
+            return {"match_all": {}}
+        bool_query: dict[str, Any] = {}
+        if must:
+            bool_query["must"] = must
+        if filter_clauses:
+            bool_query["filter"] = filter_clauses
+        return {"bool": bool_query}
+
+    @staticmethod
+    def _filter_clause(f: FilterModel) -> dict[str, Any]:
+        field = FILE_FILTER_FIELDS.get(f.field)
+        if field is None:
+            raise ValueError(
+                f"Unknown file filter {f.field!r}; "
+                f"allowed: {', '.join(FILE_FILTER_FIELDS)}"
+            )
+        if f.operator == "all":
+            return {"bool": {"must": [{"term": {field: v}} for v in f.values]}}
+        if f.operator == "none":
+            return {"bool": {"must_not": [{"terms": {field: f.values}}]}}
+        return {"terms": {field: f.values}}
+
+    # -- aggregations ---------------------------------------------------------
+
+    def _build_aggs(self) -> dict[str, Any] | None:
+        return {
+            name: {
+                "terms": {
+                    "field": facet_cfg.field,
+                    "size": self._file_config.facet_size,
+                }
+            }
+            for name, facet_cfg in FILE_FACET_CONFIG.items()
+        }
+
+    # -- sort -----------------------------------------------------------------
+
+    def _build_sort(self, sort: SortModel | None) -> list[dict[str, Any]] | None:
+        # Every sort ends on ``id`` so that pages are stable.
+        tiebreak = [{"id": {"order": "asc"}}]
+        if not sort:
+            return [
+                {"dataset_id": {"order": "asc"}},
+                {"name": {"order": "asc"}},
+                *tiebreak,
+            ]
+        if sort.field not in FILE_SORT_FIELDS:
+            raise ValueError(
+                f"Cannot sort files by {sort.field!r}; "
+                f"allowed: {', '.join(FILE_SORT_FIELDS)}"
+            )
+        if sort.field == "id":
+            return [{"id": {"order": sort.direction}}]
+        return [{sort.field: {"order": sort.direction}}, *tiebreak]
@@ -0,0 +1,181 @@
+"""In-process cache of the dataset ID sets collected by metabolite stages.
+
+A metabolite stage pages through a composite aggregation of up to
+``max_ids`` dataset IDs. The set depends only on the compiled metabolite
+query, so later pages, other sorts and extra dataset-level filters of the
+same search reuse it. Sets are stored compactly (see ``CompactIdSet``),
+evicted least recently used beyond ``max_bytes`` and dropped when the
+search generation changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Iterable, Iterator
+
+DEFAULT_ID_SET_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_ID_SET_MAX_AGE_S = 600
+
+# ``<prefix><digits>``; 18 digits always fit in a signed 64-bit int.
+_NUMBERED_ID = re.compile(r"^(.*?)(\d{1,18})$")
+
+
+class CompactIdSet:
+    """A set of IDs stored as integers where the IDs allow it.
+
+    IDs such as ``ms::MTBLS1234`` are grouped by prefix (and by digit width
+    when zero-padded, e.g. ``ST000123``). The numbers of a group are kept
+    as a sorted ``array('q')``, or as a bitset when they are dense enough
+    for that to be smaller. Other IDs are kept as strings.
+    """
+
+    __slots__ = ("_groups", "_others", "_size")
+
+    def __init__(self, ids: Iterable[str]) -> None:
+        numbers: dict[tuple[str, int], set[int]] = {}
+        others: set[str] = set()
+        for id_ in ids:
+            match = _NUMBERED_ID.match(id_)
+            if match is None:
+                others.add(id_)
+                continue
+            prefix, digits = match.groups()
+            width = len(digits) if digits[0] == "0" else 0
+            numbers.setdefault((prefix, width), set()).add(int(digits))
+
+        self._groups: list[tuple[str, int, int, array | bytes]] = []
+        for (prefix, width), values in numbers.items():
+            ordered = sorted(values)
+            low = ordered[0]
+            span = ordered[-1] - low + 1
+            if (span + 7) // 8 < len(ordered) * 8:
+                bits = bytearray((span + 7) // 8)
+                for value in ordered:
+                    offset = value - low
+                    bits[offset >> 3] |= 1 << (offset & 7)
+                self._groups.append((prefix, width, low, bytes(bits)))
+            else:
+                self._groups.append((prefix, width, low, array("q", ordered)))
+        self._others = tuple(sorted(others))
+        self._size = sum(len(v) for v in numbers.values()) + len(self._others)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        for prefix, width, low, data in self._groups:
+            if isinstance(data, array):
+                numbers: Iterable[int] = data
+            else:
+                numbers = (
+                    low + (i << 3) + bit
+                    for i, byte in enumerate(data)
+                    if byte
+                    for bit in range(8)
+                    if byte >> bit & 1
+                )
+            for number in numbers:
+                yield f"{prefix}{number:0{width}d}" if width else f"{prefix}{number}"
+        yield from self._others
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the set."""
+        total = sys.getsizeof(self._groups) + sys.getsizeof(self._others)
+        for prefix, _, _, data in self._groups:
+            total += sys.getsizeof(prefix) + sys.getsizeof(data)
+        return total + sum(sys.getsizeof(id_) for id_ in self._others)
+
+
+def id_set_cache_key(
+    index: str, dataset_id_path: str, query: dict[str, Any], max_ids: int
+) -> str:
+    payload = json.dumps(
+        [index, dataset_id_path, query, max_ids],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class MetaboliteIdSetCache:
+    """LRU cache of ``CompactIdSet`` values bounded by ``max_bytes``.
+
+    ``observe_generation`` is called with the current search generation;
+    a new generation clears the cache. Entries also expire after
+    ``max_age_s`` in case no generation is observed.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_ID_SET_CACHE_MAX_BYTES,
+        max_age_s: int = DEFAULT_ID_SET_MAX_AGE_S,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.generation: str | None = None
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, CompactIdSet]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def observe_generation(self, generation: str) -> None:
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+    def get(self, key: str) -> CompactIdSet | None:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.max_age_s:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, ids: Iterable[str]) -> CompactIdSet:
+        id_set = ids if isinstance(ids, CompactIdSet) else CompactIdSet(ids)
+        if key in self._entries:
+            self._remove(key)
+        if id_set.nbytes > self.max_bytes:
+            return id_set
+        while self._entries and self.nbytes + id_set.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        self._entries[key] = (time.monotonic(), id_set)
+        self.nbytes += id_set.nbytes
+        return id_set
+
+    def _remove(self, key: str) -> None:
+        _, id_set = self._entries.pop(key)
+        self.nbytes -= id_set.nbytes
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,79 @@
+"""Time the dataset stage modes of the advanced search on the same queries."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Sequence
+
+from mhd_ws.application.services.interfaces.advanced_search_port import (
+    AdvancedSearchPort,
+)
+from mhd_ws.domain.entities.search.index_search import (
+    IndexSearchResult,
+    PageModel,
+    SortModel,
+)
+from mhd_ws.domain.entities.search.index_search_spec import SearchSpec
+from mhd_ws.infrastructure.search.es.es_configuration import DATASET_STAGE_MODES
+from mhd_ws.infrastructure.search.indexing.benchmark.runner import _stage_summary
+
+BenchmarkQuery = tuple[SearchSpec, PageModel | None, SortModel | None]
+
+
+def _fingerprint(result: IndexSearchResult) -> dict[str, Any]:
+    return {
+        "total_results": result.total_results,
+        "ids": [hit.get("_id") for hit in result.results],
+        "facets": {
+            name: facet.model_dump(mode="json") for name, facet in result.facets.items()
+        },
+    }
+
+
+async def benchmark_search_modes(
+    make_gateway: Callable[[str], AdvancedSearchPort],
+    queries: Sequence[BenchmarkQuery],
+    modes: Sequence[str] = DATASET_STAGE_MODES,
+    repeats: int = 5,
+    warmup: int = 1,
+) -> dict[str, Any]:
+    """Run every query ``warmup + repeats`` times in each mode.
+
+    Modes take turns on each run of a query so that caches warm up and
+    load changes evenly for all of them. Queries whose hits, totals or
+    facets differ between modes are reported as mismatches.
+    """
+    gateways = {mode: make_gateway(mode) for mode in modes}
+    samples: dict[str, list[float]] = {mode: [] for mode in modes}
+    per_query: list[dict[str, Any]] = []
+    mismatches: list[int] = []
+    for number, (spec, page, sort) in enumerate(queries):
+        query_samples: dict[str, list[float]] = {mode: [] for mode in modes}
+        fingerprints: dict[str, dict[str, Any]] = {}
+        for run in range(warmup + repeats):
+            for mode, gateway in gateways.items():
+                started = time.perf_counter()
+                result = await gateway.advanced_search(spec, page=page, sort=sort)
+                elapsed = time.perf_counter() - started
+                if run >= warmup:
+                    query_samples[mode].append(elapsed)
+                fingerprints[mode] = _fingerprint(result)
+        for mode in modes:
+            samples[mode].extend(query_samples[mode])
+        if len({repr(f) for f in fingerprints.values()}) > 1:
+            mismatches.append(number)
+        per_query.append(
+            {
+                "query": number,
+                "total_results": fingerprints[modes[0]]["total_results"],
+                "modes": {mode: _stage_summary(query_samples[mode]) for mode in modes},
+            }
+        )
+    return {
+        "queries": len(queries),
+        "repeats": repeats,
+        "warmup": warmup,
+        "modes": {mode: _stage_summary(samples[mode]) for mode in modes},
+        "per_query": per_query,
+        "mismatches": mismatches,
+    }
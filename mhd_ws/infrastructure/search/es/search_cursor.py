@@ -0,0 +1,104 @@
+"""Opaque cursors for paging advanced search results with ``search_after``.
+
+A cursor carries the point in time (PIT) opened for the first page, the
+sort values of the last hit returned and a fingerprint of the search it
+belongs to. Each page is a ``size``-hit search after those sort values in
+the same PIT, so page N costs what page 1 costs and is not limited by
+``index.max_result_window``.
+
+Cursors are signed with an HMAC of a server key, so a client cannot move
+the PIT open time or point a cursor at another PIT.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from mhd_ws.domain.entities.search.index_search import SortModel
+from mhd_ws.domain.entities.search.index_search_spec import SearchSpec
+from mhd_ws.infrastructure.search.search_cache import canonical_spec
+
+# Cursor a client sends to start paging a search.
+START_CURSOR = "*"
+CURSOR_VERSION = 1
+
+
+@dataclass(frozen=True)
+class SearchCursor:
+    pit_id: str
+    # Sort values of the last hit of the previous page; None on page 1.
+    search_after: list[Any] | None
+    fingerprint: str
+    # Epoch seconds when the PIT was opened.
+    opened_at: float
+
+
+def search_fingerprint(spec: SearchSpec, sort: SortModel | None) -> str:
+    """Hash of what decides the hits and their order. Facet selection is
+    left out, so later pages may drop facets the first page asked for."""
+    data = canonical_spec(spec)
+    data.pop("facets", None)
+    payload = json.dumps(
+        [data, sort.model_dump(mode="json") if sort else None],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode((data + "=" * (-len(data) % 4)).encode())
+
+
+def _signature(payload: bytes, key: bytes) -> bytes:
+    return hmac.new(key, payload, hashlib.sha256).digest()
+
+
+def encode_cursor(cursor: SearchCursor, key: bytes) -> str:
+    payload = json.dumps(
+        {
+            "v": CURSOR_VERSION,
+            "pit": cursor.pit_id,
+            "after": cursor.search_after,
+            "fp": cursor.fingerprint,
+            "t": round(cursor.opened_at, 3),
+        },
+        separators=(",", ":"),
+    ).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload, key))}"
+
+
+def decode_cursor(token: str, key: bytes) -> SearchCursor:
+    """Verify the signature of ``token`` with ``key`` and decode it."""
+    try:
+        encoded_payload, encoded_signature = token.split(".")
+        payload = _b64decode(encoded_payload)
+        if not hmac.compare_digest(
+            _b64decode(encoded_signature), _signature(payload, key)
+        ):
+            raise ValueError("bad signature")
+        data = json.loads(payload)
+        if data["v"] != CURSOR_VERSION:
+            raise ValueError(data["v"])
+        after = data["after"]
+        if after is not None and not isinstance(after, list):
+            raise ValueError(after)
+        return SearchCursor(
+            pit_id=str(data["pit"]),
+            search_after=after,
+            fingerprint=str(data["fp"]),
+            opened_at=float(data["t"]),
+        )
+    except (ValueError, TypeError, KeyError) as ex:
+        raise ValueError(
+            f'Invalid search cursor; start again with cursor "{START_CURSOR}"'
+        ) from ex
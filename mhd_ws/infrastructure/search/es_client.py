@@ -1,12 +1,25 @@
+import asyncio
 import logging
 import time
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, AsyncIterable, Dict, Iterable, List, Optional, Union
 
 from elastic_transport import ConnectionTimeout
 from elasticsearch import ApiError, AsyncElasticsearch
 from elasticsearch.helpers import async_streaming_bulk
 from pydantic import BaseModel, Field
 
+from mhd_ws.infrastructure.search.bulk import (
+    RETRYABLE_STATUSES,
+    AdaptiveBatchSizer,
+    BulkAction,
+    BulkBatchResult,
+    BulkReport,
+    BulkUploadOptions,
+    DeadLetterWriter,
+    iter_bulk_chunks,
+    make_bulk_action,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,12 +50,28 @@ class ElasticsearchClientConfig(BaseModel):
     verify_certs: bool = Field(
         default=True, description="Verify SSL certificates for HTTPS connections"
     )
+    http_compress: bool = Field(
+        default=False,
+        description="gzip request bodies; trades client CPU for less bulk traffic",
+    )
     indices: Dict[str, str] = Field(
         default_factory=dict,
         description="Logical index name → concrete ES index/alias",
     )
 
 
+def missing_properties(
+    mapping_response: Dict[str, Any], properties: Dict[str, Any]
+) -> Dict[str, Any]:
+    """The top-level ``properties`` absent from a get-mapping response."""
+    existing = {
+        name
+        for index_mapping in mapping_response.values()
+        for name in (index_mapping.get("mappings") or {}).get("properties") or {}
+    }
+    return {k: v for k, v in properties.items() if k not in existing}
+
+
 class ElasticsearchClient:
     def __init__(self, config: None | ElasticsearchClientConfig | dict[str, Any]):
         self._config = config
@@ -158,6 +187,7 @@ class ElasticsearchClient:
                     hosts=self._config.hosts or None,
                     request_timeout=self._config.request_timeout,
                     verify_certs=self._config.verify_certs,
+                    http_compress=self._config.http_compress,
                     **auth_kwargs,
                 )
                 ok = await es.ping()
@@ -251,8 +281,12 @@ class ElasticsearchClient:
 
     # no current usecase for multiple search, but adding for completeness / the future.
     async def msearch(
-        self, index, body: Dict[str, Any], api_key_name: Optional[str] = None
+        self,
+        index,
+        body: List[Dict[str, Any]],
+        api_key_name: Optional[str] = None,
     ) -> Dict[str, Any]:
+        """Run header/body pairs in ``body`` as one multi-search request."""
         client = await self._get_started_client(api_key_name)
         try:
             return await client.msearch(index=index, body=body)
@@ -264,6 +298,36 @@ class ElasticsearchClient:
                 index=index,
             )
 
+    async def open_point_in_time(
+        self, index: str, keep_alive: str, api_key_name: Optional[str] = None
+    ) -> str:
+        """Open a point in time on ``index`` and return its ID."""
+        client = await self._get_started_client(api_key_name)
+        try:
+            resp = await client.open_point_in_time(index=index, keep_alive=keep_alive)
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="open point in time",
+                api_key_name=api_key_name,
+                index=index,
+            )
+        return resp["id"]
+
+    async def close_point_in_time(
+        self, pit_id: str, api_key_name: Optional[str] = None
+    ) -> None:
+        """Close a point in time; one that has already expired is ignored."""
+        client = await self._get_started_client(api_key_name)
+        try:
+            await client.close_point_in_time(id=pit_id)
+        except ApiError as exc:
+            if exc.status_code == 404:
+                return
+            self._raise_api_error_with_context(
+                exc, operation="close point in time", api_key_name=api_key_name
+            )
+
     async def count(
         self, index, body: Optional[Dict[str, Any]], api_key_name: Optional[str] = None
     ) -> int:
@@ -279,6 +343,36 @@ class ElasticsearchClient:
             )
         return int(resp.get("count", 0))
 
+    async def delete_by_query(
+        self,
+        index: str,
+        query: Dict[str, Any],
+        api_key_name: Optional[str] = None,
+        refresh: bool = False,
+    ) -> int:
+        """Delete the docs matching ``query`` and return how many were deleted.
+
+        Version conflicts (docs updated while the delete runs) are counted,
+        not raised, so a concurrent upsert of a matching doc wins.
+        """
+        client = await self._get_started_client(api_key_name)
+        try:
+            resp = await client.options(
+                request_timeout=self._config.bulk_request_timeout
+            ).delete_by_query(
+                index=index, query=query, conflicts="proceed", refresh=refresh
+            )
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="delete by query",
+                api_key_name=api_key_name,
+                index=index,
+            )
+        deleted = int(resp.get("deleted", 0))
+        logger.info("Deleted %d docs by query from index %s", deleted, index)
+        return deleted
+
     async def get_info(self, api_key_name: Optional[str] = None) -> Dict[str, Any]:
         client = await self._get_started_client(api_key_name)
         try:
@@ -305,6 +399,25 @@ class ElasticsearchClient:
             )
         return response.body
 
+    async def put_mapping(
+        self,
+        index: str,
+        properties: Dict[str, Any],
+        api_key_name: Optional[str] = None,
+    ) -> None:
+        """Add fields to the mapping of an existing index."""
+        client = await self._get_started_client(api_key_name)
+        try:
+            await client.indices.put_mapping(index=index, properties=properties)
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="mapping update",
+                api_key_name=api_key_name,
+                index=index,
+            )
+        logger.info("Updated mapping of index %s", index)
+
     async def index_exists(
         self, index: str, api_key_name: Optional[str] = None
     ) -> bool:
@@ -356,41 +469,192 @@ class ElasticsearchClient:
         mapping: dict,
         recreate: bool = False,
         api_key_name: Optional[str] = None,
+        update_mapping: bool = False,
     ) -> None:
+        """Create ``index`` unless it exists. With ``update_mapping`` an
+        existing index gets any fields of ``mapping`` it does not have yet;
+        fields it has are left alone, so their definitions never conflict."""
         exists = await self.index_exists(index, api_key_name)
         if exists:
             if not recreate:
                 logger.info("Index %s already exists, skipping creation.", index)
+                if update_mapping:
+                    missing = missing_properties(
+                        await self.get_mapping(index, api_key_name),
+                        mapping["mappings"]["properties"],
+                    )
+                    if missing:
+                        await self.put_mapping(index, missing, api_key_name)
                 return
             await self.delete_index(index, api_key_name)
         await self.create_index(index, mapping, api_key_name)
 
+    async def put_index_settings(
+        self,
+        index: str,
+        settings: Dict[str, Any],
+        api_key_name: Optional[str] = None,
+    ) -> None:
+        client = await self._get_started_client(api_key_name)
+        try:
+            await client.indices.put_settings(index=index, settings=settings)
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="index settings update",
+                api_key_name=api_key_name,
+                index=index,
+            )
+        logger.info("Updated settings of index %s: %s", index, settings)
+
+    async def refresh_index(
+        self, index: str, api_key_name: Optional[str] = None
+    ) -> None:
+        client = await self._get_started_client(api_key_name)
+        try:
+            await client.indices.refresh(index=index)
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="index refresh",
+                api_key_name=api_key_name,
+                index=index,
+            )
+
+    async def force_merge(
+        self,
+        index: str,
+        max_num_segments: int = 1,
+        api_key_name: Optional[str] = None,
+    ) -> None:
+        client = await self._get_started_client(api_key_name)
+        try:
+            await client.options(
+                request_timeout=self._config.bulk_request_timeout
+            ).indices.forcemerge(index=index, max_num_segments=max_num_segments)
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="force merge",
+                api_key_name=api_key_name,
+                index=index,
+            )
+        logger.info("Force-merged index %s to %d segments", index, max_num_segments)
+
+    async def list_indices(
+        self, pattern: str, api_key_name: Optional[str] = None
+    ) -> List[str]:
+        """Return the concrete index names matching ``pattern``."""
+        client = await self._get_started_client(api_key_name)
+        try:
+            response = await client.indices.get(
+                index=pattern, allow_no_indices=True, ignore_unavailable=True
+            )
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="index listing",
+                api_key_name=api_key_name,
+                index=pattern,
+            )
+        return sorted(response.body)
+
+    async def get_alias_indices(
+        self, alias: str, api_key_name: Optional[str] = None
+    ) -> List[str]:
+        """Return the indices an alias points at (empty if there is no alias)."""
+        client = await self._get_started_client(api_key_name)
+        try:
+            response = await client.indices.get_alias(name=alias)
+        except ApiError as exc:
+            if getattr(exc, "status_code", None) == 404:
+                return []
+            self._raise_api_error_with_context(
+                exc,
+                operation="alias lookup",
+                api_key_name=api_key_name,
+                index=alias,
+            )
+        return sorted(response.body)
+
+    async def update_aliases(
+        self, actions: List[Dict[str, Any]], api_key_name: Optional[str] = None
+    ) -> None:
+        """Apply alias actions in one atomic request."""
+        client = await self._get_started_client(api_key_name)
+        try:
+            await client.indices.update_aliases(actions=actions)
+        except ApiError as exc:
+            self._raise_api_error_with_context(
+                exc,
+                operation="alias update",
+                api_key_name=api_key_name,
+            )
+        logger.info("Updated aliases: %s", actions)
+
     async def bulk_upload(
         self,
-        docs: Iterable[Dict[str, Any]],
+        docs: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
         index_name: str,
         op_type: str = "index",
         batch_size: int = 500,
         api_key_name: Optional[str] = None,
+        options: Optional[BulkUploadOptions] = None,
+        report: Optional[BulkReport] = None,
+        dead_letter: Optional[DeadLetterWriter] = None,
     ) -> int:
+        """Upload documents with the Bulk API and return the number indexed.
+
+        Without ``options`` a single streaming bulk request is in flight at a
+        time. With ``options`` requests are chunked by doc count and bytes,
+        run ``options.concurrency`` at a time, optionally resized from ES
+        ``took`` times and rejections, and recorded per batch in ``report``.
+
+        Items failing with a retryable status (429, 502-504) or a request
+        timeout are retried with exponential backoff up to
+        ``options.max_retries`` times. Items that still fail are written to
+        ``dead_letter`` when given, otherwise the upload raises at the end.
+        """
         client = await self._get_started_client(api_key_name)
+        if options is not None or dead_letter is not None:
+            return await self._bulk_upload_chunked(
+                client,
+                docs,
+                index_name,
+                op_type,
+                batch_size,
+                options or BulkUploadOptions(),
+                report or BulkReport(index_name=index_name),
+                dead_letter,
+            )
         errors: List[Dict[str, Any]] = []
         total_uploaded = 0
         bulk_request_timeout = (
             self._config.bulk_request_timeout or self._config.request_timeout
         )
 
-        def actions():
-            for doc in docs:
-                action: Dict[str, Any] = {
-                    "_op_type": op_type,
-                    "_index": index_name,
-                    "_source": doc,
-                }
-                doc_id = doc.get("id")
-                if doc_id:
-                    action["_id"] = doc_id
-                yield action
+        def to_action(doc: Dict[str, Any]) -> Dict[str, Any]:
+            action: Dict[str, Any] = {
+                "_op_type": op_type,
+                "_index": index_name,
+                "_source": doc,
+            }
+            doc_id = doc.get("id")
+            if doc_id:
+                action["_id"] = doc_id
+            return action
+
+        if hasattr(docs, "__aiter__"):
+
+            async def actions():
+                async for doc in docs:
+                    yield to_action(doc)
+
+        else:
+
+            def actions():
+                for doc in docs:
+                    yield to_action(doc)
 
         try:
             async for ok, item in async_streaming_bulk(
@@ -421,3 +685,224 @@ class ElasticsearchClient:
 
         logger.info("Bulk uploaded %d docs to index %s", total_uploaded, index_name)
         return total_uploaded
+
+    async def _bulk_upload_chunked(
+        self,
+        client: AsyncElasticsearch,
+        docs: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        index_name: str,
+        op_type: str,
+        batch_size: int,
+        options: BulkUploadOptions,
+        report: BulkReport,
+        dead_letter: Optional[DeadLetterWriter],
+    ) -> int:
+        bulk_request_timeout = (
+            self._config.bulk_request_timeout or self._config.request_timeout
+        )
+        sizer = AdaptiveBatchSizer(batch_size, options)
+        errors: List[Dict[str, Any]] = []
+        bulk_client = client.options(request_timeout=bulk_request_timeout)
+
+        async def actions():
+            if hasattr(docs, "__aiter__"):
+                async for doc in docs:
+                    yield make_bulk_action(doc, index_name, op_type)
+            else:
+                for doc in docs:
+                    yield make_bulk_action(doc, index_name, op_type)
+
+        def give_up(action: BulkAction, result: Dict[str, Any], attempts: int):
+            if dead_letter is None:
+                errors.append({op_type: result})
+            else:
+                dead_letter.write(
+                    action,
+                    index_name,
+                    op_type,
+                    status=result.get("status"),
+                    error=result.get("error"),
+                    attempts=attempts,
+                )
+
+        async def send(number: int, chunk: List[BulkAction]) -> None:
+            pending = chunk
+            attempt = 0
+            while pending:
+                attempt += 1
+                can_retry = attempt <= options.max_retries
+                batch = BulkBatchResult(
+                    number=number,
+                    docs=len(pending),
+                    nbytes=sum(a.nbytes for a in pending),
+                    latency_s=0.0,
+                )
+                started = time.perf_counter()
+                try:
+                    resp = await bulk_client.bulk(
+                        operations=[line for a in pending for line in a.lines]
+                    )
+                except ApiError as exc:
+                    status = exc.status_code
+                    if status == 413 and len(pending) > 1:
+                        # The request body is too large for the cluster:
+                        # resend each half, splitting again if needed.
+                        half = len(pending) // 2
+                        logger.warning(
+                            "Bulk batch %d to %s is too large (%d docs, %d bytes); "
+                            "splitting it in two",
+                            number,
+                            index_name,
+                            batch.docs,
+                            batch.nbytes,
+                        )
+                        await send(number, pending[:half])
+                        await send(number, pending[half:])
+                        return
+                    if status != 413 and status not in RETRYABLE_STATUSES:
+                        raise
+                    # The whole request was rejected; every item shares its
+                    # status and is retried or dead-lettered like an item error.
+                    results = [
+                        {"_id": a.doc_id, "status": status, "error": str(exc)}
+                        for a in pending
+                    ]
+                except ConnectionTimeout as exc:
+                    if not can_retry and dead_letter is None:
+                        raise RuntimeError(
+                            "Elasticsearch bulk upload timed out after "
+                            f"{bulk_request_timeout}s for index {index_name!r}. "
+                            "Increase gateways.database.elasticsearch.connection.bulk_request_timeout "
+                            "or reduce --batch-size."
+                        ) from exc
+                    results = [
+                        {"_id": a.doc_id, "status": None, "error": "timeout"}
+                        for a in pending
+                    ]
+                else:
+                    batch.took_ms = resp.get("took")
+                    results = [
+                        next(iter(item.values())) for item in resp.get("items", [])
+                    ]
+                batch.latency_s = time.perf_counter() - started
+
+                retry: List[BulkAction] = []
+                for action, result in zip(pending, results, strict=True):
+                    status = result.get("status")
+                    if status is not None and 200 <= status < 300:
+                        batch.succeeded += 1
+                        continue
+                    if status == 429:
+                        batch.rejected += 1
+                    if can_retry and (status is None or status in RETRYABLE_STATUSES):
+                        retry.append(action)
+                        continue
+                    batch.failed += 1
+                    if dead_letter is not None:
+                        batch.dead_lettered += 1
+                    give_up(action, result, attempt)
+                batch.retried = len(retry)
+                report.add(batch)
+                sizer.observe(batch)
+                logger.info(
+                    "Bulk batch %d to %s: %d docs, %d bytes, took=%sms, "
+                    "latency=%.3fs (%.1f docs/s), rejected=%d, retry=%d, "
+                    "next size=%d",
+                    number,
+                    index_name,
+                    batch.docs,
+                    batch.nbytes,
+                    batch.took_ms,
+                    batch.latency_s,
+                    batch.docs_per_second,
+                    batch.rejected,
+                    batch.retried,
+                    sizer.size,
+                )
+                pending = retry
+                if pending:
+                    delay = options.backoff(attempt)
+                    logger.warning(
+                        "Retrying %d items of bulk batch %d to %s in %.1fs "
+                        "(attempt %d of %d)",
+                        len(pending),
+                        number,
+                        index_name,
+                        delay,
+                        attempt + 1,
+                        options.max_retries + 1,
+                    )
+                    await asyncio.sleep(delay)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=options.concurrency)
+
+        async def worker() -> None:
+            while (job := await queue.get()) is not None:
+                await send(*job)
+
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(max(1, options.concurrency)):
+                tg.create_task(worker())
+            number = 0
+            async for chunk in iter_bulk_chunks(
+                actions(), sizer, options.max_chunk_bytes
+            ):
+                number += 1
+                await queue.put((number, chunk))
+            for _ in range(max(1, options.concurrency)):
+                await queue.put(None)
+
+        if errors:
+            sample = errors[:5]
+            raise RuntimeError(
+                f"Bulk upload failed for {len(errors)} items; sample: {sample}"
+            )
+        logger.info(report.summary())
+        return report.docs
+
+    async def bulk_delete(
+        self,
+        doc_ids: Iterable[str],
+        index_name: str,
+        batch_size: int = 500,
+        api_key_name: Optional[str] = None,
+    ) -> int:
+        client = await self._get_started_client(api_key_name)
+        errors: List[Dict[str, Any]] = []
+        total_deleted = 0
+        bulk_request_timeout = (
+            self._config.bulk_request_timeout or self._config.request_timeout
+        )
+        actions = (
+            {"_op_type": "delete", "_index": index_name, "_id": doc_id}
+            for doc_id in doc_ids
+        )
+        try:
+            async for ok, item in async_streaming_bulk(
+                client,
+                actions,
+                chunk_size=batch_size,
+                request_timeout=bulk_request_timeout,
+                raise_on_error=False,
+                raise_on_exception=True,
+            ):
+                if ok:
+                    total_deleted += 1
+                elif (item.get("delete") or {}).get("status") != 404:
+                    errors.append(item)
+        except ConnectionTimeout as exc:
+            raise RuntimeError(
+                "Elasticsearch bulk delete timed out after "
+                f"{bulk_request_timeout}s for index {index_name!r}. "
+                "Increase gateways.database.elasticsearch.connection.bulk_request_timeout "
+                "or reduce --batch-size."
+            ) from exc
+
+        if errors:
+            sample = errors[:5]
+            raise RuntimeError(
+                f"Bulk delete failed for {len(errors)} items; sample: {sample}"
+            )
+
+        logger.info("Bulk deleted %d docs from index %s", total_deleted, index_name)
+        return total_deleted
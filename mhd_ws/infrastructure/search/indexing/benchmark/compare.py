@@ -0,0 +1,65 @@
+"""Compare benchmark results against a stored baseline."""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import Any
+
+# Stages faster than this (mean per dataset) are too noisy to flag.
+MIN_MEAN_MS = 0.05
+
+
+@dataclasses.dataclass(frozen=True)
+class StageComparison:
+    profile: str
+    stage: str
+    baseline_ms: float
+    current_ms: float
+    threshold: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ms / self.baseline_ms if self.baseline_ms else 1.0
+
+    @property
+    def regressed(self) -> bool:
+        return self.baseline_ms >= MIN_MEAN_MS and self.ratio > 1 + self.threshold
+
+
+def compare_results(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float = 0.10
+) -> list[StageComparison]:
+    """Compare mean per-dataset stage times for profiles present in both runs.
+
+    Means (not totals) are compared so runs with different dataset counts
+    stay comparable; spec differences are the caller's responsibility.
+    """
+    comparisons = []
+    for profile, result in current.get("profiles", {}).items():
+        base = baseline.get("profiles", {}).get(profile)
+        if not base:
+            continue
+        for stage, stats in result["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats:
+                continue
+            comparisons.append(
+                StageComparison(
+                    profile=profile,
+                    stage=stage,
+                    baseline_ms=base_stats["mean_ms"],
+                    current_ms=stats["mean_ms"],
+                    threshold=threshold,
+                )
+            )
+    return comparisons
+
+
+def spec_mismatches(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Return the profiles whose synthetic graph spec differs from the baseline."""
+    return [
+        profile
+        for profile, result in current.get("profiles", {}).items()
+        if profile in baseline.get("profiles", {})
+        and baseline["profiles"][profile]["spec"] != result["spec"]
+    ]
@@ -0,0 +1,308 @@
+"""Time each indexer stage over synthetic datasets, offline."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import gzip
+import json
+import math
+import platform
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+from mhd_ws.infrastructure.search.bulk import (
+    BulkReport,
+    BulkUploadOptions,
+    make_bulk_action,
+)
+from mhd_ws.infrastructure.search.es_client import ElasticsearchClient
+from mhd_ws.infrastructure.search.indexing.benchmark.synthetic import (
+    SyntheticGraphSpec,
+    write_synthetic_datasets,
+)
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    build_legacy_dataset_doc,
+)
+from mhd_ws.infrastructure.search.indexing.doc_profiles import (
+    DOC_PROFILES,
+    HIT_SOURCE_EXCLUDES,
+    SLIM_SOURCE_EXCLUDES,
+    json_size,
+    source_view,
+    split_diagnostics,
+)
+from mhd_ws.infrastructure.search.indexing.graph_utils import GraphView
+from mhd_ws.infrastructure.search.indexing.io_utils import (
+    COMPRESSIONS,
+    payload_compressor,
+)
+from mhd_ws.infrastructure.search.indexing.metabolite_builder import (
+    build_metabolite_docs,
+)
+from mhd_ws.infrastructure.search.indexing.utils import (
+    iso_now,
+    load_json_file,
+    resolve_json_decoder,
+)
+
+RESULTS_VERSION = 1
+STAGES = ("decode", "graph_view", "dataset_doc", "metabolite_docs", "serialize")
+SINKS = ("null", "stand-in")
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkOptions:
+    datasets: int = 20
+    repeats: int = 1
+    sink: str = "null"
+    rel_index: str = "dict"
+    json_decoder: str = "auto"
+    batch_size: int = 500
+    bulk_concurrency: int = 1
+    stand_in_latency_ms: float = 0.0
+    # 0 = unlimited; otherwise the stand-in waits as if on a link this fast.
+    stand_in_bandwidth_mbps: float = 0.0
+    # Payload file compression (--format bulk --compress) timed per dataset.
+    compression: str = "none"
+    # gzip request bodies like the ES transport does with http_compress.
+    http_compress: bool = False
+    # full or slim (search_text not stored, debug counts in their own docs).
+    doc_profile: str = "full"
+
+
+class StandInElasticsearch:
+    """In-process stand-in for the Bulk API: parses payloads, accepts all."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        bandwidth_mbps: float = 0.0,
+        http_compress: bool = False,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.bandwidth_mbps = bandwidth_mbps
+        self.http_compress = http_compress
+        self.docs = 0
+        self.bytes = 0
+        self.wire_bytes = 0
+
+    def options(self, **kwargs: Any) -> StandInElasticsearch:
+        return self
+
+    async def bulk(self, operations: list[bytes], **kwargs: Any) -> dict[str, Any]:
+        started = time.perf_counter()
+        body = b"\n".join(operations) + b"\n"
+        if self.http_compress:
+            # What elastic_transport does per request when http_compress is on.
+            body = gzip.compress(body)
+        self.wire_bytes += len(body)
+        items = []
+        for meta_line, source_line in zip(
+            operations[::2], operations[1::2], strict=True
+        ):
+            meta = json.loads(meta_line)
+            json.loads(source_line)
+            op_type, action = next(iter(meta.items()))
+            items.append({op_type: {"_id": action.get("_id"), "status": 201}})
+            self.bytes += len(meta_line) + len(source_line) + 2
+        delay_s = self.latency_ms / 1000
+        if self.bandwidth_mbps:
+            delay_s += len(body) * 8 / (self.bandwidth_mbps * 1_000_000)
+        if delay_s:
+            await asyncio.sleep(delay_s)
+        self.docs += len(items)
+        took = int((time.perf_counter() - started) * 1000)
+        return {"took": took, "errors": False, "items": items}
+
+    async def close(self) -> None:
+        return None
+
+
+class StandInElasticsearchClient(ElasticsearchClient):
+    """ElasticsearchClient whose connections all go to a StandInElasticsearch."""
+
+    def __init__(self, stand_in: StandInElasticsearch) -> None:
+        super().__init__(None)
+        self.stand_in = stand_in
+
+    async def _get_started_client(self, api_key_name: str | None):
+        return self.stand_in
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _stage_summary(samples: list[float]) -> dict[str, float]:
+    return {
+        "total_s": round(sum(samples), 6),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 4) if samples else 0.0,
+        "p50_ms": round(_percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 4),
+        "max_ms": round(max(samples, default=0.0) * 1000, 4),
+    }
+
+
+def _time_files(
+    files: list[Path], options: BenchmarkOptions, indexed_ts: str
+) -> tuple[dict[str, list[float]], list[dict[str, Any]], dict[str, int]]:
+    timings: dict[str, list[float]] = defaultdict(list)
+    docs: list[dict[str, Any]] = []
+    totals = {"dataset_docs": 0, "metabolite_docs": 0, "doc_bytes": 0}
+    slim = options.doc_profile == "slim"
+    stored_excludes = SLIM_SOURCE_EXCLUDES if slim else ()
+    # Per dataset doc: bytes kept in _source, and bytes a search hit returns.
+    source_sizes: list[int] = []
+    hit_sizes: list[int] = []
+    compressor = None
+    if options.compression != "none":
+        compressor = payload_compressor(options.compression)
+        totals["compressed_bytes"] = 0
+    clock = time.perf_counter
+    for path in files:
+        t0 = clock()
+        mhd = load_json_file(path, decoder=options.json_decoder)
+        t1 = clock()
+        view = GraphView.from_mhd(mhd, rel_index=options.rel_index)
+        t2 = clock()
+        doc = build_legacy_dataset_doc(mhd, indexed_ts, view)
+        diagnostics = split_diagnostics(doc) if slim else None
+        t3 = clock()
+        metabolite_docs = build_metabolite_docs(mhd, doc, view)
+        t4 = clock()
+        file_actions = [make_bulk_action(doc, "datasets")]
+        file_actions.extend(make_bulk_action(d, "metabolites") for d in metabolite_docs)
+        if diagnostics is not None:
+            file_actions.append(make_bulk_action(diagnostics, "diagnostics"))
+        t5 = clock()
+        for stage, seconds in zip(
+            STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4), strict=True
+        ):
+            timings[stage].append(seconds)
+        if compressor is not None:
+            payload = b"".join(line + b"\n" for a in file_actions for line in a.lines)
+            t6 = clock()
+            totals["compressed_bytes"] += len(compressor.compress(payload))
+            timings["compress"].append(clock() - t6)
+        totals["dataset_docs"] += 1
+        totals["metabolite_docs"] += len(metabolite_docs)
+        totals["doc_bytes"] += sum(a.nbytes for a in file_actions)
+        source_sizes.append(json_size(source_view(doc, stored_excludes)))
+        hit_sizes.append(json_size(source_view(doc, HIT_SOURCE_EXCLUDES)))
+        if options.sink != "null":
+            docs.extend(a.source for a in file_actions)
+    if compressor is not None:
+        totals["compressed_bytes"] += len(compressor.flush())
+    totals["source_bytes"] = sum(source_sizes)
+    totals["source_bytes_p95"] = int(_percentile(source_sizes, 95))
+    totals["hit_bytes_p95"] = int(_percentile(hit_sizes, 95))
+    return timings, docs, totals
+
+
+async def _upload_to_stand_in(
+    docs: list[dict[str, Any]], options: BenchmarkOptions
+) -> dict[str, Any]:
+    stand_in = StandInElasticsearch(
+        latency_ms=options.stand_in_latency_ms,
+        bandwidth_mbps=options.stand_in_bandwidth_mbps,
+        http_compress=options.http_compress,
+    )
+    client = StandInElasticsearchClient(stand_in)
+    report = BulkReport(index_name="stand-in")
+    await client.bulk_upload(
+        docs,
+        "stand-in",
+        batch_size=options.batch_size,
+        options=BulkUploadOptions(concurrency=options.bulk_concurrency),
+        report=report,
+    )
+    return {
+        "docs": report.docs,
+        "batches": len(report.batches),
+        "seconds": round(report.elapsed, 6),
+        "docs_per_second": round(report.docs_per_second, 1),
+        "batch_p95_ms": round(report.latency_percentile(95) * 1000, 4),
+        "wire_bytes": stand_in.wire_bytes,
+        "wire_bytes_per_second": round(stand_in.wire_bytes / report.elapsed)
+        if report.elapsed
+        else 0,
+    }
+
+
+def run_profile(
+    spec: SyntheticGraphSpec, options: BenchmarkOptions, workdir: Path
+) -> dict[str, Any]:
+    """Benchmark one synthetic profile and return its result record."""
+    files = write_synthetic_datasets(
+        workdir / spec.profile, spec, options.datasets, prefix=spec.profile.upper()
+    )
+    indexed_ts = iso_now()
+    timings: dict[str, list[float]] = defaultdict(list)
+    best_wall = math.inf
+    upload: dict[str, Any] | None = None
+    for _ in range(max(1, options.repeats)):
+        started = time.perf_counter()
+        run_timings, docs, totals = _time_files(files, options, indexed_ts)
+        if options.sink == "stand-in":
+            run_upload = asyncio.run(_upload_to_stand_in(docs, options))
+            # Per dataset, like the build stages, so baselines stay comparable.
+            run_timings["upload"] = [run_upload["seconds"] / len(files)] * len(files)
+            if upload is None or run_upload["seconds"] < upload["seconds"]:
+                upload = run_upload
+        best_wall = min(best_wall, time.perf_counter() - started)
+        for stage, samples in run_timings.items():
+            timings[stage].extend(samples)
+
+    result: dict[str, Any] = {
+        "spec": dataclasses.asdict(spec),
+        "stages": {stage: _stage_summary(s) for stage, s in timings.items()},
+        "totals": {
+            **totals,
+            "wall_s": round(best_wall, 6),
+            "datasets_per_s": round(options.datasets / best_wall, 2),
+            "input_bytes": sum(p.stat().st_size for p in files),
+        },
+    }
+    if upload is not None:
+        result["upload"] = upload
+    return result
+
+
+def run_benchmark(
+    specs: list[SyntheticGraphSpec],
+    options: BenchmarkOptions,
+    workdir: Path | None = None,
+) -> dict[str, Any]:
+    """Benchmark each spec (one per profile) and return machine-readable results."""
+    if options.sink not in SINKS:
+        raise ValueError(f"unknown sink {options.sink!r}; expected one of {SINKS}")
+    if options.compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression {options.compression!r}")
+    if options.doc_profile not in DOC_PROFILES:
+        raise ValueError(f"unknown doc profile {options.doc_profile!r}")
+    options = dataclasses.replace(
+        options, json_decoder=resolve_json_decoder(options.json_decoder)
+    )
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        profiles = {
+            spec.profile: run_profile(spec, options, Path(tmp)) for spec in specs
+        }
+    return {
+        "version": RESULTS_VERSION,
+        "created": iso_now(),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "options": dataclasses.asdict(options),
+        "profiles": profiles,
+    }
@@ -0,0 +1,240 @@
+"""Synthetic MHD graphs of configurable size for indexer benchmarks."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+PROFILE_URIS = {
+    "legacy": "https://metabolomicshub.github.io/mhd-model/schemas/v0_1/legacy-profile.json",
+    "ms": "https://metabolomicshub.github.io/mhd-model/schemas/v0_1/ms-profile.json",
+}
+CHARACTERISTIC_TYPES = ("organism", "disease", "organism part", "sample type")
+FILE_EXTENSIONS = (".mzML", ".raw", ".wiff", ".d.zip")
+
+
+@dataclasses.dataclass(frozen=True)
+class SyntheticGraphSpec:
+    """Size knobs for one synthetic dataset graph."""
+
+    profile: str = "ms"
+    assays: int = 2
+    samples: int = 50
+    files_per_sample: int = 2
+    metabolites: int = 100
+    identifiers_per_metabolite: int = 2
+    characteristic_types: int = 4
+    characteristic_values_per_type: int = 10
+    parameter_types: int = 6
+    parameter_values_per_type: int = 5
+    factor_values: int = 6
+    people: int = 5
+    seed: int = 1
+
+    def __post_init__(self) -> None:
+        if self.profile not in PROFILE_URIS:
+            raise ValueError(
+                f"unknown profile {self.profile!r}; expected one of "
+                f"{', '.join(PROFILE_URIS)}"
+            )
+
+
+class _GraphWriter:
+    def __init__(self) -> None:
+        self.nodes: list[dict[str, Any]] = []
+        self.relationships: list[dict[str, Any]] = []
+
+    def node(self, node_id: str, node_type: str, **fields: Any) -> str:
+        self.nodes.append({"id": node_id, "type": node_type, **fields})
+        return node_id
+
+    def rel(self, src: str, name: str, tgt: str) -> None:
+        self.relationships.append(
+            {
+                "type": "relationship",
+                "source_ref": src,
+                "relationship_name": name,
+                "target_ref": tgt,
+            }
+        )
+
+
+def make_synthetic_mhd(spec: SyntheticGraphSpec, accession: str) -> dict[str, Any]:
+    """Build an MHD document whose graph exercises every builder stage."""
+    rnd = random.Random(f"{spec.seed}:{accession}")
+    g = _GraphWriter()
+    study = g.node(
+        "study-1",
+        "study",
+        title=f"Synthetic study {accession}",
+        description="<p>Synthetic <b>benchmark</b> study</p> " * 5,
+        license="CC-BY-4.0",
+        submission_date="2024-01-01",
+        public_release_date="2024-06-01",
+        dataset_url_list=[f"https://example.org/{accession}"],
+    )
+
+    provider = g.node("provider-1", "data-provider", name="Synthetic repository")
+    g.rel(provider, "provides", study)
+    org = g.node("org-1", "organization", name="Institute", address="1 Lab Road")
+    g.rel(study, "funded-by", org)
+    for i in range(spec.people):
+        person = g.node(
+            f"person-{i}",
+            "person",
+            full_name=f"Person {i}",
+            email_list=[f"p{i}@example.org"],
+            orcid=f"0000-0000-0000-{i:04d}",
+        )
+        g.rel(person, "principal-investigator-of" if i == 0 else "author-of", study)
+        g.rel(person, "affiliated-with", org)
+    project = g.node("project-1", "project", title="Synthetic project")
+    g.rel(project, "has-study", study)
+    g.rel(project, "managed-by", org)
+    pub = g.node("pub-1", "publication", title="A paper", doi="10.1000/synthetic")
+    g.rel(study, "has-publication", pub)
+
+    descriptors = {
+        ref: g.node(f"desc-{ref}", "descriptor", name=name, accession=f"MS:{i:07d}")
+        for i, (ref, name) in enumerate(
+            [
+                ("technology", "mass spectrometry"),
+                ("assay", "LC-MS"),
+                ("measurement", "targeted metabolite profiling"),
+                ("omics", "metabolomics"),
+            ]
+        )
+    }
+    protocol_type = g.node("desc-protocol", "descriptor", name="mass spectrometry")
+    protocol = g.node(
+        "protocol-1",
+        "protocol",
+        name="MS protocol",
+        protocol_type_ref=protocol_type,
+    )
+    g.rel(study, "has-protocol", protocol)
+    for i in range(spec.assays):
+        assay = g.node(
+            f"assay-{i}",
+            "assay",
+            name=f"Assay {i}",
+            technology_type_ref=descriptors["technology"],
+            assay_type_ref=descriptors["assay"],
+            measurement_type_ref=descriptors["measurement"],
+            omics_type_ref=descriptors["omics"],
+        )
+        g.rel(study, "has-assay", assay)
+
+    char_values: list[str] = []
+    for t in range(spec.characteristic_types):
+        type_name = CHARACTERISTIC_TYPES[t % len(CHARACTERISTIC_TYPES)]
+        cd = g.node(f"cd-{t}", "characteristic-definition", name=type_name)
+        g.rel(study, "has-characteristic-definition", cd)
+        for v in range(spec.characteristic_values_per_type):
+            cv = g.node(
+                f"cv-{t}-{v}",
+                "characteristic-value",
+                name=f"{type_name} value {v}",
+                accession=f"EFO:{t * 1000 + v:07d}",
+                source="EFO",
+            )
+            g.rel(cv, "instance-of", cd)
+            char_values.append(cv)
+
+    param_values: list[str] = []
+    for t in range(spec.parameter_types):
+        ptype = g.node(f"ptype-{t}", "descriptor", name=f"parameter type {t}")
+        pdef = g.node(
+            f"pdef-{t}",
+            "parameter-definition",
+            name=f"parameter {t}",
+            parameter_type_ref=ptype,
+        )
+        for v in range(spec.parameter_values_per_type):
+            pv = g.node(f"pv-{t}-{v}", "parameter-value", name=f"setting {v}")
+            g.rel(pv, "instance-of", pdef)
+            param_values.append(pv)
+
+    fd = g.node("fd-1", "factor-definition", name="treatment")
+    g.rel(study, "has-factor-definition", fd)
+    for v in range(spec.factor_values):
+        fv = g.node(f"fv-{v}", "factor-value", name=f"dose {v}")
+        g.rel(fv, "instance-of", fd)
+
+    for i in range(spec.samples):
+        sample = g.node(f"sample-{i}", "sample", name=f"Sample {i}")
+        g.rel(study, "has-sample", sample)
+        for cv in rnd.sample(char_values, min(len(char_values), 3)):
+            g.rel(sample, "has-characteristic-value", cv)
+        if spec.profile == "ms":
+            subject = g.node(f"subject-{i}", "subject", name=f"Subject {i}")
+            specimen = g.node(
+                f"specimen-{i}",
+                "specimen",
+                name=f"Specimen {i}",
+                repository_identifier=f"{accession}-SP{i}",
+            )
+            g.rel(subject, "source-of", specimen)
+            g.rel(specimen, "source-of", sample)
+        for f in range(spec.files_per_sample):
+            ext = FILE_EXTENSIONS[(i + f) % len(FILE_EXTENSIONS)]
+            raw = g.node(f"raw-{i}-{f}", "raw-data-file", name=f"run-{i}-{f}{ext}")
+            if spec.profile == "ms":
+                run = g.node(f"run-{i}-{f}", "sample-run", name=f"Run {i}-{f}")
+                g.rel(sample, "has-sample-run", run)
+                g.rel(run, "has-raw-data-file", raw)
+                for pv in rnd.sample(param_values, min(len(param_values), 2)):
+                    g.rel(run, "has-parameter-value", pv)
+            else:
+                g.rel(sample, "has-file", raw)
+
+    g.node("metadata-1", "metadata-file", name="i_Investigation.txt")
+    g.node("result-1", "result-file", name="m_metabolites.tsv")
+
+    for m in range(spec.metabolites):
+        met = g.node(f"met-{m}", "metabolite", name=f"metabolite {m}")
+        g.rel(study, "reports-metabolite", met)
+        for k in range(spec.identifiers_per_metabolite):
+            source = ("CHEBI", "HMDB", "KEGG")[k % 3]
+            ident = g.node(
+                f"ident-{m}-{k}",
+                "metabolite-identifier",
+                source=source,
+                accession=f"{source}:{m:06d}",
+            )
+            g.rel(ident, "identifier-of", met)
+
+    doc: dict[str, Any] = {
+        "repository_name": "Synthetic",
+        "repository_identifier": accession,
+        "repository_revision": 1,
+        "profile_uri": PROFILE_URIS[spec.profile],
+        "graph": {
+            "start_item_refs": [study],
+            "nodes": g.nodes,
+            "relationships": g.relationships,
+        },
+    }
+    if spec.profile == "ms":
+        doc["mhd_identifier"] = f"MHD{accession}"
+        doc["repository_revision_datetime"] = "2024-06-01T00:00:00"
+    return doc
+
+
+def write_synthetic_datasets(
+    directory: Path, spec: SyntheticGraphSpec, count: int, prefix: str = "SYN"
+) -> list[Path]:
+    """Write ``count`` synthetic ``*.mhd.json`` files and return their paths."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        accession = f"{prefix}{i + 1}"
+        path = directory / f"{accession}.mhd.json"
+        path.write_text(
+            json.dumps(make_synthetic_mhd(spec, accession)), encoding="utf-8"
+        )
+        paths.append(path)
+    return paths
@@ -0,0 +1,101 @@
+"""Delete docs a dataset no longer has, after it was reindexed.
+
+Metabolite and file docs are upserted by ID, so a metabolite or file
+removed from a dataset's graph would stay in its index. Each doc carries
+the ``dataset_id`` it belongs to and the ``indexed`` timestamp of the run
+that wrote it; once a dataset's docs are uploaded, its docs with an older
+(or no) timestamp are stale. Datasets are cleaned with one
+``delete_by_query`` per ``batch_size`` datasets rather than one request
+each.
+
+A doc upserted while the delete runs is skipped as a version conflict, so
+the cleanup never removes a doc the current run wrote.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator
+
+from mhd_ws.infrastructure.search.indexing.pipeline import FileBuildResult
+
+METABOLITE_ID_SEPARATOR = "::metabolite::"
+
+
+def stale_docs_query(dataset_ids: list[str], indexed_ts: str) -> dict[str, Any]:
+    """Docs of ``dataset_ids`` written before ``indexed_ts``."""
+    return {
+        "bool": {
+            "filter": [{"terms": {"dataset_id": dataset_ids}}],
+            "should": [
+                {"range": {"indexed": {"lt": indexed_ts}}},
+                {"bool": {"must_not": [{"exists": {"field": "indexed"}}]}},
+            ],
+            "minimum_should_match": 1,
+        }
+    }
+
+
+def dataset_id_of_doc(doc_id: str, id_separator: str) -> str | None:
+    """Dataset ID of a ``<dataset id><id_separator><node id>`` doc ID, or
+    None for other docs."""
+    dataset_id, sep, _ = doc_id.partition(id_separator)
+    return dataset_id if sep else None
+
+
+class StaleDocCleaner:
+    """Collect reindexed datasets and delete their stale docs from one
+    index whose docs carry ``dataset_id`` and ``indexed``.
+
+    ``id_separator`` splits the IDs of that index's docs into dataset and
+    node (see ``dataset_id_of_doc``).
+    """
+
+    def __init__(
+        self,
+        es_client,
+        index_name: str,
+        indexed_ts: str,
+        *,
+        api_key_name: str | None,
+        id_separator: str,
+        batch_size: int = 500,
+        dataset_ids: Iterable[str] = (),
+    ) -> None:
+        self.es_client = es_client
+        self.index_name = index_name
+        self.indexed_ts = indexed_ts
+        self.api_key_name = api_key_name
+        self.id_separator = id_separator
+        self.batch_size = max(1, batch_size)
+        self.dataset_ids: list[str] = list(dataset_ids)
+        self.deleted = 0
+        self.requests = 0
+
+    def track(self, results: Iterable[FileBuildResult]) -> Iterator[FileBuildResult]:
+        """Record datasets whose docs were built while passing results on."""
+        for result in results:
+            if result.doc is not None and result.doc.get("id"):
+                self.dataset_ids.append(result.doc["id"])
+            yield result
+
+    def skip_failed(self, doc_ids: Iterable[str]) -> int:
+        """Leave datasets with docs that failed to upload alone: their
+        previous docs are all the index has for them."""
+        failed = {dataset_id_of_doc(doc_id, self.id_separator) for doc_id in doc_ids}
+        kept = [i for i in self.dataset_ids if i not in failed]
+        skipped = len(self.dataset_ids) - len(kept)
+        self.dataset_ids = kept
+        return skipped
+
+    async def run(self) -> int:
+        """Delete stale docs of every tracked dataset; return how many."""
+        for start in range(0, len(self.dataset_ids), self.batch_size):
+            batch = self.dataset_ids[start : start + self.batch_size]
+            self.deleted += await self.es_client.delete_by_query(
+                self.index_name,
+                stale_docs_query(batch, self.indexed_ts),
+                api_key_name=self.api_key_name,
+            )
+            self.requests += 1
+        self.dataset_ids = []
+        return self.deleted
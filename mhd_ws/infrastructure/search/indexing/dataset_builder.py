@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import dataclasses
 from collections import Counter
 from pathlib import Path
 from typing import Any
@@ -14,14 +15,13 @@ from mhd_ws.infrastructure.search.indexing.facets import (
     route_characteristic_to_facet,
 )
 from mhd_ws.infrastructure.search.indexing.graph_utils import (
-    build_rel_index,
-    choose_study_id,
+    GraphView,
     cv_value_label_and_accession,
-    get_graph_parts,
     node_name,
     rel_sources,
     rel_targets,
 )
+from mhd_ws.infrastructure.search.indexing.profiling import StageProfiler
 from mhd_ws.infrastructure.search.indexing.utils import (
     dedup_preserve_order,
     dedup_sorted_strings,
@@ -51,6 +51,54 @@ INSTRUMENT_ACCESSION_BUCKET: dict[str, str] = {
 STUDY_ORG_REL_NAMES = {"funds", "funded-by"}
 MASS_ANALYZER_KEYWORDS = ("mass analyzer", "mass analyser")
 SAMPLE_NODE_TYPES = {"sample"}
+# Entry lists capped by ``DocSizeBudget.max_list_items``.
+CAPPED_LIST_FIELDS = (
+    "people",
+    "organizations",
+    "parameters",
+    "parameter_groups",
+    "characteristic_groups",
+    "descriptors",
+    "ms_instruments",
+    "chromatography_instruments",
+    "other_instruments",
+    "mass_analyzers",
+    "factors",
+    "protocols",
+    "publications",
+    "specimens",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class DocSizeBudget:
+    """Per-section caps on a dataset document; 0 disables a cap.
+
+    Entry lists keep their first ``max_list_items`` entries. Facet values,
+    file extensions and the values of each characteristic/parameter group
+    keep the most frequent ones, so a filter on a dropped value no longer
+    matches the dataset. Every cap that applies is recorded in the doc's
+    ``truncation`` list. All caps are off unless set; ``search_text`` is
+    built before the lists are cut.
+    """
+
+    max_list_items: int = 0
+    max_facet_values: int = 0
+    max_group_values: int = 0
+    max_search_text_bytes: int = 0
+
+
+UNBOUNDED_DOC_BUDGET = DocSizeBudget()
+DEFAULT_DOC_BUDGET = UNBOUNDED_DOC_BUDGET
+# Mapping of the ``truncation`` field (as in ms_mapping.json), added to
+# dataset indices created before the field existed.
+TRUNCATION_PROPERTY: dict[str, Any] = {
+    "properties": {
+        "field": {"type": "keyword"},
+        "kept": {"type": "integer"},
+        "total": {"type": "integer"},
+    }
+}
 
 
 def detect_profile(mhd: dict[str, Any]) -> str:
@@ -109,6 +157,45 @@ def dedup_org_refs(orgs: list[dict[str, Any]]) -> list[dict[str, Any]]:
     return out
 
 
+def top_values(counts: Counter[str], k: int) -> list[str]:
+    """The ``k`` most frequent values, ties broken by value."""
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [value for value, _ in ranked[:k]]
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """``text`` cut to at most ``max_bytes`` UTF-8 bytes, at a word boundary
+    when there is one."""
+    data = text.encode("utf-8")
+    if len(data) <= max_bytes:
+        return text
+    cut = data[:max_bytes].decode("utf-8", errors="ignore")
+    head, sep, _ = cut.rpartition(" ")
+    return (head if sep else cut).rstrip()
+
+
+def _cap_groups(
+    groups: dict[str, list[str]],
+    counts: Counter[tuple[str, str]],
+    limit: int,
+) -> tuple[dict[str, list[str]], int, int]:
+    """Keep the ``limit`` most frequent values of each group; return the
+    groups with the kept and total value counts of the capped ones."""
+    kept = total = 0
+    capped: dict[str, list[str]] = {}
+    for type_name, values in groups.items():
+        if limit and len(values) > limit:
+            top = set(
+                top_values(Counter({v: counts[(type_name, v)] for v in values}), limit)
+            )
+            capped[type_name] = [v for v in values if v in top]
+            kept += limit
+            total += len(values)
+        else:
+            capped[type_name] = values
+    return capped, kept, total
+
+
 def normalize_extension(ext: str | None) -> str | None:
     """Normalize an extension to lowercase with a leading dot."""
     if not ext or not isinstance(ext, str):
@@ -187,13 +274,7 @@ _NODE_REF_DESCRIPTOR_SOURCES: tuple[tuple[str, str, str], ...] = (
 )
 
 
-def _collect_descriptors(
-    doc: dict[str, Any],
-    node_by_id: dict[str, Any],
-    relidx: Any,
-    study_id: str,
-    assay_nodes: list[dict[str, Any]],
-) -> None:
+def _collect_descriptors(doc: dict[str, Any], view: GraphView) -> None:
     """Populate doc['descriptors'] from all known relationship/ref sources."""
     seen: set[tuple[str, str]] = set()  # (descriptor_id, relationship)
 
@@ -215,25 +296,18 @@ def _collect_descriptors(
             }
         )
 
+    node_by_id = view.node_by_id
+
     # Study-level keyword relationships
     for rel_name in _STUDY_DESCRIPTOR_RELS:
-        for target_id in rel_targets(relidx, study_id, rel_name):
+        for target_id in rel_targets(view.relidx, view.study_id, rel_name):
             node = node_by_id.get(target_id)
             if node and node.get("type") == "descriptor":
                 _add(node, f"study.{rel_name}")
 
     # Embedded ref fields on assay and file nodes
-    nodes_by_type: dict[str, list[dict[str, Any]]] = {}
-    for node in node_by_id.values():
-        ntype = node.get("type", "")
-        nodes_by_type.setdefault(ntype, []).append(node)
-
     for node_type, ref_field, rel_label in _NODE_REF_DESCRIPTOR_SOURCES:
-        if node_type == "assay":
-            source_nodes = assay_nodes
-        else:
-            source_nodes = nodes_by_type.get(node_type, [])
-        for node in source_nodes:
+        for node in view.nodes(node_type):
             ref_id = node.get(ref_field)
             if not ref_id:
                 continue
@@ -243,14 +317,25 @@ def _collect_descriptors(
 
 
 def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
-    mhd: dict[str, Any], indexed_iso: str
+    mhd: dict[str, Any],
+    indexed_iso: str,
+    view: GraphView | None = None,
+    profiler: StageProfiler | None = None,
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
 ) -> dict[str, Any]:
-    """Build a legacy dataset document suitable for ES indexing."""
-    node_by_id, relationships = get_graph_parts(mhd)
-    relidx = build_rel_index(relationships)
+    """Build a legacy dataset document suitable for ES indexing.
 
-    study_id = choose_study_id(mhd, node_by_id)
-    study = node_by_id[study_id]
+    With ``profiler`` each section is charged to a ``dataset_doc.*`` stage.
+    Sections over ``budget`` are cut and listed in ``truncation``.
+    """
+    if view is None:
+        view = GraphView.from_mhd(mhd)
+    node_by_id = view.node_by_id
+    relationships = view.relationships
+    relidx = view.relidx
+
+    study_id = view.study_id
+    study = view.study
 
     repo_name = mhd.get("repository_name")
     repo_id = mhd.get("repository_identifier")
@@ -316,6 +401,10 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
             "relationship_counts": {},
         },
     }
+    truncation: list[dict[str, Any]] = []
+
+    def record_truncation(field: str, kept: int, total: int) -> None:
+        truncation.append({"field": field, "kept": kept, "total": total})
 
     # MS-specific top-level fields
     revision_datetime = mhd.get("repository_revision_datetime")
@@ -340,9 +429,9 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
         doc["study"]["related_datasets"] = related_datasets
 
     # Debug counts
-    doc["debug"]["node_type_counts"] = dict(
-        Counter([n.get("type") for n in node_by_id.values()])
-    )
+    doc["debug"]["node_type_counts"] = {
+        t: len(nodes) for t, nodes in view.nodes_by_type.items()
+    }
     doc["debug"]["relationship_counts"] = dict(
         Counter(
             [
@@ -353,6 +442,9 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
         )
     )
 
+    if profiler:
+        profiler.mark("dataset_doc.header")
+
     # Data provider (study.created_by_ref or data-provider --provides--> study)
     provider_id = study.get("created_by_ref")
     if not provider_id:
@@ -372,9 +464,7 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
 
     # People: any study <-> person relationship; preserve relationship roles
     people_by_id: dict[str, dict[str, Any]] = {}
-    for rel in relationships:
-        if rel.get("type") != "relationship":
-            continue
+    for rel in view.incident_relationships(study_id):
         rel_name = rel.get("relationship_name")
         src = rel.get("source_ref")
         tgt = rel.get("target_ref")
@@ -431,9 +521,7 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
     seen_orgs: set[tuple[str, ...]] = set()
 
     # People -> organizations (affiliations, etc.), promote to dataset orgs
-    for rel in relationships:
-        if rel.get("type") != "relationship":
-            continue
+    for rel in view.incident_relationships(*people_by_id):
         src = rel.get("source_ref")
         tgt = rel.get("target_ref")
         if not src or not tgt:
@@ -459,9 +547,7 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
     doc["people"] = list(people_by_id.values())
 
     # Organizations: capture study <-> organization relationships (funding only)
-    for rel in relationships:
-        if rel.get("type") != "relationship":
-            continue
+    for rel in view.incident_relationships(study_id):
         rel_name = rel.get("relationship_name")
         if rel_name not in STUDY_ORG_REL_NAMES:
             continue
@@ -543,23 +629,18 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
         seen_publications.add(key)
         doc["publications"].append(entry)
 
+    if profiler:
+        profiler.mark("dataset_doc.contributors")
+
     # Assay facets: assay refs point to descriptor nodes
-    assay_nodes = [n for n in node_by_id.values() if n.get("type") == "assay"]
+    assay_nodes = view.nodes("assay")
     doc["assays"]["count"] = len(assay_nodes)
-    doc["samples"]["count"] = sum(
-        1 for n in node_by_id.values() if n.get("type") in SAMPLE_NODE_TYPES
-    )
+    doc["samples"]["count"] = view.count(*SAMPLE_NODE_TYPES)
     doc["counts"]["assays"] = doc["assays"]["count"]
     doc["counts"]["samples"] = doc["samples"]["count"]
-    doc["counts"]["sample_runs"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "sample-run"
-    )
-    doc["counts"]["subjects"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "subject"
-    )
-    doc["counts"]["specimens"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "specimen"
-    )
+    doc["counts"]["sample_runs"] = view.count("sample-run")
+    doc["counts"]["subjects"] = view.count("subject")
+    doc["counts"]["specimens"] = view.count("specimen")
     for a in assay_nodes:
         for facet_key, ref_key in ASSAY_FACET_REF_KEYS:
             ref = a.get(ref_key)
@@ -568,14 +649,13 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
                 if nm:
                     doc["facets"][facet_key].append(nm)
 
+    if profiler:
+        profiler.mark("dataset_doc.assays")
+
     # Characteristic definitions
     char_def_ids = rel_targets(relidx, study_id, "has-characteristic-definition")
     if not char_def_ids:
-        char_def_ids = [
-            nid
-            for nid, n in node_by_id.items()
-            if n.get("type") == "characteristic-definition"
-        ]
+        char_def_ids = [n["id"] for n in view.nodes("characteristic-definition")]
 
     for cd_id in char_def_ids:
         cd = node_by_id.get(cd_id, {})
@@ -585,11 +665,7 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
 
     # Characteristic values
     char_entries: list[dict[str, str]] = []
-    for cv_node in [
-        n
-        for n in node_by_id.values()
-        if (n.get("type") or "").endswith("characteristic-value")
-    ]:
+    for cv_node in view.nodes_with_type_suffix("characteristic-value"):
         cv_id = cv_node.get("id")
         if not cv_id:
             continue
@@ -668,6 +744,13 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
             char_groups[type_name] = []
         if value not in char_groups[type_name]:
             char_groups[type_name].append(value)
+    char_groups, kept, total = _cap_groups(
+        char_groups,
+        Counter((e["type_name"], e["value"]) for e in char_entries),
+        budget.max_group_values,
+    )
+    if total:
+        record_truncation("characteristic_groups.values", kept, total)
     doc["characteristic_groups"] = [
         {
             "type_name": t,
@@ -677,19 +760,18 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
         for t, vs in char_groups.items()
     ]
 
+    if profiler:
+        profiler.mark("dataset_doc.characteristics")
+
     # Factor values
     factor_def_ids = rel_targets(relidx, study_id, "has-factor-definition")
     if not factor_def_ids:
-        factor_def_ids = [
-            nid for nid, n in node_by_id.items() if n.get("type") == "factor-definition"
-        ]
+        factor_def_ids = [n["id"] for n in view.nodes("factor-definition")]
     factor_def_id_set = set(factor_def_ids)
     factor_entries: list[dict[str, Any]] = []
     seen_factors: set[tuple[str, ...]] = set()
 
-    for fv_node in [
-        n for n in node_by_id.values() if (n.get("type") or "").endswith("factor-value")
-    ]:
+    for fv_node in view.nodes_with_type_suffix("factor-value"):
         fv_id = fv_node.get("id")
         if not fv_id:
             continue
@@ -799,14 +881,13 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
 
     doc["factors"] = factor_entries
 
+    if profiler:
+        profiler.mark("dataset_doc.factors")
+
     # Parameters: parameter-value nodes + their parameter types/definitions
     param_entries: list[dict[str, Any]] = []
     seen_params: set[tuple[str, ...]] = set()
-    for pv_node in [
-        n
-        for n in node_by_id.values()
-        if (n.get("type") or "").endswith("parameter-value")
-    ]:
+    for pv_node in view.nodes_with_type_suffix("parameter-value"):
         pv_id = pv_node.get("id")
         if not pv_id:
             continue
@@ -936,32 +1017,39 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
                 groups[type_name] = []
             if value not in groups[type_name]:
                 groups[type_name].append(value)
+    groups, kept, total = _cap_groups(
+        groups,
+        Counter(
+            (e["type_name"], e["value"])
+            for e in param_entries
+            if e.get("type_name") and e.get("value")
+        ),
+        budget.max_group_values,
+    )
+    if total:
+        record_truncation("parameter_groups.values", kept, total)
     doc["parameter_groups"] = [
         {"type_name": t, "values": vs} for t, vs in groups.items()
     ]
 
+    if profiler:
+        profiler.mark("dataset_doc.parameters")
+
     # Descriptors: collect all descriptor nodes reachable via known relationships/refs
-    _collect_descriptors(doc, node_by_id, relidx, study_id, assay_nodes)
+    _collect_descriptors(doc, view)
+
+    if profiler:
+        profiler.mark("dataset_doc.descriptors")
 
     # File counts
-    doc["files"]["metadata"]["count"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "metadata-file"
-    )
-    doc["files"]["raw"]["count"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "raw-data-file"
-    )
-    doc["files"]["derived"]["count"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "derived-data-file"
-    )
-    doc["files"]["result"]["count"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "result-file"
-    )
-    doc["files"]["supplementary"]["count"] = sum(
-        1 for n in node_by_id.values() if n.get("type") == "supplementary-file"
-    )
+    doc["files"]["metadata"]["count"] = view.count("metadata-file")
+    doc["files"]["raw"]["count"] = view.count("raw-data-file")
+    doc["files"]["derived"]["count"] = view.count("derived-data-file")
+    doc["files"]["result"]["count"] = view.count("result-file")
+    doc["files"]["supplementary"]["count"] = view.count("supplementary-file")
 
     # Specimens (ms profile)
-    specimen_nodes = [n for n in node_by_id.values() if n.get("type") == "specimen"]
+    specimen_nodes = view.nodes("specimen")
     if specimen_nodes:
         doc["specimens"] = [
             {
@@ -971,18 +1059,19 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
             for s in specimen_nodes
         ]
     extension_counts: Counter[str] = Counter()
-    for node in node_by_id.values():
-        if node.get("type") not in FILE_NODE_TYPES:
-            continue
+    for node in (n for t in FILE_NODE_TYPES for n in view.nodes(t)):
         ext = detect_file_extension(node)
         if ext:
             extension_counts[ext] += 1
-    if extension_counts:
+    extensions = sorted(extension_counts.keys())
+    if extensions:
         doc["files"]["extensions"] = [
-            {"extension": ext, "count": extension_counts[ext]}
-            for ext in sorted(extension_counts.keys())
+            {"extension": ext, "count": extension_counts[ext]} for ext in extensions
         ]
 
+    if profiler:
+        profiler.mark("dataset_doc.files")
+
     # search_text
     search_bits: list[str] = []
     search_bits.extend(
@@ -1011,10 +1100,42 @@ def build_legacy_dataset_doc(  # noqa: C901, PLR0912, PLR0915
     for k in SEARCH_FACET_KEYS:
         search_bits.extend(doc["facets"].get(k, []))
 
-    doc["search_text"] = " ".join(dedup_preserve_order(search_bits)).strip()
+    search_text = " ".join(dedup_preserve_order(search_bits)).strip()
+    if budget.max_search_text_bytes:
+        size = len(search_text.encode("utf-8"))
+        if size > budget.max_search_text_bytes:
+            search_text = truncate_utf8(search_text, budget.max_search_text_bytes)
+            record_truncation("search_text", len(search_text.encode("utf-8")), size)
+    doc["search_text"] = search_text
+
+    # Entries cut below stay findable through search_text.
+    if budget.max_facet_values and len(extensions) > budget.max_facet_values:
+        top = set(top_values(extension_counts, budget.max_facet_values))
+        doc["files"]["extensions"] = [
+            e for e in doc["files"]["extensions"] if e["extension"] in top
+        ]
+        record_truncation("files.extensions", len(top), len(extension_counts))
+    if budget.max_list_items:
+        for field in CAPPED_LIST_FIELDS:
+            entries = doc[field]
+            if len(entries) > budget.max_list_items:
+                doc[field] = entries[: budget.max_list_items]
+                record_truncation(field, budget.max_list_items, len(entries))
+
+    if profiler:
+        profiler.mark("dataset_doc.search_text")
 
     # final de-dup + sort facets
     for k, v in doc["facets"].items():
-        doc["facets"][k] = dedup_sorted_strings(v)
-
+        values = dedup_sorted_strings(v)
+        if budget.max_facet_values and len(values) > budget.max_facet_values:
+            counts = Counter(x.strip() for x in v if isinstance(x, str) and x.strip())
+            values = sorted(top_values(counts, budget.max_facet_values))
+            record_truncation(f"facets.{k}", len(values), len(counts))
+        doc["facets"][k] = values
+    if truncation:
+        doc["truncation"] = truncation
+
+    if profiler:
+        profiler.mark("dataset_doc.facets")
     return doc
@@ -0,0 +1,285 @@
+"""Index source reading the latest public dataset revisions from Postgres.
+
+Announcement files stored in ``announcement_file.file`` are announcements,
+not MHD graphs; each points at its MHD file through
+``mhd_metadata_file_url``. Revisions are read with keyset pagination on
+``dataset.id`` (one short query per batch, no transaction held open while
+documents are built) and the MHD files are fetched with bounded
+concurrency, from a local mirror when one is given.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import queue
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterator
+from urllib.parse import urlparse
+
+import httpx
+from sqlalchemy import Select, and_, select
+
+from mhd_ws.infrastructure.persistence.db.db_client import DatabaseClient
+from mhd_ws.infrastructure.persistence.db.mhd import (
+    AnnouncementFile,
+    Dataset,
+    DatasetRevision,
+    DatasetRevisionStatus,
+    DatasetStatus,
+)
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    DEFAULT_DOC_BUDGET,
+    DocSizeBudget,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import (
+    FileBuildResult,
+    build_mhd_docs,
+)
+from mhd_ws.infrastructure.search.indexing.utils import (
+    load_json_bytes,
+    resolve_json_decoder,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class DatasetRevisionRef:
+    """The latest valid revision of one public dataset."""
+
+    dataset_id: int
+    accession: str
+    revision: int
+    mhd_file_url: str | None
+
+    @property
+    def source(self) -> str:
+        return f"{self.accession}@{self.revision}"
+
+
+def _latest_public_revisions() -> Select:
+    return (
+        select(
+            Dataset.id,
+            Dataset.accession,
+            DatasetRevision.revision,
+            AnnouncementFile.file["mhd_metadata_file_url"].as_string(),
+        )
+        .join(
+            DatasetRevision,
+            and_(
+                DatasetRevision.dataset_id == Dataset.id,
+                DatasetRevision.revision == Dataset.revision,
+            ),
+        )
+        .join(AnnouncementFile, AnnouncementFile.id == DatasetRevision.file_id)
+        .where(
+            Dataset.status == DatasetStatus.PUBLIC,
+            DatasetRevision.status == DatasetRevisionStatus.VALID,
+        )
+    )
+
+
+def latest_public_revisions_query(after_id: int, batch_size: int) -> Select:
+    """One keyset page of latest public revisions, ordered by dataset id."""
+    return (
+        _latest_public_revisions()
+        .where(Dataset.id > after_id)
+        .order_by(Dataset.id)
+        .limit(batch_size)
+    )
+
+
+async def get_latest_public_revision(
+    db_client: DatabaseClient, accession: str
+) -> DatasetRevisionRef | None:
+    """The latest revision of one dataset, or None if it is not public."""
+    async with db_client.session() as session:
+        result = await session.execute(
+            _latest_public_revisions().where(Dataset.accession == accession).limit(1)
+        )
+        row = result.first()
+    return DatasetRevisionRef(*row) if row else None
+
+
+async def iter_latest_public_revisions(
+    db_client: DatabaseClient, batch_size: int = 1000
+) -> AsyncIterator[DatasetRevisionRef]:
+    """Yield the latest revision of every public dataset, ``batch_size`` rows
+    per query. Only the columns needed to fetch the MHD file are read."""
+    after_id = 0
+    while True:
+        async with db_client.session() as session:
+            result = await session.execute(
+                latest_public_revisions_query(after_id, batch_size)
+            )
+            rows = result.all()
+        for dataset_id, accession, revision, url in rows:
+            yield DatasetRevisionRef(dataset_id, accession, revision, url)
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1][0]
+
+
+class MhdFileFetcher:
+    """Fetch MHD files over HTTP, or from a mirror directory, at most
+    ``concurrency`` at a time."""
+
+    def __init__(
+        self,
+        mirror_dir: Path | None = None,
+        concurrency: int = 8,
+        timeout_s: float = 60.0,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.mirror_dir = mirror_dir
+        self.timeout_s = timeout_s
+        self._client = client
+        self._owns_client = client is None
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def __aenter__(self) -> MhdFileFetcher:
+        if self._client is None and self.mirror_dir is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_s, follow_redirects=True
+            )
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    def mirror_path(self, ref: DatasetRevisionRef) -> Path:
+        """File of ``ref`` in the mirror: the URL's file name, if it has one."""
+        name = Path(urlparse(ref.mhd_file_url or "").path).name
+        return self.mirror_dir / (name or f"{ref.accession}.mhd.json")
+
+    async def fetch(self, ref: DatasetRevisionRef) -> bytes:
+        async with self._semaphore:
+            if self.mirror_dir is not None:
+                return await asyncio.to_thread(self.mirror_path(ref).read_bytes)
+            if not ref.mhd_file_url:
+                raise ValueError("announcement has no mhd_metadata_file_url")
+            response = await self._client.get(ref.mhd_file_url)
+            response.raise_for_status()
+            return response.content
+
+
+async def iter_fetched_mhd_files(
+    db_client: DatabaseClient,
+    fetcher: MhdFileFetcher,
+    batch_size: int = 1000,
+    prefetch: int = 16,
+    limit: int | None = None,
+    accept: Callable[[str], bool] | None = None,
+) -> AsyncIterator[tuple[DatasetRevisionRef, bytes | Exception]]:
+    """Yield each revision with its MHD file bytes (or the fetch error).
+
+    Up to ``prefetch`` downloads run ahead of the consumer; output keeps
+    the database order. ``accept`` filters on accession (e.g. a shard).
+    """
+    pending: collections.deque[tuple[DatasetRevisionRef, asyncio.Task]] = (
+        collections.deque()
+    )
+
+    async def fetch(ref: DatasetRevisionRef) -> bytes | Exception:
+        try:
+            return await fetcher.fetch(ref)
+        except Exception as e:
+            return e
+
+    try:
+        taken = 0
+        async for ref in iter_latest_public_revisions(db_client, batch_size):
+            if accept is not None and not accept(ref.accession):
+                continue
+            if limit is not None and taken >= limit:
+                break
+            taken += 1
+            pending.append((ref, asyncio.create_task(fetch(ref))))
+            if len(pending) >= max(1, prefetch):
+                ref, task = pending.popleft()
+                yield ref, await task
+        while pending:
+            ref, task = pending.popleft()
+            yield ref, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+_END = object()
+
+
+def iter_db_build_results(
+    db_client: DatabaseClient,
+    fetcher: MhdFileFetcher,
+    skip_metabolites: bool,
+    indexed_ts: str,
+    batch_size: int = 1000,
+    prefetch: int = 16,
+    limit: int | None = None,
+    accept: Callable[[str], bool] | None = None,
+    rel_index: str = "dict",
+    json_decoder: str = "auto",
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
+) -> Iterator[FileBuildResult]:
+    """Yield one build result per public dataset, like ``iter_build_results``.
+
+    Reading and downloading run on a background thread with its own event
+    loop; at most ``prefetch`` fetched files wait for the builders.
+    """
+    json_decoder = resolve_json_decoder(json_decoder)
+    fetched: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def offer(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                fetched.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def read() -> None:
+        async with fetcher:
+            async for item in iter_fetched_mhd_files(
+                db_client, fetcher, batch_size, prefetch, limit, accept
+            ):
+                if not await asyncio.to_thread(offer, item):
+                    return
+
+    def produce() -> None:
+        try:
+            asyncio.run(read())
+        except Exception as e:
+            offer(e)
+        finally:
+            offer(_END)
+
+    thread = threading.Thread(target=produce, name="mhd-db-source", daemon=True)
+    thread.start()
+    try:
+        while (item := fetched.get()) is not _END:
+            if isinstance(item, Exception):
+                raise RuntimeError(
+                    f"reading datasets from the database failed: {item}"
+                ) from item
+            ref, data = item
+            if isinstance(data, Exception):
+                yield FileBuildResult(path=ref.source, error=f"fetch failed: {data}")
+                continue
+            try:
+                mhd = load_json_bytes(data, decoder=json_decoder)
+            except Exception as e:
+                yield FileBuildResult(path=ref.source, error=str(e))
+                continue
+            yield build_mhd_docs(
+                mhd, ref.source, skip_metabolites, indexed_ts, rel_index, budget
+            )
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,87 @@
+"""Dataset document profiles: what is stored in ``_source``.
+
+``full`` stores every built field. ``slim`` keeps ``search_text`` indexed
+but excludes it from ``_source`` (it is only ever queried, never shown),
+and moves the ``debug`` counts into one doc per dataset in a separate
+diagnostics index. The profile is recorded in the mapping ``_meta`` so
+that indexers writing into an existing index (the near-real-time task)
+build docs to match it.
+
+``search_text`` is built in Python rather than with mapping ``copy_to``:
+it strips HTML and collects strings from nested objects, which ``copy_to``
+cannot copy into a root-level field.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any, Iterable, Iterator
+
+from mhd_ws.infrastructure.search.es.es_configuration import (
+    AdvancedSearchConfiguration,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import FileBuildResult
+
+DOC_PROFILES = ("full", "slim")
+# Indexed but not stored by the slim mapping.
+SLIM_SOURCE_EXCLUDES = ("search_text",)
+# Never returned in search hits, whatever the profile.
+HIT_SOURCE_EXCLUDES = AdvancedSearchConfiguration.source_excludes
+# Key of the profile in the mapping ``_meta``.
+DOC_PROFILE_META_KEY = "doc_profile"
+
+
+def slim_mapping(mapping: dict[str, Any]) -> dict[str, Any]:
+    """The dataset index mapping for the slim profile.
+
+    ``debug`` stays in the strict mapping, neither indexed nor searchable,
+    so that full-profile docs (e.g. replayed payloads) are still accepted.
+    """
+    mapping = copy.deepcopy(mapping)
+    mappings = mapping["mappings"]
+    mappings["properties"]["debug"] = {"type": "object", "enabled": False}
+    mappings["_source"] = {"excludes": list(SLIM_SOURCE_EXCLUDES)}
+    mappings.setdefault("_meta", {})[DOC_PROFILE_META_KEY] = "slim"
+    return mapping
+
+
+def index_doc_profile(mapping_response: dict[str, Any]) -> str:
+    """The profile recorded in a get-mapping response; "full" if none is."""
+    for index_mapping in mapping_response.values():
+        meta = (index_mapping.get("mappings") or {}).get("_meta") or {}
+        if meta.get(DOC_PROFILE_META_KEY) == "slim":
+            return "slim"
+    return "full"
+
+
+def split_diagnostics(doc: dict[str, Any]) -> dict[str, Any] | None:
+    """Remove the debug block from ``doc`` and return it as a diagnostics doc."""
+    debug = doc.pop("debug", None)
+    if debug is None:
+        return None
+    return {
+        "id": doc.get("id"),
+        "dataset_id": doc.get("id"),
+        "indexed": (doc.get("dates") or {}).get("indexed"),
+        **debug,
+    }
+
+
+def slim_results(results: Iterable[FileBuildResult]) -> Iterator[FileBuildResult]:
+    """Apply the slim profile to build results as they pass."""
+    for result in results:
+        if result.doc is not None:
+            result.diagnostics_doc = split_diagnostics(result.doc)
+        yield result
+
+
+def source_view(doc: dict[str, Any], excludes: Iterable[str]) -> dict[str, Any]:
+    """``doc`` without the given top-level fields, as ES would return it."""
+    excludes = set(excludes)
+    return {k: v for k, v in doc.items() if k not in excludes}
+
+
+def json_size(doc: dict[str, Any]) -> int:
+    """Encoded size of ``doc``, as written by the bulk writers."""
+    return len(json.dumps(doc, ensure_ascii=False).encode("utf-8"))
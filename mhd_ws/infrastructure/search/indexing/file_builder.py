@@ -0,0 +1,105 @@
+"""Build one search document per file node of an MHD graph.
+
+File docs are yielded one at a time and go straight to the bulk writer or
+uploader, so a dataset with 100k+ files never has all of its file docs in
+memory at once; only its graph is.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    FILE_NODE_TYPES,
+    detect_file_extension,
+    detect_profile,
+)
+from mhd_ws.infrastructure.search.indexing.graph_utils import GraphView
+from mhd_ws.infrastructure.search.indexing.utils import load_json_file
+
+FILE_ID_SEPARATOR = "::file::"
+
+
+def file_doc_id(dataset_id: str, node_id: str) -> str:
+    return f"{dataset_id}{FILE_ID_SEPARATOR}{node_id}"
+
+
+def dataset_doc_id(mhd: dict[str, Any]) -> str:
+    """ID of the dataset doc built from ``mhd``."""
+    return f"{detect_profile(mhd)}::{mhd.get('repository_identifier')}"
+
+
+def iter_file_docs(
+    mhd: dict[str, Any],
+    indexed_ts: str,
+    view: GraphView | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield a doc for every file node of ``mhd``, by file type then graph
+    order."""
+    if view is None:
+        view = GraphView.from_mhd(mhd)
+    repository = {
+        "name": mhd.get("repository_name"),
+        "identifier": mhd.get("repository_identifier"),
+        "revision": mhd.get("repository_revision", 1),
+    }
+    profile = detect_profile(mhd)
+    dataset_id = dataset_doc_id(mhd)
+    for file_type in sorted(FILE_NODE_TYPES):
+        for node in view.nodes(file_type):
+            node_id = node.get("id")
+            if not node_id:
+                continue
+            doc: dict[str, Any] = {
+                "id": file_doc_id(dataset_id, node_id),
+                "dataset_id": dataset_id,
+                "profile": profile,
+                "repository": repository,
+                "file_type": file_type,
+                "name": node.get("name"),
+                "extension": detect_file_extension(node),
+                "urls": node.get("url_list") or [],
+                "indexed": indexed_ts,
+            }
+            format_node = view.node_by_id.get(node.get("format_ref") or "")
+            if format_node and format_node.get("name"):
+                doc["format"] = {
+                    "name": format_node["name"],
+                    "accession": format_node.get("accession"),
+                    "source": format_node.get("source"),
+                }
+            yield doc
+
+
+@dataclasses.dataclass
+class FileIndexStats:
+    files: int = 0
+    file_docs: int = 0
+    # Datasets whose file docs were all built, in input order.
+    dataset_ids: list[str] = dataclasses.field(default_factory=list)
+    errors: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+
+
+def iter_file_index_docs(
+    paths: Iterable[Path],
+    indexed_ts: str,
+    stats: FileIndexStats,
+    rel_index: str = "dict",
+    json_decoder: str = "auto",
+) -> Iterator[dict[str, Any]]:
+    """Yield the file docs of every MHD file in ``paths``, one graph at a
+    time. Files that fail to load or build are recorded in ``stats``."""
+    for path in paths:
+        stats.files += 1
+        try:
+            mhd = load_json_file(path, decoder=json_decoder)
+            view = GraphView.from_mhd(mhd, rel_index=rel_index)
+            for doc in iter_file_docs(mhd, indexed_ts, view):
+                stats.file_docs += 1
+                yield doc
+        except Exception as e:
+            stats.errors.append((str(path), str(e)))
+            continue
+        stats.dataset_ids.append(dataset_doc_id(mhd))
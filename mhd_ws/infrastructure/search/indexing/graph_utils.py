@@ -3,8 +3,10 @@
 from __future__ import annotations
 
 import dataclasses
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from typing import Any
+from typing import Any, Callable
 
 
 @dataclasses.dataclass
@@ -12,6 +14,103 @@ class RelIndex:
     out_by_src: dict[tuple[str, str], list[str]]
     out_by_tgt: dict[tuple[str, str], list[str]]
 
+    def targets(self, source_id: str, rel_name: str) -> list[str]:
+        return self.out_by_src.get((source_id, rel_name), [])
+
+    def sources(self, target_id: str, rel_name: str) -> list[str]:
+        return self.out_by_tgt.get((target_id, rel_name), [])
+
+
+@dataclasses.dataclass
+class _CsrAdjacency:
+    """Edges grouped by node, then relationship, in insertion order.
+
+    Edges of node ``n`` live at ``offsets[n]:offsets[n + 1]``; within that
+    range ``rels`` is sorted so one relationship is a contiguous slice.
+    ``edges`` holds the position of each edge in the relationship list.
+    """
+
+    offsets: array
+    rels: array
+    nodes: array
+    edges: array
+
+    @classmethod
+    def build(
+        cls,
+        keys: array,
+        rels: array,
+        others: array,
+        edges: array,
+        n_nodes: int,
+        n_rels: int,
+    ) -> _CsrAdjacency:
+        composite = [k * n_rels + r for k, r in zip(keys, rels)]
+        order = sorted(range(len(keys)), key=composite.__getitem__)
+        counts = array("q", bytes(8 * (n_nodes + 1)))
+        for k in keys:
+            counts[k + 1] += 1
+        for i in range(n_nodes):
+            counts[i + 1] += counts[i]
+        return cls(
+            offsets=counts,
+            rels=array("i", (rels[i] for i in order)),
+            nodes=array("i", (others[i] for i in order)),
+            edges=array("i", (edges[i] for i in order)),
+        )
+
+    def lookup(self, node: int, rel: int) -> array:
+        lo, hi = self.offsets[node], self.offsets[node + 1]
+        lo = bisect_left(self.rels, rel, lo, hi)
+        return self.nodes[lo : bisect_right(self.rels, rel, lo, hi)]
+
+    def edges_of(self, node: int) -> array:
+        return self.edges[self.offsets[node] : self.offsets[node + 1]]
+
+    def nbytes(self) -> int:
+        arrays = (self.offsets, self.rels, self.nodes, self.edges)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+@dataclasses.dataclass
+class CsrRelIndex:
+    """Compact ``RelIndex`` backend: interned ids and array-backed CSR edges.
+
+    Trades a little lookup latency for far less memory than the tuple-keyed
+    dicts of ``RelIndex`` on graphs with hundreds of thousands of edges.
+    """
+
+    node_ids: list[str]
+    node_index: dict[str, int]
+    rel_index: dict[str | None, int]
+    by_src: _CsrAdjacency
+    by_tgt: _CsrAdjacency
+
+    def targets(self, source_id: str, rel_name: str) -> list[str]:
+        return self._lookup(self.by_src, source_id, rel_name)
+
+    def sources(self, target_id: str, rel_name: str) -> list[str]:
+        return self._lookup(self.by_tgt, target_id, rel_name)
+
+    def _lookup(self, adj: _CsrAdjacency, node_id: str, rel_name: str) -> list[str]:
+        node = self.node_index.get(node_id)
+        rel = self.rel_index.get(rel_name)
+        if node is None or rel is None:
+            return []
+        ids = self.node_ids
+        return [ids[i] for i in adj.lookup(node, rel)]
+
+    def incident(self, node_id: str) -> list[int]:
+        """Return positions of the relationships touching a node, in order."""
+        node = self.node_index.get(node_id)
+        if node is None:
+            return []
+        return sorted({*self.by_src.edges_of(node), *self.by_tgt.edges_of(node)})
+
+    def nbytes(self) -> int:
+        """Return the size of the edge arrays (excluding the intern tables)."""
+        return self.by_src.nbytes() + self.by_tgt.nbytes()
+
 
 def build_rel_index(relationships: list[dict[str, Any]]) -> RelIndex:
     """Build relationship lookup maps keyed by (node_id, relationship_name)."""
@@ -30,14 +129,55 @@ def build_rel_index(relationships: list[dict[str, Any]]) -> RelIndex:
     return RelIndex(out_by_src=out_by_src, out_by_tgt=out_by_tgt)
 
 
-def rel_targets(relidx: RelIndex, source_id: str, rel_name: str) -> list[str]:
+def build_csr_rel_index(relationships: list[dict[str, Any]]) -> CsrRelIndex:
+    """Build a ``CsrRelIndex`` with the same lookups as ``build_rel_index``.
+
+    Unnamed relationships are kept (under ``None``, which no lookup by name
+    matches) so that ``incident`` still sees them.
+    """
+    node_index: dict[str, int] = {}
+    rel_index: dict[str | None, int] = {}
+    srcs, tgts, names, edges = array("i"), array("i"), array("i"), array("i")
+    for i, r in enumerate(relationships):
+        if r.get("type") != "relationship":
+            continue
+        s = r.get("source_ref")
+        t = r.get("target_ref")
+        if not s or not t:
+            continue
+        name = r.get("relationship_name") or None
+        srcs.append(node_index.setdefault(s, len(node_index)))
+        tgts.append(node_index.setdefault(t, len(node_index)))
+        names.append(rel_index.setdefault(name, len(rel_index)))
+        edges.append(i)
+    n_nodes, n_rels = len(node_index), len(rel_index)
+    return CsrRelIndex(
+        node_ids=list(node_index),
+        node_index=node_index,
+        rel_index=rel_index,
+        by_src=_CsrAdjacency.build(srcs, names, tgts, edges, n_nodes, n_rels),
+        by_tgt=_CsrAdjacency.build(tgts, names, srcs, edges, n_nodes, n_rels),
+    )
+
+
+REL_INDEX_BACKENDS: dict[str, Callable[[list[dict[str, Any]]], Any]] = {
+    "dict": build_rel_index,
+    "csr": build_csr_rel_index,
+}
+
+
+def rel_targets(
+    relidx: RelIndex | CsrRelIndex, source_id: str, rel_name: str
+) -> list[str]:
     """Return target ids for a given source id and relationship name."""
-    return relidx.out_by_src.get((source_id, rel_name), [])
+    return relidx.targets(source_id, rel_name)
 
 
-def rel_sources(relidx: RelIndex, target_id: str, rel_name: str) -> list[str]:
+def rel_sources(
+    relidx: RelIndex | CsrRelIndex, target_id: str, rel_name: str
+) -> list[str]:
     """Return source ids for a given target id and relationship name."""
-    return relidx.out_by_tgt.get((target_id, rel_name), [])
+    return relidx.sources(target_id, rel_name)
 
 
 def get_graph_parts(
@@ -69,6 +209,101 @@ def choose_study_id(mhd: dict[str, Any], node_by_id: dict[str, dict[str, Any]])
     raise ValueError("no study node found")
 
 
+@dataclasses.dataclass
+class GraphView:
+    """Indexed view of one MHD graph, shared by all document builders.
+
+    Built once per file: node lookup, nodes bucketed by type (in graph
+    order), the relationship index, relationships incident to each node and
+    the chosen study id. With the CSR backend, incidence is read from the
+    CSR arrays and ``position`` and ``incident`` are not built.
+    """
+
+    mhd: dict[str, Any]
+    node_by_id: dict[str, dict[str, Any]]
+    relationships: list[dict[str, Any]]
+    relidx: RelIndex | CsrRelIndex
+    study_id: str
+    nodes_by_type: dict[str | None, list[dict[str, Any]]]
+    position: dict[str, int] | None = None
+    incident: dict[str, list[int]] | None = None
+
+    @classmethod
+    def from_mhd(cls, mhd: dict[str, Any], rel_index: str = "dict") -> GraphView:
+        node_by_id, relationships = get_graph_parts(mhd)
+        nodes_by_type: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+        for n in node_by_id.values():
+            nodes_by_type[n.get("type")].append(n)
+        relidx = REL_INDEX_BACKENDS[rel_index](relationships)
+        position: dict[str, int] | None = None
+        incident: dict[str, list[int]] | None = None
+        if not isinstance(relidx, CsrRelIndex):
+            position = {nid: i for i, nid in enumerate(node_by_id)}
+            incident = defaultdict(list)
+            for i, r in enumerate(relationships):
+                if r.get("type") != "relationship":
+                    continue
+                s = r.get("source_ref")
+                t = r.get("target_ref")
+                if not s or not t:
+                    continue
+                incident[s].append(i)
+                if t != s:
+                    incident[t].append(i)
+            incident = dict(incident)
+        return cls(
+            mhd=mhd,
+            node_by_id=node_by_id,
+            relationships=relationships,
+            relidx=relidx,
+            study_id=choose_study_id(mhd, node_by_id),
+            nodes_by_type=dict(nodes_by_type),
+            position=position,
+            incident=incident,
+        )
+
+    @property
+    def study(self) -> dict[str, Any]:
+        return self.node_by_id[self.study_id]
+
+    def nodes(self, node_type: str) -> list[dict[str, Any]]:
+        """Return nodes of one type in graph order."""
+        return self.nodes_by_type.get(node_type, [])
+
+    def count(self, *node_types: str) -> int:
+        """Return the number of nodes with any of the given types."""
+        return sum(len(self.nodes_by_type.get(t, ())) for t in set(node_types))
+
+    def incident_relationships(self, *node_ids: str) -> list[dict[str, Any]]:
+        """Return relationships touching any of the nodes, once each, in order."""
+        if len(node_ids) == 1:
+            idx = self._incident(node_ids[0])
+        else:
+            idx = sorted({i for nid in node_ids for i in self._incident(nid)})
+        return [self.relationships[i] for i in idx]
+
+    def _incident(self, node_id: str) -> list[int]:
+        if self.incident is None:
+            return self.relidx.incident(node_id)
+        return self.incident.get(node_id, [])
+
+    def nodes_with_type_suffix(self, suffix: str) -> list[dict[str, Any]]:
+        """Return nodes whose type ends with ``suffix``, in graph order."""
+        buckets = [
+            nodes
+            for t, nodes in self.nodes_by_type.items()
+            if isinstance(t, str) and t.endswith(suffix)
+        ]
+        if len(buckets) == 1:
+            return list(buckets[0])
+        if self.position is None:
+            types = {nodes[0].get("type") for nodes in buckets}
+            return [n for n in self.node_by_id.values() if n.get("type") in types]
+        merged = [n for nodes in buckets for n in nodes]
+        merged.sort(key=lambda n: self.position[n["id"]])
+        return merged
+
+
 def node_name(node: dict[str, Any] | None) -> str | None:
     """Return a best-effort display name for a node."""
     if not node:
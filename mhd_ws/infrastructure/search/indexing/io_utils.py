@@ -2,10 +2,36 @@
 
 from __future__ import annotations
 
+import contextlib
+import gzip
+import importlib
+import importlib.util
+import io
 import json
 import re
+import sys
+import zlib
 from pathlib import Path
-from typing import Any, Iterable
+from typing import IO, Any, Iterable, Iterator, NamedTuple
+
+from mhd_ws.infrastructure.search.indexing.utils import INDEXING_EXTRA
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+# Speed over ratio: payloads are written once and streamed at build speed.
+DEFAULT_COMPRESS_LEVELS = {"gzip": 6, "zstd": 3}
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BULK_OP_TYPES = ("index", "create", "update", "delete")
+
+
+class PayloadRecord(NamedTuple):
+    """One action read back from a bulk or JSONL payload file."""
+
+    op_type: str
+    index: str
+    doc_id: str | None
+    doc: dict[str, Any] | None
 
 
 def iter_input_files(input_dir: Path, pattern: str) -> list[Path]:
@@ -14,6 +40,139 @@ def iter_input_files(input_dir: Path, pattern: str) -> list[Path]:
     return [p for p in files if p.is_file()]
 
 
+def resolve_compression(name: str, out: str = "-") -> str:
+    """Return the compression to use; ``auto`` follows the ``out`` suffix."""
+    if name == "auto":
+        name = "none" if out == "-" else compression_for_path(out)
+    if name not in COMPRESSIONS:
+        raise ValueError(f"unknown compression: {name!r}")
+    if name == "zstd" and not importlib.util.find_spec("zstandard"):
+        raise ValueError(
+            f"zstd compression needs the 'zstandard' package; install {INDEXING_EXTRA}"
+        )
+    return name
+
+
+def compression_for_path(path: str) -> str:
+    """Infer the output compression from a file suffix (``.gz``, ``.zst``)."""
+    return COMPRESSION_SUFFIXES.get(Path(path).suffix.lower(), "none")
+
+
+def _zstandard():
+    try:
+        return importlib.import_module("zstandard")
+    except ImportError as e:
+        raise ValueError(
+            "reading or writing zstd needs the 'zstandard' package; "
+            f"install {INDEXING_EXTRA}"
+        ) from e
+
+
+@contextlib.contextmanager
+def open_text_output(
+    out: str, compression: str = "none", level: int | None = None
+) -> Iterator[IO[str]]:
+    """Open ``out`` (or stdout for ``-``) for streamed, optionally compressed text.
+
+    Compressed output is written as it is produced, so memory use does not
+    grow with the payload size.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression {compression!r}")
+    if compression == "none":
+        if out == "-":
+            yield sys.stdout
+            return
+        with open(out, "w", encoding="utf-8") as fh:  # noqa: PTH123
+            yield fh
+        return
+
+    level = DEFAULT_COMPRESS_LEVELS[compression] if level is None else level
+    with contextlib.ExitStack() as stack:
+        raw = (
+            sys.stdout.buffer if out == "-" else stack.enter_context(open(out, "wb"))  # noqa: PTH123
+        )
+        if compression == "gzip":
+            binary = stack.enter_context(
+                gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level)
+            )
+        else:
+            binary = stack.enter_context(
+                _zstandard()
+                .ZstdCompressor(level=level)
+                .stream_writer(raw, closefd=False)
+            )
+        text = io.TextIOWrapper(binary, encoding="utf-8", write_through=False)
+        try:
+            yield text
+        finally:
+            # Flush into the compressor but leave closing it to the stack,
+            # which also finishes the gzip/zstd frame.
+            text.flush()
+            text.detach()
+
+
+def payload_compressor(compression: str, level: int | None = None):
+    """Return an incremental compressor (``compress``/``flush``) for bytes."""
+    level = DEFAULT_COMPRESS_LEVELS.get(compression) if level is None else level
+    if compression == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"unknown compression: {compression!r}")
+
+
+@contextlib.contextmanager
+def open_text_input(path: Path) -> Iterator[IO[str]]:
+    """Open a payload file, transparently decompressing gzip or zstd."""
+    with contextlib.ExitStack() as stack:
+        raw = stack.enter_context(path.open("rb"))
+        magic = raw.read(4)
+        raw.seek(0)
+        if magic.startswith(_GZIP_MAGIC):
+            binary = stack.enter_context(gzip.GzipFile(fileobj=raw, mode="rb"))
+        elif magic == _ZSTD_MAGIC:
+            binary = stack.enter_context(
+                _zstandard().ZstdDecompressor().stream_reader(raw, closefd=False)
+            )
+        else:
+            binary = raw
+        yield stack.enter_context(io.TextIOWrapper(binary, encoding="utf-8"))
+
+
+def iter_bulk_payload(fh: IO[str]) -> Iterator[PayloadRecord]:
+    """Yield the actions of a Bulk API NDJSON payload written by ``write_bulk``."""
+    lines = (line for line in fh if line.strip())
+    for n, line in enumerate(lines, start=1):
+        meta = json.loads(line)
+        op_type = next(iter(meta), None) if isinstance(meta, dict) else None
+        if op_type not in BULK_OP_TYPES or len(meta) != 1:
+            raise ValueError(f"action {n}: expected a bulk action line")
+        action = meta[op_type]
+        if op_type == "delete":
+            yield PayloadRecord(op_type, action["_index"], action.get("_id"), None)
+            continue
+        source = next(lines, None)
+        if source is None:
+            raise ValueError(f"action {n}: missing its source line")
+        yield PayloadRecord(
+            op_type, action["_index"], action.get("_id"), json.loads(source)
+        )
+
+
+def iter_jsonl_payload(
+    fh: IO[str], index_name: str, metabolite_index: str
+) -> Iterator[PayloadRecord]:
+    """Yield the docs of a JSONL payload, routing metabolite docs by their
+    ``dataset_id`` back-reference (dataset docs have none)."""
+    for line in fh:
+        if not line.strip():
+            continue
+        doc = json.loads(line)
+        index = metabolite_index if "dataset_id" in doc else index_name
+        yield PayloadRecord("index", index, doc.get("id"), doc)
+
+
 def write_bulk(
     out_fh,
     docs: Iterable[dict[str, Any]],
@@ -33,6 +192,16 @@ def write_bulk(
     return n
 
 
+def write_bulk_deletes(out_fh, doc_ids: Iterable[str], index_name: str) -> int:
+    """Write Elasticsearch Bulk API delete actions for the given IDs."""
+    n = 0
+    for doc_id in doc_ids:
+        meta = {"delete": {"_index": index_name, "_id": doc_id}}
+        out_fh.write(json.dumps(meta, ensure_ascii=False) + "\n")
+        n += 1
+    return n
+
+
 def write_jsonl(out_fh, docs: Iterable[dict[str, Any]]) -> int:
     """Write one JSON document per line (NDJSON docs only)."""
     n = 0
@@ -42,12 +211,16 @@ def write_jsonl(out_fh, docs: Iterable[dict[str, Any]]) -> int:
     return n
 
 
-def write_json_dir(out_dir: Path, docs: Iterable[dict[str, Any]]) -> int:
-    """Write one pretty-printed JSON file per document."""
+def write_json_dir(
+    out_dir: Path, docs: Iterable[dict[str, Any]], start: int = 0
+) -> int:
+    """Write one pretty-printed JSON file per document. A document without
+    an ``id`` is written as ``doc_<start + n>``, so callers writing a
+    directory in several calls pass the number of docs written so far."""
     out_dir.mkdir(parents=True, exist_ok=True)
     n = 0
     for doc in docs:
-        doc_id = doc.get("id") or f"doc_{n}"
+        doc_id = doc.get("id") or f"doc_{start + n}"
         safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", doc_id)
         path = out_dir / f"{safe}.json"
         path.write_text(
@@ -0,0 +1,210 @@
+"""Content-hash manifest for incremental indexing runs."""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from mhd_ws.infrastructure.search.indexing.pipeline import FileBuildResult
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_NAME = ".mhd-index-manifest.json"
+
+
+@dataclasses.dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    dataset_id: str | None = None
+    metabolite_ids: list[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class Manifest:
+    target: dict[str, Any] = dataclasses.field(default_factory=dict)
+    entries: dict[str, ManifestEntry] = dataclasses.field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "target": self.target,
+            "entries": [
+                dataclasses.asdict(self.entries[k]) for k in sorted(self.entries)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Manifest:
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"unsupported manifest version: {data.get('version')!r}")
+        entries = [ManifestEntry(**e) for e in data.get("entries") or []]
+        return cls(
+            target=data.get("target") or {},
+            entries={e.path: e for e in entries},
+        )
+
+    def dataset_ids(self) -> set[str]:
+        return {e.dataset_id for e in self.entries.values() if e.dataset_id}
+
+    def metabolite_ids(self) -> set[str]:
+        return {i for e in self.entries.values() for i in e.metabolite_ids}
+
+
+def shard_manifest_name(shard_index: int = 0, shard_count: int = 1) -> str:
+    """Default manifest file name; shards of one input dir get their own."""
+    if shard_count <= 1:
+        return DEFAULT_MANIFEST_NAME
+    stem = DEFAULT_MANIFEST_NAME.removesuffix(".json")
+    return f"{stem}.shard-{shard_index}-of-{shard_count}.json"
+
+
+def load_manifest(path: Path) -> Manifest:
+    """Load a manifest file, or return an empty manifest if it does not exist."""
+    if not path.is_file():
+        return Manifest()
+    return Manifest.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+
+def save_manifest(manifest: Manifest, path: Path) -> None:
+    """Write the manifest atomically (temp file + rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest.to_dict(), indent=1), encoding="utf-8")
+    tmp.replace(path)
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """Return the hex sha256 digest of a file, read in blocks."""
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        while block := fh.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclasses.dataclass
+class IncrementalPlan:
+    """Which input files need rebuilding, and the manifest the run produces.
+
+    ``manifest`` starts with the entries of unchanged files; ``track`` adds
+    an entry for every rebuilt file as its result passes through. Stale IDs
+    are whatever the previous manifest knew about and the new one does not.
+    """
+
+    previous: Manifest
+    manifest: Manifest
+    changed: list[Path]
+    fingerprints: dict[str, ManifestEntry]
+    unchanged: int = 0
+    removed: int = 0
+    root: Path = Path()
+
+    def track(self, results: Iterable[FileBuildResult]) -> Iterator[FileBuildResult]:
+        """Record rebuilt files in the new manifest while passing results on."""
+        for result in results:
+            key = _relative_key(Path(result.path), self.root)
+            if result.doc is None:
+                # Keep the previous entry so the file is retried next run and
+                # its documents are not deleted because of a transient error.
+                if key in self.previous.entries:
+                    self.manifest.entries[key] = self.previous.entries[key]
+            else:
+                entry = dataclasses.replace(
+                    self.fingerprints[key],
+                    dataset_id=result.doc.get("id"),
+                    metabolite_ids=[
+                        d["id"] for d in result.metabolite_docs if d.get("id")
+                    ],
+                )
+                self.manifest.entries[key] = entry
+            yield result
+
+    def forget(self, doc_ids: set[str]) -> int:
+        """Roll back entries whose docs failed to upload, so they are rebuilt.
+
+        The previous entry is restored (or the entry dropped for a new file),
+        which makes the next incremental run see the file as changed.
+        """
+        rolled_back = 0
+        for key, entry in list(self.manifest.entries.items()):
+            if entry is self.previous.entries.get(key):
+                continue
+            if entry.dataset_id in doc_ids or doc_ids.intersection(
+                entry.metabolite_ids
+            ):
+                if key in self.previous.entries:
+                    self.manifest.entries[key] = self.previous.entries[key]
+                else:
+                    del self.manifest.entries[key]
+                rolled_back += 1
+        return rolled_back
+
+    def stale_dataset_ids(self) -> list[str]:
+        return sorted(self.previous.dataset_ids() - self.manifest.dataset_ids())
+
+    def stale_metabolite_ids(self) -> list[str]:
+        return sorted(self.previous.metabolite_ids() - self.manifest.metabolite_ids())
+
+
+def _relative_key(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def plan_incremental(
+    previous: Manifest,
+    root: Path,
+    files: list[Path],
+    all_files: list[Path] | None = None,
+    target: dict[str, Any] | None = None,
+) -> IncrementalPlan:
+    """Compare input files against ``previous`` and decide what to rebuild.
+
+    A file is unchanged when its size and mtime match the manifest, or when
+    they differ but its sha256 does not. Only ``files`` are considered for
+    rebuilding; removals are detected against ``all_files`` (default
+    ``files``) so that ``--max-files`` does not look like mass deletion.
+    """
+    manifest = Manifest(target=dict(target or previous.target))
+    plan = IncrementalPlan(
+        previous=previous, manifest=manifest, changed=[], fingerprints={}, root=root
+    )
+    present = {_relative_key(p, root) for p in (all_files or files)}
+    selected = set()
+    for path in files:
+        key = _relative_key(path, root)
+        selected.add(key)
+        st = path.stat()
+        old = previous.entries.get(key)
+        if old and old.size == st.st_size and old.mtime_ns == st.st_mtime_ns:
+            manifest.entries[key] = old
+            plan.unchanged += 1
+            continue
+        digest = file_sha256(path)
+        fingerprint = ManifestEntry(
+            path=key, size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=digest
+        )
+        if old and old.sha256 == digest:
+            manifest.entries[key] = dataclasses.replace(
+                old, size=st.st_size, mtime_ns=st.st_mtime_ns
+            )
+            plan.unchanged += 1
+            continue
+        plan.fingerprints[key] = fingerprint
+        plan.changed.append(path)
+
+    for key, entry in previous.entries.items():
+        if key in selected:
+            continue
+        if key in present:
+            manifest.entries[key] = entry
+        else:
+            plan.removed += 1
+    return plan
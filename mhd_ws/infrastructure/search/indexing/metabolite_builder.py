@@ -5,29 +5,31 @@ from __future__ import annotations
 from typing import Any
 
 from mhd_ws.infrastructure.search.indexing.graph_utils import (
-    build_rel_index,
-    choose_study_id,
-    get_graph_parts,
+    GraphView,
     rel_sources,
 )
 
 
 def build_metabolite_docs(
-    mhd: dict[str, Any], dataset_doc: dict[str, Any]
+    mhd: dict[str, Any],
+    dataset_doc: dict[str, Any],
+    view: GraphView | None = None,
 ) -> list[dict[str, Any]]:
     """Build metabolite documents for a dataset."""
-    node_by_id, relationships = get_graph_parts(mhd)
-    relidx = build_rel_index(relationships)
-    study_id = choose_study_id(mhd, node_by_id)
-    study = node_by_id.get(study_id, {})
+    if view is None:
+        view = GraphView.from_mhd(mhd)
+    node_by_id = view.node_by_id
+    relidx = view.relidx
+    study = view.study
 
     dataset_id = dataset_doc.get("id")
     repo = dataset_doc.get("repository", {})
+    # Every doc of one index run shares the run's timestamp; docs of a
+    # dataset with an older one are stale (see cleanup.py).
+    indexed = (dataset_doc.get("dates") or {}).get("indexed")
 
     docs: list[dict[str, Any]] = []
-    for m in node_by_id.values():
-        if m.get("type") != "metabolite":
-            continue
+    for m in view.nodes("metabolite"):
         metabolite_id = m.get("id")
         if not metabolite_id:
             continue
@@ -62,6 +64,7 @@ def build_metabolite_docs(
             "id": f"{dataset_id}::metabolite::{metabolite_id}",
             "dataset_id": dataset_id,
             "profile": dataset_doc.get("profile"),
+            "indexed": indexed,
             "repository": repo,
             "study": {"title": study.get("title")},
             "metabolite": {
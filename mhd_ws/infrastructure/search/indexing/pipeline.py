@@ -0,0 +1,375 @@
+"""Per-file document building, optionally fanned out over a process pool."""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import dataclasses
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    DEFAULT_DOC_BUDGET,
+    DocSizeBudget,
+    build_legacy_dataset_doc,
+)
+from mhd_ws.infrastructure.search.indexing.graph_utils import GraphView
+from mhd_ws.infrastructure.search.indexing.metabolite_builder import (
+    build_metabolite_docs,
+)
+from mhd_ws.infrastructure.search.indexing.profiling import (
+    FileProfile,
+    ProfileReport,
+    StageProfiler,
+)
+from mhd_ws.infrastructure.search.indexing.utils import load_json_file
+
+
+@dataclasses.dataclass
+class FileBuildResult:
+    path: str
+    doc: dict[str, Any] | None = None
+    metabolite_docs: list[dict[str, Any]] = dataclasses.field(default_factory=list)
+    error: str | None = None
+    profile: FileProfile | None = None
+    # Set by the slim doc profile: the debug block moved out of ``doc``.
+    diagnostics_doc: dict[str, Any] | None = None
+
+
+@dataclasses.dataclass
+class BuildStats:
+    files: int = 0
+    dataset_docs: int = 0
+    metabolite_docs: int = 0
+    errors: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+    profile: ProfileReport | None = None
+    # Datasets cut to the doc size budget: (doc id, truncation records).
+    capped: list[tuple[str, list[dict[str, Any]]]] = dataclasses.field(
+        default_factory=list
+    )
+
+    def add(self, result: FileBuildResult) -> None:
+        self.files += 1
+        if self.profile is not None:
+            self.profile.add(result.profile)
+        if result.error is not None:
+            self.errors.append((result.path, result.error))
+            return
+        self.dataset_docs += 1
+        self.metabolite_docs += len(result.metabolite_docs)
+        if result.doc.get("truncation"):
+            self.capped.append((result.doc.get("id"), result.doc["truncation"]))
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        docs = self.dataset_docs + self.metabolite_docs
+        return docs / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def build_file_docs(
+    path: Path,
+    skip_metabolites: bool,
+    indexed_ts: str,
+    rel_index: str = "dict",
+    json_decoder: str = "auto",
+    profile: bool = False,
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
+) -> FileBuildResult:
+    """Load one MHD file and build its dataset and metabolite documents."""
+    if profile:
+        return _profile_file_docs(
+            path, skip_metabolites, indexed_ts, rel_index, json_decoder, budget
+        )
+    try:
+        mhd = load_json_file(path, decoder=json_decoder)
+    except Exception as e:
+        return FileBuildResult(path=str(path), error=str(e))
+    return build_mhd_docs(
+        mhd, str(path), skip_metabolites, indexed_ts, rel_index, budget
+    )
+
+
+def build_mhd_docs(
+    mhd: dict[str, Any],
+    source: str,
+    skip_metabolites: bool,
+    indexed_ts: str,
+    rel_index: str = "dict",
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
+) -> FileBuildResult:
+    """Build the dataset and metabolite documents of an already decoded MHD."""
+    try:
+        view = GraphView.from_mhd(mhd, rel_index=rel_index)
+        doc = build_legacy_dataset_doc(mhd, indexed_ts, view, budget=budget)
+        metabolite_docs = (
+            [] if skip_metabolites else build_metabolite_docs(mhd, doc, view)
+        )
+    except Exception as e:
+        return FileBuildResult(path=source, error=str(e))
+    return FileBuildResult(path=source, doc=doc, metabolite_docs=metabolite_docs)
+
+
+def _profile_file_docs(
+    path: Path,
+    skip_metabolites: bool,
+    indexed_ts: str,
+    rel_index: str,
+    json_decoder: str,
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
+) -> FileBuildResult:
+    """``build_file_docs`` with every stage timed and doc sizes measured."""
+    profiler = StageProfiler()
+    file_profile = FileProfile(path=str(path), timings=profiler.timings)
+    try:
+        mhd = load_json_file(path, decoder=json_decoder)
+        profiler.mark("decode")
+        view = GraphView.from_mhd(mhd, rel_index=rel_index)
+        profiler.mark("graph_view")
+        doc = build_legacy_dataset_doc(
+            mhd, indexed_ts, view, profiler=profiler, budget=budget
+        )
+        profiler.mark("dataset_doc")
+        metabolite_docs = (
+            [] if skip_metabolites else build_metabolite_docs(mhd, doc, view)
+        )
+        profiler.mark("metabolite_docs")
+        # Same encoding as the bulk writers, to time and size serialisation.
+        file_profile.doc_bytes = len(json.dumps(doc, ensure_ascii=False))
+        file_profile.metabolite_docs = len(metabolite_docs)
+        file_profile.metabolite_bytes = sum(
+            len(json.dumps(d, ensure_ascii=False)) for d in metabolite_docs
+        )
+        profiler.mark("serialize")
+    except Exception as e:
+        profiler.mark("failed")
+        return FileBuildResult(path=str(path), error=str(e), profile=file_profile)
+    return FileBuildResult(
+        path=str(path),
+        doc=doc,
+        metabolite_docs=metabolite_docs,
+        profile=file_profile,
+    )
+
+
+def _build_chunk(
+    paths: list[Path],
+    skip_metabolites: bool,
+    indexed_ts: str,
+    rel_index: str,
+    json_decoder: str,
+    profile: bool = False,
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
+) -> list[FileBuildResult]:
+    return [
+        build_file_docs(
+            p, skip_metabolites, indexed_ts, rel_index, json_decoder, profile, budget
+        )
+        for p in paths
+    ]
+
+
+def _chunked(files: list[Path], size: int) -> Iterable[list[Path]]:
+    for i in range(0, len(files), size):
+        yield files[i : i + size]
+
+
+def iter_build_results(
+    files: Iterable[Path],
+    skip_metabolites: bool,
+    indexed_ts: str,
+    workers: int = 1,
+    chunk_size: int = 1,
+    ordered: bool = True,
+    max_pending: int | None = None,
+    rel_index: str = "dict",
+    json_decoder: str = "auto",
+    profile: bool = False,
+    budget: DocSizeBudget = DEFAULT_DOC_BUDGET,
+) -> Iterator[FileBuildResult]:
+    """Yield one build result per input file.
+
+    With ``workers > 1`` files are sent to a process pool in chunks of
+    ``chunk_size``. At most ``max_pending`` chunks (default ``2 * workers``)
+    are in flight, so a slow consumer holds back the pool instead of letting
+    finished results pile up. Results follow input order unless ``ordered`` is
+    False, in which case each chunk is yielded as soon as it completes.
+    ``rel_index`` selects the relationship index backend (``dict`` or ``csr``)
+    and ``json_decoder`` the JSON decoder (see ``resolve_json_decoder``).
+    With ``profile`` each result carries a ``FileProfile``; ``budget`` caps
+    the size of each dataset doc.
+    """
+    if workers <= 1:
+        for p in files:
+            yield build_file_docs(
+                p,
+                skip_metabolites,
+                indexed_ts,
+                rel_index,
+                json_decoder,
+                profile,
+                budget,
+            )
+        return
+
+    chunks = _chunked(list(files), max(1, chunk_size))
+    max_pending = max(1, max_pending or 2 * workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: collections.deque[concurrent.futures.Future] = collections.deque()
+
+        def submit_next() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            pending.append(
+                pool.submit(
+                    _build_chunk,
+                    chunk,
+                    skip_metabolites,
+                    indexed_ts,
+                    rel_index,
+                    json_decoder,
+                    profile,
+                    budget,
+                )
+            )
+            return True
+
+        while len(pending) < max_pending and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = concurrent.futures.wait(
+                    pending, return_when=FIRST_COMPLETED
+                )
+                done = [f for f in pending if f in finished]
+                for f in done:
+                    pending.remove(f)
+            for future in done:
+                results = future.result()
+                submit_next()
+                yield from results
+
+
+_END = object()
+
+
+class BoundedDocStream:
+    """Bridge blocking build results into bounded asyncio queues.
+
+    Results are pulled from ``results`` on a worker thread and pushed, one
+    file at a time, into a dataset queue and (optionally) metabolite and
+    diagnostics queues. Each queue holds at most ``max_pending`` files worth of documents, so
+    peak memory is bounded by the batch size rather than the corpus size.
+    """
+
+    def __init__(
+        self,
+        results: Iterable[FileBuildResult],
+        max_pending: int = 16,
+        include_metabolites: bool = True,
+        include_diagnostics: bool = False,
+    ) -> None:
+        self._results = results
+        self._max_pending = max(1, max_pending)
+        self._include_metabolites = include_metabolites
+        self._include_diagnostics = include_diagnostics
+        self._stop = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._producer: asyncio.Future | None = None
+        self._dataset_queue: asyncio.Queue | None = None
+        self._metabolite_queue: asyncio.Queue | None = None
+        self._diagnostics_queue: asyncio.Queue | None = None
+
+    async def __aenter__(self) -> BoundedDocStream:
+        self._loop = asyncio.get_running_loop()
+        self._dataset_queue = asyncio.Queue(maxsize=self._max_pending)
+        if self._include_metabolites:
+            self._metabolite_queue = asyncio.Queue(maxsize=self._max_pending)
+        if self._include_diagnostics:
+            self._diagnostics_queue = asyncio.Queue(maxsize=self._max_pending)
+        self._producer = self._loop.run_in_executor(None, self._produce)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._stop.set()
+        await self._producer
+
+    def dataset_docs(self) -> AsyncIterator[dict[str, Any]]:
+        return self._drain(self._dataset_queue)
+
+    def metabolite_docs(self) -> AsyncIterator[dict[str, Any]]:
+        if self._metabolite_queue is None:
+            raise RuntimeError("stream was created without metabolite documents")
+        return self._drain(self._metabolite_queue)
+
+    def diagnostics_docs(self) -> AsyncIterator[dict[str, Any]]:
+        if self._diagnostics_queue is None:
+            raise RuntimeError("stream was created without diagnostics documents")
+        return self._drain(self._diagnostics_queue)
+
+    @staticmethod
+    async def _drain(queue: asyncio.Queue) -> AsyncIterator[dict[str, Any]]:
+        while True:
+            batch = await queue.get()
+            if batch is _END:
+                return
+            for doc in batch:
+                yield doc
+
+    def _put(self, queue: asyncio.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), self._loop)
+            try:
+                future.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                if not future.cancel():
+                    return True
+        return False
+
+    def _produce(self) -> None:
+        queues = [
+            q
+            for q in (
+                self._dataset_queue,
+                self._metabolite_queue,
+                self._diagnostics_queue,
+            )
+            if q is not None
+        ]
+        try:
+            for result in self._results:
+                if result.doc is None:
+                    continue
+                if not self._put(self._dataset_queue, [result.doc]):
+                    return
+                if self._metabolite_queue is not None and result.metabolite_docs:
+                    if not self._put(self._metabolite_queue, result.metabolite_docs):
+                        return
+                if self._diagnostics_queue is not None and result.diagnostics_doc:
+                    if not self._put(self._diagnostics_queue, [result.diagnostics_doc]):
+                        return
+        finally:
+            close = getattr(self._results, "close", None)
+            if close:
+                close()
+            for queue in queues:
+                self._put(queue, _END)
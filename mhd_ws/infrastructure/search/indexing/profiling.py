@@ -0,0 +1,165 @@
+"""Opt-in wall/CPU profiling of index runs, per stage and per file."""
+
+from __future__ import annotations
+
+import dataclasses
+import heapq
+import time
+from typing import Any
+
+SIZE_BUCKETS = (10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class StageProfiler:
+    """Split one file build into consecutive named stages.
+
+    Each ``mark(stage)`` charges the wall and CPU time since the previous
+    mark to ``stage``, and a ``parent.child`` mark to ``parent`` as well. Builders take an optional profiler and only call it
+    when one is given, so unprofiled runs pay nothing.
+    """
+
+    __slots__ = ("timings", "_wall", "_cpu")
+
+    def __init__(self) -> None:
+        self.timings: dict[str, list[float]] = {}
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def mark(self, stage: str) -> None:
+        wall, cpu = time.perf_counter(), time.process_time()
+        d_wall, d_cpu = wall - self._wall, cpu - self._cpu
+        if "." in stage:
+            # Sub-stages also count towards their parent stage.
+            parent = self.timings.setdefault(stage.split(".", 1)[0], [0.0, 0.0])
+            parent[0] += d_wall
+            parent[1] += d_cpu
+        entry = self.timings.setdefault(stage, [0.0, 0.0])
+        entry[0] += d_wall
+        entry[1] += d_cpu
+        self._wall, self._cpu = wall, cpu
+
+
+@dataclasses.dataclass
+class FileProfile:
+    path: str
+    timings: dict[str, list[float]]
+    doc_bytes: int = 0
+    metabolite_docs: int = 0
+    metabolite_bytes: int = 0
+
+    @property
+    def wall(self) -> float:
+        return sum(w for name, (w, _) in self.timings.items() if "." not in name)
+
+    @property
+    def cpu(self) -> float:
+        return sum(c for name, (_, c) in self.timings.items() if "." not in name)
+
+
+@dataclasses.dataclass
+class ProfileReport:
+    """Aggregate FileProfiles into stage totals, slowest files and doc sizes.
+
+    Stage names with a dot (``dataset_doc.characteristics``) are sub-stages
+    of the part before the dot and are not counted twice in file totals.
+    """
+
+    top_n: int = 10
+    stages: dict[str, list[float]] = dataclasses.field(default_factory=dict)
+    files: list[FileProfile] = dataclasses.field(default_factory=list)
+    upload: dict[str, dict[str, Any]] = dataclasses.field(default_factory=dict)
+
+    def add(self, profile: FileProfile | None) -> None:
+        if profile is None:
+            return
+        self.files.append(profile)
+        for stage, (wall, cpu) in profile.timings.items():
+            entry = self.stages.setdefault(stage, [0.0, 0.0, 0])
+            entry[0] += wall
+            entry[1] += cpu
+            entry[2] += 1
+
+    def add_upload(self, index_name: str, report) -> None:
+        """Record ES round trips from a ``BulkReport``."""
+        latencies = [b.latency_s for b in report.batches]
+        self.upload[index_name] = {
+            "requests": len(latencies),
+            "docs": report.docs,
+            "request_wall_s": sum(latencies),
+            "elapsed_s": report.elapsed,
+            "p95_request_s": report.latency_percentile(95),
+        }
+
+    def slowest(self) -> list[FileProfile]:
+        return heapq.nlargest(self.top_n, self.files, key=lambda f: f.wall)
+
+    def size_histogram(self) -> dict[str, int]:
+        labels = [f"<{b:,}B" for b in SIZE_BUCKETS] + [f">={SIZE_BUCKETS[-1]:,}B"]
+        counts = dict.fromkeys(labels, 0)
+        for f in self.files:
+            idx = next(
+                (i for i, b in enumerate(SIZE_BUCKETS) if f.doc_bytes < b),
+                len(SIZE_BUCKETS),
+            )
+            counts[labels[idx]] += 1
+        return counts
+
+    def summary_lines(self) -> list[str]:
+        total_wall = sum(v[0] for k, v in self.stages.items() if "." not in k)
+        lines = [
+            f"{'stage':<32} {'wall s':>9} {'cpu s':>9} {'share':>6} {'mean ms':>9}"
+        ]
+        for stage, (wall, cpu, n) in self.stages.items():
+            name = f"  {stage.split('.', 1)[1]}" if "." in stage else stage
+            share = wall / total_wall if total_wall else 0.0
+            lines.append(
+                f"{name:<32} {wall:>9.3f} {cpu:>9.3f} {share:>6.1%} "
+                f"{wall / n * 1000:>9.2f}"
+            )
+        for index_name, up in self.upload.items():
+            lines.append(
+                f"upload {index_name}: {up['requests']} requests, "
+                f"{up['request_wall_s']:.3f}s in requests, "
+                f"{up['elapsed_s']:.3f}s elapsed, "
+                f"p95 {up['p95_request_s'] * 1000:.1f}ms"
+            )
+        if self.files:
+            sizes = sorted(f.doc_bytes for f in self.files)
+            lines.append(
+                f"dataset doc bytes: median {sizes[len(sizes) // 2]:,}, "
+                f"max {sizes[-1]:,}; "
+                + ", ".join(f"{k}: {v}" for k, v in self.size_histogram().items())
+            )
+            lines.append(f"slowest {min(self.top_n, len(self.files))} files:")
+            for f in self.slowest():
+                lines.append(
+                    f"  {f.wall:>8.3f}s wall {f.cpu:>8.3f}s cpu "
+                    f"{f.doc_bytes:>10,}B doc {f.metabolite_docs:>6} metabolites  "
+                    f"{f.path}"
+                )
+        return lines
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "stages": {
+                stage: {"wall_s": wall, "cpu_s": cpu, "files": n}
+                for stage, (wall, cpu, n) in self.stages.items()
+            },
+            "upload": self.upload,
+            "doc_size_histogram": self.size_histogram(),
+            "slowest": [f.path for f in self.slowest()],
+            "files": [
+                {
+                    "path": f.path,
+                    "wall_s": f.wall,
+                    "cpu_s": f.cpu,
+                    "doc_bytes": f.doc_bytes,
+                    "metabolite_docs": f.metabolite_docs,
+                    "metabolite_bytes": f.metabolite_bytes,
+                    "stages": {
+                        k: {"wall_s": w, "cpu_s": c} for k, (w, c) in f.timings.items()
+                    },
+                }
+                for f in self.files
+            ],
+        }
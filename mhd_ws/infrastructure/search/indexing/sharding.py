@@ -0,0 +1,113 @@
+"""Deterministic sharding of index runs and merging of per-shard summaries."""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import socket
+from pathlib import Path
+from typing import Any
+
+from mhd_ws.infrastructure.search.indexing.pipeline import BuildStats
+
+SUMMARY_VERSION = 1
+
+
+def accession_from_path(path: Path) -> str:
+    """Return the accession an MHD file is named after (``MTBLS1.mhd.json``)."""
+    return path.name.split(".", 1)[0]
+
+
+def shard_of(accession: str, shard_count: int) -> int:
+    """Map an accession to a shard, stable across machines and Python runs."""
+    digest = hashlib.blake2b(accession.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def select_shard(files: list[Path], shard_index: int, shard_count: int) -> list[Path]:
+    """Return the files of one shard, keeping their order."""
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(
+            f"shard index {shard_index} is out of range for {shard_count} shards"
+        )
+    if shard_count == 1:
+        return list(files)
+    return [
+        p for p in files if shard_of(accession_from_path(p), shard_count) == shard_index
+    ]
+
+
+def run_summary(
+    stats: BuildStats,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    **extra: Any,
+) -> dict[str, Any]:
+    """Machine-readable summary of one (shard of an) index run."""
+    return {
+        "version": SUMMARY_VERSION,
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "host": socket.gethostname(),
+        "finished_at": datetime.datetime.now(datetime.UTC).isoformat(),
+        "files": stats.files,
+        "dataset_docs": stats.dataset_docs,
+        "metabolite_docs": stats.metabolite_docs,
+        "elapsed_s": round(stats.elapsed, 3),
+        "errors": [{"path": path, "error": error} for path, error in stats.errors],
+        "capped": [
+            {"id": doc_id, "truncation": truncation}
+            for doc_id, truncation in stats.capped
+        ],
+        **extra,
+    }
+
+
+def merge_run_summaries(summaries: list[dict[str, Any]]) -> dict[str, Any]:
+    """Combine shard summaries and check that every shard ran exactly once."""
+    shard_counts = sorted({s["shard_count"] for s in summaries})
+    problems: list[str] = []
+    if len(shard_counts) > 1:
+        problems.append(f"summaries disagree on shard count: {shard_counts}")
+    expected = max(shard_counts, default=0)
+    seen: dict[int, int] = {}
+    for s in summaries:
+        seen[s["shard_index"]] = seen.get(s["shard_index"], 0) + 1
+    missing = [i for i in range(expected) if i not in seen]
+    duplicates = sorted(i for i, n in seen.items() if n > 1)
+    if missing:
+        problems.append(f"missing shards: {missing}")
+    if duplicates:
+        problems.append(f"shards reported more than once: {duplicates}")
+
+    errors = [
+        {**error, "shard_index": s["shard_index"]}
+        for s in summaries
+        for error in s.get("errors", [])
+    ]
+    return {
+        "version": SUMMARY_VERSION,
+        "shard_count": expected,
+        "shards": sorted(
+            (
+                {k: v for k, v in s.items() if k not in ("errors", "capped")}
+                | {
+                    "errors": len(s.get("errors", [])),
+                    "capped": len(s.get("capped", [])),
+                }
+                for s in summaries
+            ),
+            key=lambda s: s["shard_index"],
+        ),
+        "files": sum(s["files"] for s in summaries),
+        "dataset_docs": sum(s["dataset_docs"] for s in summaries),
+        "metabolite_docs": sum(s["metabolite_docs"] for s in summaries),
+        "max_elapsed_s": max((s["elapsed_s"] for s in summaries), default=0.0),
+        "errors": sorted(errors, key=lambda e: e["path"]),
+        "capped": sorted(
+            (c for s in summaries for c in s.get("capped", [])),
+            key=lambda c: c["id"],
+        ),
+        "problems": problems,
+        "complete": not problems,
+    }
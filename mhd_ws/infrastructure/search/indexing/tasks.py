@@ -0,0 +1,222 @@
+"""Near-real-time indexing of one dataset after a new revision is stored.
+
+``DebouncedDatasetIndexing.schedule_indexing`` is called once the revision
+is committed. It stores a fresh token for the accession and starts
+``index_dataset_task`` on the ``indexing`` queue after the debounce window; a task whose token has
+been replaced by a later schedule call does nothing, so a burst of
+revisions is indexed once, from the latest one (trailing-edge debounce).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any
+
+from dependency_injector.wiring import Provide, inject
+
+from mhd_ws.application.decorators.async_task import async_task
+from mhd_ws.application.services.interfaces.async_task.async_task_service import (
+    AsyncTaskService,
+)
+from mhd_ws.application.services.interfaces.cache_service import CacheService
+from mhd_ws.application.services.interfaces.dataset_indexing_port import (
+    DatasetIndexingPort,
+)
+from mhd_ws.infrastructure.persistence.db.db_client import DatabaseClient
+from mhd_ws.infrastructure.search.es_client import (
+    ElasticsearchClient,
+    missing_properties,
+)
+from mhd_ws.infrastructure.search.indexing.cleanup import stale_docs_query
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    TRUNCATION_PROPERTY,
+)
+from mhd_ws.infrastructure.search.indexing.db_source import (
+    MhdFileFetcher,
+    get_latest_public_revision,
+)
+from mhd_ws.infrastructure.search.indexing.doc_profiles import (
+    index_doc_profile,
+    split_diagnostics,
+)
+from mhd_ws.infrastructure.search.indexing.file_builder import iter_file_docs
+from mhd_ws.infrastructure.search.indexing.pipeline import build_mhd_docs
+from mhd_ws.infrastructure.search.indexing.utils import iso_now, load_json_bytes
+from mhd_ws.infrastructure.search.search_cache import bump_search_generation
+
+logger = getLogger(__name__)
+
+# How long a schedule token outlives its debounce window.
+INDEX_TOKEN_TTL_S = 60 * 60
+
+
+@dataclass(frozen=True)
+class DatasetIndexingConfiguration:
+    # Seconds to wait for further revisions before indexing an accession.
+    debounce_s: int = 30
+
+
+def index_token_key(accession: str) -> str:
+    return f"index-dataset:{accession}"
+
+
+class DebouncedDatasetIndexing(DatasetIndexingPort):
+    def __init__(
+        self,
+        cache_service: CacheService,
+        async_task_service: AsyncTaskService,
+        config: DatasetIndexingConfiguration | None = None,
+    ) -> None:
+        self._cache_service = cache_service
+        self._async_task_service = async_task_service
+        self._config = config or DatasetIndexingConfiguration()
+
+    async def schedule_indexing(self, accession: str) -> str:
+        """Index ``accession`` after the debounce window unless scheduled
+        again before then. Returns the schedule token."""
+        debounce_s = self._config.debounce_s
+        token = uuid.uuid4().hex
+        await self._cache_service.set_value(
+            index_token_key(accession),
+            token,
+            expiration_time_in_seconds=debounce_s + INDEX_TOKEN_TTL_S,
+        )
+        executor = await self._async_task_service.get_async_task(
+            index_dataset_task, accession=accession, token=token
+        )
+        await executor.start(countdown=debounce_s)
+        logger.info("Indexing of %s scheduled in %ss", accession, debounce_s)
+        return token
+
+
+@inject
+async def index_dataset_revision(
+    accession: str,
+    token: str | None = None,
+    database_client: DatabaseClient = Provide["gateways.database_client"],
+    es_client: ElasticsearchClient = Provide["gateways.elasticsearch_client"],
+    cache_service: CacheService = Provide["services.cache_service"],
+    indices: dict[str, str] = Provide[
+        "config.gateways.database.elasticsearch.connection.indices"
+    ],
+) -> dict[str, Any]:
+    """Build and upsert the dataset and metabolite docs (and file docs, when
+    a ``file`` index is configured) of the latest public revision of
+    ``accession``, then delete its stale metabolite and file docs.
+
+    If the dataset index was created with the slim profile, the debug
+    block goes to the ``diagnostics`` index (when configured) instead."""
+    if token is not None:
+        current = await cache_service.get_value(index_token_key(accession))
+        if isinstance(current, bytes):
+            current = current.decode()
+        if current != token:
+            return {
+                "success": True,
+                "message": f"Indexing of {accession} superseded by a later revision.",
+            }
+    ref = await get_latest_public_revision(database_client, accession)
+    if ref is None:
+        return {"success": False, "message": f"Dataset {accession} is not public."}
+    indexed_ts = iso_now()
+    try:
+        async with MhdFileFetcher() as fetcher:
+            data = await fetcher.fetch(ref)
+        mhd = load_json_bytes(data)
+    except Exception as e:
+        logger.exception(e)
+        return {"success": False, "message": f"Failed to fetch {ref.source}: {e}"}
+    try:
+        result = build_mhd_docs(
+            mhd,
+            ref.source,
+            skip_metabolites=False,
+            indexed_ts=indexed_ts,
+        )
+    except Exception as e:
+        logger.exception(e)
+        return {
+            "success": False,
+            "message": f"Failed to build documents of {ref.source}: {e}",
+        }
+    if result.error is not None:
+        logger.error("Failed to build documents of %s: %s", ref.source, result.error)
+        return {"success": False, "message": result.error}
+
+    truncation = result.doc.get("truncation")
+    if truncation:
+        logger.warning(
+            "Document of %s was cut to the size budget: %s",
+            ref.source,
+            ", ".join(t["field"] for t in truncation),
+        )
+
+    deleted_files = 0
+    dataset_index = indices["dataset_ms"]
+    metabolite_index = indices["metabolite"]
+    await es_client.start()
+    try:
+        mapping = await es_client.get_mapping(dataset_index, api_key_name="dataset_ms")
+        if truncation and (
+            missing := missing_properties(mapping, {"truncation": TRUNCATION_PROPERTY})
+        ):
+            await es_client.put_mapping(
+                dataset_index, missing, api_key_name="dataset_ms"
+            )
+        if index_doc_profile(mapping) == "slim":
+            diagnostics_doc = split_diagnostics(result.doc)
+            diagnostics_index = indices.get("diagnostics")
+            if diagnostics_doc is not None and diagnostics_index:
+                await es_client.bulk_upload(
+                    [diagnostics_doc], diagnostics_index, api_key_name="dataset_ms"
+                )
+        await es_client.bulk_upload(
+            [result.doc], dataset_index, api_key_name="dataset_ms"
+        )
+        await es_client.bulk_upload(
+            result.metabolite_docs, metabolite_index, api_key_name="metabolite"
+        )
+        deleted = await es_client.delete_by_query(
+            metabolite_index,
+            stale_docs_query([result.doc["id"]], indexed_ts),
+            api_key_name="metabolite",
+        )
+        if file_index := indices.get("file"):
+            await es_client.bulk_upload(
+                iter_file_docs(mhd, indexed_ts), file_index, api_key_name="file"
+            )
+            deleted_files = await es_client.delete_by_query(
+                file_index,
+                stale_docs_query([result.doc["id"]], indexed_ts),
+                api_key_name="file",
+            )
+    finally:
+        await es_client.close()
+    try:
+        await bump_search_generation(cache_service)
+    except Exception as ex:
+        logger.warning("Failed to bump the search generation: %s", ex)
+    logger.info(
+        "Indexed %s with %d metabolite docs; deleted %d stale metabolite docs",
+        ref.source,
+        len(result.metabolite_docs),
+        deleted,
+    )
+    return {
+        "success": True,
+        "message": f"Indexed {ref.source}.",
+        "metabolite_docs": len(result.metabolite_docs),
+        "stale_metabolite_docs": deleted,
+        "stale_file_docs": deleted_files,
+    }
+
+
+@async_task(app_name="mhd", queue="indexing")
+def index_dataset_task(
+    *, accession: str, token: str | None = None, **kwargs
+) -> dict[str, Any]:
+    coroutine = index_dataset_revision(accession=accession, token=token)
+    return asyncio.run(coroutine)
@@ -2,16 +2,34 @@
 
 from __future__ import annotations
 
+import contextlib
 import datetime as dt
+import functools
+import gc
+import importlib.util
 import json
+import mmap
 import re
 import sys
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
-MERGE_CONFLICT_RE = re.compile(r"^(<<<<<<<|=======|>>>>>>>)", re.MULTILINE)
+# Markers only count at the start of a line. Matching on a literal "\n"
+# prefix (plus a separate check of the first line) lets the regex engine
+# skip between newlines instead of trying the pattern at every offset.
+MERGE_CONFLICT_MARKERS = ("<<<<<<<", "=======", ">>>>>>>")
+MERGE_CONFLICT_RE = re.compile(r"\n(?:<<<<<<<|=======|>>>>>>>)")
+_MERGE_CONFLICT_BYTES_RE = re.compile(rb"\n(?:<<<<<<<|=======|>>>>>>>)")
 TAG_RE = re.compile(r"<[^>]+>")
 
+JSON_DECODERS = ("orjson", "ujson", "json")
+# "auto" picks the first installed of these. ujson is left out: on large MHD
+# files it decodes no faster than the stdlib path and needs more memory
+# (see scripts/benchmark_json_decode.py).
+AUTO_JSON_DECODERS = ("orjson", "json")
+# Optional dependencies providing orjson and zstandard.
+INDEXING_EXTRA = "mhd-ws[indexing]"
+
 
 def strip_html(text: str | None) -> str:
     """Remove basic HTML tags and normalize whitespace."""
@@ -43,19 +61,96 @@ def iso_now() -> str:
     return dt.datetime.now(dt.timezone.utc).isoformat()
 
 
-def load_json_file(path: Path) -> dict[str, Any]:
-    """Load a JSON file, rejecting merge-conflict markers."""
-    text = path.read_text(encoding="utf-8", errors="replace")
-    if MERGE_CONFLICT_RE.search(text):
+@functools.cache
+def resolve_json_decoder(name: str = "auto") -> str:
+    """Return the decoder module to use: ``name``, or the best installed."""
+    if name == "auto":
+        return next(d for d in AUTO_JSON_DECODERS if importlib.util.find_spec(d))
+    if name not in JSON_DECODERS:
+        raise ValueError(f"unknown JSON decoder: {name!r}")
+    if not importlib.util.find_spec(name):
+        hint = f"; install {INDEXING_EXTRA}" if name == "orjson" else ""
+        raise ValueError(f"JSON decoder {name!r} is not installed{hint}")
+    return name
+
+
+@contextlib.contextmanager
+def _gc_paused() -> Iterator[None]:
+    # Decoded JSON has no reference cycles; collections triggered by the
+    # burst of allocations only cost time on large files.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _check_merge_conflicts(data: str | bytes | memoryview) -> None:
+    if isinstance(data, str):
+        head, pattern = data[:7], MERGE_CONFLICT_RE
+    else:
+        head, pattern = bytes(data[:7]).decode("latin-1"), _MERGE_CONFLICT_BYTES_RE
+    if head in MERGE_CONFLICT_MARKERS or pattern.search(data):
         raise ValueError(
             "merge-conflict markers detected (<<<<<<< / ======= / >>>>>>>)"
         )
+
+
+def _loads_text(text: str) -> dict[str, Any]:
     try:
         return json.loads(text)
     except json.JSONDecodeError as e:
         raise ValueError(f"invalid JSON: {e}") from e
 
 
+def _loads_fast(data: bytes | memoryview, decoder: str) -> dict[str, Any]:
+    _check_merge_conflicts(data)
+    try:
+        return importlib.import_module(decoder).loads(data)
+    except (ValueError, TypeError, OverflowError):
+        # Fast decoders are stricter (invalid UTF-8, NaN, huge ints); fall back
+        # to the lenient stdlib path so results never depend on the decoder.
+        return _loads_text(bytes(data).decode("utf-8", errors="replace"))
+
+
+def load_json_file(path: Path, decoder: str = "auto") -> dict[str, Any]:
+    """Load a JSON file, rejecting merge-conflict markers.
+
+    ``decoder`` is ``auto`` or one of ``JSON_DECODERS``. orjson parses a
+    memory map of the file and ujson the raw bytes, so neither needs an
+    intermediate text copy; the stdlib decoder keeps the text path, which
+    is its cheapest.
+    """
+    decoder = resolve_json_decoder(decoder)
+    with _gc_paused():
+        if decoder == "json":
+            text = path.read_text(encoding="utf-8", errors="replace")
+            _check_merge_conflicts(text)
+            return _loads_text(text)
+        with path.open("rb") as fh:
+            if decoder == "orjson" and path.stat().st_size > 0:
+                with (
+                    mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+                    memoryview(mm) as view,
+                ):
+                    return _loads_fast(view, decoder)
+            data = fh.read()
+        return _loads_fast(data, decoder)
+
+
+def load_json_bytes(data: bytes, decoder: str = "auto") -> dict[str, Any]:
+    """Decode an in-memory JSON document (e.g. a downloaded MHD file)."""
+    decoder = resolve_json_decoder(decoder)
+    with _gc_paused():
+        if decoder == "json":
+            text = data.decode("utf-8", errors="replace")
+            _check_merge_conflicts(text)
+            return _loads_text(text)
+        return _loads_fast(data, decoder)
+
+
 def eprint(*args: Any, **kwargs: Any) -> None:
     """Print to stderr."""
     sep = kwargs.pop("sep", " ")
@@ -0,0 +1,171 @@
+"""Blue/green reindexing: load a fresh timestamped index, then swap an alias."""
+
+from __future__ import annotations
+
+import copy
+import datetime
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from mhd_ws.infrastructure.search.es_client import ElasticsearchClient
+
+logger = logging.getLogger(__name__)
+
+# Bulk-load settings: no periodic refreshes and no replicas to copy to.
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+
+class LegacyIndexError(Exception): ...
+
+
+@dataclass(frozen=True)
+class BlueGreenOptions:
+    retain: int = 2
+    force_merge: bool = False
+    max_num_segments: int = 1
+    # Delete a concrete index holding the alias name (pre blue/green layout)
+    # when the alias is swapped. It is not a generation, so ``retain`` does
+    # not keep it and there is no rollback target.
+    migrate_legacy_index: bool = False
+
+
+def timestamped_index_name(alias: str, now: datetime.datetime | None = None) -> str:
+    """Return ``<alias>-<UTC timestamp>`` for a new concrete index."""
+    now = now or datetime.datetime.now(datetime.UTC)
+    return f"{alias}-{now.strftime(TIMESTAMP_FORMAT)}"
+
+
+def generation_indices(alias: str, names: list[str]) -> list[str]:
+    """Return the timestamped indices of ``alias`` in ``names``, oldest first."""
+    pattern = re.compile(rf"^{re.escape(alias)}-\d{{14}}$")
+    return sorted(name for name in names if pattern.match(name))
+
+
+class BlueGreenReindex:
+    """Load a new concrete index for ``alias`` and swap the alias onto it.
+
+    ``create`` makes the index from the mapping with refreshes and replicas
+    disabled; ``finalize`` restores the mapping's settings, optionally
+    force-merges, repoints the alias in one atomic request and prunes older
+    generations beyond ``options.retain``. Until ``finalize`` searches keep
+    using whatever the alias (or a same-named concrete index) points at;
+    once the alias is swapped the new index is live and ``abort`` keeps it.
+    """
+
+    def __init__(
+        self,
+        es_client: ElasticsearchClient,
+        alias: str,
+        mapping: dict[str, Any],
+        api_key_name: str | None = None,
+        options: BlueGreenOptions | None = None,
+        now: datetime.datetime | None = None,
+    ) -> None:
+        self.es_client = es_client
+        self.alias = alias
+        self.mapping = mapping
+        self.api_key_name = api_key_name
+        self.options = options or BlueGreenOptions()
+        self.index_name = timestamped_index_name(alias, now)
+        self.swapped = False
+
+    def _index_settings(self) -> dict[str, Any]:
+        return dict((self.mapping.get("settings") or {}).get("index") or {})
+
+    def restore_settings(self) -> dict[str, Any]:
+        """Mapping values for the bulk-load settings (None = ES default)."""
+        settings = self._index_settings()
+        return {key: settings.get(key) for key in BULK_LOAD_SETTINGS}
+
+    async def _holds_legacy_index(self, current: list[str]) -> bool:
+        """Whether a concrete index, not an alias, has the alias name."""
+        if current or not await self.es_client.index_exists(
+            self.alias, api_key_name=self.api_key_name
+        ):
+            return False
+        if not self.options.migrate_legacy_index:
+            raise LegacyIndexError(
+                f"{self.alias} is a concrete index, not an alias; "
+                "reindex or rename it before a blue/green load"
+            )
+        return True
+
+    async def create(self) -> str:
+        # Refuse a legacy index before spending a full load on it.
+        await self._holds_legacy_index(
+            await self.es_client.get_alias_indices(
+                self.alias, api_key_name=self.api_key_name
+            )
+        )
+        mapping = copy.deepcopy(self.mapping)
+        index_settings = mapping.setdefault("settings", {}).setdefault("index", {})
+        index_settings.update(BULK_LOAD_SETTINGS)
+        await self.es_client.create_index(
+            self.index_name, mapping, api_key_name=self.api_key_name
+        )
+        return self.index_name
+
+    async def finalize(self) -> list[str]:
+        """Restore settings, swap the alias and return the pruned indices."""
+        await self.es_client.put_index_settings(
+            self.index_name,
+            {"index": self.restore_settings()},
+            api_key_name=self.api_key_name,
+        )
+        await self.es_client.refresh_index(
+            self.index_name, api_key_name=self.api_key_name
+        )
+        if self.options.force_merge:
+            await self.es_client.force_merge(
+                self.index_name,
+                max_num_segments=self.options.max_num_segments,
+                api_key_name=self.api_key_name,
+            )
+        await self.swap_alias()
+        return await self.prune()
+
+    async def swap_alias(self) -> None:
+        current = await self.es_client.get_alias_indices(
+            self.alias, api_key_name=self.api_key_name
+        )
+        actions: list[dict[str, Any]] = []
+        if await self._holds_legacy_index(current):
+            # Drop the legacy index in the same request so the name is
+            # never unresolved.
+            actions.append({"remove_index": {"index": self.alias}})
+        actions.extend(
+            {"remove": {"index": index, "alias": self.alias}}
+            for index in current
+            if index != self.index_name
+        )
+        actions.append({"add": {"index": self.index_name, "alias": self.alias}})
+        await self.es_client.update_aliases(actions, api_key_name=self.api_key_name)
+        self.swapped = True
+        logger.info("Alias %s now points at %s", self.alias, self.index_name)
+
+    async def prune(self) -> list[str]:
+        names = await self.es_client.list_indices(
+            f"{self.alias}-*", api_key_name=self.api_key_name
+        )
+        generations = generation_indices(self.alias, names)
+        keep = set(generations[-max(1, self.options.retain) :])
+        keep.add(self.index_name)
+        pruned = [name for name in generations if name not in keep]
+        for name in pruned:
+            await self.es_client.delete_index(name, api_key_name=self.api_key_name)
+        return pruned
+
+    async def abort(self) -> None:
+        """Delete the half-loaded index; the alias is left untouched. An
+        index the alias was already swapped onto is live and kept."""
+        if self.swapped:
+            return
+        if await self.es_client.index_exists(
+            self.index_name, api_key_name=self.api_key_name
+        ):
+            await self.es_client.delete_index(
+                self.index_name, api_key_name=self.api_key_name
+            )
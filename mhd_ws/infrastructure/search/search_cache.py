@@ -0,0 +1,203 @@
+"""Result cache in front of the advanced search gateway.
+
+Results are stored in the ``CacheService`` under a hash of the normalised
+``SearchSpec``, page and sort. The key also carries the current index
+generation: a marker that indexers replace after a reindex, alias swap or
+near-real-time update, so older entries are never read again and expire
+with their TTL.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from mhd_ws.application.services.interfaces.advanced_search_port import (
+    AdvancedSearchPort,
+)
+from mhd_ws.application.services.interfaces.cache_service import CacheService
+from mhd_ws.domain.entities.search.index_search import (
+    IndexSearchResult,
+    PageModel,
+    SortModel,
+)
+from mhd_ws.domain.entities.search.index_search_spec import SearchSpec
+from mhd_ws.infrastructure.search.es.id_set_cache import MetaboliteIdSetCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_GENERATION_KEY = "search-generation"
+SEARCH_CACHE_KEY_PREFIX = "advanced-search"
+DEFAULT_SEARCH_CACHE_TTL_S = 300
+# Generation used until an indexer has set the marker.
+INITIAL_GENERATION = "0"
+
+# Clause value lists combined with AND/OR; their order does not matter.
+_CLAUSE_VALUE_FIELDS = ("terms", "values", "names")
+
+
+def canonical_spec(spec: SearchSpec) -> dict[str, Any]:
+    """Return ``spec`` as JSON data with clause and value order removed.
+
+    Clauses are joined by AND or OR and values within a clause by AND or
+    OR, so both are sorted (and values deduplicated) to give equivalent
+    specs one representation.
+    """
+    data = spec.model_dump(mode="json")
+    clauses = []
+    for clause in data["clauses"]:
+        for name in _CLAUSE_VALUE_FIELDS:
+            if isinstance(clause.get(name), list):
+                clause[name] = sorted(set(clause[name]))
+        clauses.append(clause)
+    data["clauses"] = sorted(clauses, key=_dumps)
+    return data
+
+
+def search_cache_key(
+    spec: SearchSpec,
+    page: PageModel | None,
+    sort: SortModel | None,
+    generation: str,
+) -> str:
+    page = page or PageModel()
+    payload = {
+        "spec": canonical_spec(spec),
+        "page": page.model_dump(mode="json"),
+        "sort": sort.model_dump(mode="json") if sort else None,
+    }
+    digest = hashlib.sha256(_dumps(payload).encode()).hexdigest()
+    return f"{SEARCH_CACHE_KEY_PREFIX}:{generation}:{digest}"
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+async def get_search_generation(cache_service: CacheService) -> str:
+    generation = await cache_service.get_value(SEARCH_GENERATION_KEY)
+    if isinstance(generation, bytes):
+        generation = generation.decode()
+    return generation or INITIAL_GENERATION
+
+
+async def bump_search_generation(cache_service: CacheService) -> str:
+    """Start a new index generation; cached results of older ones are
+    no longer read. Returns the new generation."""
+    generation = uuid.uuid4().hex
+    await cache_service.set_value(SEARCH_GENERATION_KEY, generation)
+    logger.info("Search index generation is now %s", generation)
+    return generation
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    errors: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hit_rate, 4),
+            "miss_rate": round(1 - self.hit_rate, 4) if self.lookups else 0.0,
+        }
+
+
+class CachedAdvancedSearch(AdvancedSearchPort):
+    """``AdvancedSearchPort`` that serves repeated searches from the cache.
+
+    Cache failures are logged and counted, and the search falls through to
+    ``delegate``; the cache never fails a search. ``stats`` counts the
+    lookups of this process. The generation read for each search is passed
+    on to ``id_set_cache``, the in-process metabolite ID set cache of the
+    gateway, so that both caches are invalidated together.
+    """
+
+    def __init__(
+        self,
+        delegate: AdvancedSearchPort,
+        cache_service: CacheService,
+        ttl_in_seconds: int | None = DEFAULT_SEARCH_CACHE_TTL_S,
+        enabled: bool | None = True,
+        id_set_cache: MetaboliteIdSetCache | None = None,
+    ):
+        self.delegate = delegate
+        self.cache_service = cache_service
+        self.ttl_in_seconds = ttl_in_seconds or DEFAULT_SEARCH_CACHE_TTL_S
+        self.enabled = enabled is not False
+        self.id_set_cache = id_set_cache
+        self.stats = SearchCacheStats()
+
+    async def get_index_mapping(self) -> dict[str, Any]:
+        return await self.delegate.get_index_mapping()
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        stats = {"enabled": self.enabled, **self.stats.as_dict()}
+        if self.id_set_cache is not None:
+            stats["metabolite_id_sets"] = self.id_set_cache.stats()
+        return stats
+
+    async def _read_generation(self) -> str | None:
+        try:
+            generation = await get_search_generation(self.cache_service)
+        except Exception as ex:
+            logger.warning("Search generation read failed: %s", ex)
+            self.stats.errors += 1
+            return None
+        if self.id_set_cache is not None:
+            self.id_set_cache.observe_generation(generation)
+        return generation
+
+    async def advanced_search(
+        self,
+        spec: SearchSpec,
+        page: PageModel | None = None,
+        sort: SortModel | None = None,
+    ) -> IndexSearchResult:
+        generation = None
+        if self.enabled or self.id_set_cache is not None:
+            generation = await self._read_generation()
+        # Cursor pages are read from their point in time, never the cache.
+        if not self.enabled or generation is None or (page and page.cursor):
+            return await self.delegate.advanced_search(spec, page=page, sort=sort)
+
+        key = search_cache_key(spec, page, sort, generation)
+        try:
+            cached = await self.cache_service.get_value(key)
+        except Exception as ex:
+            logger.warning("Search cache read failed for %s: %s", key, ex)
+            self.stats.errors += 1
+            cached = None
+        if cached is not None:
+            self.stats.hits += 1
+            result = IndexSearchResult.model_validate_json(cached)
+            result.request_id = str(uuid.uuid4())
+            return result
+
+        self.stats.misses += 1
+        result = await self.delegate.advanced_search(spec, page=page, sort=sort)
+        try:
+            await self.cache_service.set_value(
+                key,
+                result.model_dump_json(),
+                expiration_time_in_seconds=self.ttl_in_seconds,
+            )
+        except Exception as ex:
+            logger.warning("Search cache write failed for %s: %s", key, ex)
+            self.stats.errors += 1
+        return result
@@ -305,6 +305,32 @@ distribution for that characteristic type in the response facets:
 ```
 
 Use `"values": []` to match any dataset that has the characteristic type regardless of value.
+
+**Facet selection**
+
+Facets are computed for every facet key by default. Paging and API clients that do not read
+them should send `"facets": "none"`, or list the facet keys they need (see `/search/fields`).
+`facet_sizes` overrides the number of buckets (default 25) per value facet:
+```json
+{
+  "query_text": "lipidomics",
+  "facets": ["organisms", "diseases"],
+  "facet_sizes": {"organisms": 100},
+  "page": {"current": 3, "size": 20}
+}
+```
+Parameter and characteristic drill-downs still follow `include_facet` of their clauses.
+
+**Cursor paging**
+
+To page through every result, send `"cursor": "*"` with the first request and the returned
+`next_cursor` with each following one, keeping the query, clauses and sort unchanged.
+Pages are read from a snapshot of the index taken for the first page, so deep pages cost the
+same as the first and are not limited to 10,000 hits. `next_cursor` is null after the last page.
+A cursor stays valid for two minutes after its page was returned and for at most an hour in total.
+```json
+{"query_text": "lipidomics", "cursor": "*", "page": {"current": 1, "size": 100}, "facets": "none"}
+```
 """
 
 _ADVANCED_SEARCH_EXAMPLES = {
@@ -463,7 +489,7 @@ _ADVANCED_SEARCH_EXAMPLES = {
 async def advanced_search_datasets(
     request: SearchRequestDTO = Body(openapi_examples=_ADVANCED_SEARCH_EXAMPLES),
     resolver: SearchSpecResolver = Depends(Provide["gateways.search_spec_resolver"]),  # noqa: FAST002
-    gateway: AdvancedSearchPort = Depends(Provide["gateways.advanced_search_gateway"]),  # noqa: FAST002
+    gateway: AdvancedSearchPort = Depends(Provide["services.advanced_search_service"]),  # noqa: FAST002
 ) -> APIResponse[IndexSearchResult]:
     spec = resolver.resolve(request)
     page = (
@@ -471,6 +497,10 @@ async def advanced_search_datasets(
         if request.page
         else None
     )
+    if request.cursor is not None:
+        if page and page.current > 1:
+            raise ValueError("cursor replaces page.current; send page.size only")
+        page = PageModel(size=page.size if page else 20, cursor=request.cursor)
     sort = (
         SortModel(field=request.sort[0].field, direction=request.sort[0].direction)
         if request.sort
@@ -540,12 +570,28 @@ async def get_advanced_search_examples(
 )
 @inject
 async def get_advanced_dataset_search_mapping(
-    gateway: AdvancedSearchPort = Depends(Provide["gateways.advanced_search_gateway"]),  # noqa: FAST002
+    gateway: AdvancedSearchPort = Depends(Provide["services.advanced_search_service"]),  # noqa: FAST002
 ) -> JSONResponse:
     mapping = await gateway.get_index_mapping()
     return JSONResponse(content=mapping)
 
 
+@router.get(
+    "/search/advanced/datasets/cache-stats",
+    summary="Get advanced search cache statistics",
+    description="Returns the result cache hits, misses and hit rate of this server process.",
+    responses={
+        200: {"description": "Cache statistics."},
+    },
+    include_in_schema=False,
+)
+@inject
+async def get_advanced_search_cache_stats(
+    gateway: AdvancedSearchPort = Depends(Provide["services.advanced_search_service"]),  # noqa: FAST002
+) -> JSONResponse:
+    return JSONResponse(content=gateway.get_cache_stats())
+
+
 @router.get(
     "/search/datasets/mapping",
     summary="Get dataset search index mapping",
@@ -563,18 +609,49 @@ async def get_dataset_search_mapping(
     return JSONResponse(content=mapping)
 
 
+_FILE_SEARCH_DESCRIPTION = """Search the files of all datasets: one result per file
+with its dataset ID, file type, format, extension and name, plus facets over
+file type, extension, format and repository.
+
+Filter names: `dataset_id` (e.g. `ms::MTBLS1`), `accession`, `repository`,
+`file_type`, `extension` and `format`. Sort fields: `dataset_id`, `file_type`,
+`name`, `extension` and `id`. Use `skip` and `size` to page through large
+datasets.
+"""
+
+_FILE_SEARCH_EXAMPLES = {
+    "No Search Option": Example(summary="No Search Option", value={}),
+    "Files of one dataset": Example(
+        summary="Raw data files of one dataset",
+        value=SearchOptions(
+            filter_options=[
+                FilterOption(filter_name="dataset_id", value="ms::MTBLS1"),
+                FilterOption(filter_name="file_type", value="raw-data-file"),
+            ],
+            sort_options=[SortOption(field_name="name")],
+        ).model_dump(by_alias=True),
+    ),
+}
+
+
 @router.post(
     "/search/dataset-files",
     summary="Search dataset files",
-    description="Search Dataset files",
-    include_in_schema=False,
+    description=_FILE_SEARCH_DESCRIPTION,
+    response_model=APIResponse[IndexSearchResult],
+    responses={
+        200: {"description": "Search results."},
+        400: {"description": "Bad request."},
+    },
+    include_in_schema=True,
 )
+@inject
 async def search_dataset_files(
     search: Annotated[
         None | str,
         Query(
-            title="Dataset search keywords.",
-            description="Dataset search keywords.",
+            title="File search keywords.",
+            description="File search keywords, matched against file names.",
         ),
     ] = None,
     search_options: Annotated[
@@ -582,12 +659,7 @@ async def search_dataset_files(
         Body(
             title="Search Options",
             description="Search Options",
-            openapi_examples={
-                "No Search Option": Example(
-                    summary="No Search Option",
-                    value={},
-                ),
-            },
+            openapi_examples=_FILE_SEARCH_EXAMPLES,
         ),
     ] = None,
     skip: Annotated[
@@ -597,22 +669,30 @@ async def search_dataset_files(
         int,
         Query(title="Size of returned result", description="Size of returned result."),
     ] = 50,
-) -> None:
-    pass
+    gateway: SearchPort = Depends(Provide["gateways.file_search_gateway"]),  # noqa: FAST002
+) -> APIResponse[IndexSearchResult]:
+    return await _search_files(gateway, search, search_options, skip, size)
 
 
 @router.post(
     "/search/dataset-metadata-files",
     summary="Search dataset metadata files",
-    description="Search dataset metadata files",
-    include_in_schema=False,
+    description="Search the metadata files of all datasets. Accepts the same "
+    "filters, sort fields and paging as /search/dataset-files.",
+    response_model=APIResponse[IndexSearchResult],
+    responses={
+        200: {"description": "Search results."},
+        400: {"description": "Bad request."},
+    },
+    include_in_schema=True,
 )
+@inject
 async def search_dataset_metadata_files(
     search: Annotated[
         None | str,
         Query(
-            title="Dataset search keywords.",
-            description="Dataset search keywords.",
+            title="File search keywords.",
+            description="File search keywords, matched against file names.",
         ),
     ] = None,
     search_options: Annotated[
@@ -620,12 +700,7 @@ async def search_dataset_metadata_files(
         Body(
             title="Search Options",
             description="Search Options",
-            openapi_examples={
-                "No Search Option": Example(
-                    summary="No Search Option",
-                    value={},
-                ),
-            },
+            openapi_examples=_FILE_SEARCH_EXAMPLES,
         ),
     ] = None,
     skip: Annotated[
@@ -635,8 +710,16 @@ async def search_dataset_metadata_files(
         int,
         Query(title="Size of returned result", description="Size of returned result."),
     ] = 50,
-) -> None:
-    pass
+    gateway: SearchPort = Depends(Provide["gateways.file_search_gateway"]),  # noqa: FAST002
+) -> APIResponse[IndexSearchResult]:
+    return await _search_files(
+        gateway,
+        search,
+        search_options,
+        skip,
+        size,
+        file_type="metadata-file",
+    )
 
 
 # -- helpers ------------------------------------------------------------------
@@ -657,6 +740,32 @@ def _build_filters(search_options: SearchOptions | None) -> list[FilterModel] |
     return filters or None
 
 
+async def _search_files(
+    gateway: SearchPort,
+    search: str | None,
+    search_options: SearchOptions | None,
+    skip: int,
+    size: int,
+    file_type: str | None = None,
+) -> APIResponse[IndexSearchResult]:
+    filters = _build_filters(search_options) or []
+    if file_type:
+        filters.append(FilterModel(field="file_type", values=[file_type]))
+    page_size = max(1, min(size, 200))
+    page = PageModel(current=(max(0, skip) // page_size) + 1, size=page_size)
+    sort = None
+    if search_options and search_options.sort_options:
+        option = search_options.sort_options[0]
+        sort = SortModel(
+            field=option.field_name,
+            direction="desc" if option.descending else "asc",
+        )
+    result = await gateway.search(
+        search_text=search, filters=filters or None, page=page, sort=sort
+    )
+    return APIResponse(content=result)
+
+
 def _build_advanced_search_example(field_registry: FieldRegistry) -> SearchRequestDTO:
     clauses: list[
         TermClauseDTO
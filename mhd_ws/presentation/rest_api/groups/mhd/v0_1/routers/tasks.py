@@ -28,6 +28,9 @@ from mhd_ws.application.services.interfaces.async_task.async_task_service import
     AsyncTaskService,
 )
 from mhd_ws.application.services.interfaces.cache_service import CacheService
+from mhd_ws.application.services.interfaces.dataset_indexing_port import (
+    DatasetIndexingPort,
+)
 from mhd_ws.application.use_cases.announcement_conversion import (
     convert_mhd_to_announcement,
 )
@@ -49,6 +52,20 @@ from mhd_ws.presentation.rest_api.groups.mhd.v0_1.routers.models import (
 logger = getLogger(__name__)
 
 
+@inject
+async def schedule_indexing(
+    accession: str,
+    dataset_indexing_service: DatasetIndexingPort = Provide[
+        "services.dataset_indexing_service"
+    ],
+) -> None:
+    """Queue near-real-time indexing of a new revision; never fails the caller."""
+    try:
+        await dataset_indexing_service.schedule_indexing(accession)
+    except Exception as ex:
+        logger.error("Failed to schedule indexing of %s: %s", accession, ex)
+
+
 def json_path(field_path):
     return ".".join([x if isinstance(x, str) else f"[{x}]" for x in field_path])
 
@@ -277,6 +294,7 @@ async def add_submission(
                     dataset_revision, from_attributes=True
                 )
                 model.accession = accession
+                await schedule_indexing(accession)
                 return TaskResult[CreateDatasetRevisionModel](
                     success=True, result=model
                 ).model_dump()
@@ -680,6 +698,7 @@ async def derive_announcement(
     # Step 7: Invalidate cache
     if cache_service is not None:
         await cache_service.delete_key(f"announcement-file:{accession}:latest")
+    await schedule_indexing(db_dataset.accession)
 
     # Step 8: Return success
     return {
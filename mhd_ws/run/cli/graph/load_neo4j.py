@@ -13,7 +13,12 @@ import click
 from neo4j import GraphDatabase
 
 from mhd_ws.infrastructure.search.indexing.io_utils import iter_input_files
-from mhd_ws.infrastructure.search.indexing.utils import eprint, load_json_file
+from mhd_ws.infrastructure.search.indexing.utils import (
+    JSON_DECODERS,
+    eprint,
+    load_json_file,
+    resolve_json_decoder,
+)
 
 LABEL_RE = re.compile(r"[^A-Za-z0-9]+")
 
@@ -129,6 +134,16 @@ def _flush_relationships(
     show_default=True,
 )
 @click.option("--ensure-constraint/--skip-constraint", default=True, show_default=True)
+@click.option(
+    "--json-decoder",
+    type=click.Choice(["auto", *JSON_DECODERS]),
+    default="auto",
+    show_default=True,
+    help=(
+        "JSON decoder for input files (auto = orjson if installed, else json; "
+        "orjson comes with the mhd-ws[indexing] extra)"
+    ),
+)
 @click.option("--dry-run", is_flag=True, default=False)
 def load_neo4j(
     input_dir: str,
@@ -141,9 +156,14 @@ def load_neo4j(
     max_files: int,
     include_embedded: bool,
     ensure_constraint: bool,
+    json_decoder: str,
     dry_run: bool,
 ) -> None:
     """Load MHD graph JSON files into Neo4j."""
+    try:
+        json_decoder = resolve_json_decoder(json_decoder)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--json-decoder") from e
 
     input_path = Path(input_dir)
     files = iter_input_files(input_path, pattern)
@@ -156,7 +176,7 @@ def load_neo4j(
     errors: list[tuple[str, str]] = []
     for path in files:
         try:
-            mhd_files.append((path, load_json_file(path)))
+            mhd_files.append((path, load_json_file(path, decoder=json_decoder)))
         except Exception as e:
             errors.append((str(path), str(e)))
 
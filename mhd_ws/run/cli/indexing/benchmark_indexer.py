@@ -0,0 +1,227 @@
+"""CLI command for benchmarking the indexer on synthetic MHD graphs."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import click
+
+from mhd_ws.infrastructure.search.indexing.benchmark.compare import (
+    compare_results,
+    spec_mismatches,
+)
+from mhd_ws.infrastructure.search.indexing.benchmark.runner import (
+    SINKS,
+    BenchmarkOptions,
+    run_benchmark,
+)
+from mhd_ws.infrastructure.search.indexing.benchmark.synthetic import (
+    PROFILE_URIS,
+    SyntheticGraphSpec,
+)
+from mhd_ws.infrastructure.search.indexing.doc_profiles import DOC_PROFILES
+from mhd_ws.infrastructure.search.indexing.graph_utils import REL_INDEX_BACKENDS
+from mhd_ws.infrastructure.search.indexing.io_utils import COMPRESSIONS
+from mhd_ws.infrastructure.search.indexing.utils import JSON_DECODERS, eprint
+
+
+def _print_results(results: dict[str, Any]) -> None:
+    for profile, result in results["profiles"].items():
+        totals = result["totals"]
+        eprint(
+            f"[{profile}] {totals['dataset_docs']} datasets, "
+            f"{totals['metabolite_docs']} metabolite docs, "
+            f"{totals['wall_s']:.3f}s ({totals['datasets_per_s']} datasets/s)"
+        )
+        eprint(f"  {'stage':<16} {'mean ms':>10} {'p95 ms':>10} {'total s':>10}")
+        for stage, stats in result["stages"].items():
+            eprint(
+                f"  {stage:<16} {stats['mean_ms']:>10.3f} "
+                f"{stats['p95_ms']:>10.3f} {stats['total_s']:>10.3f}"
+            )
+        eprint(
+            f"  _source: {totals['source_bytes']} bytes stored, "
+            f"p95 {totals['source_bytes_p95']} per dataset; "
+            f"p95 hit payload {totals['hit_bytes_p95']} bytes"
+        )
+        if "compressed_bytes" in totals:
+            ratio = totals["doc_bytes"] / max(1, totals["compressed_bytes"])
+            eprint(
+                f"  payload: {totals['doc_bytes']} -> {totals['compressed_bytes']} "
+                f"bytes ({ratio:.1f}x)"
+            )
+        if "upload" in result:
+            upload = result["upload"]
+            eprint(
+                f"  upload: {upload['docs']} docs in {upload['batches']} batches, "
+                f"{upload['docs_per_second']} docs/s, "
+                f"{upload['wire_bytes']} bytes on the wire"
+            )
+
+
+@click.command(name="benchmark-index")
+@click.option(
+    "--profile",
+    "profiles",
+    type=click.Choice([*PROFILE_URIS, "both"]),
+    default="both",
+    help="Synthetic MHD profile(s) to benchmark",
+)
+@click.option("--datasets", type=click.IntRange(min=1), default=20)
+@click.option("--repeats", type=click.IntRange(min=1), default=1)
+@click.option("--assays", type=click.IntRange(min=0), default=2)
+@click.option("--samples", type=click.IntRange(min=0), default=50)
+@click.option("--files-per-sample", type=click.IntRange(min=0), default=2)
+@click.option("--metabolites", type=click.IntRange(min=0), default=100)
+@click.option("--identifiers-per-metabolite", type=click.IntRange(min=0), default=2)
+@click.option("--characteristic-types", type=click.IntRange(min=0), default=4)
+@click.option("--characteristic-values", type=click.IntRange(min=0), default=10)
+@click.option("--parameter-types", type=click.IntRange(min=0), default=6)
+@click.option("--parameter-values", type=click.IntRange(min=0), default=5)
+@click.option("--seed", type=int, default=1)
+@click.option(
+    "--sink",
+    type=click.Choice(SINKS),
+    default="null",
+    help="null = build and serialise only; stand-in = also bulk upload in-process",
+)
+@click.option("--stand-in-latency-ms", type=click.FloatRange(min=0), default=0.0)
+@click.option(
+    "--stand-in-bandwidth-mbps",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="Simulated link speed for the stand-in sink (0 = unlimited)",
+)
+@click.option(
+    "--compress",
+    "compression",
+    type=click.Choice(COMPRESSIONS),
+    default="none",
+    help="Also time compressing the bulk payload as --format bulk --compress would",
+)
+@click.option(
+    "--http-compress",
+    is_flag=True,
+    help="gzip each stand-in bulk request body, like ES http_compress",
+)
+@click.option(
+    "--doc-profile",
+    type=click.Choice(DOC_PROFILES),
+    default="full",
+    help="Dataset doc profile whose stored and hit payload sizes are reported",
+)
+@click.option("--batch-size", type=click.IntRange(min=1), default=500)
+@click.option("--bulk-concurrency", type=click.IntRange(min=1), default=1)
+@click.option("--rel-index", type=click.Choice(REL_INDEX_BACKENDS), default="dict")
+@click.option(
+    "--json-decoder", type=click.Choice(["auto", *JSON_DECODERS]), default="auto"
+)
+@click.option(
+    "--json",
+    "json_out",
+    default=None,
+    help="Write results as JSON to this file ('-' for stdout)",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Results JSON of an earlier run; exit 1 if any stage regressed",
+)
+@click.option(
+    "--threshold",
+    type=click.FloatRange(min=0),
+    default=0.10,
+    help="Allowed slowdown of a stage's mean time before it is a regression",
+)
+def benchmark_indexer(  # noqa: PLR0913
+    profiles: str,
+    datasets: int,
+    repeats: int,
+    assays: int,
+    samples: int,
+    files_per_sample: int,
+    metabolites: int,
+    identifiers_per_metabolite: int,
+    characteristic_types: int,
+    characteristic_values: int,
+    parameter_types: int,
+    parameter_values: int,
+    seed: int,
+    sink: str,
+    stand_in_latency_ms: float,
+    stand_in_bandwidth_mbps: float,
+    compression: str,
+    http_compress: bool,
+    doc_profile: str,
+    batch_size: int,
+    bulk_concurrency: int,
+    rel_index: str,
+    json_decoder: str,
+    json_out: str | None,
+    baseline: str | None,
+    threshold: float,
+) -> None:
+    """Time indexer stages on synthetic MHD graphs, offline."""
+    specs = [
+        SyntheticGraphSpec(
+            profile=profile,
+            assays=assays,
+            samples=samples,
+            files_per_sample=files_per_sample,
+            metabolites=metabolites,
+            identifiers_per_metabolite=identifiers_per_metabolite,
+            characteristic_types=characteristic_types,
+            characteristic_values_per_type=characteristic_values,
+            parameter_types=parameter_types,
+            parameter_values_per_type=parameter_values,
+            seed=seed,
+        )
+        for profile in (PROFILE_URIS if profiles == "both" else [profiles])
+    ]
+    options = BenchmarkOptions(
+        datasets=datasets,
+        repeats=repeats,
+        sink=sink,
+        rel_index=rel_index,
+        json_decoder=json_decoder,
+        batch_size=batch_size,
+        bulk_concurrency=bulk_concurrency,
+        stand_in_latency_ms=stand_in_latency_ms,
+        stand_in_bandwidth_mbps=stand_in_bandwidth_mbps,
+        compression=compression,
+        http_compress=http_compress,
+        doc_profile=doc_profile,
+    )
+    try:
+        results = run_benchmark(specs, options)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    _print_results(results)
+
+    if json_out == "-":
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif json_out:
+        Path(json_out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        eprint(f"Wrote results to {json_out}")
+
+    if not baseline:
+        return
+    baseline_results = json.loads(Path(baseline).read_text(encoding="utf-8"))
+    for profile in spec_mismatches(baseline_results, results):
+        eprint(f"Warning: [{profile}] synthetic spec differs from the baseline")
+    comparisons = compare_results(baseline_results, results, threshold=threshold)
+    regressions = [c for c in comparisons if c.regressed]
+    for c in comparisons:
+        flag = "REGRESSION" if c.regressed else "ok"
+        eprint(
+            f"[{c.profile}] {c.stage:<16} {c.baseline_ms:>10.3f} -> "
+            f"{c.current_ms:>10.3f} ms ({c.ratio:.2f}x) {flag}"
+        )
+    if regressions:
+        eprint(f"{len(regressions)} stage(s) regressed by more than {threshold:.0%}")
+        raise SystemExit(1)
@@ -0,0 +1,156 @@
+"""CLI command comparing the dataset stage modes of the advanced search."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import click
+from pydantic import ValidationError
+
+from mhd_ws.domain.domain_services.query_planner import QueryPlanner
+from mhd_ws.domain.domain_services.search_spec_resolver import SearchSpecResolver
+from mhd_ws.domain.entities.search.dtos import SearchRequestDTO
+from mhd_ws.domain.entities.search.index_search import PageModel, SortModel
+from mhd_ws.domain.entities.search.registries.field_registry import FIELD_REGISTRY
+from mhd_ws.domain.entities.search.registries.index_capability_registry import (
+    build_index_capabilities,
+)
+from mhd_ws.infrastructure.search.es.advanced_search_gateway import (
+    AdvancedSearchGateway,
+)
+from mhd_ws.infrastructure.search.es.es_configuration import (
+    DATASET_STAGE_MODES,
+    AdvancedSearchConfiguration,
+)
+from mhd_ws.infrastructure.search.es.search_benchmark import (
+    BenchmarkQuery,
+    benchmark_search_modes,
+)
+from mhd_ws.infrastructure.search.indexing.utils import eprint
+from mhd_ws.run.cli.indexing.cli_helpers import init_container
+
+
+def load_benchmark_queries(path: Path) -> list[BenchmarkQuery]:
+    """Read advanced search request payloads (one object or a list)."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    payloads = data if isinstance(data, list) else [data]
+    resolver = SearchSpecResolver(field_registry=FIELD_REGISTRY)
+    queries: list[BenchmarkQuery] = []
+    for payload in payloads:
+        request = SearchRequestDTO.model_validate(payload)
+        page = (
+            PageModel(current=request.page.current, size=request.page.size)
+            if request.page
+            else None
+        )
+        sort = (
+            SortModel(field=request.sort[0].field, direction=request.sort[0].direction)
+            if request.sort
+            else None
+        )
+        queries.append((resolver.resolve(request), page, sort))
+    return queries
+
+
+def _print_results(results: dict[str, Any]) -> None:
+    eprint(
+        f"{results['queries']} queries x {results['repeats']} runs "
+        f"(+{results['warmup']} warm-up)"
+    )
+    eprint(f"  {'mode':<12} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for mode, stats in results["modes"].items():
+        eprint(
+            f"  {mode:<12} {stats['mean_ms']:>10.3f} "
+            f"{stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f}"
+        )
+    if results["mismatches"]:
+        eprint(
+            "Results differ between modes for queries: "
+            + ", ".join(str(n) for n in results["mismatches"])
+        )
+
+
+@click.command(name="benchmark-search")
+@click.argument("queries_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--config-file",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="YAML config file with the Elasticsearch connection",
+)
+@click.option(
+    "--secrets-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML secrets file",
+)
+@click.option(
+    "--mode",
+    "modes",
+    type=click.Choice(DATASET_STAGE_MODES),
+    multiple=True,
+    help="Dataset stage mode to time; repeat for several (default: all)",
+)
+@click.option("--repeats", type=click.IntRange(min=1), default=5)
+@click.option("--warmup", type=click.IntRange(min=0), default=1)
+@click.option("--json", "json_out", default=None, help="Write the results as JSON")
+def benchmark_search(
+    queries_file: str,
+    config_file: str,
+    secrets_file: str | None,
+    modes: tuple[str, ...],
+    repeats: int,
+    warmup: int,
+    json_out: str | None,
+) -> None:
+    """Time advanced searches (QUERIES_FILE: request payloads as accepted by
+    POST /v0_1/search/advanced/datasets) in each dataset stage mode against
+    a live index."""
+    try:
+        queries = load_benchmark_queries(Path(queries_file))
+    except (ValueError, ValidationError) as e:
+        raise click.ClickException(f"{queries_file}: {e}") from e
+
+    container = init_container(config_file, secrets_file)
+    es_config = container.config.gateways.database.elasticsearch
+    indices = es_config.connection.indices() or {}
+    base_config = es_config.advanced_search() or {}
+    es_client = container.gateways.elasticsearch_client()
+    index_registry = build_index_capabilities(
+        dataset_index=indices.get("dataset_legacy", "dataset_legacy_v1"),
+        metabolite_index=indices.get("metabolite", "metabolite_ms_v1"),
+        dataset_ms_index=indices.get("dataset_ms", "dataset_ms_v1"),
+    )
+
+    def make_gateway(mode: str) -> AdvancedSearchGateway:
+        return AdvancedSearchGateway(
+            client=es_client,
+            config=AdvancedSearchConfiguration(
+                **{**base_config, "dataset_stage_mode": mode}
+            ),
+            planner=QueryPlanner(),
+            index_registry=index_registry,
+            field_registry=FIELD_REGISTRY,
+        )
+
+    async def run() -> dict[str, Any]:
+        await es_client.start()
+        try:
+            return await benchmark_search_modes(
+                make_gateway,
+                queries,
+                modes=modes or DATASET_STAGE_MODES,
+                repeats=repeats,
+                warmup=warmup,
+            )
+        finally:
+            await es_client.close()
+
+    results = asyncio.run(run())
+    _print_results(results)
+    if json_out:
+        Path(json_out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        eprint(f"Wrote results to {json_out}")
@@ -0,0 +1,88 @@
+"""Helpers shared by the indexing CLI commands."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import click
+
+from mhd_ws.infrastructure.search.indexing.utils import eprint, load_json_file
+from mhd_ws.infrastructure.search.search_cache import bump_search_generation
+from mhd_ws.run.cli.indexing.containers import IndexingCliContainer
+from mhd_ws.run.config_renderer import render_config_secrets
+
+
+def _ensure_cli_logging(
+    config: dict[str, Any], secrets: dict[str, Any] | None = None
+) -> None:
+    run_cfg = config.get("run") or {}
+    cli_cfg = run_cfg.get("cli") or {}
+    if cli_cfg.get("logging"):
+        return
+    logging_cfg = (run_cfg.get("mhd_ws") or {}).get("logging")
+    if not logging_cfg and secrets:
+        logging_cfg = ((secrets.get("run") or {}).get("cli") or {}).get("logging")
+        if not logging_cfg:
+            logging_cfg = ((secrets.get("run") or {}).get("mhd_ws") or {}).get(
+                "logging"
+            )
+    if logging_cfg:
+        cli_cfg["logging"] = logging_cfg
+        run_cfg["cli"] = cli_cfg
+        config["run"] = run_cfg
+
+
+def resolve_repo_path(path_str: str) -> str:
+    path = Path(path_str)
+    if path.is_absolute():
+        return str(path)
+    if path.exists():
+        return str(path)
+    repo_root = Path(__file__).resolve().parents[4]
+    candidate = repo_root / path
+    if candidate.exists():
+        return str(candidate)
+    return str(path)
+
+
+def load_mapping(mapping_file: str, label: str) -> dict[str, Any]:
+    mapping_path = Path(mapping_file)
+    if not mapping_path.is_file():
+        raise click.ClickException(f"{label} file does not exist: {mapping_path}")
+    return load_json_file(mapping_path)
+
+
+def init_container(config_file: str, secrets_file: str | None):
+    container = IndexingCliContainer()
+    container.config.from_yaml(config_file)
+    if secrets_file:
+        container.secrets.from_yaml(secrets_file)
+    render_config_secrets(container.config(), container.secrets())
+    _ensure_cli_logging(container.config(), container.secrets())
+    container.init_resources()
+    return container
+
+
+def init_upload_client(config_file: str | None, secrets_file: str | None):
+    if not config_file:
+        raise click.ClickException("--config-file is required when --upload is set")
+    return init_container(config_file, secrets_file).gateways.elasticsearch_client()
+
+
+def start_search_generation(config_file: str, secrets_file: str | None) -> None:
+    """Bump the search generation so that the API stops serving advanced
+    search results cached before the upload."""
+    container = init_container(config_file, secrets_file)
+    if not container.config.gateways.cache.selected_cache_provider():
+        eprint("No cache configured; cached search results were not invalidated")
+        return
+    try:
+        generation = asyncio.run(
+            bump_search_generation(container.gateways.cache_service())
+        )
+    except Exception as e:
+        eprint(f"Failed to invalidate cached search results: {e}")
+        return
+    eprint(f"Started search generation {generation}")
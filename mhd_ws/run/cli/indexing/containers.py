@@ -2,6 +2,13 @@ from logging import config as logging_config
 
 from dependency_injector import containers, providers
 
+from mhd_ws.infrastructure.cache.redis.redis_impl import RedisCacheImpl
+from mhd_ws.infrastructure.cache.redis_sentinel.redis_sentinel_impl import (
+    RedisSentinelCacheImpl,
+)
+from mhd_ws.infrastructure.persistence.db.postgresql.db_client_impl import (
+    DatabaseClientImpl,
+)
 from mhd_ws.infrastructure.search.es_client import ElasticsearchClient
 
 
@@ -22,6 +29,25 @@ class IndexingGatewaysContainer(containers.DeclarativeContainer):
         config=config.database.elasticsearch.connection,
     )
 
+    # Only constructed by ``index --from-db``.
+    database_client = providers.Singleton(
+        DatabaseClientImpl,
+        db_connection=config.database.postgresql.connection,
+    )
+
+    # Only constructed after an upload, to start a new search generation.
+    cache_service = providers.Selector(
+        config.cache.selected_cache_provider,
+        redis=providers.Factory(
+            RedisCacheImpl,
+            config=config.cache.redis.connection,
+        ),
+        redis_sentinel=providers.Factory(
+            RedisSentinelCacheImpl,
+            config=config.cache.redis_sentinel.connection,
+        ),
+    )
+
 
 class IndexingCliContainer(containers.DeclarativeContainer):
     config = providers.Configuration()
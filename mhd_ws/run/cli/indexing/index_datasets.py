@@ -3,33 +3,91 @@
 from __future__ import annotations
 
 import asyncio
+import cProfile
+import json
 import logging
 import os
-import sys
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 import click
 
+from mhd_ws.infrastructure.search.bulk import (
+    BulkReport,
+    BulkUploadOptions,
+    DeadLetterWriter,
+    iter_dead_letter,
+)
+from mhd_ws.infrastructure.search.indexing.cleanup import (
+    METABOLITE_ID_SEPARATOR,
+    StaleDocCleaner,
+)
 from mhd_ws.infrastructure.search.indexing.dataset_builder import (
-    build_legacy_dataset_doc,
+    DEFAULT_DOC_BUDGET,
+    DocSizeBudget,
+)
+from mhd_ws.infrastructure.search.indexing.db_source import (
+    MhdFileFetcher,
+    iter_db_build_results,
+)
+from mhd_ws.infrastructure.search.indexing.doc_profiles import (
+    DOC_PROFILES,
+    slim_mapping,
+    slim_results,
 )
 from mhd_ws.infrastructure.search.indexing.io_utils import (
+    COMPRESSIONS,
+    PayloadRecord,
+    iter_bulk_payload,
     iter_input_files,
+    iter_jsonl_payload,
+    open_text_input,
+    open_text_output,
+    resolve_compression,
     write_bulk,
+    write_bulk_deletes,
     write_json_dir,
     write_jsonl,
 )
-from mhd_ws.infrastructure.search.indexing.metabolite_builder import (
-    build_metabolite_docs,
+from mhd_ws.infrastructure.search.indexing.manifest import (
+    DEFAULT_MANIFEST_NAME,
+    IncrementalPlan,
+    Manifest,
+    load_manifest,
+    plan_incremental,
+    save_manifest,
+    shard_manifest_name,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import (
+    BoundedDocStream,
+    BuildStats,
+    FileBuildResult,
+    iter_build_results,
+)
+from mhd_ws.infrastructure.search.indexing.profiling import ProfileReport
+from mhd_ws.infrastructure.search.indexing.sharding import (
+    run_summary,
+    select_shard,
+    shard_of,
 )
 from mhd_ws.infrastructure.search.indexing.utils import (
+    JSON_DECODERS,
     eprint,
     iso_now,
-    load_json_file,
+    resolve_json_decoder,
+)
+from mhd_ws.infrastructure.search.reindex import (
+    BlueGreenOptions,
+    BlueGreenReindex,
+    LegacyIndexError,
+)
+from mhd_ws.run.cli.indexing.cli_helpers import (
+    init_container,
+    init_upload_client,
+    load_mapping,
+    resolve_repo_path,
+    start_search_generation,
 )
-from mhd_ws.run.cli.indexing.containers import IndexingCliContainer
-from mhd_ws.run.config_renderer import render_config_secrets
 
 logger = logging.getLogger(__name__)
 
@@ -42,37 +100,11 @@ def _default_metabolite_index_name() -> str:
     return os.getenv("MHD_METABOLITE_INDEX_NAME") or "metabolite_ms_v1"
 
 
-def _ensure_cli_logging(
-    config: dict[str, Any], secrets: dict[str, Any] | None = None
-) -> None:
-    run_cfg = config.get("run") or {}
-    cli_cfg = run_cfg.get("cli") or {}
-    if cli_cfg.get("logging"):
-        return
-    logging_cfg = (run_cfg.get("mhd_ws") or {}).get("logging")
-    if not logging_cfg and secrets:
-        logging_cfg = ((secrets.get("run") or {}).get("cli") or {}).get("logging")
-        if not logging_cfg:
-            logging_cfg = ((secrets.get("run") or {}).get("mhd_ws") or {}).get(
-                "logging"
-            )
-    if logging_cfg:
-        cli_cfg["logging"] = logging_cfg
-        run_cfg["cli"] = cli_cfg
-        config["run"] = run_cfg
+def _default_diagnostics_index_name() -> str:
+    return os.getenv("MHD_DIAGNOSTICS_INDEX_NAME") or "dataset_ms_diagnostics_v1"
 
 
-def _resolve_repo_path(path_str: str) -> str:
-    path = Path(path_str)
-    if path.is_absolute():
-        return str(path)
-    if path.exists():
-        return str(path)
-    repo_root = Path(__file__).resolve().parents[4]
-    candidate = repo_root / path
-    if candidate.exists():
-        return str(candidate)
-    return str(path)
+DIAGNOSTICS_MAPPING_FILE = "resources/es/mappings/diagnostics_mapping.json"
 
 
 def log_facets(
@@ -93,53 +125,143 @@ def log_facets(
         eprint(f"ORGS {doc.get('id')} count={len(orgs)}")
 
 
-def build_docs(
-    files: list[Path],
-    skip_metabolites: bool,
+def iter_built_results(
+    results: Iterable[FileBuildResult],
+    stats: BuildStats,
     facet_keys: list[str] | None,
     log_facet_values: bool,
-    indexed_ts: str,
-) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[tuple[str, str]]]:
-    docs: list[dict[str, Any]] = []
-    metabolite_docs: list[dict[str, Any]] = []
-    errors: list[tuple[str, str]] = []
-
-    for p in files:
-        try:
-            mhd = load_json_file(p)
-            doc = build_legacy_dataset_doc(mhd, indexed_ts)
-            docs.append(doc)
-            if not skip_metabolites:
-                metabolite_docs.extend(build_metabolite_docs(mhd, doc))
-            if facet_keys:
-                log_facets(doc, facet_keys, log_facet_values)
-        except Exception as e:
-            errors.append((str(p), str(e)))
-
-    return docs, metabolite_docs, errors
+) -> Iterator[FileBuildResult]:
+    """Count every result in ``stats`` and yield only the successful ones."""
+    for result in results:
+        stats.add(result)
+        if result.doc is None:
+            continue
+        if facet_keys:
+            log_facets(result.doc, facet_keys, log_facet_values)
+        yield result
 
 
-def summarize(
-    files: list[Path],
-    docs: list[dict[str, Any]],
-    metabolite_docs: list[dict[str, Any]],
-    errors: list[tuple[str, str]],
-    skip_metabolites: bool,
-) -> None:
-    eprint(f"Processed files: {len(files)}")
-    eprint(f"Built dataset docs:    {len(docs)}")
+def summarize(stats: BuildStats, skip_metabolites: bool) -> None:
+    eprint(f"Processed files: {stats.files}")
+    eprint(f"Built dataset docs:    {stats.dataset_docs}")
     if not skip_metabolites:
-        eprint(f"Built metabolite docs: {len(metabolite_docs)}")
-    eprint(f"Errors:          {len(errors)}")
-    if errors:
+        eprint(f"Built metabolite docs: {stats.metabolite_docs}")
+    eprint(f"Errors:          {len(stats.errors)}")
+    eprint(
+        f"Build time:      {stats.elapsed:.2f}s "
+        f"({stats.files_per_second:.1f} files/s, "
+        f"{stats.docs_per_second:.1f} docs/s)"
+    )
+    if stats.capped:
+        eprint(f"Capped docs:     {len(stats.capped)}")
+    if stats.errors:
         eprint("---- Errors ----")
-        for fp, msg in errors:
+        for fp, msg in stats.errors:
             eprint(f"{fp}: {msg}")
+    if stats.capped:
+        eprint("---- Capped docs ----")
+        for doc_id, truncation in stats.capped:
+            fields = ", ".join(
+                f"{t['field']} {t['kept']}/{t['total']}" for t in truncation
+            )
+            eprint(f"{doc_id}: {fields}")
+
+
+def _finish_profile(
+    report: ProfileReport | None,
+    cprofiler: cProfile.Profile | None,
+    profile_json: str | None,
+    profile_pstats: str | None,
+) -> None:
+    if cprofiler is not None:
+        cprofiler.disable()
+        cprofiler.dump_stats(profile_pstats)
+        eprint(f"Wrote cProfile stats to {profile_pstats}")
+    if report is None:
+        return
+    eprint("---- Profile ----")
+    for line in report.summary_lines():
+        eprint(line)
+    if profile_json:
+        Path(profile_json).write_text(
+            json.dumps(report.to_dict(), indent=2), encoding="utf-8"
+        )
+        eprint(f"Wrote profile report to {profile_json}")
+
+
+def _write_summary(
+    summary_json: str | None,
+    stats: BuildStats,
+    shard_index: int,
+    shard_count: int,
+    source_info: dict[str, Any],
+) -> None:
+    if not summary_json:
+        return
+    summary = run_summary(stats, shard_index, shard_count, **source_info)
+    Path(summary_json).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    eprint(f"Wrote run summary to {summary_json}")
+
+
+def _plan_incremental_run(
+    manifest_path: Path,
+    input_path: Path,
+    files: list[Path],
+    all_files: list[Path],
+    target: dict[str, Any],
+    recreate_index: bool,
+) -> IncrementalPlan:
+    try:
+        previous = load_manifest(manifest_path)
+    except (ValueError, TypeError) as e:
+        raise click.ClickException(f"invalid manifest {manifest_path}: {e}") from e
+    if recreate_index:
+        eprint("Ignoring manifest because --recreate-index is set")
+        previous = Manifest()
+    elif previous.entries and previous.target != target:
+        eprint(
+            f"Manifest targets {previous.target}, not {target}; rebuilding all files"
+        )
+        previous = Manifest()
+    plan = plan_incremental(
+        previous, input_path, files, all_files=all_files, target=target
+    )
+    eprint(
+        f"Incremental: {len(plan.changed)} added/changed, "
+        f"{plan.unchanged} unchanged, {plan.removed} removed"
+    )
+    return plan
+
+
+def _dataset_mapping(mapping_file: str, slim: bool) -> dict[str, Any]:
+    mapping = load_mapping(mapping_file, "mapping")
+    return slim_mapping(mapping) if slim else mapping
+
+
+async def _ensure_index(
+    es_client,
+    index_name: str,
+    mapping_file: str,
+    recreate_index: bool,
+    api_key_name: str,
+    label: str,
+    update_mapping: bool = False,
+    slim: bool = False,
+) -> None:
+    mapping = load_mapping(mapping_file, label)
+    if slim:
+        mapping = slim_mapping(mapping)
+    await es_client.ensure_index_exists(
+        index_name,
+        mapping,
+        recreate=recreate_index,
+        api_key_name=api_key_name,
+        update_mapping=update_mapping,
+    )
 
 
 async def _handle_upload(
-    docs: list[dict[str, Any]],
-    metabolite_docs: list[dict[str, Any]],
+    results: Iterable[FileBuildResult],
     es_client,
     index_name: str,
     metabolite_index: str,
@@ -149,56 +271,334 @@ async def _handle_upload(
     batch_size: int,
     recreate_index: bool,
     skip_metabolites: bool,
+    queue_size: int,
+    plan: IncrementalPlan | None = None,
+    bulk_options: BulkUploadOptions | None = None,
+    dead_letter: DeadLetterWriter | None = None,
+    blue_green: BlueGreenOptions | None = None,
+    profile: ProfileReport | None = None,
+    indexed_ts: str | None = None,
+    cleanup_batch_size: int = 0,
+    doc_profile: str = "full",
+    diagnostics_index: str | None = None,
 ) -> None:
+    bulk_options = bulk_options or BulkUploadOptions()
+    slim = doc_profile == "slim"
+    reindexes: list[BlueGreenReindex] = []
+    cleaner: StaleDocCleaner | None = None
+    # A new or recreated index has no docs from earlier runs to clean up.
+    if (
+        indexed_ts
+        and cleanup_batch_size
+        and not skip_metabolites
+        and not recreate_index
+        and blue_green is None
+    ):
+        cleaner = StaleDocCleaner(
+            es_client,
+            metabolite_index,
+            indexed_ts,
+            api_key_name="metabolite",
+            id_separator=METABOLITE_ID_SEPARATOR,
+            batch_size=cleanup_batch_size,
+        )
+        results = cleaner.track(results)
     await es_client.start()
     try:
-        mapping_path = Path(mapping_file)
-        if not mapping_path.is_file():
-            raise click.ClickException(f"mapping file does not exist: {mapping_path}")
-        mapping = load_json_file(mapping_path)
-        await es_client.ensure_index_exists(
-            index_name,
-            mapping,
-            recreate=recreate_index,
-            api_key_name="dataset_ms",
-        )
-        n = await es_client.bulk_upload(
-            docs,
-            index_name=index_name,
-            op_type=op_type,
-            batch_size=batch_size,
-            api_key_name="dataset_ms",
-        )
-        eprint(f"Uploaded {n} dataset docs to index {index_name}")
+        if blue_green is not None:
+            reindexes.append(
+                BlueGreenReindex(
+                    es_client,
+                    index_name,
+                    _dataset_mapping(mapping_file, slim),
+                    api_key_name="dataset_ms",
+                    options=blue_green,
+                )
+            )
+            if not skip_metabolites:
+                reindexes.append(
+                    BlueGreenReindex(
+                        es_client,
+                        metabolite_index,
+                        load_mapping(metabolite_mapping_file, "metabolite mapping"),
+                        api_key_name="metabolite",
+                        options=blue_green,
+                    )
+                )
+            for reindex in reindexes:
+                await reindex.create()
+                eprint(f"Loading new index {reindex.index_name} for {reindex.alias}")
+            index_name = reindexes[0].index_name
+            if not skip_metabolites:
+                metabolite_index = reindexes[1].index_name
+        else:
+            await _ensure_index(
+                es_client,
+                index_name,
+                mapping_file,
+                recreate_index,
+                api_key_name="dataset_ms",
+                label="mapping",
+                # Indices created before a field was added (e.g. truncation)
+                # would reject docs that carry it.
+                update_mapping=True,
+                slim=slim,
+            )
+            if not skip_metabolites:
+                await _ensure_index(
+                    es_client,
+                    metabolite_index,
+                    metabolite_mapping_file,
+                    recreate_index,
+                    api_key_name="metabolite",
+                    label="metabolite mapping",
+                    update_mapping=cleaner is not None,
+                )
+        if diagnostics_index:
+            await _ensure_index(
+                es_client,
+                diagnostics_index,
+                resolve_repo_path(DIAGNOSTICS_MAPPING_FILE),
+                recreate_index,
+                api_key_name="dataset_ms",
+                label="diagnostics mapping",
+            )
+        dataset_report = BulkReport(index_name=index_name)
+        metabolite_report = BulkReport(index_name=metabolite_index)
 
-        if not skip_metabolites:
-            metab_mapping_path = Path(metabolite_mapping_file)
-            if not metab_mapping_path.is_file():
-                raise click.ClickException(
-                    f"metabolite mapping file does not exist: {metab_mapping_path}"
+        async with BoundedDocStream(
+            results,
+            max_pending=queue_size,
+            include_metabolites=not skip_metabolites,
+            include_diagnostics=bool(diagnostics_index),
+        ) as stream:
+            async with asyncio.TaskGroup() as tg:
+                dataset_task = tg.create_task(
+                    es_client.bulk_upload(
+                        stream.dataset_docs(),
+                        index_name=index_name,
+                        op_type=op_type,
+                        batch_size=batch_size,
+                        api_key_name="dataset_ms",
+                        options=bulk_options,
+                        report=dataset_report,
+                        dead_letter=dead_letter,
+                    )
                 )
-            metab_mapping = load_json_file(metab_mapping_path)
-            await es_client.ensure_index_exists(
-                metabolite_index,
-                metab_mapping,
-                recreate=recreate_index,
-                api_key_name="metabolite",
+                if not skip_metabolites:
+                    metabolite_task = tg.create_task(
+                        es_client.bulk_upload(
+                            stream.metabolite_docs(),
+                            index_name=metabolite_index,
+                            op_type=op_type,
+                            batch_size=batch_size,
+                            api_key_name="metabolite",
+                            options=bulk_options,
+                            report=metabolite_report,
+                            dead_letter=dead_letter,
+                        )
+                    )
+                if diagnostics_index:
+                    diagnostics_task = tg.create_task(
+                        es_client.bulk_upload(
+                            stream.diagnostics_docs(),
+                            index_name=diagnostics_index,
+                            op_type=op_type,
+                            batch_size=batch_size,
+                            api_key_name="dataset_ms",
+                            options=bulk_options,
+                            dead_letter=dead_letter,
+                        )
+                    )
+        eprint(f"Uploaded {dataset_task.result()} dataset docs to index {index_name}")
+        eprint(f"Bulk report: {dataset_report.summary()}")
+        if profile is not None:
+            profile.add_upload(index_name, dataset_report)
+            if not skip_metabolites:
+                profile.add_upload(metabolite_index, metabolite_report)
+        if not skip_metabolites:
+            eprint(
+                f"Uploaded {metabolite_task.result()} metabolite docs "
+                f"to index {metabolite_index}"
+            )
+            eprint(f"Bulk report: {metabolite_report.summary()}")
+        if diagnostics_index:
+            eprint(
+                f"Uploaded {diagnostics_task.result()} diagnostics docs "
+                f"to index {diagnostics_index}"
+            )
+        if dead_letter is not None and dead_letter.count:
+            eprint(
+                f"{dead_letter.count} docs failed permanently and were written to "
+                f"{dead_letter.path}; resend them with --replay-dead-letter"
             )
-            n_met = await es_client.bulk_upload(
-                metabolite_docs,
-                index_name=metabolite_index,
+            if plan is not None:
+                plan.forget(dead_letter.doc_ids)
+        if cleaner is not None:
+            if dead_letter is not None:
+                cleaner.skip_failed(dead_letter.doc_ids)
+            deleted = await cleaner.run()
+            eprint(
+                f"Deleted {deleted} stale metabolite docs from index "
+                f"{metabolite_index} in {cleaner.requests} delete-by-query requests"
+            )
+        if plan is not None:
+            deleted = await es_client.bulk_delete(
+                plan.stale_dataset_ids(),
+                index_name=index_name,
+                batch_size=batch_size,
+                api_key_name="dataset_ms",
+            )
+            eprint(f"Deleted {deleted} stale dataset docs from index {index_name}")
+            if not skip_metabolites:
+                deleted = await es_client.bulk_delete(
+                    plan.stale_metabolite_ids(),
+                    index_name=metabolite_index,
+                    batch_size=batch_size,
+                    api_key_name="metabolite",
+                )
+                eprint(
+                    f"Deleted {deleted} stale metabolite docs "
+                    f"from index {metabolite_index}"
+                )
+        for reindex in reindexes:
+            pruned = await reindex.finalize()
+            eprint(f"Alias {reindex.alias} now points at {reindex.index_name}")
+            if pruned:
+                eprint(f"Pruned old indices: {', '.join(pruned)}")
+    except Exception:
+        for reindex in reindexes:
+            if reindex.swapped:
+                eprint(
+                    f"Reindex failed; keeping {reindex.index_name}, "
+                    f"which alias {reindex.alias} already points at"
+                )
+                continue
+            eprint(f"Reindex failed; deleting {reindex.index_name}")
+            await reindex.abort()
+        raise
+    finally:
+        await es_client.close()
+
+
+async def _replay_dead_letter(
+    es_client,
+    replay_path: Path,
+    dead_letter: DeadLetterWriter,
+    metabolite_index: str,
+    batch_size: int,
+    bulk_options: BulkUploadOptions,
+) -> int:
+    """Resend the docs of a dead-letter file, grouped by index and op type."""
+    groups: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for record in iter_dead_letter(replay_path):
+        key = (record["index"], record.get("op_type") or "index")
+        groups.setdefault(key, []).append(record["doc"])
+
+    total = 0
+    await es_client.start()
+    try:
+        for (index, op_type), docs in groups.items():
+            report = BulkReport(index_name=index)
+            total += await es_client.bulk_upload(
+                docs,
+                index_name=index,
                 op_type=op_type,
                 batch_size=batch_size,
-                api_key_name="metabolite",
+                api_key_name=(
+                    "metabolite" if index == metabolite_index else "dataset_ms"
+                ),
+                options=bulk_options,
+                report=report,
+                dead_letter=dead_letter,
             )
-            eprint(f"Uploaded {n_met} metabolite docs to index {metabolite_index}")
+            eprint(f"Bulk report: {report.summary()}")
     finally:
         await es_client.close()
+    return total
+
+
+async def _replay_payload(
+    es_client,
+    payload_path: Path,
+    fmt: str,
+    index_name: str,
+    metabolite_index: str,
+    batch_size: int,
+    bulk_options: BulkUploadOptions,
+    dead_letter: DeadLetterWriter,
+) -> tuple[int, int]:
+    """Stream a (possibly compressed) bulk/JSONL payload file into ES.
+
+    Each index/op type gets its own concurrent ``bulk_upload`` fed through a
+    bounded queue, so the file is read once and never held in memory.
+    Deletes are sent last. Returns (docs uploaded, docs deleted).
+    """
+    queues: dict[tuple[str, str], asyncio.Queue] = {}
+    uploads: list[tuple[BulkReport, asyncio.Task[int]]] = []
+    deletes: dict[str, list[str]] = {}
+
+    async def drain(queue: asyncio.Queue):
+        while (doc := await queue.get()) is not None:
+            yield doc
+
+    def api_key_name(index: str) -> str:
+        return "metabolite" if index == metabolite_index else "dataset_ms"
+
+    await es_client.start()
+    try:
+        with open_text_input(payload_path) as fh:
+            records: Iterator[PayloadRecord] = (
+                iter_bulk_payload(fh)
+                if fmt == "bulk"
+                else iter_jsonl_payload(fh, index_name, metabolite_index)
+            )
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    for record in records:
+                        if record.op_type == "delete":
+                            deletes.setdefault(record.index, []).append(record.doc_id)
+                            continue
+                        key = (record.index, record.op_type)
+                        if key not in queues:
+                            queues[key] = asyncio.Queue(maxsize=batch_size)
+                            report = BulkReport(index_name=record.index)
+                            task = tg.create_task(
+                                es_client.bulk_upload(
+                                    drain(queues[key]),
+                                    index_name=record.index,
+                                    op_type=record.op_type,
+                                    batch_size=batch_size,
+                                    api_key_name=api_key_name(record.index),
+                                    options=bulk_options,
+                                    report=report,
+                                    dead_letter=dead_letter,
+                                )
+                            )
+                            uploads.append((report, task))
+                        await queues[key].put(record.doc)
+                    for queue in queues.values():
+                        await queue.put(None)
+            except* ValueError as group:
+                # A malformed payload line is a plain error, not a task failure.
+                raise group.exceptions[0] from None
+        for report, _ in uploads:
+            eprint(f"Bulk report: {report.summary()}")
+        deleted = 0
+        for index, doc_ids in deletes.items():
+            deleted += await es_client.bulk_delete(
+                doc_ids,
+                index_name=index,
+                batch_size=batch_size,
+                api_key_name=api_key_name(index),
+            )
+    finally:
+        await es_client.close()
+    return sum(task.result() for _, task in uploads), deleted
 
 
 def handle_output(
-    docs: list[dict[str, Any]],
-    metabolite_docs: list[dict[str, Any]],
+    results: Iterable[FileBuildResult],
     fmt: str,
     out: str,
     json_dir: str | None,
@@ -206,51 +606,68 @@ def handle_output(
     metabolite_index: str,
     op_type: str,
     skip_metabolites: bool,
+    plan: IncrementalPlan | None = None,
+    compression: str = "none",
+    compress_level: int | None = None,
 ) -> None:
+    n = n_met = 0
     if fmt == "json-dir":
         if not json_dir:
             raise click.ClickException("--json-dir is required when --format json-dir")
         out_dir = Path(json_dir)
-        n = write_json_dir(out_dir, docs)
+        metab_dir = out_dir / "metabolites"
+        for result in results:
+            n += write_json_dir(out_dir, [result.doc], start=n)
+            if not skip_metabolites:
+                n_met += write_json_dir(metab_dir, result.metabolite_docs, start=n_met)
         eprint(f"Wrote {n} dataset JSON files to {out_dir}")
         if not skip_metabolites:
-            metab_dir = out_dir / "metabolites"
-            n_met = write_json_dir(metab_dir, metabolite_docs)
             eprint(f"Wrote {n_met} metabolite JSON files to {metab_dir}")
         return
 
-    if out == "-":
-        out_fh = sys.stdout
-        close = False
-    else:
-        out_fh = open(out, "w", encoding="utf-8")  # noqa: SIM115, PTH123
-        close = True
-
-    try:
+    with open_text_output(out, compression, compress_level) as out_fh:
         if fmt == "bulk":
-            n = write_bulk(out_fh, docs, index_name=index_name, op_type=op_type)
+            for result in results:
+                n += write_bulk(
+                    out_fh, [result.doc], index_name=index_name, op_type=op_type
+                )
+                if not skip_metabolites:
+                    n_met += write_bulk(
+                        out_fh,
+                        result.metabolite_docs,
+                        index_name=metabolite_index,
+                        op_type=op_type,
+                    )
             eprint(f"Wrote bulk payload for {n} dataset docs")
             if not skip_metabolites:
-                n_met = write_bulk(
-                    out_fh,
-                    metabolite_docs,
-                    index_name=metabolite_index,
-                    op_type=op_type,
-                )
                 eprint(f"Wrote bulk payload for {n_met} metabolite docs")
+            if plan is not None:
+                n_del = write_bulk_deletes(
+                    out_fh, plan.stale_dataset_ids(), index_name=index_name
+                )
+                if not skip_metabolites:
+                    n_del += write_bulk_deletes(
+                        out_fh, plan.stale_metabolite_ids(), index_name=metabolite_index
+                    )
+                eprint(f"Wrote bulk delete actions for {n_del} stale docs")
         elif fmt == "jsonl":
-            n = write_jsonl(out_fh, docs)
+            for result in results:
+                n += write_jsonl(out_fh, [result.doc])
+                if not skip_metabolites:
+                    n_met += write_jsonl(out_fh, result.metabolite_docs)
             eprint(f"Wrote {n} JSONL dataset docs")
             if not skip_metabolites:
-                n_met = write_jsonl(out_fh, metabolite_docs)
                 eprint(f"Wrote {n_met} JSONL metabolite docs")
-    finally:
-        if close:
-            out_fh.close()
+
+
+def _init_db_client(config_file: str, secrets_file: str | None):
+    return init_container(config_file, secrets_file).gateways.database_client()
 
 
 @click.command(name="index")
-@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument(
+    "input_dir", required=False, type=click.Path(exists=True, file_okay=False)
+)
 @click.option(
     "--config-file",
     type=click.Path(exists=True),
@@ -264,6 +681,30 @@ def handle_output(
     help="YAML secrets file",
 )
 @click.option("--pattern", default="*.mhd.json", help="Glob pattern within input_dir")
+@click.option(
+    "--from-db",
+    is_flag=True,
+    help="Index the latest revision of every public dataset in the announcement "
+    "database instead of INPUT_DIR (MHD files are fetched from their URLs)",
+)
+@click.option(
+    "--mhd-mirror-dir",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="With --from-db, read MHD files from this local mirror, by URL file name",
+)
+@click.option(
+    "--db-batch-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    help="Dataset rows fetched per database query (--from-db)",
+)
+@click.option(
+    "--fetch-concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    help="Concurrent MHD file downloads (--from-db)",
+)
 @click.option(
     "--format",
     "fmt",
@@ -274,6 +715,22 @@ def handle_output(
 @click.option(
     "--out", default="-", help="Output file path, or '-' for stdout (bulk/jsonl only)"
 )
+@click.option(
+    "--compress",
+    "compression",
+    type=click.Choice(["auto", *COMPRESSIONS]),
+    default="auto",
+    help=(
+        "Compress bulk/jsonl output; auto follows the --out suffix (.gz, .zst). "
+        "zstd needs the mhd-ws[indexing] extra"
+    ),
+)
+@click.option(
+    "--compress-level",
+    type=int,
+    default=None,
+    help="gzip (1-9) or zstd (1-22) level; defaults favour speed (6 and 3)",
+)
 @click.option("--json-dir", default=None, help="Output directory for --format json-dir")
 @click.option(
     "--index",
@@ -296,6 +753,48 @@ def handle_output(
     default="resources/es/mappings/metabolite_mapping.json",
     help="Index mapping JSON for metabolite index",
 )
+@click.option(
+    "--doc-profile",
+    type=click.Choice(DOC_PROFILES),
+    default="full",
+    help="slim = keep search_text out of _source (new indices only) and move "
+    "debug counts to --diagnostics-index (uploaded with --upload only)",
+)
+@click.option(
+    "--diagnostics-index",
+    default=_default_diagnostics_index_name,
+    help="ES index name for the debug counts of --doc-profile slim",
+)
+@click.option(
+    "--max-list-items",
+    type=int,
+    default=DEFAULT_DOC_BUDGET.max_list_items,
+    help="Entries kept per dataset doc list (specimens, parameters, ...; 0 = all)",
+)
+@click.option(
+    "--max-facet-values",
+    type=int,
+    default=DEFAULT_DOC_BUDGET.max_facet_values,
+    help=(
+        "Most frequent values kept per facet and file extension list "
+        "(0 = all); filters on dropped values stop matching the dataset"
+    ),
+)
+@click.option(
+    "--max-group-values",
+    type=int,
+    default=DEFAULT_DOC_BUDGET.max_group_values,
+    help=(
+        "Most frequent values kept per characteristic/parameter group "
+        "(0 = all); filters on dropped values stop matching the dataset"
+    ),
+)
+@click.option(
+    "--max-search-text-bytes",
+    type=int,
+    default=DEFAULT_DOC_BUDGET.max_search_text_bytes,
+    help="UTF-8 bytes kept of each dataset doc's search_text (0 = all)",
+)
 @click.option(
     "--upload", is_flag=True, help="Upload to Elasticsearch using the Bulk API"
 )
@@ -303,6 +802,94 @@ def handle_output(
     "--dry-run", is_flag=True, help="Do not write docs; only print summary/errors"
 )
 @click.option("--batch-size", type=int, default=500, help="Bulk upload batch size")
+@click.option(
+    "--blue-green",
+    is_flag=True,
+    help=(
+        "Load a new timestamped index and swap --index/--metabolite-index "
+        "aliases onto it when done (--upload only)"
+    ),
+)
+@click.option(
+    "--retain-indices",
+    type=click.IntRange(min=1),
+    default=2,
+    help="Timestamped indices kept per alias after a --blue-green swap",
+)
+@click.option(
+    "--force-merge",
+    is_flag=True,
+    help="Force-merge the new index to one segment before a --blue-green swap",
+)
+@click.option(
+    "--migrate-legacy-index",
+    is_flag=True,
+    help=(
+        "Permanently delete a concrete index named like --index/--metabolite-index "
+        "when a --blue-green swap replaces it with an alias"
+    ),
+)
+@click.option(
+    "--bulk-concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Bulk requests in flight per index during --upload",
+)
+@click.option(
+    "--max-chunk-bytes",
+    type=click.IntRange(min=1),
+    default=10 * 1024 * 1024,
+    help="Maximum payload bytes per bulk request",
+)
+@click.option(
+    "--max-retries",
+    type=click.IntRange(min=0),
+    default=3,
+    help="Retries per bulk item for 429/502/503/504 and request timeouts",
+)
+@click.option(
+    "--retry-backoff",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    help="Initial retry backoff in seconds (doubles per attempt, max 60s)",
+)
+@click.option(
+    "--dead-letter",
+    "dead_letter_file",
+    type=click.Path(dir_okay=False),
+    default="mhd-index-dead-letter.ndjson",
+    help=(
+        "NDJSON file that docs still failing after retries are appended to "
+        "(--upload only)"
+    ),
+)
+@click.option(
+    "--replay-dead-letter",
+    "replay_dead_letter_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Resend the docs of a dead-letter file instead of indexing INPUT_DIR",
+)
+@click.option(
+    "--replay-payload",
+    "replay_payload_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Upload a --format bulk/jsonl payload file (gzip/zstd detected) "
+    "instead of indexing INPUT_DIR",
+)
+@click.option(
+    "--cleanup-batch-size",
+    type=click.IntRange(min=0),
+    default=500,
+    help="Datasets per delete-by-query removing metabolite docs a reindexed "
+    "dataset no longer has (0 = keep them)",
+)
+@click.option(
+    "--adaptive-batch-size",
+    is_flag=True,
+    help="Resize bulk batches from ES took times and 429 rejections",
+)
 @click.option(
     "--recreate-index", is_flag=True, help="Delete and recreate the index before upload"
 )
@@ -314,6 +901,97 @@ def handle_output(
 @click.option(
     "--max-files", type=int, default=0, help="Process at most N files (0 = no limit)"
 )
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Build documents in N worker processes (1 = in-process)",
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=8,
+    help="Files handed to a worker process per task (with --workers > 1)",
+)
+@click.option(
+    "--unordered",
+    is_flag=True,
+    help="Collect worker results as they complete instead of in file order",
+)
+@click.option(
+    "--rel-index",
+    type=click.Choice(["dict", "csr"]),
+    default="dict",
+    help="Relationship index backend; csr uses far less memory on large graphs",
+)
+@click.option(
+    "--json-decoder",
+    type=click.Choice(["auto", *JSON_DECODERS]),
+    default="auto",
+    help=(
+        "JSON decoder for input files (auto = orjson if installed, else json; "
+        "orjson comes with the mhd-ws[indexing] extra)"
+    ),
+)
+@click.option(
+    "--queue-size",
+    type=int,
+    default=16,
+    help="Files worth of built docs buffered between building and upload",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only rebuild files that changed since the last run (bulk/--upload only)",
+)
+@click.option(
+    "--manifest",
+    "manifest_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=f"Manifest file for --incremental (default: INPUT_DIR/{DEFAULT_MANIFEST_NAME})",
+)
+@click.option(
+    "--shard-index",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Index only the files of this shard (0-based, see --shard-count)",
+)
+@click.option(
+    "--shard-count",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Split input files into this many shards by a stable accession hash",
+)
+@click.option(
+    "--summary-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write a JSON run summary (for mhd-cli index-merge-summaries)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Report wall/CPU time per stage and file, slowest files and doc sizes",
+)
+@click.option(
+    "--profile-top",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Slowest files listed by --profile",
+)
+@click.option(
+    "--profile-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the --profile report as JSON (implies --profile)",
+)
+@click.option(
+    "--profile-pstats",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write a cProfile dump of the run, for pstats/snakeviz (implies --profile)",
+)
 @click.option(
     "--log-facets", is_flag=True, help="Log facet values per document to stderr"
 )
@@ -332,32 +1010,206 @@ def index_datasets(  # noqa: PLR0913
     config_file: str | None,
     secrets_file: str | None,
     pattern: str,
+    from_db: bool,
+    mhd_mirror_dir: str | None,
+    db_batch_size: int,
+    fetch_concurrency: int,
     fmt: str,
     out: str,
+    compression: str,
+    compress_level: int | None,
     json_dir: str | None,
     index_name: str,
     metabolite_index: str,
     mapping_file: str,
     metabolite_mapping_file: str,
+    doc_profile: str,
+    diagnostics_index: str,
+    max_list_items: int,
+    max_facet_values: int,
+    max_group_values: int,
+    max_search_text_bytes: int,
     upload: bool,
     dry_run: bool,
     batch_size: int,
+    blue_green: bool,
+    retain_indices: int,
+    force_merge: bool,
+    migrate_legacy_index: bool,
+    bulk_concurrency: int,
+    max_chunk_bytes: int,
+    cleanup_batch_size: int,
+    adaptive_batch_size: bool,
+    max_retries: int,
+    retry_backoff: float,
+    dead_letter_file: str,
+    replay_dead_letter_file: str | None,
+    replay_payload_file: str | None,
     recreate_index: bool,
     skip_metabolites: bool,
     max_files: int,
+    workers: int,
+    chunk_size: int,
+    unordered: bool,
+    rel_index: str,
+    json_decoder: str,
+    queue_size: int,
+    incremental: bool,
+    manifest_file: str | None,
+    shard_index: int,
+    shard_count: int,
+    summary_json: str | None,
+    profile: bool,
+    profile_top: int,
+    profile_json: str | None,
+    profile_pstats: str | None,
     log_facets: bool,
     log_facet_keys: str,
     log_facet_values: bool,
 ) -> None:
     """Index MHD datasets (.mhd.json) into Elasticsearch documents."""
 
-    input_path = Path(input_dir)
-    files = iter_input_files(input_path, pattern)
-    if max_files and max_files > 0:
-        files = files[:max_files]
+    bulk_options = BulkUploadOptions(
+        concurrency=bulk_concurrency,
+        max_chunk_bytes=max_chunk_bytes,
+        adaptive=adaptive_batch_size,
+        max_batch_size=max(batch_size, 5000),
+        max_retries=max_retries,
+        initial_backoff_s=retry_backoff,
+    )
+    if replay_dead_letter_file:
+        es_client = init_upload_client(config_file, secrets_file)
+        replay_path = Path(replay_dead_letter_file)
+        dead_letter_path = Path(dead_letter_file)
+        # The whole file is read before the first failure is written, so a
+        # replay into the same file replaces it rather than appending.
+        same_file = dead_letter_path.resolve() == replay_path.resolve()
+        with DeadLetterWriter(dead_letter_path, overwrite=same_file) as dead_letter:
+            uploaded = asyncio.run(
+                _replay_dead_letter(
+                    es_client,
+                    replay_path,
+                    dead_letter,
+                    metabolite_index=metabolite_index,
+                    batch_size=batch_size,
+                    bulk_options=bulk_options,
+                )
+            )
+        eprint(f"Replayed {uploaded} docs from {replay_path}")
+        start_search_generation(config_file, secrets_file)
+        if dead_letter.count:
+            eprint(f"{dead_letter.count} docs still failing; see {dead_letter_path}")
+            raise SystemExit(1)
+        if same_file:
+            replay_path.unlink()
+        return
+    if replay_payload_file:
+        if fmt == "json-dir":
+            raise click.UsageError("--replay-payload reads --format bulk or jsonl")
+        es_client = init_upload_client(config_file, secrets_file)
+        dead_letter_path = Path(dead_letter_file)
+        with DeadLetterWriter(dead_letter_path) as dead_letter:
+            try:
+                uploaded, deleted = asyncio.run(
+                    _replay_payload(
+                        es_client,
+                        Path(replay_payload_file),
+                        fmt,
+                        index_name=index_name,
+                        metabolite_index=metabolite_index,
+                        batch_size=batch_size,
+                        bulk_options=bulk_options,
+                        dead_letter=dead_letter,
+                    )
+                )
+            except ValueError as e:
+                raise click.ClickException(f"{replay_payload_file}: {e}") from e
+        eprint(
+            f"Replayed {uploaded} docs and {deleted} deletes from {replay_payload_file}"
+        )
+        start_search_generation(config_file, secrets_file)
+        if dead_letter.count:
+            eprint(f"{dead_letter.count} docs failed; see {dead_letter_path}")
+            raise SystemExit(1)
+        return
+    if from_db == bool(input_dir):
+        raise click.UsageError(
+            "give either INPUT_DIR or --from-db "
+            "(or --replay-dead-letter/--replay-payload)"
+        )
+    try:
+        compression = resolve_compression(compression, out)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--compress") from e
+    if not 0 <= shard_index < shard_count:
+        raise click.BadParameter(
+            f"shard index {shard_index} is out of range for {shard_count} shards",
+            param_hint="--shard-index",
+        )
+    if shard_count > 1 and (blue_green or recreate_index):
+        raise click.ClickException(
+            "--blue-green/--recreate-index cannot be combined with sharding; "
+            "prepare the index once before starting the shards"
+        )
+    if blue_green:
+        if not upload:
+            raise click.ClickException("--blue-green requires --upload")
+        if incremental or recreate_index:
+            raise click.ClickException(
+                "--blue-green always loads a fresh index; "
+                "drop --incremental/--recreate-index"
+            )
+    elif migrate_legacy_index:
+        raise click.ClickException("--migrate-legacy-index requires --blue-green")
 
-    if not files:
-        raise click.ClickException(f"no files matched {pattern} in {input_path}")
+    files: list[Path] = []
+    plan: IncrementalPlan | None = None
+    if from_db:
+        if incremental:
+            raise click.ClickException(
+                "--incremental tracks input files; it cannot be used with --from-db"
+            )
+        if not config_file:
+            raise click.ClickException("--config-file is required with --from-db")
+        source_info = {"source": "database"}
+    else:
+        input_path = Path(input_dir)
+        source_info = {"input_dir": str(input_path.resolve())}
+        all_files = select_shard(
+            iter_input_files(input_path, pattern), shard_index, shard_count
+        )
+        if shard_count > 1:
+            eprint(f"Shard {shard_index} of {shard_count}: {len(all_files)} files")
+        files = all_files
+        if max_files and max_files > 0:
+            files = files[:max_files]
+
+        if incremental:
+            if not upload and fmt != "bulk":
+                raise click.ClickException(
+                    "--incremental needs --upload or --format bulk to express deletes"
+                )
+            manifest_path = (
+                Path(manifest_file)
+                if manifest_file
+                else input_path / shard_manifest_name(shard_index, shard_count)
+            )
+            plan = _plan_incremental_run(
+                manifest_path,
+                input_path,
+                files,
+                all_files,
+                target={
+                    "index": index_name,
+                    "metabolite_index": metabolite_index,
+                    "skip_metabolites": skip_metabolites,
+                    "shard": [shard_index, shard_count],
+                },
+                recreate_index=recreate_index,
+            )
+            files = plan.changed
+        elif not files and shard_count == 1:
+            raise click.ClickException(f"no files matched {pattern} in {input_path}")
 
     facet_keys = (
         [k.strip() for k in log_facet_keys.split(",") if k.strip()]
@@ -365,56 +1217,151 @@ def index_datasets(  # noqa: PLR0913
         else None
     )
 
-    indexed_ts = iso_now()
-    docs, metabolite_docs, errors = build_docs(
-        files, skip_metabolites, facet_keys, log_facet_values, indexed_ts
-    )
+    try:
+        json_decoder = resolve_json_decoder(json_decoder)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--json-decoder") from e
 
-    summarize(files, docs, metabolite_docs, errors, skip_metabolites)
+    budget = DocSizeBudget(
+        max_list_items=max(0, max_list_items),
+        max_facet_values=max(0, max_facet_values),
+        max_group_values=max(0, max_group_values),
+        max_search_text_bytes=max(0, max_search_text_bytes),
+    )
+    profiling = profile or bool(profile_json) or bool(profile_pstats)
+    indexed_ts = iso_now()
+    stats = BuildStats(profile=ProfileReport(top_n=profile_top) if profiling else None)
+    cprofiler = None
+    if profile_pstats:
+        if workers > 1:
+            eprint(
+                "Warning: --profile-pstats only sees this process; "
+                "use --workers 1 to include document building"
+            )
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    if from_db:
+        if workers > 1 or profiling:
+            eprint(
+                "Warning: --from-db builds documents in this process "
+                "without per-stage profiles"
+            )
+        build_results = iter_db_build_results(
+            _init_db_client(config_file, secrets_file),
+            MhdFileFetcher(
+                mirror_dir=Path(mhd_mirror_dir) if mhd_mirror_dir else None,
+                concurrency=fetch_concurrency,
+            ),
+            skip_metabolites,
+            indexed_ts,
+            batch_size=db_batch_size,
+            prefetch=max(queue_size, fetch_concurrency),
+            limit=max_files if max_files > 0 else None,
+            accept=(
+                (lambda accession: shard_of(accession, shard_count) == shard_index)
+                if shard_count > 1
+                else None
+            ),
+            rel_index=rel_index,
+            json_decoder=json_decoder,
+            budget=budget,
+        )
+    else:
+        build_results = iter_build_results(
+            files,
+            skip_metabolites,
+            indexed_ts,
+            workers=workers,
+            chunk_size=chunk_size,
+            ordered=not unordered,
+            rel_index=rel_index,
+            json_decoder=json_decoder,
+            profile=profiling,
+            budget=budget,
+        )
+    if plan is not None:
+        build_results = plan.track(build_results)
+    if doc_profile == "slim":
+        build_results = slim_results(build_results)
+    results = iter_built_results(build_results, stats, facet_keys, log_facet_values)
 
     if dry_run:
-        raise SystemExit(0 if docs else 1)
+        for _ in results:
+            pass
+        stats.finish()
+        summarize(stats, skip_metabolites)
+        _finish_profile(stats.profile, cprofiler, profile_json, profile_pstats)
+        _write_summary(summary_json, stats, shard_index, shard_count, source_info)
+        if plan is not None:
+            raise SystemExit(0 if stats.files == stats.dataset_docs else 1)
+        # An empty shard is not a failure.
+        raise SystemExit(0 if stats.dataset_docs or not stats.files else 1)
 
     if upload:
-        if not config_file:
-            raise click.ClickException("--config-file is required when --upload is set")
-        container = IndexingCliContainer()
-        container.config.from_yaml(config_file)
-        if secrets_file:
-            container.secrets.from_yaml(secrets_file)
-        render_config_secrets(container.config(), container.secrets())
-        _ensure_cli_logging(container.config(), container.secrets())
-        mapping_file = _resolve_repo_path(mapping_file)
-        metabolite_mapping_file = _resolve_repo_path(metabolite_mapping_file)
-
-        container.init_resources()
-        es_client = container.gateways.elasticsearch_client()
-
-        asyncio.run(
-            _handle_upload(
-                docs,
-                metabolite_docs,
-                es_client,
-                index_name=index_name,
-                metabolite_index=metabolite_index,
-                mapping_file=mapping_file,
-                metabolite_mapping_file=metabolite_mapping_file,
-                op_type="index",
-                batch_size=batch_size,
-                recreate_index=recreate_index,
-                skip_metabolites=skip_metabolites,
-            )
+        es_client = init_upload_client(config_file, secrets_file)
+        mapping_file = resolve_repo_path(mapping_file)
+        metabolite_mapping_file = resolve_repo_path(metabolite_mapping_file)
+
+        with DeadLetterWriter(Path(dead_letter_file)) as dead_letter:
+            try:
+                asyncio.run(
+                    _handle_upload(
+                        results,
+                        es_client,
+                        index_name=index_name,
+                        metabolite_index=metabolite_index,
+                        mapping_file=mapping_file,
+                        metabolite_mapping_file=metabolite_mapping_file,
+                        op_type="index",
+                        batch_size=batch_size,
+                        recreate_index=recreate_index,
+                        skip_metabolites=skip_metabolites,
+                        queue_size=queue_size,
+                        plan=plan,
+                        bulk_options=bulk_options,
+                        dead_letter=dead_letter,
+                        blue_green=(
+                            BlueGreenOptions(
+                                retain=retain_indices,
+                                force_merge=force_merge,
+                                migrate_legacy_index=migrate_legacy_index,
+                            )
+                            if blue_green
+                            else None
+                        ),
+                        profile=stats.profile,
+                        indexed_ts=indexed_ts,
+                        cleanup_batch_size=cleanup_batch_size,
+                        doc_profile=doc_profile,
+                        diagnostics_index=(
+                            diagnostics_index if doc_profile == "slim" else None
+                        ),
+                    )
+                )
+            except LegacyIndexError as e:
+                raise click.ClickException(
+                    f"{e}, or pass --migrate-legacy-index to delete it"
+                ) from e
+        start_search_generation(config_file, secrets_file)
+    else:
+        handle_output(
+            results,
+            fmt=fmt,
+            out=out,
+            compression=compression,
+            compress_level=compress_level,
+            json_dir=json_dir,
+            index_name=index_name,
+            metabolite_index=metabolite_index,
+            op_type="index",
+            skip_metabolites=skip_metabolites,
+            plan=plan,
         )
-        return
 
-    handle_output(
-        docs,
-        metabolite_docs,
-        fmt=fmt,
-        out=out,
-        json_dir=json_dir,
-        index_name=index_name,
-        metabolite_index=metabolite_index,
-        op_type="index",
-        skip_metabolites=skip_metabolites,
-    )
+    stats.finish()
+    summarize(stats, skip_metabolites)
+    _finish_profile(stats.profile, cprofiler, profile_json, profile_pstats)
+    _write_summary(summary_json, stats, shard_index, shard_count, source_info)
+    if plan is not None:
+        save_manifest(plan.manifest, manifest_path)
+        eprint(f"Updated manifest {manifest_path}")
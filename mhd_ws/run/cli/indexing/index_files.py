@@ -0,0 +1,232 @@
+"""CLI command that indexes one document per MHD file node."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+import click
+
+from mhd_ws.infrastructure.search.indexing.cleanup import StaleDocCleaner
+from mhd_ws.infrastructure.search.indexing.file_builder import (
+    FILE_ID_SEPARATOR,
+    FileIndexStats,
+    iter_file_index_docs,
+)
+from mhd_ws.infrastructure.search.indexing.io_utils import (
+    COMPRESSIONS,
+    iter_input_files,
+    open_text_output,
+    resolve_compression,
+    write_bulk,
+    write_jsonl,
+)
+from mhd_ws.infrastructure.search.indexing.utils import (
+    JSON_DECODERS,
+    eprint,
+    iso_now,
+    resolve_json_decoder,
+)
+from mhd_ws.run.cli.indexing.cli_helpers import (
+    init_upload_client,
+    load_mapping,
+    resolve_repo_path,
+    start_search_generation,
+)
+
+FILE_API_KEY_NAME = "file"
+
+
+def _default_file_index_name() -> str:
+    return os.getenv("MHD_FILE_INDEX_NAME") or "dataset_file_v1"
+
+
+async def _upload_file_docs(
+    docs,
+    es_client,
+    index_name: str,
+    mapping_file: str,
+    stats: FileIndexStats,
+    indexed_ts: str,
+    batch_size: int,
+    recreate_index: bool,
+    cleanup_batch_size: int = 500,
+) -> int:
+    """Upload ``docs`` as they are built, then delete the file docs the
+    indexed datasets no longer have."""
+    await es_client.start()
+    try:
+        await es_client.ensure_index_exists(
+            index_name,
+            load_mapping(mapping_file, "file mapping"),
+            recreate=recreate_index,
+            api_key_name=FILE_API_KEY_NAME,
+        )
+        uploaded = await es_client.bulk_upload(
+            docs,
+            index_name,
+            batch_size=batch_size,
+            api_key_name=FILE_API_KEY_NAME,
+        )
+        eprint(f"Uploaded {uploaded} file docs to index {index_name}")
+        if cleanup_batch_size > 0 and not recreate_index:
+            cleaner = StaleDocCleaner(
+                es_client,
+                index_name,
+                indexed_ts,
+                api_key_name=FILE_API_KEY_NAME,
+                id_separator=FILE_ID_SEPARATOR,
+                batch_size=cleanup_batch_size,
+                dataset_ids=stats.dataset_ids,
+            )
+            deleted = await cleaner.run()
+            eprint(
+                f"Deleted {deleted} stale file docs of {len(stats.dataset_ids)} "
+                f"datasets in {cleaner.requests} requests"
+            )
+        return uploaded
+    finally:
+        await es_client.close()
+
+
+@click.command(name="index-files")
+@click.argument(
+    "input_dir", type=click.Path(exists=True, file_okay=False, path_type=str)
+)
+@click.option(
+    "--config-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML config file (for ES connection when --upload is set)",
+)
+@click.option(
+    "--secrets-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML secrets file",
+)
+@click.option("--pattern", default="*.mhd.json", help="Glob pattern within input_dir")
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["bulk", "jsonl"]),
+    default="bulk",
+    help="Output format",
+)
+@click.option("--out", default="-", help="Output file path, or '-' for stdout")
+@click.option(
+    "--compress",
+    "compression",
+    type=click.Choice(["auto", *COMPRESSIONS]),
+    default="auto",
+    help="Compress output; auto follows the --out suffix (.gz, .zst)",
+)
+@click.option(
+    "--index-name",
+    default=_default_file_index_name,
+    help="ES index name for file documents",
+)
+@click.option(
+    "--mapping-file",
+    default="resources/es/mappings/file_mapping.json",
+    help="Index mapping JSON for the file index",
+)
+@click.option(
+    "--upload", is_flag=True, help="Upload to Elasticsearch using the Bulk API"
+)
+@click.option("--batch-size", type=int, default=1000, help="Bulk upload batch size")
+@click.option(
+    "--cleanup-batch-size",
+    type=int,
+    default=500,
+    help="Datasets per delete-by-query removing file docs a reindexed dataset "
+    "no longer has (0 = no cleanup)",
+)
+@click.option(
+    "--recreate-index", is_flag=True, help="Delete and recreate the index before upload"
+)
+@click.option(
+    "--max-files", type=int, default=0, help="Process at most N files (0 = no limit)"
+)
+@click.option(
+    "--rel-index",
+    type=click.Choice(["dict", "csr"]),
+    default="dict",
+    help="Relationship index backend; csr uses far less memory on large graphs",
+)
+@click.option(
+    "--json-decoder",
+    type=click.Choice(["auto", *JSON_DECODERS]),
+    default="auto",
+    help=(
+        "JSON decoder for input files (auto = orjson if installed, else json; "
+        "orjson comes with the mhd-ws[indexing] extra)"
+    ),
+)
+def index_files(  # noqa: PLR0913
+    input_dir: str,
+    config_file: str | None,
+    secrets_file: str | None,
+    pattern: str,
+    fmt: str,
+    out: str,
+    compression: str,
+    index_name: str,
+    mapping_file: str,
+    upload: bool,
+    batch_size: int,
+    cleanup_batch_size: int,
+    recreate_index: bool,
+    max_files: int,
+    rel_index: str,
+    json_decoder: str,
+) -> None:
+    """Index one document per file node of each MHD dataset (.mhd.json).
+
+    Docs are streamed from one graph at a time to the output or the Bulk
+    API, so datasets with 100k+ files are not held in memory as docs.
+    """
+    files = iter_input_files(Path(input_dir), pattern)
+    if max_files > 0:
+        files = files[:max_files]
+    if not files:
+        raise click.ClickException(f"no files matched {pattern} in {input_dir}")
+    try:
+        json_decoder = resolve_json_decoder(json_decoder)
+        compression = resolve_compression(compression, out)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+    indexed_ts = iso_now()
+    stats = FileIndexStats()
+    docs = iter_file_index_docs(files, indexed_ts, stats, rel_index, json_decoder)
+    if upload:
+        asyncio.run(
+            _upload_file_docs(
+                docs,
+                init_upload_client(config_file, secrets_file),
+                index_name=index_name,
+                mapping_file=resolve_repo_path(mapping_file),
+                stats=stats,
+                indexed_ts=indexed_ts,
+                batch_size=batch_size,
+                recreate_index=recreate_index,
+                cleanup_batch_size=cleanup_batch_size,
+            )
+        )
+        start_search_generation(config_file, secrets_file)
+    else:
+        with open_text_output(out, compression) as out_fh:
+            if fmt == "bulk":
+                write_bulk(out_fh, docs, index_name=index_name, op_type="index")
+            else:
+                write_jsonl(out_fh, docs)
+
+    eprint(f"Processed files: {stats.files}")
+    eprint(f"Built file docs: {stats.file_docs}")
+    eprint(f"Errors:          {len(stats.errors)}")
+    for path, error in stats.errors:
+        eprint(f"{path}: {error}")
+    if len(stats.errors) == stats.files:
+        raise SystemExit(1)
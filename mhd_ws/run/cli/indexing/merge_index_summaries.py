@@ -0,0 +1,89 @@
+"""CLI command that merges the run summaries of sharded index runs."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import click
+
+from mhd_ws.infrastructure.search.indexing.sharding import merge_run_summaries
+from mhd_ws.infrastructure.search.indexing.utils import eprint
+
+
+def _print_merged(merged: dict[str, Any]) -> None:
+    eprint(f"  {'shard':>5} {'host':<20} {'files':>8} {'datasets':>9} {'errors':>7}")
+    for shard in merged["shards"]:
+        eprint(
+            f"  {shard['shard_index']:>5} {shard.get('host', '-')[:20]:<20} "
+            f"{shard['files']:>8} {shard['dataset_docs']:>9} {shard['errors']:>7}"
+        )
+    eprint(
+        f"Total: {merged['files']} files, {merged['dataset_docs']} dataset docs, "
+        f"{merged['metabolite_docs']} metabolite docs, {len(merged['errors'])} errors "
+        f"(slowest shard {merged['max_elapsed_s']:.1f}s)"
+    )
+    for error in merged["errors"][:20]:
+        eprint(f"  [shard {error['shard_index']}] {error['path']}: {error['error']}")
+    if len(merged["errors"]) > 20:
+        eprint(f"  ... {len(merged['errors']) - 20} more")
+    for problem in merged["problems"]:
+        eprint(f"Problem: {problem}")
+
+
+@click.command(name="index-merge-summaries")
+@click.argument(
+    "summary_files",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--json",
+    "json_out",
+    default=None,
+    help="Write the merged summary as JSON to this file ('-' for stdout)",
+)
+@click.option(
+    "--errors-out",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write every failed file of every shard to this NDJSON file",
+)
+def merge_index_summaries(
+    summary_files: tuple[str, ...],
+    json_out: str | None,
+    errors_out: str | None,
+) -> None:
+    """Merge the --summary-json files of sharded index runs.
+
+    Exits 1 if a shard is missing, ran twice or the shard counts disagree.
+    """
+    summaries = []
+    for path in summary_files:
+        try:
+            summaries.append(json.loads(Path(path).read_text(encoding="utf-8")))
+        except json.JSONDecodeError as e:
+            raise click.ClickException(f"{path} is not a run summary: {e}") from e
+    try:
+        merged = merge_run_summaries(summaries)
+    except KeyError as e:
+        raise click.ClickException(f"run summary is missing field {e}") from e
+    _print_merged(merged)
+
+    if json_out == "-":
+        json.dump(merged, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif json_out:
+        Path(json_out).write_text(json.dumps(merged, indent=2), encoding="utf-8")
+        eprint(f"Wrote merged summary to {json_out}")
+    if errors_out:
+        with Path(errors_out).open("w", encoding="utf-8") as f:
+            for error in merged["errors"]:
+                f.write(json.dumps(error) + "\n")
+        eprint(f"Wrote {len(merged['errors'])} errors to {errors_out}")
+
+    if not merged["complete"]:
+        raise SystemExit(1)
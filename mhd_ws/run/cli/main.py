@@ -10,7 +10,11 @@ from mhd_ws.run.cli.announcement.derive_announcement import derive_announcement
 from mhd_ws.run.cli.announcement.load_announcement import load_announcement
 from mhd_ws.run.cli.announcement.seed_datasets import seed_datasets
 from mhd_ws.run.cli.graph.load_neo4j import load_neo4j
+from mhd_ws.run.cli.indexing.benchmark_indexer import benchmark_indexer
+from mhd_ws.run.cli.indexing.benchmark_search import benchmark_search
 from mhd_ws.run.cli.indexing.index_datasets import index_datasets
+from mhd_ws.run.cli.indexing.index_files import index_files
+from mhd_ws.run.cli.indexing.merge_index_summaries import merge_index_summaries
 
 
 @click.group()
@@ -20,10 +24,14 @@ def mhd_tool() -> None:
 
 
 mhd_tool.add_command(index_datasets)
+mhd_tool.add_command(index_files)
 mhd_tool.add_command(derive_announcement)
 mhd_tool.add_command(load_announcement)
 mhd_tool.add_command(seed_datasets)
 mhd_tool.add_command(load_neo4j)
+mhd_tool.add_command(benchmark_indexer)
+mhd_tool.add_command(benchmark_search)
+mhd_tool.add_command(merge_index_summaries)
 
 
 if __name__ == "__main__":
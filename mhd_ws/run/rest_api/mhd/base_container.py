@@ -26,8 +26,13 @@ from mhd_ws.infrastructure.search.es.advanced_search_gateway import (
 )
 from mhd_ws.infrastructure.search.es.es_configuration import (
     AdvancedSearchConfiguration,
+    FileSearchConfiguration,
     LegacyElasticSearchConfiguration,
 )
+from mhd_ws.infrastructure.search.es.file_search_gateway import (
+    ElasticsearchFileSearchGateway,
+)
+from mhd_ws.infrastructure.search.es.id_set_cache import MetaboliteIdSetCache
 from mhd_ws.infrastructure.search.es.legacy.es_legacy_search_gateway import (
     ElasticsearchLegacyGateway,
 )
@@ -77,6 +82,15 @@ class GatewaysContainer(containers.DeclarativeContainer):
         ),
     )
 
+    file_search_gateway: ElasticsearchFileSearchGateway = providers.Singleton(
+        ElasticsearchFileSearchGateway,
+        client=elasticsearch_client,
+        config=providers.Factory(
+            FileSearchConfiguration,
+            index_name=config.database.elasticsearch.connection.indices.file,
+        ),
+    )
+
     field_registry = providers.Object(FIELD_REGISTRY)
     index_capabilities_registry = providers.Singleton(
         build_index_capabilities,
@@ -95,13 +109,19 @@ class GatewaysContainer(containers.DeclarativeContainer):
 
     query_planner = providers.Singleton(QueryPlanner)
 
+    metabolite_id_set_cache = providers.Singleton(MetaboliteIdSetCache)
+
     advanced_search_gateway = providers.Singleton(
         AdvancedSearchGateway,
         client=elasticsearch_client,
-        config=providers.Factory(AdvancedSearchConfiguration),
+        config=providers.Factory(
+            lambda values: AdvancedSearchConfiguration(**(values or {})),
+            config.database.elasticsearch.advanced_search,
+        ),
         planner=query_planner,
         index_registry=index_capabilities_registry,
         field_registry=field_registry,
+        id_set_cache=metabolite_id_set_cache,
     )
 
     mhd_file_base_url = providers.Callable(
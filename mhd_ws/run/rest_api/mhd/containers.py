@@ -13,6 +13,9 @@ from mhd_ws.application.services.interfaces.async_task.utils import (
     get_async_task_registry,
 )
 from mhd_ws.application.services.interfaces.cache_service import CacheService
+from mhd_ws.application.services.interfaces.dataset_indexing_port import (
+    DatasetIndexingPort,
+)
 from mhd_ws.domain.domain_services.configuration_generator import (
     create_config_from_dict,
 )
@@ -23,6 +26,11 @@ from mhd_ws.infrastructure.cache.redis_sentinel.redis_sentinel_impl import (
 from mhd_ws.infrastructure.pub_sub.celery.celery_impl import (
     CeleryAsyncTaskService,
 )
+from mhd_ws.infrastructure.search.indexing.tasks import (
+    DatasetIndexingConfiguration,
+    DebouncedDatasetIndexing,
+)
+from mhd_ws.infrastructure.search.search_cache import CachedAdvancedSearch
 from mhd_ws.presentation.rest_api.core.models import ApiServerConfiguration
 from mhd_ws.run.config import ModuleConfiguration
 from mhd_ws.run.rest_api.mhd.base_container import (
@@ -60,7 +68,7 @@ class MhdServicesContainer(containers.DeclarativeContainer):
         broker=gateways.pub_sub_broker,
         backend=gateways.pub_sub_backend,
         app_name="mhd",
-        queue_names=["submission"],
+        queue_names=["submission", "indexing"],
         async_task_registry=core.async_task_registry,
     )
     # async_task_service: AsyncTaskService = providers.Singleton(
@@ -82,6 +90,25 @@ class MhdServicesContainer(containers.DeclarativeContainer):
         ),
     )
 
+    dataset_indexing_service: DatasetIndexingPort = providers.Singleton(
+        DebouncedDatasetIndexing,
+        cache_service=cache_service,
+        async_task_service=async_task_service,
+        config=providers.Factory(
+            lambda values: DatasetIndexingConfiguration(**(values or {})),
+            config.dataset_indexing,
+        ),
+    )
+
+    advanced_search_service: CachedAdvancedSearch = providers.Singleton(
+        CachedAdvancedSearch,
+        delegate=gateways.advanced_search_gateway,
+        cache_service=cache_service,
+        ttl_in_seconds=config.search_cache.ttl_in_seconds,
+        enabled=config.search_cache.enabled,
+        id_set_cache=gateways.metabolite_id_set_cache,
+    )
+
     # authentication_service: AuthenticationService = providers.Singleton(
     #     MtblsWs2AuthenticationProxy,
     #     config=config.authentication.mtbls_ws2,
@@ -11,6 +11,9 @@ from mhd_ws.application.services.interfaces.async_task.utils import (
     get_async_task_registry,
 )
 from mhd_ws.application.services.interfaces.cache_service import CacheService
+from mhd_ws.application.services.interfaces.dataset_indexing_port import (
+    DatasetIndexingPort,
+)
 from mhd_ws.domain.domain_services.configuration_generator import (
     create_config_from_dict,
 )
@@ -21,6 +24,10 @@ from mhd_ws.infrastructure.cache.redis_sentinel.redis_sentinel_impl import (
 from mhd_ws.infrastructure.pub_sub.celery.celery_impl import (
     CeleryAsyncTaskService,
 )
+from mhd_ws.infrastructure.search.indexing.tasks import (
+    DatasetIndexingConfiguration,
+    DebouncedDatasetIndexing,
+)
 from mhd_ws.run.config import ModuleConfiguration
 from mhd_ws.run.rest_api.mhd.base_container import (
     GatewaysContainer,
@@ -53,7 +60,7 @@ class MhdWorkerServicesContainer(containers.DeclarativeContainer):
         broker=gateways.pub_sub_broker,
         backend=gateways.pub_sub_backend,
         app_name="mhd",
-        queue_names=["submission"],
+        queue_names=["submission", "indexing"],
         async_task_registry=core.async_task_registry,
     )
 
@@ -76,6 +83,15 @@ class MhdWorkerServicesContainer(containers.DeclarativeContainer):
             config=cache_config.redis_sentinel.connection,
         ),
     )
+    dataset_indexing_service: DatasetIndexingPort = providers.Singleton(
+        DebouncedDatasetIndexing,
+        cache_service=cache_service,
+        async_task_service=async_task_service,
+        config=providers.Factory(
+            lambda values: DatasetIndexingConfiguration(**(values or {})),
+            config.dataset_indexing,
+        ),
+    )
     # validation_override_service: ValidationOverrideService = providers.Singleton(
     #     FileSystemValidationOverrideService,
     #     file_object_repository=repositories.internal_files_object_repository,
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import os
 from logging.config import dictConfig
 from typing import Any, Sequence, Union
 
@@ -18,6 +19,9 @@ from mhd_ws.run.worker.mhd.containers import MhdWorkerApplicationContainer
 
 logger = None
 
+# Run e.g. MHD_WORKER_QUEUES=indexing for a worker dedicated to indexing.
+WORKER_QUEUES = os.getenv("MHD_WORKER_QUEUES", "submission,indexing")
+
 
 @setup_logging.connect()
 @inject
@@ -74,7 +78,9 @@ def get_worker_app(initial_container: MhdWorkerApplicationContainer):
 def get_celery_worker_app():
     initial_container = MhdWorkerApplicationContainer()
     update_container(
-        initial_container=initial_container, app_name="mhd", queue_names=["submission"]
+        initial_container=initial_container,
+        app_name="mhd",
+        queue_names=WORKER_QUEUES.split(","),
     )
     asyncio.run(initialization.init_application(test_async_task_service=False))
     return get_worker_app(initial_container)
@@ -86,7 +92,7 @@ def main():
         argv=[
             "worker",
             "-Q",
-            "submission",
+            WORKER_QUEUES,
             "--concurrency=1",
             "--loglevel=INFO",
         ]
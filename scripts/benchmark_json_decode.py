@@ -0,0 +1,160 @@
+"""Compare decode time and peak RSS of the JSON decoders used by load_json_file.
+
+Each (file, decoder) pair is measured in a fresh subprocess so peak RSS is
+not polluted by earlier runs. "legacy" is the previous read_text + json.loads
+path. Without --files, synthetic MS-profile-like files are generated.
+
+Usage: python scripts/benchmark_json_decode.py --sizes-mb 10 50 200 --json out.json
+"""
+
+import argparse
+import json
+import logging
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mhd_ws.infrastructure.search.indexing.utils import (
+    JSON_DECODERS,
+    load_json_file,
+    resolve_json_decoder,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+
+def write_synthetic_mhd(path: Path, size_mb: float) -> None:
+    """Write an MS-profile-shaped graph of roughly ``size_mb`` megabytes."""
+    target = int(size_mb * 2**20)
+    with path.open("w", encoding="utf-8") as fh:
+        fh.write('{"repository_identifier": "MTBLS0", "profile_uri": ')
+        fh.write('"https://example.org/ms-profile.json", "graph": {"nodes": [')
+        fh.write('{"id": "study-1", "type": "study", "title": "Synthetic study"}')
+        written, i = 0, 0
+        while written < target:
+            node = {
+                "id": f"mhd--sample--{i:08d}-5c1e-4a8e-9b0d-{i:012x}",
+                "type": "sample" if i % 3 else "raw-data-file",
+                "name": f"Sample {i} ångström",
+                "accession": f"EFO:{i % 9999:07d}",
+                "value": i * 0.125,
+                "tags": ["ms", "positive", None, True],
+            }
+            rel = {
+                "type": "relationship",
+                "source_ref": "study-1",
+                "relationship_name": "has-sample",
+                "target_ref": node["id"],
+            }
+            chunk = "," + json.dumps(node) + "," + json.dumps(rel)
+            fh.write(chunk)
+            written += len(chunk)
+            i += 1
+        fh.write("]}}")
+
+
+_LEGACY_MERGE_CONFLICT_RE = re.compile(r"^(<<<<<<<|=======|>>>>>>>)", re.MULTILINE)
+
+
+def _legacy_load(path: Path) -> dict:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if _LEGACY_MERGE_CONFLICT_RE.search(text):
+        raise ValueError("merge-conflict markers detected")
+    return json.loads(text)
+
+
+def _child(path: str, decoder: str, repeats: int) -> None:
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        if decoder == "legacy":
+            data = _legacy_load(Path(path))
+        else:
+            data = load_json_file(Path(path), decoder=decoder)
+        timings.append(time.perf_counter() - start)
+        del data
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    json.dump(
+        {
+            "seconds": min(timings),
+            "peak_rss_mb": rss_peak / 1024,
+            "delta_rss_mb": (rss_peak - rss_before) / 1024,
+        },
+        sys.stdout,
+    )
+
+
+def _measure(path: Path, decoder: str, repeats: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", str(path), decoder, str(repeats)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout)
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        _child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", nargs="*", type=Path, default=[])
+    parser.add_argument("--sizes-mb", nargs="*", type=float, default=[10, 50, 200])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", dest="json_file", default=None)
+    args = parser.parse_args()
+
+    decoders = ["legacy"]
+    for name in JSON_DECODERS:
+        try:
+            decoders.append(resolve_json_decoder(name))
+        except ValueError:
+            logger.info("Skipping %s (not installed)", name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = list(args.files)
+        if not files:
+            for size in args.sizes_mb:
+                path = Path(tmp) / f"synthetic-{size:g}mb.mhd.json"
+                write_synthetic_mhd(path, size)
+                files.append(path)
+
+        results = []
+        logger.info(
+            "%-28s %-8s %10s %14s %14s",
+            "file",
+            "decoder",
+            "decode (s)",
+            "peak RSS (MB)",
+            "+RSS (MB)",
+        )
+        for path in files:
+            size_mb = path.stat().st_size / 2**20
+            for decoder in decoders:
+                r = _measure(path, decoder, args.repeats)
+                r.update({"file": path.name, "size_mb": size_mb, "decoder": decoder})
+                results.append(r)
+                logger.info(
+                    "%-28s %-8s %10.3f %14.1f %14.1f",
+                    f"{path.name} ({size_mb:.0f} MB)",
+                    decoder,
+                    r["seconds"],
+                    r["peak_rss_mb"],
+                    r["delta_rss_mb"],
+                )
+
+    if args.json_file:
+        with open(args.json_file, "w", encoding="utf-8") as fh:  # noqa: PTH123
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
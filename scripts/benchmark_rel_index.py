@@ -0,0 +1,170 @@
+"""Compare memory and latency of the dict and CSR RelIndex backends.
+
+Usage: python scripts/benchmark_rel_index.py --samples 200000 --json out.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import random
+import statistics
+import time
+import tracemalloc
+
+from mhd_ws.infrastructure.search.indexing.graph_utils import (
+    REL_INDEX_BACKENDS,
+    rel_sources,
+    rel_targets,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+
+def _node_id(kind: str, i: int) -> str:
+    return f"mhd--{kind}--{i:08d}-5c1e-4a8e-9b0d-{i:012x}"
+
+
+def synthetic_relationships(
+    samples: int, files: int, metabolites: int, seed: int = 1
+) -> list[dict]:
+    """Build a study-shaped edge list: samples, files and metabolites."""
+    rnd = random.Random(seed)
+    study = _node_id("study", 0)
+    assay = _node_id("assay", 0)
+    cvs = [_node_id("characteristic-value", i) for i in range(200)]
+    rels = []
+
+    def rel(src: str, name: str, tgt: str) -> None:
+        rels.append(
+            {
+                "type": "relationship",
+                "source_ref": src,
+                "relationship_name": name,
+                "target_ref": tgt,
+            }
+        )
+
+    rel(study, "has-assay", assay)
+    for i in range(samples):
+        sample = _node_id("sample", i)
+        rel(study, "has-sample", sample)
+        rel(sample, "has-characteristic-value", rnd.choice(cvs))
+        rel(sample, "has-characteristic-value", rnd.choice(cvs))
+        rel(sample, "used-in", assay)
+    for i in range(files):
+        rel(assay, "has-raw-data-file", _node_id("raw-data-file", i))
+        rel(
+            _node_id("sample", rnd.randrange(max(samples, 1))),
+            "has-file",
+            _node_id("raw-data-file", i),
+        )
+    for i in range(metabolites):
+        met = _node_id("metabolite", i)
+        rel(study, "reports-metabolite", met)
+        rel(_node_id("metabolite-identifier", i), "identifier-of", met)
+    return rels
+
+
+def _measure_build(backend: str, rels: list[dict], repeats: int):
+    build = REL_INDEX_BACKENDS[backend]
+    timings = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        build(rels)
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    relidx = build(rels)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return relidx, statistics.median(timings), retained, peak
+
+
+def _measure_lookups(relidx, queries: dict[str, list[tuple[str, str]]]) -> float:
+    start = time.perf_counter()
+    for node_id, name in queries["targets"]:
+        rel_targets(relidx, node_id, name)
+    for node_id, name in queries["sources"]:
+        rel_sources(relidx, node_id, name)
+    n = len(queries["targets"]) + len(queries["sources"])
+    return (time.perf_counter() - start) / n
+
+
+def run(args: argparse.Namespace) -> dict:
+    rels = synthetic_relationships(args.samples, args.files, args.metabolites)
+    # Builders look each (node, relationship) pair up about once, so sample
+    # distinct pairs rather than edges (which would over-weight hub nodes).
+    rnd = random.Random(2)
+    forward = list({(r["source_ref"], r["relationship_name"]) for r in rels})
+    reverse = list({(r["target_ref"], r["relationship_name"]) for r in rels})
+    forward.sort()
+    reverse.sort()
+    queries = {
+        "targets": rnd.sample(forward, min(args.lookups, len(forward))),
+        "sources": rnd.sample(reverse, min(args.lookups, len(reverse))),
+    }
+    results = {
+        "edges": len(rels),
+        "lookups": len(queries["targets"]) + len(queries["sources"]),
+        "backends": {},
+    }
+    indexes = {}
+    for backend in REL_INDEX_BACKENDS:
+        relidx, build_s, retained, peak = _measure_build(backend, rels, args.repeats)
+        indexes[backend] = relidx
+        results["backends"][backend] = {
+            "build_seconds": round(build_s, 4),
+            "retained_bytes": retained,
+            "peak_bytes": peak,
+            "lookup_microseconds": round(_measure_lookups(relidx, queries) * 1e6, 3),
+        }
+    dict_index, csr_index = indexes["dict"], indexes["csr"]
+    for lookup, pairs in (
+        (rel_targets, queries["targets"]),
+        (rel_sources, queries["sources"]),
+    ):
+        for node_id, name in pairs:
+            if lookup(csr_index, node_id, name) != lookup(dict_index, node_id, name):
+                raise AssertionError(f"backends disagree for {node_id!r} {name!r}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--metabolites", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", dest="json_file", default=None)
+    args = parser.parse_args()
+
+    results = run(args)
+    logger.info("%d edges, %d lookups", results["edges"], results["lookups"])
+    logger.info(
+        "%-6s %10s %14s %14s %12s",
+        "index",
+        "build (s)",
+        "retained (MB)",
+        "peak (MB)",
+        "lookup (us)",
+    )
+    for backend, r in results["backends"].items():
+        logger.info(
+            "%-6s %10.3f %14.1f %14.1f %12.3f",
+            backend,
+            r["build_seconds"],
+            r["retained_bytes"] / 2**20,
+            r["peak_bytes"] / 2**20,
+            r["lookup_microseconds"],
+        )
+    if args.json_file:
+        with open(args.json_file, "w", encoding="utf-8") as fh:  # noqa: PTH123
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -139,3 +139,31 @@ class TestEdgeCases:
         )
         spec = resolver.resolve(dto)
         assert spec.clauses[0].negated is True
+
+
+class TestFacetSelection:
+    def test_all_facets_by_default(self, resolver: SearchSpecResolver) -> None:
+        spec = resolver.resolve(SearchRequestDTO())
+
+        assert spec.facets.keys is None
+        assert spec.facets.includes("organisms")
+
+    def test_none_and_listed_facets(self, resolver: SearchSpecResolver) -> None:
+        none = resolver.resolve(SearchRequestDTO(facets="none"))
+        listed = resolver.resolve(
+            SearchRequestDTO(
+                facets=["diseases", "organisms", "diseases"],
+                facet_sizes={"organisms": 100},
+            )
+        )
+
+        assert none.facets.keys == []
+        assert not none.facets.includes("organisms")
+        assert listed.facets.keys == ["diseases", "organisms"]
+        assert listed.facets.sizes == {"organisms": 100}
+
+    def test_unknown_facet_key_raises(self, resolver: SearchSpecResolver) -> None:
+        with pytest.raises(ValueError, match="Unknown facet key"):
+            resolver.resolve(SearchRequestDTO(facets=["organism"]))
+        with pytest.raises(ValueError, match="Unknown facet key"):
+            resolver.resolve(SearchRequestDTO(facet_sizes={"title": 5}))
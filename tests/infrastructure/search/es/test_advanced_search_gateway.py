@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from mhd_ws.domain.domain_services.query_planner import QueryPlanner
+from mhd_ws.domain.entities.search.index_search_spec import (
+    FacetSelection,
+    FieldRef,
+    ParameterPairClauseSpec,
+    SearchSpec,
+    Target,
+    TermClauseSpec,
+    ValueType,
+)
+from mhd_ws.domain.entities.search.registries.field_registry import FIELD_REGISTRY
+from mhd_ws.domain.entities.search.registries.index_capability_registry import (
+    build_index_capabilities,
+)
+from mhd_ws.domain.entities.search.stages import MetaboliteIdStage, QueryPlan
+from mhd_ws.infrastructure.search.es.advanced_search_gateway import (
+    AdvancedSearchGateway,
+)
+from mhd_ws.infrastructure.search.es.es_configuration import (
+    AdvancedSearchConfiguration,
+)
+
+
+class FakeSearchClient:
+    def __init__(self, responses: list[dict[str, Any]] | None = None) -> None:
+        self.bodies: list[tuple[str, dict[str, Any]]] = []
+        self.responses = responses or []
+
+    async def search(self, index, body, api_key_name=None) -> dict[str, Any]:
+        self.bodies.append((index, body))
+        if self.responses:
+            return self.responses.pop(0)
+        return {"hits": {"total": {"value": 0}, "hits": []}, "aggregations": {}}
+
+
+def make_gateway(
+    client: FakeSearchClient, config: AdvancedSearchConfiguration | None = None
+) -> AdvancedSearchGateway:
+    return AdvancedSearchGateway(
+        client=client,
+        config=config or AdvancedSearchConfiguration(),
+        planner=QueryPlanner(),
+        index_registry=build_index_capabilities(),
+        field_registry=FIELD_REGISTRY,
+    )
+
+
+def title_spec(*terms: str) -> SearchSpec:
+    return SearchSpec(
+        clauses=[
+            TermClauseSpec(
+                field=FieldRef(
+                    field_key="dataset.title",
+                    target=Target.DATASET,
+                    value_type=ValueType.TEXT,
+                ),
+                combine_within_field="OR",
+                terms=list(terms),
+            )
+        ]
+    )
+
+
+def metabolite_spec(*names: str, dataset_terms: list[str] | None = None):
+    clauses = [
+        TermClauseSpec(
+            field=FieldRef(
+                field_key="metabolite.name",
+                target=Target.METABOLITE,
+                value_type=ValueType.TEXT,
+            ),
+            combine_within_field="OR",
+            terms=list(names),
+        )
+    ]
+    if dataset_terms:
+        clauses.extend(title_spec(*dataset_terms).clauses)
+    return SearchSpec(clauses=clauses)
+
+
+class PartitionedSearchClient(FakeSearchClient):
+    """Answers partition aggs with ``ids[partition]`` and tracks how many
+    searches run at once."""
+
+    def __init__(self, ids: list[list[str]]) -> None:
+        super().__init__()
+        self.ids = ids
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def search(self, index, body, api_key_name=None) -> dict[str, Any]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        terms = body.get("aggs", {}).get("dataset_ids", {}).get("terms")
+        if terms is None:
+            return await super().search(index, body, api_key_name)
+        self.bodies.append((index, body))
+        partition = terms["include"]["partition"]
+        buckets = [{"key": id_} for id_ in self.ids[partition][: terms["size"]]]
+        return {"aggregations": {"dataset_ids": {"buckets": buckets}}}
+
+
+@pytest.mark.asyncio
+async def test_metabolite_partitions_are_fetched_concurrently_and_merged():
+    ids = [[f"ms::MTBLS{p}{i}" for i in range(3)] for p in range(6)]
+    client = PartitionedSearchClient(ids)
+    config = AdvancedSearchConfiguration(
+        metabolite_partitions=6, metabolite_concurrency=2
+    )
+
+    await make_gateway(client, config).advanced_search(metabolite_spec("cholesterol"))
+
+    partition_bodies = [b for _, b in client.bodies if b.get("size") == 0]
+    assert sorted(
+        b["aggs"]["dataset_ids"]["terms"]["include"]["partition"]
+        for b in partition_bodies
+    ) == list(range(6))
+    assert client.max_in_flight == 2
+    _, dataset_body = client.bodies[-1]
+    [id_filter] = dataset_body["query"]["bool"]["filter"]
+    [filtered_ids] = id_filter["terms"].values()
+    assert sorted(filtered_ids) == sorted(id_ for partition in ids for id_ in partition)
+
+
+class MaxIdsPlanner(QueryPlanner):
+    """Plans like ``QueryPlanner`` with a lower metabolite-stage ID cap."""
+
+    def __init__(self, max_ids: int) -> None:
+        self.max_ids = max_ids
+
+    def plan(self, spec: SearchSpec) -> QueryPlan:
+        plan = super().plan(spec)
+        for stage in plan.stages:
+            if isinstance(stage, MetaboliteIdStage):
+                stage.output.max_ids = self.max_ids
+        return plan
+
+
+@pytest.mark.asyncio
+async def test_partitioned_ids_are_cut_to_the_lowest_max_ids():
+    client = PartitionedSearchClient([["ms::a", "ms::d"], ["ms::b", "ms::c"]])
+    gateway = AdvancedSearchGateway(
+        client=client,
+        config=AdvancedSearchConfiguration(metabolite_partitions=2),
+        planner=MaxIdsPlanner(max_ids=3),
+        index_registry=build_index_capabilities(),
+        field_registry=FIELD_REGISTRY,
+    )
+
+    await gateway.advanced_search(metabolite_spec("cholesterol"))
+
+    partition_bodies = [b for _, b in client.bodies if b.get("size") == 0]
+    assert len(partition_bodies) == 2
+    _, dataset_body = client.bodies[-1]
+    [id_filter] = dataset_body["query"]["bool"]["filter"]
+    [filtered_ids] = id_filter["terms"].values()
+    assert sorted(filtered_ids) == ["ms::a", "ms::b", "ms::c"]
+
+
+@pytest.mark.asyncio
+async def test_hits_leave_out_search_text_and_debug():
+    client = FakeSearchClient(
+        [
+            {
+                "hits": {
+                    "total": {"value": 1},
+                    "hits": [{"_id": "ms::MTBLS1", "_score": 1.0, "_source": {}}],
+                },
+            }
+        ]
+    )
+
+    result = await make_gateway(client).advanced_search(title_spec("cancer"))
+
+    _, body = client.bodies[0]
+    assert body["_source"] == {"excludes": ["search_text", "debug"]}
+    assert result.results == [{"_id": "ms::MTBLS1", "_score": 1.0}]
+
+
+@pytest.mark.asyncio
+async def test_source_excludes_can_be_turned_off():
+    client = FakeSearchClient()
+    config = AdvancedSearchConfiguration(source_excludes=())
+
+    await make_gateway(client, config).advanced_search(title_spec("cancer"))
+
+    _, body = client.bodies[0]
+    assert "_source" not in body
+
+
+class MultiSearchClient(FakeSearchClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.msearches: list[list[dict[str, Any]]] = []
+
+    async def msearch(self, index, body, api_key_name=None) -> dict[str, Any]:
+        self.msearches.append(body)
+        bodies = body[1::2]
+        return {
+            "responses": [
+                {
+                    "hits": {"total": {"value": 3}, "hits": []},
+                    "aggregations": {
+                        name: {"buckets": [{"key": name, "doc_count": 1}]}
+                        for name in b.get("aggs", {})
+                    },
+                }
+                for b in bodies
+            ]
+        }
+
+
+def faceted_spec() -> SearchSpec:
+    spec = title_spec("cancer")
+    spec.clauses.append(
+        ParameterPairClauseSpec(
+            type_name="column type", values=["C18"], include_facet=True
+        )
+    )
+    return spec
+
+
+@pytest.mark.asyncio
+async def test_msearch_mode_splits_hits_from_aggregation_groups():
+    client = MultiSearchClient()
+    config = AdvancedSearchConfiguration(
+        dataset_stage_mode="msearch", track_total_hits=True
+    )
+
+    result = await make_gateway(client, config).advanced_search(faceted_spec())
+
+    [searches] = client.msearches
+    headers, bodies = searches[0::2], searches[1::2]
+    assert headers == [{"index": "dataset_ms_v1"}] * 3
+    hits_body, facet_body, group_body = bodies
+    assert "aggs" not in hits_body
+    assert hits_body["track_total_hits"] is True
+    assert facet_body["size"] == group_body["size"] == 0
+    assert facet_body["track_total_hits"] is False
+    assert facet_body["query"] == hits_body["query"]
+    assert list(group_body["aggs"]) == ["param__column type"]
+    assert result.total_results == 3
+    assert "param__column type" in result.facets
+    assert set(facet_body["aggs"]) <= set(result.facets)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_mode_sends_one_search_per_group():
+    client = FakeSearchClient()
+    config = AdvancedSearchConfiguration(dataset_stage_mode="concurrent")
+
+    await make_gateway(client, config).advanced_search(faceted_spec())
+
+    assert len(client.bodies) == 3
+    assert "aggs" not in client.bodies[0][1]
+    assert all(body["size"] == 0 for _, body in client.bodies[1:])
+
+
+@pytest.mark.asyncio
+async def test_msearch_sub_search_errors_are_raised():
+    client = MultiSearchClient()
+
+    async def failing(index, body, api_key_name=None):
+        return {"responses": [{"error": {"type": "too_many_buckets_exception"}}]}
+
+    client.msearch = failing
+    config = AdvancedSearchConfiguration(dataset_stage_mode="msearch")
+
+    with pytest.raises(RuntimeError, match="too_many_buckets"):
+        await make_gateway(client, config).advanced_search(faceted_spec())
+
+
+def test_unknown_dataset_stage_mode_is_rejected():
+    with pytest.raises(ValueError, match="Unknown dataset stage mode"):
+        AdvancedSearchConfiguration(dataset_stage_mode="parallel")
+
+
+@pytest.mark.asyncio
+async def test_only_selected_facets_are_compiled():
+    client = FakeSearchClient()
+    gateway = make_gateway(client)
+    paging = title_spec("cancer")
+    paging.facets = FacetSelection(keys=[])
+    selected = title_spec("cancer")
+    selected.facets = FacetSelection(
+        keys=["diseases", "organisms"], sizes={"organisms": 100}
+    )
+
+    await gateway.advanced_search(paging)
+    await gateway.advanced_search(selected)
+    await gateway.advanced_search(title_spec("cancer"))
+
+    (_, paging_body), (_, selected_body), (_, all_body) = client.bodies
+    assert "aggs" not in paging_body
+    assert set(selected_body["aggs"]) == {"diseases", "organisms"}
+    assert selected_body["aggs"]["organisms"]["terms"]["size"] == 100
+    assert selected_body["aggs"]["diseases"]["terms"]["size"] == 25
+    assert len(all_body["aggs"]) > 2
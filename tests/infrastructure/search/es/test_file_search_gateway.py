@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pytest
+
+from mhd_ws.domain.entities.search.index_search import (
+    FilterModel,
+    PageModel,
+    SortModel,
+)
+from mhd_ws.infrastructure.search.es.es_configuration import FileSearchConfiguration
+from mhd_ws.infrastructure.search.es.file_search_gateway import (
+    ElasticsearchFileSearchGateway,
+)
+
+from .test_advanced_search_gateway import FakeSearchClient
+
+
+def make_file_gateway(client: FakeSearchClient) -> ElasticsearchFileSearchGateway:
+    return ElasticsearchFileSearchGateway(
+        client=client, config=FileSearchConfiguration(index_name="files")
+    )
+
+
+@pytest.mark.asyncio
+async def test_lists_files_of_a_dataset_with_facets_and_stable_pages():
+    client = FakeSearchClient(
+        [
+            {
+                "hits": {
+                    "total": {"value": 120_000},
+                    "hits": [
+                        {
+                            "_id": "ms::MTBLS1::file::f-1",
+                            "_score": None,
+                            "_source": {"name": "run1.mzML"},
+                        }
+                    ],
+                },
+                "aggregations": {
+                    "extension": {"buckets": [{"key": ".mzml", "doc_count": 120_000}]}
+                },
+            }
+        ]
+    )
+
+    result = await make_file_gateway(client).search(
+        filters=[FilterModel(field="dataset_id", values=["ms::MTBLS1"])],
+        page=PageModel(current=500, size=200),
+    )
+
+    assert result.total_results == 120_000
+    assert result.results[0]["name"] == "run1.mzML"
+    assert result.facets["extension"].data[0].value == ".mzml"
+    [(index, body)] = client.bodies
+    assert index == "files"
+    assert body["query"] == {
+        "bool": {"filter": [{"terms": {"dataset_id": ["ms::MTBLS1"]}}]}
+    }
+    assert body["from"] == 99_800
+    assert body["sort"][-1] == {"id": {"order": "asc"}}
+    assert set(body["aggs"]) == {"file_type", "extension", "format", "repository"}
+
+
+@pytest.mark.asyncio
+async def test_sort_and_filter_names_are_validated():
+    gateway = make_file_gateway(FakeSearchClient())
+
+    with pytest.raises(ValueError, match="Unknown file filter"):
+        await gateway.search(filters=[FilterModel(field="search_text", values=["x"])])
+    with pytest.raises(ValueError, match="Cannot sort files"):
+        await gateway.search(sort=SortModel(field="urls"))
+    with pytest.raises(ValueError, match="paged through"):
+        await gateway.search(page=PageModel(current=1001, size=200))
+
+
+@pytest.mark.asyncio
+async def test_sort_on_a_field_keeps_the_id_tiebreak():
+    client = FakeSearchClient()
+
+    await make_file_gateway(client).search(
+        search_text="mzML", sort=SortModel(field="name", direction="desc")
+    )
+
+    [(_, body)] = client.bodies
+    assert body["sort"] == [{"name": {"order": "desc"}}, {"id": {"order": "asc"}}]
+    assert body["query"]["bool"]["must"][0]["multi_match"]["query"] == "mzML"
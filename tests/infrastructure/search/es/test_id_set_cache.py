@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import pytest
+
+from mhd_ws.domain.domain_services.query_planner import QueryPlanner
+from mhd_ws.domain.entities.search.index_search import PageModel
+from mhd_ws.domain.entities.search.registries.field_registry import FIELD_REGISTRY
+from mhd_ws.domain.entities.search.registries.index_capability_registry import (
+    build_index_capabilities,
+)
+from mhd_ws.infrastructure.search.es.advanced_search_gateway import (
+    AdvancedSearchGateway,
+)
+from mhd_ws.infrastructure.search.es.es_configuration import (
+    AdvancedSearchConfiguration,
+)
+from mhd_ws.infrastructure.search.es.id_set_cache import (
+    CompactIdSet,
+    MetaboliteIdSetCache,
+)
+
+from .test_advanced_search_gateway import FakeSearchClient, metabolite_spec
+
+
+def composite_response(*ids: str) -> dict:
+    return {
+        "aggregations": {
+            "dataset_ids": {"buckets": [{"key": {"dataset_id": i}} for i in ids]}
+        }
+    }
+
+
+def test_compact_set_round_trips_numbered_padded_and_other_ids():
+    ids = {
+        "ms::MTBLS1",
+        "ms::MTBLS2",
+        "ms::MTBLS13000",
+        "ms::ST000042",
+        "ms::ST000101",
+        "ms::MSV000079514",
+        "ms::legacy-id",
+        "0",
+    }
+
+    id_set = CompactIdSet(ids)
+
+    assert set(id_set) == ids
+    assert len(id_set) == len(ids)
+
+
+def test_dense_ids_are_stored_smaller_than_strings():
+    ids = [f"ms::MTBLS{i}" for i in range(1, 50_001)]
+
+    id_set = CompactIdSet(ids)
+
+    assert set(id_set) == set(ids)
+    # One bit per ID instead of a ~60 byte string.
+    assert id_set.nbytes < 10_000
+
+
+def test_cache_is_bounded_and_cleared_by_a_new_generation():
+    one = CompactIdSet(f"ms::MTBLS{i}" for i in range(0, 20_000, 7))
+    cache = MetaboliteIdSetCache(max_bytes=one.nbytes * 2 + 1)
+    cache.observe_generation("g1")
+
+    for key in ("a", "b", "c"):
+        cache.put(key, one)
+
+    assert cache.get("a") is None
+    assert cache.get("c") is one
+    assert cache.evictions == 1
+    assert cache.nbytes <= cache.max_bytes
+
+    cache.observe_generation("g1")
+    assert len(cache) == 2
+    cache.observe_generation("g2")
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+@pytest.mark.asyncio
+async def test_later_pages_and_refinements_reuse_the_metabolite_ids():
+    client = FakeSearchClient([composite_response("ms::MTBLS1", "ms::MTBLS7")])
+    cache = MetaboliteIdSetCache()
+    gateway = AdvancedSearchGateway(
+        client=client,
+        config=AdvancedSearchConfiguration(metabolite_partitions=1),
+        planner=QueryPlanner(),
+        index_registry=build_index_capabilities(),
+        field_registry=FIELD_REGISTRY,
+        id_set_cache=cache,
+    )
+
+    await gateway.advanced_search(metabolite_spec("glucose"))
+    await gateway.advanced_search(metabolite_spec("glucose"), page=PageModel(current=2))
+    await gateway.advanced_search(metabolite_spec("glucose", dataset_terms=["cancer"]))
+
+    metabolite_requests = [body for _, body in client.bodies if body.get("size") == 0]
+    dataset_requests = [body for _, body in client.bodies if "sort" in body]
+    assert len(metabolite_requests) == 1
+    assert len(dataset_requests) == 3
+    for body in dataset_requests:
+        [id_filter] = [f for f in body["query"]["bool"]["filter"] if "terms" in f]
+        assert sorted(next(iter(id_filter["terms"].values()))) == [
+            "ms::MTBLS1",
+            "ms::MTBLS7",
+        ]
+    assert cache.hits == 2
+    assert cache.misses == 1
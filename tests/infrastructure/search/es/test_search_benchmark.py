@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from mhd_ws.domain.entities.search.index_search import IndexSearchResult
+from mhd_ws.domain.entities.search.index_search_spec import SearchSpec
+from mhd_ws.infrastructure.search.es.es_configuration import (
+    AdvancedSearchConfiguration,
+)
+from mhd_ws.infrastructure.search.es.search_benchmark import benchmark_search_modes
+from mhd_ws.run.cli.indexing.benchmark_search import load_benchmark_queries
+
+from .test_advanced_search_gateway import FakeSearchClient, make_gateway
+
+
+class CountingGateway:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.calls = 0
+
+    async def advanced_search(self, spec, page=None, sort=None):
+        self.calls += 1
+        return IndexSearchResult(total_results=self.total)
+
+
+@pytest.mark.asyncio
+async def test_each_mode_runs_every_query_and_mismatches_are_reported():
+    gateways = {"combined": CountingGateway(5), "msearch": CountingGateway(4)}
+    queries = [(SearchSpec(query_text="a"), None, None)] * 2
+
+    results = await benchmark_search_modes(
+        gateways.__getitem__, queries, modes=list(gateways), repeats=3, warmup=1
+    )
+
+    assert [g.calls for g in gateways.values()] == [8, 8]
+    assert set(results["modes"]) == {"combined", "msearch"}
+    assert results["queries"] == 2
+    assert results["mismatches"] == [0, 1]
+    assert results["per_query"][0]["total_results"] == 5
+
+
+@pytest.mark.asyncio
+async def test_split_modes_match_the_combined_mode(tmp_path: Path):
+    queries_file = tmp_path / "queries.json"
+    queries_file.write_text(
+        json.dumps(
+            [
+                {"query_text": "cancer"},
+                {
+                    "clauses": [
+                        {
+                            "kind": "parameter_pair",
+                            "type_name": "column type",
+                            "values": ["C18"],
+                            "include_facet": True,
+                        }
+                    ],
+                    "page": {"current": 2, "size": 10},
+                },
+            ]
+        )
+    )
+    client = FakeSearchClient()
+
+    async def msearch(index, body, api_key_name=None):
+        return {"responses": [await client.search(index, b) for b in body[1::2]]}
+
+    client.msearch = msearch
+
+    def gateway(mode: str):
+        return make_gateway(
+            client, AdvancedSearchConfiguration(dataset_stage_mode=mode)
+        )
+
+    results = await benchmark_search_modes(
+        gateway, load_benchmark_queries(queries_file), repeats=1, warmup=0
+    )
+
+    assert set(results["modes"]) == {"combined", "msearch", "concurrent"}
+    assert results["mismatches"] == []
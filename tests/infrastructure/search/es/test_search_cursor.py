@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import base64
+import json
+import time
+from typing import Any
+
+import pytest
+
+from mhd_ws.domain.entities.search.index_search import PageModel, SortModel
+from mhd_ws.infrastructure.search.es.es_configuration import (
+    AdvancedSearchConfiguration,
+)
+from mhd_ws.infrastructure.search.es.search_cursor import (
+    SearchCursor,
+    decode_cursor,
+    encode_cursor,
+    search_fingerprint,
+)
+
+from .test_advanced_search_gateway import FakeSearchClient, make_gateway, title_spec
+
+
+class PitSearchClient(FakeSearchClient):
+    """Serves ``docs`` sorted by score, then ``_shard_doc``, after the
+    ``search_after`` of each body."""
+
+    def __init__(self, scores: list[float]) -> None:
+        super().__init__()
+        self.docs = [(score, n) for n, score in enumerate(scores)]
+        self.opened: list[str] = []
+        self.closed: list[str] = []
+
+    async def open_point_in_time(self, index, keep_alive, api_key_name=None) -> str:
+        self.opened.append(index)
+        return f"pit-{len(self.opened)}"
+
+    async def close_point_in_time(self, pit_id, api_key_name=None) -> None:
+        self.closed.append(pit_id)
+
+    async def search(self, index, body, api_key_name=None) -> dict[str, Any]:
+        self.bodies.append((index, body))
+        ordered = sorted(self.docs, key=lambda d: (-d[0], d[1]))
+        if "search_after" in body:
+            score, doc = body["search_after"]
+            ordered = [d for d in ordered if (-d[0], d[1]) > (-score, doc)]
+        hits = [
+            {"_id": f"ms::MTBLS{doc}", "_source": {}, "sort": [score, doc]}
+            for score, doc in ordered[: body["size"]]
+        ]
+        return {
+            "pit_id": body["pit"]["id"] + "+",
+            "hits": {"total": {"value": len(self.docs)}, "hits": hits},
+            "aggregations": {},
+        }
+
+
+KEY = b"cursor-key"
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    cursor = SearchCursor("pit-1", [1.5, 3], "abc", 1700000000.25)
+
+    assert decode_cursor(encode_cursor(cursor, KEY), KEY) == cursor
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        decode_cursor("not-a-cursor", KEY)
+
+
+def test_cursor_with_a_rewritten_payload_or_another_key_is_rejected():
+    token = encode_cursor(SearchCursor("pit-1", None, "abc", 1700000000.0), KEY)
+    payload, signature = token.split(".")
+    data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    data["t"] = time.time()
+    forged_payload = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        decode_cursor(f"{forged_payload.rstrip('=')}.{signature}", KEY)
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        decode_cursor(token, b"other-key")
+
+
+def test_fingerprint_ignores_facets_but_not_sort():
+    spec = title_spec("cancer")
+    no_facets = title_spec("cancer")
+    no_facets.facets.keys = []
+
+    assert search_fingerprint(spec, None) == search_fingerprint(no_facets, None)
+    assert search_fingerprint(spec, None) != search_fingerprint(
+        spec, SortModel(field="dataset.title")
+    )
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_walk_every_hit_once_and_close_the_pit():
+    # Ties in score are broken by _shard_doc.
+    client = PitSearchClient([1.0, 2.0, 2.0, 0.5, 2.0])
+    gateway = make_gateway(client, AdvancedSearchConfiguration(cursor_secret="key"))
+    spec = title_spec("cancer")
+
+    ids: list[str] = []
+    token = "*"
+    while token is not None:
+        result = await gateway.advanced_search(
+            spec, page=PageModel(size=2, cursor=token)
+        )
+        ids.extend(hit["_id"] for hit in result.results)
+        token = result.next_cursor
+
+    assert ids == [f"ms::MTBLS{n}" for n in (1, 2, 4, 0, 3)]
+    assert len(client.opened) == 1
+    assert client.closed == ["pit-1+++"]
+    first, second = (body for _, body in client.bodies[:2])
+    assert all(index is None for index, _ in client.bodies)
+    assert "from" not in first and "search_after" not in first
+    assert first["sort"][-1] == {"_shard_doc": "asc"}
+    assert second["pit"] == {"id": "pit-1+", "keep_alive": "2m"}
+    assert second["search_after"] == [2.0, 2]
+
+
+@pytest.mark.asyncio
+async def test_cursor_paging_is_off_without_a_secret():
+    client = PitSearchClient([1.0])
+    gateway = make_gateway(client)
+
+    with pytest.raises(ValueError, match="not enabled"):
+        await gateway.advanced_search(
+            title_spec("cancer"), page=PageModel(size=1, cursor="*")
+        )
+    assert client.opened == []
+
+
+@pytest.mark.asyncio
+async def test_cursor_of_another_search_or_too_old_is_rejected():
+    client = PitSearchClient([1.0, 2.0, 3.0])
+    gateway = make_gateway(
+        client,
+        AdvancedSearchConfiguration(cursor_max_lifetime_s=60, cursor_secret="key"),
+    )
+    spec = title_spec("cancer")
+    first = await gateway.advanced_search(spec, page=PageModel(size=1, cursor="*"))
+
+    with pytest.raises(ValueError, match="different query"):
+        await gateway.advanced_search(
+            title_spec("diabetes"), page=PageModel(size=1, cursor=first.next_cursor)
+        )
+
+    stale = decode_cursor(first.next_cursor, b"key")
+    stale = SearchCursor(
+        stale.pit_id, stale.search_after, stale.fingerprint, time.time() - 61
+    )
+    with pytest.raises(ValueError, match="older than 60 s"):
+        await gateway.advanced_search(
+            spec, page=PageModel(size=1, cursor=encode_cursor(stale, b"key"))
+        )
+    assert client.closed == ["pit-1+"]
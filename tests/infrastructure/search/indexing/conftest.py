@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy.pool import NullPool
+
+from mhd_ws.infrastructure.persistence.db import Base
+from mhd_ws.infrastructure.persistence.db.mhd import (
+    AnnouncementFile,
+    Dataset,
+    DatasetRevision,
+    DatasetRevisionStatus,
+    DatasetStatus,
+    Repository,
+)
+from mhd_ws.infrastructure.persistence.db.sqlite.db_client_impl import (
+    SQLiteDatabaseClientImpl,
+)
+
+
+def make_mhd_graph(accession: str, metabolites: int = 2) -> dict[str, Any]:
+    nodes: list[dict[str, Any]] = [
+        {"id": "study-1", "type": "study", "title": f"Study {accession}"},
+        {"id": "assay-1", "type": "assay", "assay_type_ref": "desc-1"},
+        {"id": "desc-1", "type": "descriptor", "name": "LC-MS"},
+        {"id": "sample-1", "type": "sample", "name": "S1"},
+        {"id": "file-1", "type": "raw-data-file", "name": "run1.mzML"},
+        {"id": "cd-1", "type": "characteristic-definition", "name": "organism"},
+        {
+            "id": "cv-1",
+            "type": "characteristic-value",
+            "name": "Homo sapiens",
+            "accession": "NCBITaxon:9606",
+        },
+    ]
+    relationships: list[dict[str, Any]] = [
+        {
+            "type": "relationship",
+            "source_ref": "study-1",
+            "target_ref": "cd-1",
+            "relationship_name": "has-characteristic-definition",
+        },
+        {
+            "type": "relationship",
+            "source_ref": "cv-1",
+            "target_ref": "cd-1",
+            "relationship_name": "instance-of",
+        },
+    ]
+    for i in range(metabolites):
+        nodes.append(
+            {"id": f"met-{i}", "type": "metabolite", "name": f"metabolite {i}"}
+        )
+        nodes.append(
+            {
+                "id": f"ident-{i}",
+                "type": "metabolite-identifier",
+                "source": "CHEBI",
+                "accession": f"CHEBI:{i}",
+            }
+        )
+        relationships.append(
+            {
+                "type": "relationship",
+                "source_ref": f"ident-{i}",
+                "target_ref": f"met-{i}",
+                "relationship_name": "identifier-of",
+            }
+        )
+    return {
+        "repository_name": "MetaboLights",
+        "repository_identifier": accession,
+        "profile_uri": "https://example.org/ms-profile.json",
+        "graph": {
+            "start_item_refs": ["study-1"],
+            "nodes": nodes,
+            "relationships": relationships,
+        },
+    }
+
+
+def write_mhd_file(directory: Path, accession: str, **kwargs: Any) -> Path:
+    path = directory / f"{accession}.mhd.json"
+    path.write_text(json.dumps(make_mhd_graph(accession, **kwargs)), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def mhd_files(tmp_path: Path) -> list[Path]:
+    files = [write_mhd_file(tmp_path, f"MTBLS{i}") for i in range(1, 6)]
+    broken = tmp_path / "MTBLS99.mhd.json"
+    broken.write_text("{not json", encoding="utf-8")
+    return sorted([*files, broken])
+
+
+NOW = datetime.datetime(2024, 6, 1)
+
+
+async def _add_dataset(
+    session, accession: str, revisions: int, status=DatasetStatus.PUBLIC
+) -> None:
+    dataset = Dataset(
+        accession=accession,
+        dataset_repository_identifier=accession,
+        repository_id=1,
+        status=status,
+        revision=revisions,
+        created_at=NOW,
+    )
+    session.add(dataset)
+    for revision in range(1, revisions + 1):
+        file = AnnouncementFile(
+            dataset=dataset,
+            hash_sha256=f"{accession}-{revision}",
+            schema_uri="schema",
+            profile_uri="profile",
+            created_at=NOW,
+            file={
+                "mhd_metadata_file_url": (
+                    f"https://example.org/r{revision}/{accession}.mhd.json"
+                )
+            },
+        )
+        session.add(
+            DatasetRevision(
+                dataset=dataset,
+                file=file,
+                revision=revision,
+                revision_datetime=NOW,
+                task_id="task",
+                description="test",
+                created_at=NOW,
+                status=DatasetRevisionStatus.VALID,
+            )
+        )
+
+
+async def _seed(client: SQLiteDatabaseClientImpl) -> None:
+    async with client.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with client.session() as session:
+        session.add(
+            Repository(
+                id=1,
+                name="MetaboLights",
+                short_name="MTBLS",
+                description="",
+                join_datetime=NOW,
+            )
+        )
+        for i in range(1, 6):
+            await _add_dataset(session, f"MTBLS{i}", revisions=1 + i % 2)
+        await _add_dataset(session, "MTBLS9", 1, status=DatasetStatus.PRIVATE)
+        await session.commit()
+    # Tests use the client from their own event loop.
+    await client.engine.dispose()
+
+
+@pytest.fixture
+def db_client(tmp_path: Path) -> SQLiteDatabaseClientImpl:
+    # No pooling: connections (and their threads) end with each session.
+    client = SQLiteDatabaseClientImpl(
+        {"file_path": str(tmp_path / "mhd.db")}, poolclass=NullPool
+    )
+    asyncio.run(_seed(client))
+    return client
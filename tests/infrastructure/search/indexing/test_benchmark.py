@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from mhd_ws.infrastructure.search.indexing.benchmark.compare import compare_results
+from mhd_ws.infrastructure.search.indexing.benchmark.runner import (
+    STAGES,
+    BenchmarkOptions,
+    run_benchmark,
+)
+from mhd_ws.infrastructure.search.indexing.benchmark.synthetic import (
+    SyntheticGraphSpec,
+    make_synthetic_mhd,
+)
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    build_legacy_dataset_doc,
+)
+from mhd_ws.infrastructure.search.indexing.metabolite_builder import (
+    build_metabolite_docs,
+)
+from mhd_ws.run.cli.indexing.benchmark_indexer import benchmark_indexer
+
+
+@pytest.mark.parametrize("profile", ["legacy", "ms"])
+def test_synthetic_graph_exercises_builders(profile: str):
+    spec = SyntheticGraphSpec(
+        profile=profile, samples=7, files_per_sample=3, metabolites=4
+    )
+    mhd = make_synthetic_mhd(spec, "SYN1")
+
+    doc = build_legacy_dataset_doc(mhd, "ts")
+    metabolite_docs = build_metabolite_docs(mhd, doc)
+
+    assert doc["profile"] == profile
+    assert doc["counts"]["samples"] == 7
+    assert doc["files"]["raw"]["count"] == 21
+    assert doc["counts"]["specimens"] == (7 if profile == "ms" else 0)
+    assert len(doc["facets"]["characteristic_kv"]) == 40
+    assert len(doc["parameters"]) == 30
+    assert doc["people"] and doc["protocols"] and doc["publications"]
+    assert len(metabolite_docs) == 4
+    assert make_synthetic_mhd(spec, "SYN1") == mhd
+
+
+def test_run_benchmark_reports_every_stage_with_stand_in_sink():
+    specs = [SyntheticGraphSpec(profile="ms", samples=3, metabolites=5)]
+
+    results = run_benchmark(specs, BenchmarkOptions(datasets=2, sink="stand-in"))
+
+    ms = results["profiles"]["ms"]
+    assert set(ms["stages"]) == {*STAGES, "upload"}
+    assert ms["totals"]["dataset_docs"] == 2
+    assert ms["totals"]["metabolite_docs"] == 10
+    assert ms["upload"]["docs"] == 12
+    json.dumps(results)
+
+
+def test_run_benchmark_measures_payload_and_http_compression():
+    specs = [SyntheticGraphSpec(profile="legacy", samples=3, metabolites=20)]
+    plain = run_benchmark(specs, BenchmarkOptions(datasets=2, sink="stand-in"))
+
+    results = run_benchmark(
+        specs,
+        BenchmarkOptions(
+            datasets=2, sink="stand-in", compression="gzip", http_compress=True
+        ),
+    )
+
+    legacy = results["profiles"]["legacy"]
+    assert "compress" in legacy["stages"]
+    totals = legacy["totals"]
+    assert 0 < totals["compressed_bytes"] < totals["doc_bytes"]
+    plain_wire = plain["profiles"]["legacy"]["upload"]["wire_bytes"]
+    assert legacy["upload"]["wire_bytes"] < plain_wire
+
+
+def test_slim_profile_stores_and_returns_less():
+    specs = [SyntheticGraphSpec(profile="ms", samples=3, metabolites=5)]
+
+    full = run_benchmark(specs, BenchmarkOptions(datasets=3))["profiles"]["ms"]
+    slim = run_benchmark(specs, BenchmarkOptions(datasets=3, doc_profile="slim"))[
+        "profiles"
+    ]["ms"]
+
+    assert slim["totals"]["source_bytes"] < full["totals"]["source_bytes"]
+    # Hits leave out search_text and debug under either profile.
+    assert slim["totals"]["hit_bytes_p95"] == full["totals"]["hit_bytes_p95"]
+    assert full["totals"]["hit_bytes_p95"] < full["totals"]["source_bytes_p95"]
+
+
+def _results(**stage_means: float) -> dict:
+    return {
+        "profiles": {
+            "ms": {"stages": {s: {"mean_ms": v} for s, v in stage_means.items()}}
+        }
+    }
+
+
+def test_compare_flags_only_stages_beyond_threshold():
+    comparisons = compare_results(
+        _results(decode=10.0, dataset_doc=10.0, serialize=0.01),
+        _results(decode=10.5, dataset_doc=12.0, serialize=1.0),
+        threshold=0.10,
+    )
+
+    assert {c.stage: c.regressed for c in comparisons} == {
+        "decode": False,
+        "dataset_doc": True,
+        # Too fast in the baseline to compare meaningfully.
+        "serialize": False,
+    }
+
+
+def test_cli_writes_json_and_fails_on_regression(tmp_path: Path):
+    out = tmp_path / "results.json"
+    args = ["--profile", "legacy", "--datasets", "1", "--samples", "2"]
+    runner = CliRunner()
+
+    result = runner.invoke(benchmark_indexer, [*args, "--json", str(out)])
+    assert result.exit_code == 0, result.output
+    baseline = json.loads(out.read_text())
+    for stats in baseline["profiles"]["legacy"]["stages"].values():
+        stats["mean_ms"] = 0.06
+    baseline_file = tmp_path / "baseline.json"
+    baseline_file.write_text(json.dumps(baseline))
+
+    result = runner.invoke(benchmark_indexer, [*args, "--baseline", str(baseline_file)])
+    assert result.exit_code == 1
+    assert "REGRESSION" in result.output
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from mhd_ws.infrastructure.search.indexing.cleanup import (
+    METABOLITE_ID_SEPARATOR,
+    StaleDocCleaner,
+    dataset_id_of_doc,
+    stale_docs_query,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import (
+    BuildStats,
+    iter_build_results,
+)
+from mhd_ws.run.cli.indexing.index_datasets import _handle_upload, iter_built_results
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+
+
+class FakeEsClient:
+    def __init__(self) -> None:
+        self.start = AsyncMock()
+        self.close = AsyncMock()
+        self.ensure_index_exists = AsyncMock()
+        self.uploaded: dict[str, list[dict]] = {}
+        self.queries: list[tuple[str, dict]] = []
+
+    async def bulk_upload(self, docs, index_name, **kwargs) -> int:
+        self.uploaded[index_name] = [doc async for doc in docs]
+        return len(self.uploaded[index_name])
+
+    async def delete_by_query(self, index, query, **kwargs) -> int:
+        self.queries.append((index, query))
+        return len(query["bool"]["filter"][0]["terms"]["dataset_id"])
+
+
+def test_stale_query_matches_older_and_untimestamped_docs():
+    query = stale_docs_query(["ms::MTBLS1"], "2024-06-01T00:00:00+00:00")
+
+    assert query["bool"]["filter"] == [{"terms": {"dataset_id": ["ms::MTBLS1"]}}]
+    assert query["bool"]["should"][0] == {
+        "range": {"indexed": {"lt": "2024-06-01T00:00:00+00:00"}}
+    }
+    assert query["bool"]["minimum_should_match"] == 1
+
+
+def test_dataset_id_of_doc():
+    metabolite_id = "ms::MTBLS1::metabolite::m-1"
+    assert dataset_id_of_doc(metabolite_id, METABOLITE_ID_SEPARATOR) == "ms::MTBLS1"
+    assert dataset_id_of_doc("ms::MTBLS1", METABOLITE_ID_SEPARATOR) is None
+    assert dataset_id_of_doc("ms::MTBLS1::file::f-1", "::file::") == "ms::MTBLS1"
+
+
+@pytest.mark.asyncio
+async def test_cleaner_batches_datasets_and_skips_failed_uploads(
+    mhd_files: list[Path],
+):
+    es_client = FakeEsClient()
+    cleaner = StaleDocCleaner(
+        es_client,
+        "metabolites",
+        "ts",
+        api_key_name="metabolite",
+        id_separator=METABOLITE_ID_SEPARATOR,
+        batch_size=2,
+    )
+    results = list(cleaner.track(iter_build_results(mhd_files, False, "ts")))
+
+    assert len(results) == 6
+    assert cleaner.dataset_ids == [f"ms::MTBLS{i}" for i in range(1, 6)]
+    assert cleaner.skip_failed({"ms::MTBLS3::metabolite::m-1", "ms::MTBLS4"}) == 1
+
+    deleted = await cleaner.run()
+
+    assert deleted == 4
+    assert cleaner.requests == 2
+    assert [
+        q["bool"]["filter"][0]["terms"]["dataset_id"] for _, q in es_client.queries
+    ] == [
+        ["ms::MTBLS1", "ms::MTBLS2"],
+        ["ms::MTBLS4", "ms::MTBLS5"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_handle_upload_cleans_up_after_uploading(mhd_files: list[Path]):
+    stats = BuildStats()
+    results = iter_built_results(
+        iter_build_results(mhd_files, False, "ts"), stats, None, False
+    )
+    es_client = FakeEsClient()
+
+    await _handle_upload(
+        results,
+        es_client,
+        index_name="datasets",
+        metabolite_index="metabolites",
+        mapping_file=str(REPO_ROOT / "resources/es/mappings/ms_mapping.json"),
+        metabolite_mapping_file=str(
+            REPO_ROOT / "resources/es/mappings/metabolite_mapping.json"
+        ),
+        op_type="index",
+        batch_size=2,
+        recreate_index=False,
+        skip_metabolites=False,
+        queue_size=1,
+        indexed_ts="ts",
+        cleanup_batch_size=500,
+    )
+
+    assert len(es_client.uploaded["metabolites"]) == 10
+    assert es_client.queries == [
+        (
+            "metabolites",
+            stale_docs_query([f"ms::MTBLS{i}" for i in range(1, 6)], "ts"),
+        )
+    ]
+    # Existing metabolite indices get the ``indexed`` field added.
+    metabolite_call = es_client.ensure_index_exists.await_args_list[1]
+    assert metabolite_call.kwargs["update_mapping"] is True
+
+
+@pytest.mark.asyncio
+async def test_recreated_index_is_not_cleaned_up(mhd_files: list[Path]):
+    es_client = FakeEsClient()
+
+    await _handle_upload(
+        iter_build_results(mhd_files, False, "ts"),
+        es_client,
+        index_name="datasets",
+        metabolite_index="metabolites",
+        mapping_file=str(REPO_ROOT / "resources/es/mappings/ms_mapping.json"),
+        metabolite_mapping_file=str(
+            REPO_ROOT / "resources/es/mappings/metabolite_mapping.json"
+        ),
+        op_type="index",
+        batch_size=2,
+        recreate_index=True,
+        skip_metabolites=False,
+        queue_size=1,
+        indexed_ts="ts",
+        cleanup_batch_size=500,
+    )
+
+    assert es_client.queries == []
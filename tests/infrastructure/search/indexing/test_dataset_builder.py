@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    TRUNCATION_PROPERTY,
+    UNBOUNDED_DOC_BUDGET,
+    DocSizeBudget,
+    build_legacy_dataset_doc,
+    top_values,
+    truncate_utf8,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import (
+    BuildStats,
+    iter_build_results,
+)
+from mhd_ws.infrastructure.search.indexing.sharding import run_summary
+
+from .conftest import make_mhd_graph
+
+BUDGET = DocSizeBudget(
+    max_list_items=10,
+    max_facet_values=2,
+    max_group_values=2,
+    max_search_text_bytes=200,
+)
+
+
+def make_oversized_graph(accession: str = "MTBLS1") -> dict[str, Any]:
+    """A graph with 50 specimens, 153 organisms and 22 file extensions."""
+    mhd = make_mhd_graph(accession, metabolites=0)
+    nodes = mhd["graph"]["nodes"]
+    relationships = mhd["graph"]["relationships"]
+    nodes.extend(
+        {"id": f"sp-{i}", "type": "specimen", "name": f"specimen {i}"}
+        for i in range(50)
+    )
+    organisms = (
+        ["Homo sapiens"] * 99
+        + ["Mus musculus"] * 50
+        + [f"organism {i}" for i in range(151)]
+    )
+    for i, name in enumerate(organisms):
+        nodes.append({"id": f"cv-x{i}", "type": "characteristic-value", "name": name})
+        relationships.append(
+            {
+                "type": "relationship",
+                "source_ref": f"cv-x{i}",
+                "target_ref": "cd-1",
+                "relationship_name": "instance-of",
+            }
+        )
+    file_names = (
+        [f"run{i}.mzML" for i in range(30)]
+        + [f"run{i}.raw" for i in range(10)]
+        + [f"notes.x{i}" for i in range(20)]
+    )
+    nodes.extend(
+        {"id": f"f-{i}", "type": "raw-data-file", "name": name}
+        for i, name in enumerate(file_names)
+    )
+    return mhd
+
+
+def test_small_docs_are_not_truncated():
+    doc = build_legacy_dataset_doc(make_mhd_graph("MTBLS1"), "ts")
+
+    assert "truncation" not in doc
+
+
+def test_oversized_doc_is_cut_to_the_budget():
+    doc = build_legacy_dataset_doc(make_oversized_graph(), "ts", budget=BUDGET)
+
+    assert [s["name"] for s in doc["specimens"]] == [f"specimen {i}" for i in range(10)]
+    assert doc["facets"]["organisms"] == ["Homo sapiens", "Mus musculus"]
+    [group] = doc["characteristic_groups"]
+    assert group["values"] == ["Homo sapiens", "Mus musculus"]
+    assert group["kv"] == ["organism::Homo sapiens", "organism::Mus musculus"]
+    assert doc["files"]["extensions"] == [
+        {"extension": ".mzml", "count": 31},
+        {"extension": ".raw", "count": 10},
+    ]
+    assert len(doc["search_text"].encode("utf-8")) <= 200
+
+    truncation = {t["field"]: (t["kept"], t["total"]) for t in doc["truncation"]}
+    assert truncation["specimens"] == (10, 50)
+    assert truncation["facets.organisms"] == (2, 153)
+    assert truncation["characteristic_groups.values"] == (2, 153)
+    assert truncation["files.extensions"] == (2, 22)
+    assert truncation["search_text"][1] > 200
+    unbounded = build_legacy_dataset_doc(
+        make_oversized_graph(), "ts", budget=UNBOUNDED_DOC_BUDGET
+    )
+    assert len(json.dumps(doc)) < len(json.dumps(unbounded))
+
+
+def test_unbounded_budget_keeps_everything():
+    doc = build_legacy_dataset_doc(
+        make_oversized_graph(), "ts", budget=UNBOUNDED_DOC_BUDGET
+    )
+    default = build_legacy_dataset_doc(make_oversized_graph(), "ts")
+
+    assert default == doc
+
+    assert "truncation" not in doc
+    assert len(doc["specimens"]) == 50
+    assert len(doc["facets"]["organisms"]) == 153
+    assert len(doc["files"]["extensions"]) == 22
+
+
+def test_capped_entries_stay_in_search_text():
+    budget = DocSizeBudget(max_facet_values=2)
+
+    doc = build_legacy_dataset_doc(make_oversized_graph(), "ts", budget=budget)
+
+    assert [e["extension"] for e in doc["files"]["extensions"]] == [".mzml", ".raw"]
+    assert ".x7" in doc["search_text"].split()
+
+
+def test_top_values_breaks_ties_by_value():
+    counts = Counter({"b": 2, "a": 2, "c": 3, "d": 1})
+
+    assert top_values(counts, 3) == ["c", "a", "b"]
+
+
+def test_truncate_utf8_cuts_at_a_word_boundary():
+    assert truncate_utf8("alpha beta gamma", 12) == "alpha beta"
+    assert truncate_utf8("ééé", 5) == "éé"
+    assert truncate_utf8("short", 100) == "short"
+
+
+def test_capped_datasets_are_reported(tmp_path: Path):
+    files = []
+    for accession, mhd in [
+        ("MTBLS1", make_oversized_graph("MTBLS1")),
+        ("MTBLS2", make_mhd_graph("MTBLS2")),
+    ]:
+        path = tmp_path / f"{accession}.mhd.json"
+        path.write_text(json.dumps(mhd), encoding="utf-8")
+        files.append(path)
+    stats = BuildStats()
+
+    for result in iter_build_results(files, True, "ts", budget=BUDGET):
+        stats.add(result)
+
+    assert [doc_id for doc_id, _ in stats.capped] == ["ms::MTBLS1"]
+    [capped] = run_summary(stats)["capped"]
+    assert capped["id"] == "ms::MTBLS1"
+    assert {"field": "specimens", "kept": 10, "total": 50} in capped["truncation"]
+
+
+def test_truncation_property_matches_the_dataset_mapping():
+    mapping_file = Path(__file__).resolve().parents[4] / (
+        "resources/es/mappings/ms_mapping.json"
+    )
+    mapping = json.loads(mapping_file.read_text(encoding="utf-8"))
+
+    assert mapping["mappings"]["properties"]["truncation"] == TRUNCATION_PROPERTY
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from mhd_ws.infrastructure.search.indexing.db_source import (
+    MhdFileFetcher,
+    iter_db_build_results,
+    iter_latest_public_revisions,
+)
+from mhd_ws.run.cli.indexing import index_datasets as cli_module
+
+from .conftest import make_mhd_graph
+
+
+@pytest.mark.asyncio
+async def test_latest_public_revisions_are_paged_by_dataset_id(db_client):
+    refs = [ref async for ref in iter_latest_public_revisions(db_client, 2)]
+
+    assert [ref.accession for ref in refs] == [f"MTBLS{i}" for i in range(1, 6)]
+    assert [ref.revision for ref in refs] == [2, 1, 2, 1, 2]
+    assert refs[0].mhd_file_url == "https://example.org/r2/MTBLS1.mhd.json"
+
+
+def test_db_build_results_read_mirrored_mhd_files(db_client, tmp_path: Path):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    for i in range(1, 5):
+        path = mirror / f"MTBLS{i}.mhd.json"
+        path.write_text(json.dumps(make_mhd_graph(f"MTBLS{i}")), encoding="utf-8")
+
+    results = list(
+        iter_db_build_results(
+            db_client,
+            MhdFileFetcher(mirror_dir=mirror, concurrency=2),
+            skip_metabolites=False,
+            indexed_ts="ts",
+            batch_size=2,
+            prefetch=2,
+            accept=lambda accession: accession != "MTBLS3",
+        )
+    )
+
+    assert [r.path for r in results] == ["MTBLS1@2", "MTBLS2@1", "MTBLS4@1", "MTBLS5@2"]
+    assert [r.doc["id"] for r in results[:3]] == [
+        "ms::MTBLS1",
+        "ms::MTBLS2",
+        "ms::MTBLS4",
+    ]
+    assert len(results[0].metabolite_docs) == 2
+    assert results[3].doc is None
+    assert "fetch failed" in results[3].error
+
+
+def test_cli_indexes_from_db_in_dry_run(
+    db_client, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    for i in range(1, 6):
+        path = mirror / f"MTBLS{i}.mhd.json"
+        path.write_text(json.dumps(make_mhd_graph(f"MTBLS{i}")), encoding="utf-8")
+    config = tmp_path / "config.yaml"
+    config.write_text("gateways: {}\n", encoding="utf-8")
+    summary = tmp_path / "summary.json"
+    monkeypatch.setattr(cli_module, "_init_db_client", lambda *args: db_client)
+
+    result = CliRunner().invoke(
+        cli_module.index_datasets,
+        [
+            "--from-db",
+            "--config-file",
+            str(config),
+            "--mhd-mirror-dir",
+            str(mirror),
+            "--db-batch-size",
+            "2",
+            "--dry-run",
+            "--summary-json",
+            str(summary),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    written = json.loads(summary.read_text())
+    assert written["source"] == "database"
+    assert written["dataset_docs"] == 5
+    assert written["metabolite_docs"] == 10
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from mhd_ws.infrastructure.search.indexing.doc_profiles import (
+    index_doc_profile,
+    slim_mapping,
+    slim_results,
+    split_diagnostics,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import iter_build_results
+from mhd_ws.run.cli.indexing.index_datasets import _handle_upload
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+
+
+def test_slim_mapping_keeps_search_text_indexed_but_not_stored():
+    mapping = json.loads(
+        (REPO_ROOT / "resources/es/mappings/ms_mapping.json").read_text()
+    )
+
+    slim = slim_mapping(mapping)
+
+    assert slim["mappings"]["_source"] == {"excludes": ["search_text"]}
+    assert slim["mappings"]["properties"]["search_text"] == {"type": "text"}
+    assert slim["mappings"]["properties"]["debug"] == {
+        "type": "object",
+        "enabled": False,
+    }
+    assert "_meta" not in mapping["mappings"]
+    assert index_doc_profile({"dataset_ms_v1": slim}) == "slim"
+    assert index_doc_profile({"dataset_ms_v1": mapping}) == "full"
+
+
+def test_split_diagnostics_moves_the_debug_block():
+    doc = {
+        "id": "ms::MTBLS1",
+        "dates": {"indexed": "ts"},
+        "debug": {"node_type_counts": {"study": 1}, "relationship_counts": {}},
+    }
+
+    diagnostics = split_diagnostics(doc)
+
+    assert "debug" not in doc
+    assert diagnostics == {
+        "id": "ms::MTBLS1",
+        "dataset_id": "ms::MTBLS1",
+        "indexed": "ts",
+        "node_type_counts": {"study": 1},
+        "relationship_counts": {},
+    }
+    assert split_diagnostics(doc) is None
+
+
+def test_slim_results_attach_diagnostics_docs(mhd_files: list[Path]):
+    results = list(slim_results(iter_build_results(mhd_files, False, "ts")))
+
+    built = [r for r in results if r.doc is not None]
+    assert len(built) == 5
+    assert all("debug" not in r.doc for r in built)
+    assert all("search_text" in r.doc for r in built)
+    assert [r.diagnostics_doc["id"] for r in built] == [r.doc["id"] for r in built]
+    assert results[-1].diagnostics_doc is None
+
+
+class FakeEsClient:
+    def __init__(self) -> None:
+        self.start = AsyncMock()
+        self.close = AsyncMock()
+        self.ensure_index_exists = AsyncMock()
+        self.uploaded: dict[str, list[dict]] = {}
+
+    async def bulk_upload(self, docs, index_name, **kwargs) -> int:
+        self.uploaded[index_name] = [doc async for doc in docs]
+        return len(self.uploaded[index_name])
+
+
+@pytest.mark.asyncio
+async def test_slim_upload_sends_debug_counts_to_the_diagnostics_index(
+    mhd_files: list[Path],
+):
+    es_client = FakeEsClient()
+
+    await _handle_upload(
+        slim_results(iter_build_results(mhd_files, False, "ts")),
+        es_client,
+        index_name="datasets",
+        metabolite_index="metabolites",
+        mapping_file=str(REPO_ROOT / "resources/es/mappings/ms_mapping.json"),
+        metabolite_mapping_file=str(
+            REPO_ROOT / "resources/es/mappings/metabolite_mapping.json"
+        ),
+        op_type="index",
+        batch_size=2,
+        recreate_index=True,
+        skip_metabolites=False,
+        queue_size=1,
+        doc_profile="slim",
+        diagnostics_index="diagnostics",
+    )
+
+    assert len(es_client.uploaded["datasets"]) == 5
+    assert len(es_client.uploaded["diagnostics"]) == 5
+    dataset_call, _, diagnostics_call = es_client.ensure_index_exists.await_args_list
+    assert dataset_call.args[1]["mappings"]["_source"] == {"excludes": ["search_text"]}
+    assert diagnostics_call.args[0] == "diagnostics"
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import itertools
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from click.testing import CliRunner
+
+from mhd_ws.infrastructure.search.indexing.cleanup import stale_docs_query
+from mhd_ws.infrastructure.search.indexing.file_builder import (
+    FileIndexStats,
+    iter_file_docs,
+    iter_file_index_docs,
+)
+from mhd_ws.run.cli.indexing.index_files import _upload_file_docs, index_files
+
+from .conftest import make_mhd_graph
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+
+
+def test_file_docs_carry_dataset_type_format_and_extension():
+    mhd = make_mhd_graph("MTBLS1")
+    mhd["graph"]["nodes"].extend(
+        [
+            {
+                "id": "meta-1",
+                "type": "metadata-file",
+                "name": "s_MTBLS1.txt",
+                "format_ref": "fmt-1",
+                "url_list": ["https://example.org/MTBLS1/s_MTBLS1.txt"],
+            },
+            {
+                "id": "fmt-1",
+                "type": "descriptor",
+                "name": "ISA-Tab sample file",
+                "accession": "EDAM:3685",
+                "source": "EDAM",
+            },
+        ]
+    )
+
+    docs = list(iter_file_docs(mhd, "ts"))
+
+    assert [d["id"] for d in docs] == [
+        "ms::MTBLS1::file::meta-1",
+        "ms::MTBLS1::file::file-1",
+    ]
+    meta, raw = docs
+    assert meta["dataset_id"] == "ms::MTBLS1"
+    assert meta["file_type"] == "metadata-file"
+    assert meta["extension"] == ".txt"
+    assert meta["format"] == {
+        "name": "ISA-Tab sample file",
+        "accession": "EDAM:3685",
+        "source": "EDAM",
+    }
+    assert meta["urls"] == ["https://example.org/MTBLS1/s_MTBLS1.txt"]
+    assert meta["indexed"] == "ts"
+    assert raw["name"] == "run1.mzML"
+    assert raw["extension"] == ".mzml"
+    assert "format" not in raw
+
+
+def test_file_docs_are_built_lazily():
+    mhd = make_mhd_graph("MTBLS1", metabolites=0)
+    mhd["graph"]["nodes"].extend(
+        {"id": f"f-{i}", "type": "raw-data-file", "name": f"run{i}.raw"}
+        for i in range(100_000)
+    )
+
+    docs = iter_file_docs(mhd, "ts")
+    first = list(itertools.islice(docs, 3))
+
+    assert [d["name"] for d in first] == ["run1.mzML", "run0.raw", "run1.raw"]
+    assert sum(1 for _ in docs) == 100_001 - 3
+
+
+def test_file_index_docs_skip_broken_files(mhd_files: list[Path]):
+    stats = FileIndexStats()
+
+    docs = list(iter_file_index_docs(mhd_files, "ts", stats))
+
+    assert len(docs) == 5
+    assert stats.files == 6
+    assert stats.file_docs == 5
+    assert stats.dataset_ids == [f"ms::MTBLS{i}" for i in range(1, 6)]
+    assert [path for path, _ in stats.errors] == [str(mhd_files[-1])]
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_docs_and_drops_stale_ones(mhd_files: list[Path]):
+    es_client = AsyncMock()
+    es_client.delete_by_query.return_value = 2
+    stats = FileIndexStats()
+    docs = iter_file_index_docs(mhd_files, "ts", stats)
+
+    async def consume(docs, index_name, **kwargs):
+        return sum(1 for _ in docs)
+
+    es_client.bulk_upload.side_effect = consume
+
+    uploaded = await _upload_file_docs(
+        docs,
+        es_client,
+        index_name="files",
+        mapping_file=str(REPO_ROOT / "resources/es/mappings/file_mapping.json"),
+        stats=stats,
+        indexed_ts="ts",
+        batch_size=100,
+        recreate_index=False,
+        cleanup_batch_size=3,
+    )
+
+    assert uploaded == 5
+    es_client.delete_by_query.assert_any_await(
+        "files",
+        stale_docs_query([f"ms::MTBLS{i}" for i in range(1, 4)], "ts"),
+        api_key_name="file",
+    )
+    assert es_client.delete_by_query.await_count == 2
+    es_client.close.assert_awaited_once()
+
+
+def test_cli_writes_file_docs_as_jsonl(mhd_files: list[Path], tmp_path: Path):
+    out = tmp_path / "files.jsonl"
+
+    result = CliRunner().invoke(
+        index_files,
+        [str(mhd_files[0].parent), "--format", "jsonl", "--out", str(out)],
+    )
+
+    assert result.exit_code == 0, result.output
+    docs = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [d["dataset_id"] for d in docs] == [f"ms::MTBLS{i}" for i in range(1, 6)]
+    assert "Built file docs: 5" in result.output
+    assert "Errors:          1" in result.output
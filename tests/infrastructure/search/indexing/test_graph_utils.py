@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    build_legacy_dataset_doc,
+)
+from mhd_ws.infrastructure.search.indexing.graph_utils import (
+    GraphView,
+    build_csr_rel_index,
+    build_rel_index,
+    rel_sources,
+    rel_targets,
+)
+from mhd_ws.infrastructure.search.indexing.metabolite_builder import (
+    build_metabolite_docs,
+)
+
+from .conftest import make_mhd_graph
+
+
+def _rel(src: str, tgt: str, name: str | None) -> dict:
+    return {
+        "type": "relationship",
+        "source_ref": src,
+        "target_ref": tgt,
+        "relationship_name": name,
+    }
+
+
+def test_graph_view_buckets_and_study():
+    view = GraphView.from_mhd(make_mhd_graph("MTBLS1", metabolites=3))
+
+    assert view.study_id == "study-1"
+    assert view.study["title"] == "Study MTBLS1"
+    assert [n["id"] for n in view.nodes("metabolite")] == ["met-0", "met-1", "met-2"]
+    assert view.count("metabolite", "metabolite-identifier") == 6
+    assert view.nodes("missing") == []
+    assert rel_sources(view.relidx, "met-1", "identifier-of") == ["ident-1"]
+
+
+def test_type_suffix_lookup_keeps_graph_order():
+    mhd = {
+        "graph": {
+            "nodes": [
+                {"id": "s", "type": "study"},
+                {"id": "a", "type": "characteristic-value"},
+                {"id": "b", "type": "x-characteristic-value"},
+                {"id": "c", "type": "characteristic-value"},
+                {"id": "d", "type": None},
+            ],
+            "relationships": [],
+        }
+    }
+    view = GraphView.from_mhd(mhd)
+
+    found = view.nodes_with_type_suffix("characteristic-value")
+
+    assert [n["id"] for n in found] == ["a", "b", "c"]
+
+
+def test_incident_relationships_are_unique_and_ordered():
+    rels = [
+        _rel("p1", "o1", "affiliated-with"),
+        _rel("s", "p1", "has-contributor"),
+        _rel("s", "s", "funds"),
+        _rel("o2", "p2", None),
+        {"type": "other", "source_ref": "s", "target_ref": "p1"},
+    ]
+    mhd = {
+        "graph": {
+            "nodes": [{"id": "s", "type": "study"}],
+            "relationships": rels,
+        }
+    }
+    view = GraphView.from_mhd(mhd)
+
+    assert view.incident_relationships("s") == [rels[1], rels[2]]
+    assert view.incident_relationships("p2", "p1") == [rels[0], rels[1], rels[3]]
+
+
+def test_builders_accept_shared_view():
+    mhd = make_mhd_graph("MTBLS1")
+    view = GraphView.from_mhd(mhd)
+
+    doc = build_legacy_dataset_doc(mhd, "ts", view)
+
+    assert doc == build_legacy_dataset_doc(mhd, "ts")
+    assert build_metabolite_docs(mhd, doc, view) == build_metabolite_docs(mhd, doc)
+
+
+def test_csr_rel_index_matches_dict_backend():
+    rels = [
+        _rel("a", "b", "x"),
+        _rel("a", "c", "x"),
+        _rel("a", "b", "y"),
+        _rel("c", "a", "x"),
+        _rel("a", "b", "x"),
+        _rel("d", "a", None),
+        {"type": "other", "source_ref": "a", "target_ref": "d"},
+    ]
+    dict_index = build_rel_index(rels)
+    csr_index = build_csr_rel_index(rels)
+
+    for node_id in ("a", "b", "c", "d", "missing"):
+        for name in ("x", "y", "z"):
+            assert rel_targets(csr_index, node_id, name) == rel_targets(
+                dict_index, node_id, name
+            )
+            assert rel_sources(csr_index, node_id, name) == rel_sources(
+                dict_index, node_id, name
+            )
+    assert rel_targets(csr_index, "a", "x") == ["b", "c", "b"]
+    assert rel_sources(csr_index, "a", "x") == ["c"]
+
+
+def test_builders_work_with_csr_backend():
+    mhd = make_mhd_graph("MTBLS1", metabolites=3)
+    view = GraphView.from_mhd(mhd, rel_index="csr")
+
+    doc = build_legacy_dataset_doc(mhd, "ts", view)
+
+    assert doc == build_legacy_dataset_doc(mhd, "ts")
+    assert build_metabolite_docs(mhd, doc, view) == build_metabolite_docs(mhd, doc)
+
+
+def test_csr_view_reads_incidence_and_order_from_the_graph():
+    rels = [
+        _rel("p1", "o1", "affiliated-with"),
+        _rel("s", "p1", "has-contributor"),
+        _rel("s", "s", "funds"),
+        _rel("o2", "p2", None),
+    ]
+    mhd = {
+        "graph": {
+            "nodes": [
+                {"id": "s", "type": "study"},
+                {"id": "a", "type": "characteristic-value"},
+                {"id": "b", "type": "x-characteristic-value"},
+                {"id": "c", "type": "characteristic-value"},
+            ],
+            "relationships": rels,
+        }
+    }
+    view = GraphView.from_mhd(mhd, rel_index="csr")
+
+    assert view.position is None
+    assert view.incident is None
+    assert view.incident_relationships("s") == [rels[1], rels[2]]
+    assert view.incident_relationships("p2", "p1") == [rels[0], rels[1], rels[3]]
+    found = view.nodes_with_type_suffix("characteristic-value")
+    assert [n["id"] for n in found] == ["a", "b", "c"]
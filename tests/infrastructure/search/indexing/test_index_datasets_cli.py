@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from click.testing import CliRunner
+
+from mhd_ws.infrastructure.search.bulk import (
+    BulkUploadOptions,
+    DeadLetterWriter,
+    make_bulk_action,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import (
+    BuildStats,
+    iter_build_results,
+)
+from mhd_ws.infrastructure.search.reindex import BlueGreenOptions
+from mhd_ws.run.cli.indexing.index_datasets import (
+    _handle_upload,
+    _replay_dead_letter,
+    _replay_payload,
+    index_datasets,
+    iter_built_results,
+)
+
+from .conftest import write_mhd_file
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+
+
+class FakeEsClient:
+    def __init__(self) -> None:
+        self.start = AsyncMock()
+        self.close = AsyncMock()
+        self.ensure_index_exists = AsyncMock()
+        self.uploaded: dict[str, list[dict]] = {}
+
+    async def bulk_upload(self, docs, index_name, **kwargs) -> int:
+        self.uploaded[index_name] = [doc async for doc in docs]
+        return len(self.uploaded[index_name])
+
+
+@pytest.mark.asyncio
+async def test_handle_upload_streams_docs_into_both_indices(mhd_files: list[Path]):
+    stats = BuildStats()
+    results = iter_built_results(
+        iter_build_results(mhd_files, False, "ts"), stats, None, False
+    )
+    es_client = FakeEsClient()
+
+    await _handle_upload(
+        results,
+        es_client,
+        index_name="datasets",
+        metabolite_index="metabolites",
+        mapping_file=str(REPO_ROOT / "resources/es/mappings/ms_mapping.json"),
+        metabolite_mapping_file=str(
+            REPO_ROOT / "resources/es/mappings/metabolite_mapping.json"
+        ),
+        op_type="index",
+        batch_size=2,
+        recreate_index=False,
+        skip_metabolites=False,
+        queue_size=1,
+    )
+
+    assert len(es_client.uploaded["datasets"]) == 5
+    assert len(es_client.uploaded["metabolites"]) == 10
+    assert stats.files == 6
+    assert len(stats.errors) == 1
+    es_client.close.assert_awaited_once()
+
+
+def test_cli_writes_streamed_bulk_payload(mhd_files: list[Path], tmp_path: Path):
+    out = tmp_path / "out.ndjson"
+    result = CliRunner().invoke(
+        index_datasets,
+        [str(mhd_files[0].parent), "--format", "bulk", "--out", str(out)],
+    )
+
+    assert result.exit_code == 0, result.output
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    actions = lines[0::2]
+    assert sum(1 for a in actions if a["index"]["_index"] == "dataset_ms_v1") == 5
+    assert sum(1 for a in actions if a["index"]["_index"] == "metabolite_ms_v1") == 10
+    assert "Errors:          1" in result.output
+
+
+def test_cli_incremental_bulk_only_sends_changes(mhd_files: list[Path], tmp_path: Path):
+    root = mhd_files[0].parent
+    manifest = tmp_path / "manifest.json"
+    out = tmp_path / "out.ndjson"
+    args = [
+        str(root),
+        "--incremental",
+        "--manifest",
+        str(manifest),
+        "--out",
+        str(out),
+    ]
+    runner = CliRunner()
+    first = runner.invoke(index_datasets, args)
+    assert first.exit_code == 0, first.output
+    assert manifest.is_file()
+
+    (root / "MTBLS5.mhd.json").unlink()
+    write_mhd_file(root, "MTBLS2", metabolites=3)
+    second = runner.invoke(index_datasets, args)
+
+    assert second.exit_code == 0, second.output
+    assert "2 added/changed, 3 unchanged, 1 removed" in second.output
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    indexed = [line["index"]["_id"] for line in lines if "index" in line]
+    deleted = [line["delete"]["_id"] for line in lines if "delete" in line]
+    assert indexed[0] == "ms::MTBLS2"
+    assert len(indexed) == 4
+    assert deleted[0] == "ms::MTBLS5"
+    assert len(deleted) == 3
+
+
+def test_cli_incremental_rejects_jsonl(mhd_files: list[Path]):
+    result = CliRunner().invoke(
+        index_datasets,
+        [str(mhd_files[0].parent), "--incremental", "--format", "jsonl"],
+    )
+
+    assert result.exit_code != 0
+    assert "--incremental needs --upload or --format bulk" in result.output
+
+
+@pytest.mark.asyncio
+async def test_replay_dead_letter_resends_docs_per_index(tmp_path: Path):
+    path = tmp_path / "dead-letter.ndjson"
+    with DeadLetterWriter(path) as writer:
+        for index, doc_id in [("datasets", "d1"), ("metabolites", "m1")]:
+            action = make_bulk_action({"id": doc_id}, index)
+            writer.write(action, index, "index", 429, None, attempts=4)
+    es_client = FakeEsClient()
+    api_keys = {}
+
+    async def bulk_upload(docs, index_name, **kwargs):
+        api_keys[index_name] = kwargs["api_key_name"]
+        es_client.uploaded[index_name] = list(docs)
+        return len(es_client.uploaded[index_name])
+
+    es_client.bulk_upload = bulk_upload
+
+    with DeadLetterWriter(tmp_path / "again.ndjson") as dead_letter:
+        uploaded = await _replay_dead_letter(
+            es_client,
+            path,
+            dead_letter,
+            metabolite_index="metabolites",
+            batch_size=10,
+            bulk_options=BulkUploadOptions(),
+        )
+
+    assert uploaded == 2
+    assert es_client.uploaded == {
+        "datasets": [{"id": "d1"}],
+        "metabolites": [{"id": "m1"}],
+    }
+    assert api_keys == {"datasets": "dataset_ms", "metabolites": "metabolite"}
+
+
+def test_cli_writes_gzip_payload_that_replays_into_bulk_upload(
+    mhd_files: list[Path], tmp_path: Path
+):
+    out = tmp_path / "out.ndjson.gz"
+    result = CliRunner().invoke(
+        index_datasets, [str(mhd_files[0].parent), "--out", str(out)]
+    )
+    assert result.exit_code == 0, result.output
+    assert out.read_bytes()[:2] == b"\x1f\x8b"
+
+    es_client = FakeEsClient()
+    es_client.bulk_delete = AsyncMock(return_value=0)
+    with DeadLetterWriter(tmp_path / "dead-letter.ndjson") as dead_letter:
+        uploaded, deleted = asyncio.run(
+            _replay_payload(
+                es_client,
+                out,
+                "bulk",
+                index_name="dataset_ms_v1",
+                metabolite_index="metabolite_ms_v1",
+                batch_size=2,
+                bulk_options=BulkUploadOptions(),
+                dead_letter=dead_letter,
+            )
+        )
+
+    assert (uploaded, deleted) == (15, 0)
+    assert len(es_client.uploaded["dataset_ms_v1"]) == 5
+    assert len(es_client.uploaded["metabolite_ms_v1"]) == 10
+    es_client.bulk_delete.assert_not_awaited()
+    es_client.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_handle_upload_blue_green_loads_new_indices_then_swaps(
+    mhd_files: list[Path],
+):
+    results = iter_built_results(
+        iter_build_results(mhd_files, False, "ts"), BuildStats(), None, False
+    )
+    es_client = FakeEsClient()
+    for name in (
+        "create_index",
+        "put_index_settings",
+        "refresh_index",
+        "update_aliases",
+        "delete_index",
+    ):
+        setattr(es_client, name, AsyncMock())
+    es_client.get_alias_indices = AsyncMock(return_value=[])
+    es_client.index_exists = AsyncMock(return_value=False)
+    es_client.list_indices = AsyncMock(return_value=[])
+
+    await _handle_upload(
+        results,
+        es_client,
+        index_name="datasets",
+        metabolite_index="metabolites",
+        mapping_file=str(REPO_ROOT / "resources/es/mappings/ms_mapping.json"),
+        metabolite_mapping_file=str(
+            REPO_ROOT / "resources/es/mappings/metabolite_mapping.json"
+        ),
+        op_type="index",
+        batch_size=2,
+        recreate_index=False,
+        skip_metabolites=False,
+        queue_size=1,
+        blue_green=BlueGreenOptions(),
+    )
+
+    es_client.ensure_index_exists.assert_not_awaited()
+    uploaded = sorted(es_client.uploaded)
+    assert [name.rsplit("-", 1)[0] for name in uploaded] == ["datasets", "metabolites"]
+    swaps = [
+        call.args[0][-1]["add"] for call in es_client.update_aliases.await_args_list
+    ]
+    assert sorted((s["alias"], s["index"]) for s in swaps) == [
+        ("datasets", uploaded[0]),
+        ("metabolites", uploaded[1]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_handle_upload_blue_green_keeps_swapped_index_when_a_later_step_fails(
+    mhd_files: list[Path],
+):
+    results = iter_built_results(
+        iter_build_results(mhd_files, False, "ts"), BuildStats(), None, False
+    )
+    es_client = FakeEsClient()
+    for name in ("create_index", "put_index_settings", "refresh_index"):
+        setattr(es_client, name, AsyncMock())
+    es_client.get_alias_indices = AsyncMock(return_value=[])
+    es_client.index_exists = AsyncMock(
+        side_effect=lambda name, **_: name not in ("datasets", "metabolites")
+    )
+    es_client.list_indices = AsyncMock(return_value=[])
+    es_client.delete_index = AsyncMock()
+    # The dataset alias swaps; the metabolite swap fails.
+    es_client.update_aliases = AsyncMock(side_effect=[None, RuntimeError("boom")])
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await _handle_upload(
+            results,
+            es_client,
+            index_name="datasets",
+            metabolite_index="metabolites",
+            mapping_file=str(REPO_ROOT / "resources/es/mappings/ms_mapping.json"),
+            metabolite_mapping_file=str(
+                REPO_ROOT / "resources/es/mappings/metabolite_mapping.json"
+            ),
+            op_type="index",
+            batch_size=2,
+            recreate_index=False,
+            skip_metabolites=False,
+            queue_size=1,
+            blue_green=BlueGreenOptions(),
+        )
+
+    deleted = [call.args[0] for call in es_client.delete_index.await_args_list]
+    assert [name.rsplit("-", 1)[0] for name in deleted] == ["metabolites"]
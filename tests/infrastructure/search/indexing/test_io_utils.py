@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from mhd_ws.infrastructure.search.indexing.io_utils import (
+    iter_bulk_payload,
+    iter_jsonl_payload,
+    open_text_input,
+    open_text_output,
+    resolve_compression,
+    write_bulk,
+    write_bulk_deletes,
+    write_json_dir,
+    write_jsonl,
+)
+
+DATASET = {"id": "ms::MTBLS1", "title": "Study"}
+METABOLITE = {"id": "ms::MTBLS1::metabolite::met-1", "dataset_id": "ms::MTBLS1"}
+
+
+@pytest.mark.parametrize(
+    ("compression", "suffix", "magic"),
+    [("none", ".ndjson", b"{"), ("gzip", ".gz", b"\x1f\x8b"), ("zstd", ".zst", None)],
+)
+def test_bulk_payload_round_trips_through_compression(
+    tmp_path: Path, compression: str, suffix: str, magic: bytes | None
+):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+        magic = b"\x28\xb5\x2f\xfd"
+    path = tmp_path / f"payload{suffix}"
+
+    with open_text_output(str(path), compression) as fh:
+        write_bulk(fh, [DATASET], "datasets", "index")
+        write_bulk(fh, [METABOLITE], "metabolites", "index")
+        write_bulk_deletes(fh, ["ms::OLD"], "datasets")
+
+    assert path.read_bytes().startswith(magic)
+    with open_text_input(path) as fh:
+        records = list(iter_bulk_payload(fh))
+    assert [(r.op_type, r.index, r.doc_id) for r in records] == [
+        ("index", "datasets", "ms::MTBLS1"),
+        ("index", "metabolites", "ms::MTBLS1::metabolite::met-1"),
+        ("delete", "datasets", "ms::OLD"),
+    ]
+    assert records[0].doc == DATASET
+
+
+def test_jsonl_payload_routes_metabolite_docs(tmp_path: Path):
+    path = tmp_path / "docs.jsonl.gz"
+    with open_text_output(str(path), resolve_compression("auto", str(path))) as fh:
+        write_jsonl(fh, [DATASET, METABOLITE])
+
+    with open_text_input(path) as fh:
+        records = list(iter_jsonl_payload(fh, "datasets", "metabolites"))
+
+    assert [r.index for r in records] == ["datasets", "metabolites"]
+
+
+def test_bulk_payload_rejects_a_source_line_without_action(tmp_path: Path):
+    path = tmp_path / "broken.ndjson"
+    path.write_text('{"id": "x"}\n', encoding="utf-8")
+
+    with open_text_input(path) as fh, pytest.raises(ValueError, match="action 1"):
+        list(iter_bulk_payload(fh))
+
+
+def test_resolve_compression_follows_the_output_suffix():
+    assert resolve_compression("auto", "out.ndjson.gz") == "gzip"
+    assert resolve_compression("auto", "out.ndjson") == "none"
+    assert resolve_compression("auto", "-") == "none"
+    assert resolve_compression("gzip", "-") == "gzip"
+    with pytest.raises(ValueError, match="unknown compression"):
+        resolve_compression("brotli")
+
+
+def test_json_dir_names_docs_without_id_uniquely_across_calls(tmp_path: Path):
+    n = 0
+    for doc in ({"title": "a"}, {"title": "b"}, DATASET):
+        n += write_json_dir(tmp_path, [doc], start=n)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "doc_0.json",
+        "doc_1.json",
+        "ms_MTBLS1.json",
+    ]
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from mhd_ws.infrastructure.search.indexing.manifest import (
+    Manifest,
+    load_manifest,
+    plan_incremental,
+    save_manifest,
+)
+from mhd_ws.infrastructure.search.indexing.pipeline import iter_build_results
+
+from .conftest import write_mhd_file
+
+
+def _full_run(root: Path, files: list[Path]) -> Manifest:
+    plan = plan_incremental(Manifest(), root, files)
+    for _ in plan.track(iter_build_results(plan.changed, False, "ts")):
+        pass
+    return plan.manifest
+
+
+def test_first_run_builds_everything_and_records_ids(mhd_files: list[Path]):
+    root = mhd_files[0].parent
+    manifest = _full_run(root, mhd_files)
+
+    entry = manifest.entries["MTBLS1.mhd.json"]
+    assert entry.dataset_id == "ms::MTBLS1"
+    assert len(entry.metabolite_ids) == 2
+    assert len(entry.sha256) == 64
+    # The broken file has no entry, so it is retried on the next run.
+    assert "MTBLS99.mhd.json" not in manifest.entries
+
+
+def test_manifest_round_trip(mhd_files: list[Path], tmp_path: Path):
+    manifest = _full_run(mhd_files[0].parent, mhd_files)
+    path = tmp_path / "state" / "manifest.json"
+
+    save_manifest(manifest, path)
+
+    assert load_manifest(path) == manifest
+    assert load_manifest(tmp_path / "missing.json") == Manifest()
+
+
+def test_unchanged_touched_and_modified_files(mhd_files: list[Path]):
+    root = mhd_files[0].parent
+    previous = _full_run(root, mhd_files)
+    touched = root / "MTBLS2.mhd.json"
+    os.utime(touched, ns=(1, 1))
+    write_mhd_file(root, "MTBLS3", metabolites=1)
+
+    plan = plan_incremental(previous, root, mhd_files)
+
+    assert [p.name for p in plan.changed] == ["MTBLS3.mhd.json", "MTBLS99.mhd.json"]
+    assert plan.unchanged == 4
+    assert plan.manifest.entries["MTBLS2.mhd.json"].mtime_ns == 1
+
+    for _ in plan.track(iter_build_results(plan.changed, False, "ts")):
+        pass
+
+    assert plan.stale_dataset_ids() == []
+    assert plan.stale_metabolite_ids() == ["ms::MTBLS3::metabolite::met-1"]
+
+
+def test_removed_files_become_stale_but_limited_runs_do_not(mhd_files: list[Path]):
+    root = mhd_files[0].parent
+    previous = _full_run(root, mhd_files)
+    (root / "MTBLS5.mhd.json").unlink()
+    files = [p for p in mhd_files if p.exists()]
+
+    limited = plan_incremental(previous, root, files[:1], all_files=files)
+    assert limited.removed == 1
+    assert set(limited.manifest.entries) == {f"MTBLS{i}.mhd.json" for i in range(1, 5)}
+    assert limited.stale_dataset_ids() == ["ms::MTBLS5"]
+
+
+def test_renamed_file_does_not_delete_its_dataset(mhd_files: list[Path]):
+    root = mhd_files[0].parent
+    previous = _full_run(root, mhd_files)
+    renamed = root / "renamed.mhd.json"
+    (root / "MTBLS1.mhd.json").rename(renamed)
+    files = sorted(p for p in root.glob("*.mhd.json"))
+
+    plan = plan_incremental(previous, root, files)
+    for _ in plan.track(iter_build_results(plan.changed, False, "ts")):
+        pass
+
+    assert plan.removed == 1
+    assert plan.stale_dataset_ids() == []
+    assert plan.manifest.entries["renamed.mhd.json"].dataset_id == "ms::MTBLS1"
+
+
+def test_forget_rolls_back_entries_of_failed_uploads(mhd_files: list[Path]):
+    root = mhd_files[0].parent
+    previous = _full_run(root, mhd_files)
+    write_mhd_file(root, "MTBLS1", metabolites=1)
+    write_mhd_file(root, "MTBLS6")
+    plan = plan_incremental(previous, root, sorted(root.glob("*.mhd.json")))
+    for _ in plan.track(iter_build_results(plan.changed, False, "ts")):
+        pass
+
+    rolled_back = plan.forget({"ms::MTBLS1", "ms::MTBLS6::metabolite::met-0"})
+
+    assert rolled_back == 2
+    assert (
+        plan.manifest.entries["MTBLS1.mhd.json"] is previous.entries["MTBLS1.mhd.json"]
+    )
+    assert "MTBLS6.mhd.json" not in plan.manifest.entries
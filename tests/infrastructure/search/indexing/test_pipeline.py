@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from mhd_ws.infrastructure.search.indexing.pipeline import (
+    BoundedDocStream,
+    BuildStats,
+    build_file_docs,
+    iter_build_results,
+)
+
+
+def test_build_file_docs_returns_dataset_and_metabolite_docs(mhd_files: list[Path]):
+    result = build_file_docs(mhd_files[0], skip_metabolites=False, indexed_ts="ts")
+
+    assert result.error is None
+    assert result.doc["id"] == "ms::MTBLS1"
+    assert len(result.metabolite_docs) == 2
+
+
+def test_build_file_docs_reports_errors(mhd_files: list[Path]):
+    result = build_file_docs(mhd_files[-1], skip_metabolites=False, indexed_ts="ts")
+
+    assert result.doc is None
+    assert result.error.startswith("invalid JSON")
+
+
+def test_process_pool_matches_serial_results(mhd_files: list[Path]):
+    serial = list(iter_build_results(mhd_files, False, "ts"))
+    parallel = list(iter_build_results(mhd_files, False, "ts", workers=2, chunk_size=2))
+
+    assert [r.path for r in parallel] == [r.path for r in serial]
+    assert [r.doc for r in parallel] == [r.doc for r in serial]
+    assert [r.error for r in parallel] == [r.error for r in serial]
+
+
+def test_unordered_results_cover_all_files(mhd_files: list[Path]):
+    results = list(
+        iter_build_results(
+            mhd_files, True, "ts", workers=2, chunk_size=2, ordered=False
+        )
+    )
+
+    assert sorted(r.path for r in results) == sorted(str(p) for p in mhd_files)
+    assert all(not r.metabolite_docs for r in results)
+
+
+def test_build_stats_aggregates_errors(mhd_files: list[Path]):
+    stats = BuildStats()
+    for result in iter_build_results(mhd_files, False, "ts"):
+        stats.add(result)
+    stats.finish()
+
+    assert stats.files == 6
+    assert stats.dataset_docs == 5
+    assert stats.metabolite_docs == 10
+    assert [fp for fp, _ in stats.errors] == [str(mhd_files[-1])]
+    assert stats.files_per_second > 0
+
+
+def test_bounded_window_limits_pending_chunks(mhd_files: list[Path]):
+    results = list(
+        iter_build_results(
+            mhd_files, False, "ts", workers=2, chunk_size=1, max_pending=1
+        )
+    )
+
+    assert [r.path for r in results] == [str(p) for p in mhd_files]
+
+
+@pytest.mark.asyncio
+async def test_bounded_doc_stream_feeds_both_queues(mhd_files: list[Path]):
+    results = iter_build_results(mhd_files, False, "ts")
+
+    async def collect(docs):
+        return [doc async for doc in docs]
+
+    async with BoundedDocStream(results, max_pending=1) as stream:
+        datasets, metabolites = await asyncio.gather(
+            collect(stream.dataset_docs()), collect(stream.metabolite_docs())
+        )
+
+    assert [d["id"] for d in datasets] == [f"ms::MTBLS{i}" for i in range(1, 6)]
+    assert len(metabolites) == 10
+
+
+@pytest.mark.asyncio
+async def test_bounded_doc_stream_stops_producer_on_consumer_failure(
+    mhd_files: list[Path],
+):
+    results = iter_build_results(mhd_files, False, "ts")
+
+    with pytest.raises(RuntimeError, match="upload failed"):
+        async with BoundedDocStream(results, max_pending=1) as stream:
+            async for _ in stream.dataset_docs():
+                raise RuntimeError("upload failed")
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from mhd_ws.infrastructure.search.indexing.pipeline import build_file_docs
+from mhd_ws.infrastructure.search.indexing.profiling import (
+    FileProfile,
+    ProfileReport,
+    StageProfiler,
+)
+from mhd_ws.run.cli.indexing.index_datasets import index_datasets
+
+
+def test_sub_stages_also_count_towards_their_parent():
+    profiler = StageProfiler()
+    profiler.mark("decode")
+    profiler.mark("dataset_doc.people")
+    profiler.mark("dataset_doc.files")
+    profiler.mark("dataset_doc")
+
+    timings = profiler.timings
+    assert list(timings) == [
+        "decode",
+        "dataset_doc",
+        "dataset_doc.people",
+        "dataset_doc.files",
+    ]
+    assert timings["dataset_doc"][0] >= (
+        timings["dataset_doc.people"][0] + timings["dataset_doc.files"][0]
+    )
+    file_profile = FileProfile(path="x", timings=timings)
+    assert file_profile.wall == timings["decode"][0] + timings["dataset_doc"][0]
+
+
+def test_build_file_docs_profiles_only_when_asked(mhd_files: list[Path]):
+    plain = build_file_docs(mhd_files[0], False, "ts")
+    profiled = build_file_docs(mhd_files[0], False, "ts", profile=True)
+
+    assert plain.profile is None
+    assert profiled.doc == plain.doc
+    stages = profiled.profile.timings
+    for stage in ("decode", "graph_view", "dataset_doc", "metabolite_docs"):
+        assert stage in stages
+    assert "dataset_doc.characteristics" in stages
+    assert profiled.profile.doc_bytes == len(json.dumps(plain.doc, ensure_ascii=False))
+    assert profiled.profile.metabolite_docs == 2
+
+
+def test_report_lists_slowest_files_and_sizes():
+    report = ProfileReport(top_n=2)
+    for i, wall in enumerate([0.1, 0.3, 0.2]):
+        report.add(
+            FileProfile(
+                path=f"f{i}", timings={"decode": [wall, wall]}, doc_bytes=20_000 * i
+            )
+        )
+    report.add(None)
+
+    assert [f.path for f in report.slowest()] == ["f1", "f2"]
+    assert report.stages["decode"][2] == 3
+    assert report.to_dict()["doc_size_histogram"]["<100,000B"] == 2
+    assert any("slowest 2 files" in line for line in report.summary_lines())
+
+
+def test_cli_profile_writes_json_report(mhd_files: list[Path], tmp_path: Path):
+    report_file = tmp_path / "profile.json"
+    result = CliRunner().invoke(
+        index_datasets,
+        [
+            str(mhd_files[0].parent),
+            "--dry-run",
+            "--profile-json",
+            str(report_file),
+        ],
+    )
+
+    # The broken fixture file makes the dry run exit 1 after reporting.
+    assert "---- Profile ----" in result.output
+    report = json.loads(report_file.read_text())
+    assert len(report["files"]) == 6
+    assert report["stages"]["decode"]["files"] == 5
+    assert report["stages"]["failed"]["files"] == 1
+    assert report["stages"]["dataset_doc"]["files"] == 5
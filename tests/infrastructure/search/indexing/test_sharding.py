@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from mhd_ws.infrastructure.search.indexing.sharding import (
+    merge_run_summaries,
+    select_shard,
+    shard_of,
+)
+from mhd_ws.run.cli.indexing.index_datasets import index_datasets
+from mhd_ws.run.cli.indexing.merge_index_summaries import merge_index_summaries
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("MTBLS1", 4) == shard_of("MTBLS1", 4)
+    assert {shard_of(f"MTBLS{i}", 4) for i in range(200)} == {0, 1, 2, 3}
+
+
+def test_shards_are_disjoint_and_cover_all_files():
+    files = [Path(f"/data/MTBLS{i}.mhd.json") for i in range(50)]
+    shards = [select_shard(files, i, 3) for i in range(3)]
+
+    assert sorted(p for shard in shards for p in shard) == sorted(files)
+    assert sum(len(s) for s in shards) == len(files)
+    # Extension and directory do not matter, only the accession.
+    assert shard_of("MTBLS7", 3) in range(3)
+    assert select_shard([Path("/other/MTBLS7.json")], shard_of("MTBLS7", 3), 3)
+
+
+def _summary(index: int, count: int, errors: list[dict] | None = None) -> dict:
+    return {
+        "shard_index": index,
+        "shard_count": count,
+        "files": 2,
+        "dataset_docs": 2 - len(errors or []),
+        "metabolite_docs": 4,
+        "elapsed_s": 1.5 * (index + 1),
+        "errors": errors or [],
+    }
+
+
+def test_merge_totals_and_tags_errors_with_their_shard():
+    merged = merge_run_summaries(
+        [_summary(1, 2, [{"path": "b.json", "error": "boom"}]), _summary(0, 2)]
+    )
+
+    assert merged["complete"]
+    assert merged["files"] == 4
+    assert merged["dataset_docs"] == 3
+    assert merged["max_elapsed_s"] == 3.0
+    assert [s["shard_index"] for s in merged["shards"]] == [0, 1]
+    assert merged["errors"] == [{"path": "b.json", "error": "boom", "shard_index": 1}]
+
+
+def test_merge_reports_missing_duplicate_and_mismatched_shards():
+    merged = merge_run_summaries([_summary(0, 3), _summary(0, 3), _summary(1, 2)])
+
+    assert not merged["complete"]
+    assert any("disagree" in p for p in merged["problems"])
+    assert any("missing shards: [2]" in p for p in merged["problems"])
+    assert any("more than once: [0]" in p for p in merged["problems"])
+
+
+def test_cli_shards_then_merges_summaries(mhd_files: list[Path], tmp_path: Path):
+    input_dir = str(mhd_files[0].parent)
+    summaries = []
+    for i in range(2):
+        summary = tmp_path / f"shard-{i}.json"
+        CliRunner().invoke(
+            index_datasets,
+            [
+                input_dir,
+                "--dry-run",
+                "--shard-index",
+                str(i),
+                "--shard-count",
+                "2",
+                "--summary-json",
+                str(summary),
+            ],
+        )
+        summaries.append(str(summary))
+
+    errors_out = tmp_path / "errors.ndjson"
+    result = CliRunner().invoke(
+        merge_index_summaries,
+        [*summaries, "--json", "-", "--errors-out", str(errors_out)],
+    )
+
+    assert result.exit_code == 0, result.output
+    merged = json.loads(result.stdout)
+    assert merged["files"] == len(mhd_files)
+    assert merged["dataset_docs"] == len(mhd_files) - 1
+    [error] = [json.loads(line) for line in errors_out.read_text().splitlines()]
+    assert error["path"].endswith("MTBLS99.mhd.json")
+
+    result = CliRunner().invoke(merge_index_summaries, summaries[:1])
+    assert result.exit_code == 1
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import httpx
+import pytest
+
+from mhd_ws.infrastructure.search.indexing import tasks as tasks_module
+from mhd_ws.infrastructure.search.indexing.cleanup import stale_docs_query
+from mhd_ws.infrastructure.search.indexing.dataset_builder import (
+    TRUNCATION_PROPERTY,
+    DocSizeBudget,
+)
+from mhd_ws.infrastructure.search.indexing.db_source import MhdFileFetcher
+from mhd_ws.infrastructure.search.indexing.pipeline import build_mhd_docs
+from mhd_ws.infrastructure.search.indexing.tasks import (
+    DatasetIndexingConfiguration,
+    DebouncedDatasetIndexing,
+    index_dataset_revision,
+    index_dataset_task,
+    index_token_key,
+)
+from mhd_ws.infrastructure.search.search_cache import SEARCH_GENERATION_KEY
+
+from .conftest import make_mhd_graph
+
+INDICES = {"dataset_ms": "datasets", "metabolite": "metabolites"}
+
+
+class FakeCache:
+    def __init__(self) -> None:
+        self.values: dict[str, Any] = {}
+
+    async def get_value(self, key: str) -> Any:
+        return self.values.get(key)
+
+    async def set_value(
+        self, key: str, value: Any, expiration_time_in_seconds: int | None = None
+    ) -> bool:
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+
+class FakeExecutor:
+    def __init__(self, started: list, kwargs: dict[str, Any]) -> None:
+        self.started = started
+        self.kwargs = kwargs
+
+    async def start(self, expires: int | None = None, countdown: int | None = None):
+        self.started.append((self.kwargs, countdown))
+
+
+class FakeAsyncTaskService:
+    def __init__(self) -> None:
+        self.started: list[tuple[dict[str, Any], int | None]] = []
+
+    async def get_async_task(self, task_description, **kwargs) -> FakeExecutor:
+        assert task_description is index_dataset_task
+        return FakeExecutor(self.started, kwargs)
+
+
+class FakeEsClient:
+    def __init__(self, mapping: dict[str, Any] | None = None) -> None:
+        self.uploaded: dict[str, list[dict]] = {}
+        self.queries: list[tuple[str, dict]] = []
+        self.mapping = mapping or {"datasets": {"mappings": {"properties": {}}}}
+        self.put_mappings: list[tuple[str, dict]] = []
+
+    async def start(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    async def bulk_upload(self, docs, index_name, **kwargs) -> int:
+        docs = list(docs)
+        self.uploaded.setdefault(index_name, []).extend(docs)
+        return len(docs)
+
+    async def delete_by_query(self, index, query, **kwargs) -> int:
+        self.queries.append((index, query))
+        return 3
+
+    async def get_mapping(self, index, **kwargs) -> dict[str, Any]:
+        return self.mapping
+
+    async def put_mapping(self, index, properties, **kwargs) -> None:
+        self.put_mappings.append((index, properties))
+
+
+@pytest.fixture
+def mhd_server(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    requested: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(str(request.url))
+        accession = request.url.path.rsplit("/", 1)[-1].split(".", 1)[0]
+        return httpx.Response(200, content=json.dumps(make_mhd_graph(accession)))
+
+    monkeypatch.setattr(
+        tasks_module,
+        "MhdFileFetcher",
+        lambda: MhdFileFetcher(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        ),
+    )
+    return requested
+
+
+@pytest.mark.asyncio
+async def test_burst_of_schedules_keeps_only_the_latest_token():
+    cache = FakeCache()
+    service = FakeAsyncTaskService()
+
+    indexing = DebouncedDatasetIndexing(
+        cache, service, DatasetIndexingConfiguration(debounce_s=5)
+    )
+
+    first = await indexing.schedule_indexing("MTBLS1")
+    latest = await indexing.schedule_indexing("MTBLS1")
+
+    assert [(kwargs["token"], countdown) for kwargs, countdown in service.started] == [
+        (first, 5),
+        (latest, 5),
+    ]
+    assert cache.values[index_token_key("MTBLS1")] == latest.encode()
+
+    es_client = FakeEsClient()
+    result = await index_dataset_revision(
+        "MTBLS1",
+        token=first,
+        database_client=None,
+        es_client=es_client,
+        cache_service=cache,
+        indices=INDICES,
+    )
+
+    assert "superseded" in result["message"]
+    assert es_client.uploaded == {}
+
+
+@pytest.mark.asyncio
+async def test_index_dataset_revision_upserts_docs_and_drops_stale_ones(
+    db_client, mhd_server: list[str]
+):
+    cache = FakeCache()
+    cache.values[index_token_key("MTBLS1")] = b"token"
+    es_client = FakeEsClient()
+
+    result = await index_dataset_revision(
+        "MTBLS1",
+        token="token",
+        database_client=db_client,
+        es_client=es_client,
+        cache_service=cache,
+        indices=INDICES,
+    )
+
+    assert result["success"], result
+    assert mhd_server == ["https://example.org/r2/MTBLS1.mhd.json"]
+    assert [doc["id"] for doc in es_client.uploaded["datasets"]] == ["ms::MTBLS1"]
+    metabolite_ids = [doc["id"] for doc in es_client.uploaded["metabolites"]]
+    assert len(metabolite_ids) == 2
+    indexed_ts = es_client.uploaded["datasets"][0]["dates"]["indexed"]
+    assert {doc["indexed"] for doc in es_client.uploaded["metabolites"]} == {indexed_ts}
+    assert es_client.queries == [
+        ("metabolites", stale_docs_query(["ms::MTBLS1"], indexed_ts))
+    ]
+    assert result["stale_metabolite_docs"] == 3
+    assert cache.values[SEARCH_GENERATION_KEY]
+
+
+@pytest.mark.asyncio
+async def test_index_dataset_revision_also_indexes_files_when_configured(
+    db_client, mhd_server: list[str]
+):
+    es_client = FakeEsClient()
+
+    result = await index_dataset_revision(
+        "MTBLS2",
+        database_client=db_client,
+        es_client=es_client,
+        cache_service=FakeCache(),
+        indices={**INDICES, "file": "files"},
+    )
+
+    assert result["success"], result
+    assert [doc["id"] for doc in es_client.uploaded["files"]] == [
+        "ms::MTBLS2::file::file-1"
+    ]
+    indexed_ts = es_client.uploaded["datasets"][0]["dates"]["indexed"]
+    assert es_client.queries[-1] == (
+        "files",
+        stale_docs_query(["ms::MTBLS2"], indexed_ts),
+    )
+    assert result["stale_file_docs"] == 3
+
+
+@pytest.mark.asyncio
+async def test_private_dataset_is_not_indexed(db_client, mhd_server: list[str]):
+    es_client = FakeEsClient()
+
+    result = await index_dataset_revision(
+        "MTBLS9",
+        database_client=db_client,
+        es_client=es_client,
+        cache_service=FakeCache(),
+        indices=INDICES,
+    )
+
+    assert not result["success"]
+    assert mhd_server == []
+    assert es_client.uploaded == {}
+
+
+@pytest.mark.asyncio
+async def test_build_error_is_not_reported_as_a_fetch_error(
+    db_client, mhd_server: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    def fail_build(*args, **kwargs):
+        raise KeyError("nodes")
+
+    monkeypatch.setattr(tasks_module, "build_mhd_docs", fail_build)
+
+    result = await index_dataset_revision(
+        "MTBLS1",
+        database_client=db_client,
+        es_client=FakeEsClient(),
+        cache_service=FakeCache(),
+        indices=INDICES,
+    )
+
+    assert not result["success"]
+    assert result["message"].startswith("Failed to build documents of ")
+
+
+@pytest.mark.asyncio
+async def test_slim_index_gets_docs_without_the_debug_block(
+    db_client, mhd_server: list[str]
+):
+    slim = {"mappings": {"_meta": {"doc_profile": "slim"}, "properties": {}}}
+    es_client = FakeEsClient(mapping={"datasets": slim})
+
+    result = await index_dataset_revision(
+        "MTBLS1",
+        database_client=db_client,
+        es_client=es_client,
+        cache_service=FakeCache(),
+        indices={**INDICES, "diagnostics": "diagnostics"},
+    )
+
+    assert result["success"], result
+    [doc] = es_client.uploaded["datasets"]
+    assert "debug" not in doc
+    assert [d["dataset_id"] for d in es_client.uploaded["diagnostics"]] == [
+        "ms::MTBLS1"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_truncated_doc_adds_the_field_to_an_older_mapping(
+    db_client, mhd_server: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    def build_small_docs(*args, **kwargs):
+        budget = DocSizeBudget(max_search_text_bytes=1)
+        return build_mhd_docs(*args, budget=budget, **kwargs)
+
+    monkeypatch.setattr(tasks_module, "build_mhd_docs", build_small_docs)
+    es_client = FakeEsClient()
+
+    result = await index_dataset_revision(
+        "MTBLS1",
+        database_client=db_client,
+        es_client=es_client,
+        cache_service=FakeCache(),
+        indices=INDICES,
+    )
+
+    assert result["success"], result
+    assert es_client.uploaded["datasets"][0]["truncation"]
+    assert es_client.put_mappings == [("datasets", {"truncation": TRUNCATION_PROPERTY})]
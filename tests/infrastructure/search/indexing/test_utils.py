@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from mhd_ws.infrastructure.search.indexing.utils import (
+    JSON_DECODERS,
+    load_json_file,
+    resolve_json_decoder,
+)
+
+
+def _installed_decoders() -> list[str]:
+    installed = []
+    for name in JSON_DECODERS:
+        try:
+            installed.append(resolve_json_decoder(name))
+        except ValueError:
+            continue
+    return installed
+
+
+@pytest.fixture(params=_installed_decoders())
+def decoder(request) -> str:
+    return request.param
+
+
+def test_auto_picks_an_installed_decoder():
+    assert resolve_json_decoder() in {"orjson", "json"}
+    assert resolve_json_decoder("json") == "json"
+    with pytest.raises(ValueError, match="unknown JSON decoder"):
+        resolve_json_decoder("simplejson")
+
+
+def test_decoders_agree(tmp_path: Path, decoder: str):
+    path = tmp_path / "a.json"
+    data = {"graph": {"nodes": [{"id": "n1", "name": "ångström", "v": 1.25}]}}
+    path.write_text(
+        '{"graph": {"nodes": [{"id": "n1", "name": "\\u00e5ngstr\\u00f6m", "v": 1.25}]}}'
+    )
+
+    assert load_json_file(path, decoder=decoder) == data
+
+
+def test_lenient_inputs_fall_back_to_stdlib(tmp_path: Path, decoder: str):
+    path = tmp_path / "a.json"
+    path.write_bytes(b'{"name": "caf\xe9", "big": 123456789012345678901234567890}')
+
+    loaded = load_json_file(path, decoder=decoder)
+
+    assert loaded == {"name": "caf�", "big": 123456789012345678901234567890}
+
+
+@pytest.mark.parametrize(
+    ("content", "message"),
+    [
+        ('{"a": 1,}', "invalid JSON"),
+        ('{\n<<<<<<< HEAD\n"a": 1\n=======\n"a": 2\n>>>>>>> x\n}', "merge-conflict"),
+        ('<<<<<<< HEAD\n{"a": 1}\n=======\n{"a": 2}\n>>>>>>> x\n', "merge-conflict"),
+        ('{"a": "x ======= y"}', None),
+        ("", "invalid JSON"),
+    ],
+)
+def test_merge_conflict_markers_and_invalid_json(
+    tmp_path: Path, decoder: str, content: str, message: str | None
+):
+    path = tmp_path / "a.json"
+    path.write_text(content)
+
+    if message is None:
+        assert load_json_file(path, decoder=decoder) == {"a": "x ======= y"}
+        return
+    with pytest.raises(ValueError, match=message):
+        load_json_file(path, decoder=decoder)
@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from elastic_transport import ConnectionTimeout
+
+from mhd_ws.infrastructure.search import es_client as es_client_module
+from mhd_ws.infrastructure.search.bulk import (
+    AdaptiveBatchSizer,
+    BulkBatchResult,
+    BulkReport,
+    BulkUploadOptions,
+    DeadLetterWriter,
+    iter_bulk_chunks,
+    iter_dead_letter,
+    make_bulk_action,
+)
+from mhd_ws.infrastructure.search.es_client import ElasticsearchClient
+
+from .test_es_client import FakeApiError
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_make_bulk_action_serializes_meta_and_source():
+    action = make_bulk_action({"id": "ms::MTBLS1", "title": "é"}, "datasets")
+
+    assert json.loads(action.lines[0]) == {
+        "index": {"_index": "datasets", "_id": "ms::MTBLS1"}
+    }
+    assert json.loads(action.lines[1]) == {"id": "ms::MTBLS1", "title": "é"}
+    assert action.nbytes == sum(len(line) + 1 for line in action.lines)
+
+
+@pytest.mark.asyncio
+async def test_iter_bulk_chunks_respects_doc_count_and_bytes():
+    actions = [
+        make_bulk_action({"id": f"d{i}", "x": "a" * 100}, "i") for i in range(10)
+    ]
+    one = actions[0].nbytes
+    sizer = AdaptiveBatchSizer(4, BulkUploadOptions())
+
+    by_count = await _collect(iter_bulk_chunks(_aiter(actions), sizer, 10**9))
+    by_bytes = await _collect(iter_bulk_chunks(_aiter(actions), sizer, one * 2 + 1))
+
+    assert [len(c) for c in by_count] == [4, 4, 2]
+    assert [len(c) for c in by_bytes] == [2, 2, 2, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_iter_bulk_chunks_sends_oversized_action_alone():
+    big = make_bulk_action({"id": "big", "x": "a" * 1000}, "i")
+    small = make_bulk_action({"id": "small"}, "i")
+    sizer = AdaptiveBatchSizer(10, BulkUploadOptions())
+
+    chunks = await _collect(iter_bulk_chunks(_aiter([small, big, small]), sizer, 200))
+
+    assert [[a.doc_id for a in c] for c in chunks] == [["small"], ["big"], ["small"]]
+
+
+def test_adaptive_sizer_shrinks_on_rejection_and_slow_took_and_grows_when_fast():
+    options = BulkUploadOptions(
+        adaptive=True, target_took_ms=100, min_batch_size=10, max_batch_size=1000
+    )
+    sizer = AdaptiveBatchSizer(400, options)
+
+    sizer.observe(BulkBatchResult(1, docs=400, nbytes=0, latency_s=1, rejected=3))
+    assert sizer.size == 200
+    sizer.observe(BulkBatchResult(2, docs=200, nbytes=0, latency_s=1, took_ms=500))
+    assert sizer.size == 150
+    sizer.observe(BulkBatchResult(3, docs=150, nbytes=0, latency_s=1, took_ms=10))
+    assert sizer.size == 188
+    # A partial (trailing) batch says nothing about capacity.
+    sizer.observe(BulkBatchResult(4, docs=5, nbytes=0, latency_s=1, took_ms=10))
+    assert sizer.size == 188
+
+
+def test_sizer_is_fixed_when_not_adaptive():
+    sizer = AdaptiveBatchSizer(400, BulkUploadOptions())
+    sizer.observe(BulkBatchResult(1, docs=400, nbytes=0, latency_s=1, rejected=3))
+    assert sizer.size == 400
+
+
+def test_bulk_report_summary():
+    report = BulkReport(index_name="datasets")
+    for i, latency in enumerate([0.1, 0.2, 0.3, 0.4], start=1):
+        report.add(
+            BulkBatchResult(i, docs=10, nbytes=100, latency_s=latency, succeeded=10)
+        )
+
+    assert report.docs == 40
+    assert report.latency_percentile(50) == 0.2
+    assert report.latency_percentile(95) == 0.4
+    assert "40 docs in 4 batches" in report.summary()
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_bounds_in_flight_requests(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    state = {"in_flight": 0, "max_in_flight": 0, "ids": []}
+
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            self.indices = object()
+
+        def options(self, **kwargs):
+            return self
+
+        async def bulk(self, operations, **kwargs):
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            items = []
+            for line in operations[::2]:
+                doc_id = json.loads(line)["index"]["_id"]
+                state["ids"].append(doc_id)
+                items.append({"index": {"_id": doc_id, "status": 201}})
+            return {"took": 3, "errors": False, "items": items}
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    client = ElasticsearchClient(
+        {"hosts": ["https://127.0.0.1:9200"], "username": "e", "password": "p"}
+    )
+    report = BulkReport(index_name="datasets")
+
+    await client.start()
+    uploaded = await client.bulk_upload(
+        ({"id": f"d{i}"} for i in range(25)),
+        "datasets",
+        batch_size=2,
+        options=BulkUploadOptions(concurrency=3),
+        report=report,
+    )
+    await client.close()
+
+    assert uploaded == 25
+    assert sorted(state["ids"]) == sorted(f"d{i}" for i in range(25))
+    assert state["max_in_flight"] == 3
+    assert len(report.batches) == 13
+    assert all(b.took_ms == 3 for b in report.batches)
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_raises_on_item_errors(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            self.indices = object()
+
+        def options(self, **kwargs):
+            return self
+
+        async def bulk(self, operations, **kwargs):
+            return {
+                "took": 1,
+                "errors": True,
+                "items": [
+                    {"index": {"_id": "a", "status": 201}},
+                    {"index": {"_id": "b", "status": 400, "error": {"type": "x"}}},
+                ],
+            }
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    client = ElasticsearchClient(
+        {"hosts": ["https://127.0.0.1:9200"], "username": "e", "password": "p"}
+    )
+
+    await client.start()
+    with pytest.raises(RuntimeError, match="failed for 1 items"):
+        await client.bulk_upload(
+            [{"id": "a"}, {"id": "b"}], "datasets", options=BulkUploadOptions()
+        )
+    await client.close()
+
+
+def _client_with_bulk(monkeypatch: pytest.MonkeyPatch, bulk) -> ElasticsearchClient:
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            self.indices = object()
+            self.bulk = bulk
+
+        def options(self, **kwargs):
+            return self
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    return ElasticsearchClient(
+        {"hosts": ["https://127.0.0.1:9200"], "username": "e", "password": "p"}
+    )
+
+
+def _ids(operations) -> list[str]:
+    return [json.loads(line)["index"]["_id"] for line in operations[::2]]
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_retries_retryable_items(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    calls = []
+
+    async def bulk(operations, **kwargs):
+        ids = _ids(operations)
+        calls.append(ids)
+        if len(calls) == 2:
+            raise ConnectionTimeout("timed out")
+        return {
+            "took": 1,
+            "items": [
+                {
+                    "index": {
+                        "_id": i,
+                        "status": 429 if i == "b" and len(calls) == 1 else 201,
+                    }
+                }
+                for i in ids
+            ],
+        }
+
+    client = _client_with_bulk(monkeypatch, bulk)
+    report = BulkReport(index_name="datasets")
+
+    await client.start()
+    uploaded = await client.bulk_upload(
+        [{"id": "a"}, {"id": "b"}],
+        "datasets",
+        options=BulkUploadOptions(initial_backoff_s=0),
+        report=report,
+    )
+    await client.close()
+
+    assert uploaded == 2
+    assert calls == [["a", "b"], ["b"], ["b"]]
+    assert report.retried == 2
+    assert report.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_dead_letters_failed_items_and_continues(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    calls = []
+
+    async def bulk(operations, **kwargs):
+        ids = _ids(operations)
+        calls.append(ids)
+        status = {"bad": 400, "busy": 503}
+        return {
+            "took": 1,
+            "items": [
+                {
+                    "index": {
+                        "_id": i,
+                        "status": status.get(i, 201),
+                        **({"error": {"type": "x"}} if i in status else {}),
+                    }
+                }
+                for i in ids
+            ],
+        }
+
+    client = _client_with_bulk(monkeypatch, bulk)
+    docs = [{"id": "a"}, {"id": "bad"}, {"id": "busy"}, {"id": "c"}]
+    path = tmp_path / "dead-letter.ndjson"
+
+    await client.start()
+    with DeadLetterWriter(path) as dead_letter:
+        uploaded = await client.bulk_upload(
+            docs,
+            "datasets",
+            batch_size=2,
+            options=BulkUploadOptions(max_retries=2, initial_backoff_s=0),
+            dead_letter=dead_letter,
+        )
+    await client.close()
+
+    assert uploaded == 2
+    assert calls == [["a", "bad"], ["busy", "c"], ["busy"], ["busy"]]
+    records = list(iter_dead_letter(path))
+    assert [(r["id"], r["status"], r["attempts"]) for r in records] == [
+        ("bad", 400, 1),
+        ("busy", 503, 3),
+    ]
+    assert records[0]["doc"] == {"id": "bad"}
+    assert records[0]["index"] == "datasets"
+    assert dead_letter.doc_ids == {"bad", "busy"}
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_retries_rejected_requests_then_dead_letters(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    calls = []
+
+    async def bulk(operations, **kwargs):
+        calls.append(_ids(operations))
+        raise FakeApiError(503)
+
+    client = _client_with_bulk(monkeypatch, bulk)
+    path = tmp_path / "dead-letter.ndjson"
+
+    await client.start()
+    with DeadLetterWriter(path) as dead_letter:
+        uploaded = await client.bulk_upload(
+            [{"id": "a"}, {"id": "b"}],
+            "datasets",
+            options=BulkUploadOptions(max_retries=1, initial_backoff_s=0),
+            dead_letter=dead_letter,
+        )
+    await client.close()
+
+    assert uploaded == 0
+    assert calls == [["a", "b"], ["a", "b"]]
+    records = list(iter_dead_letter(path))
+    assert [(r["id"], r["status"], r["attempts"]) for r in records] == [
+        ("a", 503, 2),
+        ("b", 503, 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_splits_requests_that_are_too_large(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    calls = []
+
+    async def bulk(operations, **kwargs):
+        ids = _ids(operations)
+        calls.append(ids)
+        if len(ids) > 1:
+            raise FakeApiError(413)
+        return {"took": 1, "items": [{"index": {"_id": ids[0], "status": 201}}]}
+
+    client = _client_with_bulk(monkeypatch, bulk)
+
+    await client.start()
+    uploaded = await client.bulk_upload(
+        [{"id": "a"}, {"id": "b"}, {"id": "c"}],
+        "datasets",
+        batch_size=3,
+        options=BulkUploadOptions(),
+    )
+    await client.close()
+
+    assert uploaded == 3
+    assert calls == [["a", "b", "c"], ["a"], ["b", "c"], ["b"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_upload_raises_on_non_retryable_request_errors(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    async def bulk(operations, **kwargs):
+        raise FakeApiError(401)
+
+    client = _client_with_bulk(monkeypatch, bulk)
+
+    await client.start()
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await client.bulk_upload(
+            [{"id": "a"}], "datasets", options=BulkUploadOptions(initial_backoff_s=0)
+        )
+    await client.close()
+
+    assert excinfo.group_contains(FakeApiError)
+
+
+def test_dead_letter_file_is_only_created_on_failure(tmp_path):
+    path = tmp_path / "dead-letter.ndjson"
+    with DeadLetterWriter(path):
+        pass
+    assert not path.exists()
+
+
+def test_dead_letter_file_keeps_earlier_failures_unless_overwritten(tmp_path):
+    path = tmp_path / "dead-letter.ndjson"
+
+    def fail(doc_id: str, overwrite: bool = False) -> None:
+        with DeadLetterWriter(path, overwrite=overwrite) as dead_letter:
+            action = make_bulk_action({"id": doc_id}, "datasets")
+            dead_letter.write(action, "datasets", "index", 400, None, attempts=1)
+
+    fail("first")
+    fail("second")
+    assert [r["id"] for r in iter_dead_letter(path)] == ["first", "second"]
+
+    fail("replayed", overwrite=True)
+    assert [r["id"] for r in iter_dead_letter(path)] == ["replayed"]
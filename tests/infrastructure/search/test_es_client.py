@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
@@ -14,6 +15,8 @@ class FakeApiError(ApiError):
     def __init__(self, status_code: int):
         Exception.__init__(self, f"HTTP {status_code}")
         self._status_code = status_code
+        self.message = f"HTTP {status_code}"
+        self.body = None
 
     @property
     def status_code(self) -> int:
@@ -176,3 +179,189 @@ async def test_bulk_upload_timeout_error_is_actionable(
         )
 
     await client.close()
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_accepts_async_iterable(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    sent_actions = []
+
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            self.indices = object()
+
+    async def fake_async_streaming_bulk(client, actions, **kwargs):
+        async for action in actions:
+            sent_actions.append(action)
+            yield True, {"index": {"_id": action["_id"]}}
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    monkeypatch.setattr(
+        es_client_module, "async_streaming_bulk", fake_async_streaming_bulk
+    )
+
+    async def docs():
+        for i in range(3):
+            yield {"id": f"doc-{i}"}
+
+    client = ElasticsearchClient(
+        {
+            "hosts": ["https://127.0.0.1:9200"],
+            "username": "elastic",
+            "password": "secret",
+        }
+    )
+
+    await client.start()
+    uploaded = await client.bulk_upload(docs(), "dataset_ms_v1")
+    await client.close()
+
+    assert uploaded == 3
+    assert [a["_id"] for a in sent_actions] == ["doc-0", "doc-1", "doc-2"]
+    assert all(a["_index"] == "dataset_ms_v1" for a in sent_actions)
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_ignores_missing_docs(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            self.indices = object()
+
+    async def fake_async_streaming_bulk(client, actions, **kwargs):
+        for action in actions:
+            assert action["_op_type"] == "delete"
+            status = 404 if action["_id"] == "gone" else 200
+            yield status == 200, {"delete": {"_id": action["_id"], "status": status}}
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    monkeypatch.setattr(
+        es_client_module, "async_streaming_bulk", fake_async_streaming_bulk
+    )
+
+    client = ElasticsearchClient(
+        {
+            "hosts": ["https://127.0.0.1:9200"],
+            "username": "elastic",
+            "password": "secret",
+        }
+    )
+
+    await client.start()
+    deleted = await client.bulk_delete(["doc-1", "gone"], "dataset_ms_v1")
+    await client.close()
+
+    assert deleted == 1
+
+
+@pytest.mark.asyncio
+async def test_http_compress_is_passed_to_the_transport(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    instances = []
+
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            instances.append(self)
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+
+    await ElasticsearchClient({"hosts": ["http://es:9200"]}).start()
+    await ElasticsearchClient(
+        {"hosts": ["http://es:9200"], "http_compress": True}
+    ).start()
+
+    assert [i.kwargs["http_compress"] for i in instances] == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_delete_by_query_proceeds_on_conflicts(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    calls = []
+
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+
+        def options(self, **options):
+            calls.append(options)
+            return self
+
+        async def delete_by_query(self, **kwargs):
+            calls.append(kwargs)
+            return {"deleted": 4, "version_conflicts": 1}
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    client = ElasticsearchClient(
+        {"hosts": ["http://es:9200"], "bulk_request_timeout": 300.0}
+    )
+
+    await client.start()
+    query = {"term": {"dataset_id": "ms::MTBLS1"}}
+    deleted = await client.delete_by_query("metabolite_ms_v1", query)
+    await client.close()
+
+    assert deleted == 4
+    assert calls == [
+        {"request_timeout": 300.0},
+        {
+            "index": "metabolite_ms_v1",
+            "query": query,
+            "conflicts": "proceed",
+            "refresh": False,
+        },
+    ]
+
+
+@pytest.mark.asyncio
+async def test_existing_index_mapping_is_updated_on_request(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    put_mapping = AsyncMock()
+
+    class FakeIndices:
+        exists = AsyncMock(return_value=True)
+        create = AsyncMock()
+        get_mapping = AsyncMock(
+            return_value=SimpleNamespace(
+                body={"metabolites_v1": {"mappings": {"properties": {"id": {}}}}}
+            )
+        )
+
+        async def put_mapping(self, **kwargs):
+            await put_mapping(**kwargs)
+
+    class FakeAsyncElasticsearch:
+        def __init__(self, **kwargs):
+            self.ping = AsyncMock(return_value=True)
+            self.close = AsyncMock()
+            self.indices = FakeIndices()
+
+    monkeypatch.setattr(es_client_module, "AsyncElasticsearch", FakeAsyncElasticsearch)
+    client = ElasticsearchClient({"hosts": ["http://es:9200"]})
+    mapping = {
+        "mappings": {
+            "properties": {"id": {"type": "keyword"}, "indexed": {"type": "date"}}
+        }
+    }
+
+    await client.start()
+    await client.ensure_index_exists("metabolites", mapping)
+    put_mapping.assert_not_awaited()
+    await client.ensure_index_exists("metabolites", mapping, update_mapping=True)
+    await client.close()
+
+    put_mapping.assert_awaited_once_with(
+        index="metabolites", properties={"indexed": {"type": "date"}}
+    )
@@ -208,3 +208,18 @@ class TestCompositeAgg:
                 }
             }
         }
+
+    def test_metabolite_partition_agg(self, metabolite_compiler: EsDslCompiler) -> None:
+        result = metabolite_compiler.compile_metabolite_partition_agg(
+            "dataset_id", partition=2, num_partitions=8, size=50_000
+        )
+        assert result == {
+            "dataset_ids": {
+                "terms": {
+                    "field": "dataset_id",
+                    "include": {"partition": 2, "num_partitions": 8},
+                    "size": 50_000,
+                    "order": {"_key": "asc"},
+                }
+            }
+        }
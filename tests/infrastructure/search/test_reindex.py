@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from mhd_ws.infrastructure.search.reindex import (
+    BlueGreenOptions,
+    BlueGreenReindex,
+    LegacyIndexError,
+    generation_indices,
+    timestamped_index_name,
+)
+
+NOW = datetime.datetime(2026, 3, 4, 5, 6, 7, tzinfo=datetime.UTC)
+MAPPING = {
+    "settings": {"index": {"number_of_shards": 1, "number_of_replicas": 1}},
+    "mappings": {"dynamic": "strict", "properties": {}},
+}
+
+
+def _fake_client(aliased: list[str], existing: list[str]):
+    client = AsyncMock()
+    client.get_alias_indices.return_value = aliased
+    client.index_exists.side_effect = lambda name, **_: name in existing
+    client.list_indices.return_value = [
+        n for n in existing if n.startswith("dataset_ms_v1-")
+    ]
+    return client
+
+
+def test_timestamped_index_names_sort_by_generation():
+    name = timestamped_index_name("dataset_ms_v1", NOW)
+
+    assert name == "dataset_ms_v1-20260304050607"
+    assert generation_indices(
+        "dataset_ms_v1",
+        [name, "dataset_ms_v1-20250101000000", "dataset_ms_v1-tmp", "other"],
+    ) == ["dataset_ms_v1-20250101000000", name]
+
+
+@pytest.mark.asyncio
+async def test_create_uses_bulk_load_settings_without_touching_mapping():
+    client = _fake_client([], [])
+    reindex = BlueGreenReindex(client, "dataset_ms_v1", MAPPING, now=NOW)
+
+    assert await reindex.create() == "dataset_ms_v1-20260304050607"
+
+    _, mapping = client.create_index.await_args.args
+    assert mapping["settings"]["index"] == {
+        "number_of_shards": 1,
+        "number_of_replicas": 0,
+        "refresh_interval": "-1",
+    }
+    assert MAPPING["settings"]["index"]["number_of_replicas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_finalize_restores_settings_swaps_alias_and_prunes():
+    old = ["dataset_ms_v1-20250101000000", "dataset_ms_v1-20260101000000"]
+    client = _fake_client([old[-1]], [*old, "dataset_ms_v1-20260304050607"])
+    reindex = BlueGreenReindex(
+        client,
+        "dataset_ms_v1",
+        MAPPING,
+        options=BlueGreenOptions(retain=2, force_merge=True),
+        now=NOW,
+    )
+
+    pruned = await reindex.finalize()
+
+    client.put_index_settings.assert_awaited_once_with(
+        "dataset_ms_v1-20260304050607",
+        {"index": {"refresh_interval": None, "number_of_replicas": 1}},
+        api_key_name=None,
+    )
+    client.force_merge.assert_awaited_once()
+    actions = client.update_aliases.await_args.args[0]
+    assert actions == [
+        {"remove": {"index": old[-1], "alias": "dataset_ms_v1"}},
+        {"add": {"index": "dataset_ms_v1-20260304050607", "alias": "dataset_ms_v1"}},
+    ]
+    assert pruned == [old[0]]
+    client.delete_index.assert_awaited_once_with(old[0], api_key_name=None)
+
+
+@pytest.mark.asyncio
+async def test_concrete_index_holding_the_alias_name_is_refused_by_default():
+    client = _fake_client([], ["dataset_ms_v1"])
+    reindex = BlueGreenReindex(client, "dataset_ms_v1", MAPPING, now=NOW)
+
+    with pytest.raises(LegacyIndexError, match="reindex or rename"):
+        await reindex.create()
+    with pytest.raises(LegacyIndexError):
+        await reindex.swap_alias()
+
+    client.create_index.assert_not_awaited()
+    client.update_aliases.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_swap_replaces_concrete_index_holding_the_alias_name():
+    client = _fake_client([], ["dataset_ms_v1"])
+    reindex = BlueGreenReindex(
+        client,
+        "dataset_ms_v1",
+        MAPPING,
+        options=BlueGreenOptions(migrate_legacy_index=True),
+        now=NOW,
+    )
+
+    await reindex.swap_alias()
+
+    assert client.update_aliases.await_args.args[0] == [
+        {"remove_index": {"index": "dataset_ms_v1"}},
+        {"add": {"index": "dataset_ms_v1-20260304050607", "alias": "dataset_ms_v1"}},
+    ]
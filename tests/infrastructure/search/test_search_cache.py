@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from mhd_ws.domain.entities.search.index_search import (
+    IndexSearchResult,
+    PageModel,
+    SortModel,
+)
+from mhd_ws.domain.entities.search.index_search_spec import (
+    FieldRef,
+    ParameterPairClauseSpec,
+    SearchSpec,
+    Target,
+    TermClauseSpec,
+    ValueType,
+)
+from mhd_ws.infrastructure.cache.in_memory.in_memory_cache import InMemoryCacheImpl
+from mhd_ws.infrastructure.search.es.id_set_cache import MetaboliteIdSetCache
+from mhd_ws.infrastructure.search.search_cache import (
+    CachedAdvancedSearch,
+    bump_search_generation,
+    search_cache_key,
+)
+
+
+def title_clause(*terms: str) -> TermClauseSpec:
+    return TermClauseSpec(
+        field=FieldRef(
+            field_key="title", target=Target.DATASET, value_type=ValueType.TEXT
+        ),
+        combine_within_field="OR",
+        terms=list(terms),
+    )
+
+
+def organism_clause(*values: str) -> ParameterPairClauseSpec:
+    return ParameterPairClauseSpec(type_name="organism", values=list(values))
+
+
+def make_search(result: IndexSearchResult | None = None):
+    delegate = AsyncMock()
+    delegate.advanced_search.return_value = result or IndexSearchResult(
+        results=[{"id": "ms::MTBLS1"}], total_results=1, request_id="first"
+    )
+    cache = InMemoryCacheImpl()
+    return CachedAdvancedSearch(delegate, cache, ttl_in_seconds=60), delegate, cache
+
+
+def test_key_ignores_clause_and_value_order():
+    spec = SearchSpec(
+        clauses=[title_clause("lipid", "urine"), organism_clause("mouse", "human")]
+    )
+    reordered = SearchSpec(
+        clauses=[organism_clause("human", "mouse"), title_clause("urine", "lipid")]
+    )
+
+    assert search_cache_key(spec, None, None, "g") == search_cache_key(
+        reordered, PageModel(), None, "g"
+    )
+    assert search_cache_key(spec, None, None, "g") != search_cache_key(
+        spec, PageModel(current=2), None, "g"
+    )
+    assert search_cache_key(spec, None, None, "g") != search_cache_key(
+        spec, None, SortModel(field="title"), "g"
+    )
+    assert search_cache_key(spec, None, None, "g") != search_cache_key(
+        spec, None, None, "h"
+    )
+
+
+def test_key_keeps_negation_and_combiners_apart():
+    spec = SearchSpec(clauses=[title_clause("lipid")])
+    negated = SearchSpec(
+        clauses=[title_clause("lipid").model_copy(update={"negated": True})]
+    )
+    any_of = SearchSpec(inter_field_combiner="OR", clauses=[title_clause("lipid")])
+
+    keys = {search_cache_key(s, None, None, "g") for s in (spec, negated, any_of)}
+
+    assert len(keys) == 3
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_is_served_from_the_cache():
+    search, delegate, cache = make_search()
+    spec = SearchSpec(clauses=[title_clause("lipid", "urine")])
+
+    first = await search.advanced_search(spec)
+    second = await search.advanced_search(
+        SearchSpec(clauses=[title_clause("urine", "lipid")])
+    )
+
+    delegate.advanced_search.assert_awaited_once()
+    assert second.results == first.results
+    assert second.total_results == 1
+    assert second.request_id not in ("", "first")
+    assert search.get_cache_stats() == {
+        "enabled": True,
+        "hits": 1,
+        "misses": 1,
+        "errors": 0,
+        "hit_rate": 0.5,
+        "miss_rate": 0.5,
+    }
+    [key] = await cache.keys("advanced-search:*")
+    assert 0 < await cache.get_ttl_in_seconds(key) <= 60
+
+
+@pytest.mark.asyncio
+async def test_new_generation_drops_cached_results():
+    search, delegate, cache = make_search()
+    spec = SearchSpec(query_text="lipid")
+
+    await search.advanced_search(spec)
+    await bump_search_generation(cache)
+    await search.advanced_search(spec)
+
+    assert delegate.advanced_search.await_count == 2
+    assert search.stats.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_new_generation_clears_metabolite_id_sets_even_when_disabled():
+    search, delegate, cache = make_search()
+    search.enabled = False
+    search.id_set_cache = MetaboliteIdSetCache()
+    search.id_set_cache.put("key", ["ms::MTBLS1"])
+
+    await search.advanced_search(SearchSpec(query_text="lipid"))
+    search.id_set_cache.put("key", ["ms::MTBLS1"])
+    await bump_search_generation(cache)
+    await search.advanced_search(SearchSpec(query_text="lipid"))
+
+    assert len(search.id_set_cache) == 0
+    assert await cache.keys("advanced-search:*") == []
+    assert search.get_cache_stats()["metabolite_id_sets"]["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_failures_fall_through_to_the_gateway():
+    search, delegate, cache = make_search()
+    search.cache_service = AsyncMock()
+    search.cache_service.get_value.side_effect = ConnectionError("down")
+
+    result = await search.advanced_search(SearchSpec(query_text="lipid"))
+
+    assert result.request_id == "first"
+    assert search.stats.errors == 1
+    search.cache_service.set_value.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_bypass_the_cache():
+    search, delegate, cache = make_search()
+    spec = SearchSpec(clauses=[title_clause("lipid")])
+
+    for _ in range(2):
+        await search.advanced_search(spec, page=PageModel(cursor="*"))
+
+    assert delegate.advanced_search.await_count == 2
+    assert await cache.keys("advanced-search:*") == []